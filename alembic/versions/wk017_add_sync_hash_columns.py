@@ -0,0 +1,31 @@
+"""Add sync_hash to workshop sync mirror tables
+
+Revision ID: wk017_add_sync_hash_columns
+Revises: wk016_add_der_run_lbr_hrs
+Create Date: 2026-10-16
+
+Adds:
+  - sync_hash column (String(32)) to workshop_job_routes, workshop_order_overviews
+    and infor_job_transactions — content hash used by sync_bulk_upsert
+    to skip unchanged rows
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'wk017_add_sync_hash_columns'
+down_revision: str = 'wk016_add_der_run_lbr_hrs'
+branch_labels = None
+depends_on = None
+
+_TABLES = ('workshop_job_routes', 'workshop_order_overviews', 'infor_job_transactions')
+
+
+def upgrade() -> None:
+    for table in _TABLES:
+        op.add_column(table, sa.Column('sync_hash', sa.String(32), nullable=True))
+
+
+def downgrade() -> None:
+    for table in reversed(_TABLES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('sync_hash')
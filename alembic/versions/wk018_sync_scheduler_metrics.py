@@ -0,0 +1,32 @@
+"""Add scheduler metrics to sync_states
+
+Revision ID: wk018_sync_scheduler_metrics
+Revises: wk017_add_sync_hash_columns
+Create Date: 2026-10-16
+
+Adds:
+  - next_run_at, last_duration_ms, consecutive_failures, overrun_count
+    to sync_states (per-step scheduler in InforSyncService)
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'wk018_sync_scheduler_metrics'
+down_revision: str = 'wk017_add_sync_hash_columns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('sync_states', sa.Column('next_run_at', sa.DateTime(), nullable=True))
+    op.add_column('sync_states', sa.Column('last_duration_ms', sa.Integer(), nullable=True))
+    op.add_column('sync_states', sa.Column('consecutive_failures', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('sync_states', sa.Column('overrun_count', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('sync_states') as batch_op:
+        batch_op.drop_column('overrun_count')
+        batch_op.drop_column('consecutive_failures')
+        batch_op.drop_column('last_duration_ms')
+        batch_op.drop_column('next_run_at')
@@ -0,0 +1,134 @@
+"""Derived completion flag + sort keys on workshop_job_routes
+
+Revision ID: wk019_wjr_completion_sort_keys
+Revises: wk018_sync_scheduler_metrics
+Create Date: 2026-10-16
+
+Adds:
+  - is_completed, op_datum_st_key, op_datum_sp_key, oper_num_key
+    to workshop_job_routes (maintained by workshop sync dispatchers)
+  - composite index ix_wjr_queue (wc, job_stat, is_completed, op_datum_st_key)
+    for SQL-side queue / machine plan reads (filter + ORDER BY + LIMIT)
+  - backfill of existing rows; sync_hash reset so the next route sync
+    rewrites rows with the new content columns
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'wk019_wjr_completion_sort_keys'
+down_revision: str = 'wk018_sync_scheduler_metrics'
+branch_labels = None
+depends_on = None
+
+
+# Zmrazená kopie odvozovací logiky z app.services.workshop_service (stav k této revizi) —
+# migrace nesmí záviset na aktuálním kódu aplikace
+_QTY_EPSILON = 1e-6
+_DONE_STATE_MARKERS = ("DOKON", "COMPLET", "CLOSED", "FINISH", "DONE", "UZAVR")
+_SORT_KEY_MISSING = "\uffff"
+_OPER_KEY_NON_NUMERIC = 2 ** 62
+
+
+def _clean_str(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.strip() or None
+    return str(value)
+
+
+def _parse_float(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        raw = value.strip().replace("\u00a0", "")
+        if not raw:
+            return None
+        try:
+            return round(float(raw.replace(",", ".")), 4)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def _date_sort_key(value) -> str:
+    text = _clean_str(value)
+    if not text:
+        return _SORT_KEY_MISSING
+    for candidate in (text, text.replace("Z", "+00:00"), text.replace("T", " ")):
+        try:
+            return datetime.fromisoformat(candidate).isoformat()
+        except ValueError:
+            continue
+    return text
+
+
+def _oper_sort_key(value) -> int:
+    try:
+        return int(_clean_str(value) or "")
+    except (TypeError, ValueError):
+        return _OPER_KEY_NON_NUMERIC
+
+
+def _is_completed(state, state_asd, qty_released, qty_complete, qty_scrapped) -> bool:
+    state_text = " ".join([_clean_str(state) or "", _clean_str(state_asd) or ""]).upper()
+    if state_text and any(marker in state_text for marker in _DONE_STATE_MARKERS):
+        return True
+    released = _parse_float(qty_released) or 0.0
+    if released <= _QTY_EPSILON:
+        return False
+    done = (_parse_float(qty_complete) or 0.0) + (_parse_float(qty_scrapped) or 0.0)
+    return done >= (released - _QTY_EPSILON)
+
+
+def upgrade() -> None:
+    op.add_column('workshop_job_routes', sa.Column('is_completed', sa.Boolean(), nullable=False, server_default=sa.text('0')))
+    op.add_column('workshop_job_routes', sa.Column('op_datum_st_key', sa.String(40), nullable=True))
+    op.add_column('workshop_job_routes', sa.Column('op_datum_sp_key', sa.String(40), nullable=True))
+    op.add_column('workshop_job_routes', sa.Column('oper_num_key', sa.Integer(), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT id, oper_num, op_datum_st, op_datum_sp, jbr_state, jbr_state_asd, "
+        "job_qty_released, qty_complete, qty_scrapped FROM workshop_job_routes"
+    )).all()
+    params = [
+        {
+            "id": r.id,
+            "is_completed": _is_completed(
+                r.jbr_state, r.jbr_state_asd, r.job_qty_released, r.qty_complete, r.qty_scrapped,
+            ),
+            "st_key": _date_sort_key(r.op_datum_st),
+            "sp_key": _date_sort_key(r.op_datum_sp),
+            "oper_key": _oper_sort_key(r.oper_num),
+        }
+        for r in rows
+    ]
+    if params:
+        conn.execute(
+            sa.text(
+                "UPDATE workshop_job_routes SET is_completed = :is_completed, "
+                "op_datum_st_key = :st_key, op_datum_sp_key = :sp_key, oper_num_key = :oper_key, "
+                "sync_hash = NULL WHERE id = :id"
+            ),
+            params,
+        )
+
+    op.create_index(
+        'ix_wjr_queue',
+        'workshop_job_routes',
+        ['wc', 'job_stat', 'is_completed', 'op_datum_st_key'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_wjr_queue', table_name='workshop_job_routes')
+    with op.batch_alter_table('workshop_job_routes') as batch_op:
+        batch_op.drop_column('oper_num_key')
+        batch_op.drop_column('op_datum_sp_key')
+        batch_op.drop_column('op_datum_st_key')
+        batch_op.drop_column('is_completed')
@@ -0,0 +1,129 @@
+"""Orders overview read model + FTS5 search index
+
+Revision ID: wk020_order_overview_read_model
+Revises: wk019_wjr_completion_sort_keys
+Create Date: 2026-10-16
+
+Adds:
+  - selected_vp_job, view_json to workshop_order_overviews
+    (precomputed by dispatch_workshop_orders; reads no longer parse raw_data)
+  - FTS5 table workshop_order_overviews_fts (trigram tokenizer, external
+    content) + sync triggers for co_num / item / description / selected_vp_job
+  - backfill of existing rows from raw_data; sync_hash reset so the next
+    orders sync rewrites rows with the new content columns
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'wk020_order_overview_read_model'
+down_revision: str = 'wk019_wjr_completion_sort_keys'
+branch_labels = None
+depends_on = None
+
+
+# Zmrazená kopie read modelu a FTS DDL (app.services.workshop_service /
+# app.models.workshop_order_overview, stav k této revizi) — migrace nesmí
+# záviset na aktuálním kódu aplikace
+_FTS_TABLE = "workshop_order_overviews_fts"
+_FTS_COLUMNS = "co_num, item, description, selected_vp_job"
+_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {_FTS_TABLE} USING fts5("
+    f"{_FTS_COLUMNS}, content='workshop_order_overviews', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS woo_fts_ai AFTER INSERT ON workshop_order_overviews BEGIN "
+    f"INSERT INTO {_FTS_TABLE}(rowid, {_FTS_COLUMNS}) "
+    f"VALUES (new.id, new.co_num, new.item, new.description, new.selected_vp_job); END",
+    f"CREATE TRIGGER IF NOT EXISTS woo_fts_ad AFTER DELETE ON workshop_order_overviews BEGIN "
+    f"INSERT INTO {_FTS_TABLE}({_FTS_TABLE}, rowid, {_FTS_COLUMNS}) "
+    f"VALUES ('delete', old.id, old.co_num, old.item, old.description, old.selected_vp_job); END",
+    f"CREATE TRIGGER IF NOT EXISTS woo_fts_au AFTER UPDATE OF {_FTS_COLUMNS} ON workshop_order_overviews BEGIN "
+    f"INSERT INTO {_FTS_TABLE}({_FTS_TABLE}, rowid, {_FTS_COLUMNS}) "
+    f"VALUES ('delete', old.id, old.co_num, old.item, old.description, old.selected_vp_job); "
+    f"INSERT INTO {_FTS_TABLE}(rowid, {_FTS_COLUMNS}) "
+    f"VALUES (new.id, new.co_num, new.item, new.description, new.selected_vp_job); END",
+)
+
+
+def _clean_str(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.strip() or None
+    return str(value)
+
+
+def _view_operations(raw: dict) -> list:
+    ops = []
+    for i in range(1, 11):
+        idx = f"{i:02d}"
+        wc = _clean_str(raw.get(f"Wc{idx}"))
+        if not wc:
+            break
+        comp = str(raw.get(f"Comp{idx}", "0")).strip()
+        wip = str(raw.get(f"Wip{idx}", "0")).strip()
+        if comp == "1":
+            status = "done"
+        elif wip == "1":
+            status = "in_progress"
+        else:
+            status = "idle"
+        ops.append({"oper_num": str(i * 10), "wc": wc, "status": status, "state_text": None})
+    return ops
+
+
+def _view_materials(raw: dict) -> list:
+    mats = []
+    for i in range(1, 4):
+        idx = f"{i:02d}"
+        mat = _clean_str(raw.get(f"Mat{idx}"))
+        if not mat:
+            continue
+        comp = str(raw.get(f"MatComp{idx}", "0")).strip()
+        mats.append({"material": mat, "status": "done" if comp == "1" else "idle"})
+    return mats
+
+
+def _read_model(raw: dict, job):
+    operations = _view_operations(raw)
+    view = {"operations": operations, "materials": _view_materials(raw)}
+    selected_vp_job = job if (job and operations) else None
+    return selected_vp_job, json.dumps(view, ensure_ascii=False, separators=(",", ":"))
+
+
+def upgrade() -> None:
+    op.add_column('workshop_order_overviews', sa.Column('selected_vp_job', sa.String(30), nullable=True))
+    op.add_column('workshop_order_overviews', sa.Column('view_json', sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, job, raw_data FROM workshop_order_overviews")).all()
+    params = []
+    for r in rows:
+        try:
+            raw = json.loads(r.raw_data) if r.raw_data else {}
+        except (ValueError, TypeError):
+            raw = {}
+        selected_vp_job, view_json = _read_model(raw, r.job)
+        params.append({"id": r.id, "selected_vp_job": selected_vp_job, "view_json": view_json})
+    if params:
+        conn.execute(
+            sa.text(
+                "UPDATE workshop_order_overviews SET selected_vp_job = :selected_vp_job, "
+                "view_json = :view_json, sync_hash = NULL WHERE id = :id"
+            ),
+            params,
+        )
+
+    for statement in _FTS_DDL:
+        op.execute(statement)
+    op.execute(f"INSERT INTO {_FTS_TABLE}({_FTS_TABLE}) VALUES('rebuild')")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS woo_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS woo_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS woo_fts_ai")
+    op.execute("DROP TABLE IF EXISTS workshop_order_overviews_fts")
+    with op.batch_alter_table('workshop_order_overviews') as batch_op:
+        batch_op.drop_column('view_json')
+        batch_op.drop_column('selected_vp_job')
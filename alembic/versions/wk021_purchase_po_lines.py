@@ -0,0 +1,74 @@
+"""Purchase PO lines mirror + per-category quarterly aggregates
+
+Revision ID: wk021_purchase_po_lines
+Revises: wk020_order_overview_read_model
+Create Date: 2026-10-16
+
+Adds:
+  - purchase_po_lines (SLPoItems mirror with resolved PriceCategory)
+  - purchase_price_quarters (aggregate per price category x quarter)
+  - purchase_po_sync_years (years backfilled by PoOrderDate)
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'wk021_purchase_po_lines'
+down_revision: str = 'wk020_order_overview_read_model'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'purchase_po_lines',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('po_num', sa.String(20), nullable=False),
+        sa.Column('po_line', sa.String(10), nullable=False),
+        sa.Column('item', sa.String(60), nullable=False),
+        sa.Column('description', sa.String(200)),
+        sa.Column('qty_received', sa.Float, nullable=False, server_default='0'),
+        sa.Column('total_cost', sa.Float, nullable=False, server_default='0'),
+        sa.Column('unit_price', sa.Float),
+        sa.Column('order_date', sa.String(10)),
+        sa.Column('quarter', sa.String(7)),
+        sa.Column('vendor_num', sa.String(20)),
+        sa.Column('vendor_name', sa.String(100)),
+        sa.Column('record_date', sa.String(30)),
+        sa.Column('w_nr', sa.String(20)),
+        sa.Column('shape', sa.String(30)),
+        sa.Column('material_group_id', sa.Integer),
+        sa.Column('price_category_id', sa.Integer),
+        sa.Column('unmatched_reason', sa.String(200)),
+        sa.Column('sync_hash', sa.String(32), nullable=True),
+        sa.Column('synced_at', sa.DateTime, nullable=False),
+        sa.UniqueConstraint('po_num', 'po_line', 'item', name='uq_ppl_po_line_item'),
+    )
+    op.create_index('ix_ppl_order_date', 'purchase_po_lines', ['order_date'])
+    op.create_index('ix_ppl_quarter_category', 'purchase_po_lines', ['quarter', 'price_category_id'])
+
+    op.create_table(
+        'purchase_price_quarters',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('price_category_id', sa.Integer, nullable=False),
+        sa.Column('quarter', sa.String(7), nullable=False, index=True),
+        sa.Column('po_lines', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('qty_received', sa.Float, nullable=False, server_default='0'),
+        sa.Column('total_cost', sa.Float, nullable=False, server_default='0'),
+        sa.Column('min_unit_price', sa.Float),
+        sa.Column('max_unit_price', sa.Float),
+        sa.UniqueConstraint('price_category_id', 'quarter', name='uq_ppq_category_quarter'),
+    )
+
+    op.create_table(
+        'purchase_po_sync_years',
+        sa.Column('year', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('synced_at', sa.DateTime, nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('purchase_po_sync_years')
+    op.drop_table('purchase_price_quarters')
+    op.drop_index('ix_ppl_quarter_category', table_name='purchase_po_lines')
+    op.drop_index('ix_ppl_order_date', table_name='purchase_po_lines')
+    op.drop_table('purchase_po_lines')
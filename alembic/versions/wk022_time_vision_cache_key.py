@@ -0,0 +1,42 @@
+"""TimeVision response cache key columns
+
+Revision ID: wk022_time_vision_cache_key
+Revises: wk021_purchase_po_lines
+Create Date: 2026-10-16
+
+Adds to time_vision_estimations:
+  - source_hash (SHA-256 of the PDF content)
+  - prompt_hash (SHA-256 of system + user prompt)
+  - ai_detail (requested image detail mode)
+  - ix_tve_cache_key (source_hash, estimation_type, ai_model, prompt_hash)
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'wk022_time_vision_cache_key'
+down_revision: str = 'wk021_purchase_po_lines'
+branch_labels = None
+depends_on = None
+
+
+_COLUMNS = (
+    sa.Column('source_hash', sa.String(64), nullable=True),
+    sa.Column('prompt_hash', sa.String(64), nullable=True),
+    sa.Column('ai_detail', sa.String(10), nullable=True),
+)
+
+
+def upgrade() -> None:
+    for column in _COLUMNS:
+        op.add_column('time_vision_estimations', column)
+    op.create_index(
+        'ix_tve_cache_key', 'time_vision_estimations',
+        ['source_hash', 'estimation_type', 'ai_model', 'prompt_hash'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tve_cache_key', table_name='time_vision_estimations')
+    with op.batch_alter_table('time_vision_estimations') as batch_op:
+        for column in reversed(_COLUMNS):
+            batch_op.drop_column(column.name)
@@ -0,0 +1,35 @@
+"""Orders-overview ETag watermark indexes
+
+Revision ID: wk023_orders_overview_watermark
+Revises: wk022_time_vision_cache_key
+Create Date: 2026-10-16
+
+ETag přehledu zakázek = max(updated_at) přes zdrojové tabulky; index
+z MAX dělá jeden lookup místo skenu tabulky:
+  - ix_woo_updated_at (workshop_order_overviews)
+  - ix_wjr_updated_at (workshop_job_routes)
+  - ix_production_priority_updated_at (production_priorities)
+"""
+from alembic import op
+
+revision: str = 'wk023_orders_overview_watermark'
+down_revision: str = 'wk022_time_vision_cache_key'
+branch_labels = None
+depends_on = None
+
+
+_INDEXES = (
+    ('ix_woo_updated_at', 'workshop_order_overviews'),
+    ('ix_wjr_updated_at', 'workshop_job_routes'),
+    ('ix_production_priority_updated_at', 'production_priorities'),
+)
+
+
+def upgrade() -> None:
+    for name, table in _INDEXES:
+        op.create_index(name, table, ['updated_at'])
+
+
+def downgrade() -> None:
+    for name, table in reversed(_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -46,6 +46,14 @@ class Settings(BaseSettings):
     # AI Services
     OPENAI_API_KEY: str = ""  # OpenAI API key for GPT-4o vision estimation line
     AI_RATE_LIMIT: str = "10/hour"  # AI parsing rate limit (cost control)
+    OPENAI_BASE_URL: str = ""  # Prázdné = api.openai.com; jinak kompatibilní endpoint (proxy, lokální fake v testech)
+    QUOTE_PARSE_AI_CONCURRENCY: int = 4  # Max souběžných OpenAI volání při parsování jedné poptávky
+    PDF_RASTER_WORKERS: int = 2  # Procesy pro render PDF → PNG (PyMuPDF drží GIL); 0 = thread v procesu
+    RASTER_CACHE_DIR: Path = BASE_DIR / "cache" / "raster"  # PNG stránek podle hashe obsahu PDF
+    RASTER_CACHE_MAX_MB: int = 1024  # LRU podle velikosti; 0 = cache vypnuta
+    TRAINING_EXPORT_DIR: Path = BASE_DIR / "cache" / "exports"  # Resumable JSONL exporty trénovacích dat
+    TRAINING_EXPORT_RENDER_AHEAD: int = 4  # Max rozrenderovaných obrázků v paměti při streamování exportu
+    TRAINING_EXPORT_TTL_HOURS: int = 72  # Export nepoužitý déle se smaže (úklid při dalším exportu); 0 = nemazat
     @field_validator('OPENAI_API_KEY', mode='before')
     @classmethod
     def resolve_openai_key(cls, v: str) -> str:
@@ -61,6 +69,9 @@ class Settings(BaseSettings):
     INFOR_CONFIG: str = "Live"  # Infor configuration name
     INFOR_USERNAME: str = ""  # Infor API username
     INFOR_PASSWORD: str = ""  # Infor API password
+    INFOR_HTTP_MAX_CONNECTIONS: int = 16  # Pool sdíleného Infor klienta (sync + UI + importy)
+    INFOR_HTTP_MAX_KEEPALIVE: int = 8
+    INFOR_HTTP2: bool = True  # Použije se jen pokud je nainstalován `h2` (httpx[http2])
     INFOR_WC_MAPPING: str = '{"PS":"80000011","PSa":"80000011","PSm":"80000011","PSv":"80000011","FV3":"80000006","FH4":"80000007","FV5":"80000010","FV5R":"80000009","FV3R":"80000008","FV":"80000005","SH2":"80000001","SH2A":"80000002","SM1":"80000003","SM3":"80000004","VS":"80000014","OTK":"80000013","OTK/KO":"80000013","MECH":"80000015","KOO":"80000016"}'
 
     # Infor Process Server (Mongoose) — stateful session for TSD
@@ -74,6 +85,7 @@ class Settings(BaseSettings):
     INFOR_SYNC_INTERVAL_SECONDS: int = 30
     INFOR_SYNC_INITIAL_LOOKBACK_DAYS: int = 7
     INFOR_SYNC_INITIAL_DATE: str = ""  # Pevné datum prvního syncu, např. "2013-01-01". Přepisuje LOOKBACK_DAYS.
+    PURCHASE_PRICE_SYNC_MAX_AGE_S: int = 900  # Analýza nákupních cen: starší watermark → delta SLPoItems z Inforu
 
     # CsiXls Accounting API
     CSIXLS_API_URL: str = ""  # CsiXls API base URL
@@ -84,10 +96,33 @@ class Settings(BaseSettings):
     RATE_LIMIT_DEFAULT: str = "100/minute"  # Obecné API
     RATE_LIMIT_AUTH: str = "10/minute"  # Login/register (přísnější)
 
+    # Production planner — pracovní kalendář
+    PLANNER_CZ_HOLIDAYS: bool = True  # Státní svátky ČR jako nepracovní dny
+    PLANNER_HOLIDAYS: str = "[]"  # Další nepracovní dny, JSON list ISO dat: ["2026-12-31"]
+    # Směny per WC (JSON): {"FV3": ["06:00-14:00", "14:00-22:00"]} = Po–Pá,
+    # {"PS": {"0": ["06:00-14:00"], "5": ["06:00-12:00"]}} = podle dne (0=Po), "_default" = všechna WC
+    PLANNER_WC_SHIFTS: str = "{}"
+
+    # Quote PDF — pool headless Chrome (DevTools protokol přes pipe) + cache PDF
+    PDF_RENDERER_POOL_SIZE: int = 2  # Max souběžných Chrome; 0 = nový Chrome na každé PDF (--print-to-pdf)
+    PDF_RENDER_TIMEOUT_S: int = 30
+    PDF_CACHE_SIZE: int = 64  # Počet vyrenderovaných PDF v paměti (klíč = hash HTML)
+
+    # SSE event bus — "memory" = jeden worker, "sqlite" = sdílený WAL soubor (uvicorn --workers N)
+    EVENT_BUS_BACKEND: str = "memory"
+    EVENT_BUS_DB_PATH: Path = BASE_DIR / "gestima_events.db"
+    EVENT_BUS_REPLAY_SIZE: int = 1000  # Replay buffer pro Last-Event-ID resume
+    EVENT_BUS_POLL_INTERVAL_MS: int = 200  # sqlite: polling eventů z ostatních workerů
+    EVENT_BUS_COALESCE_MS: int = 100  # Okno pro sloučení dávky (tier_change stejného VP → poslední); 0 = vypnuto
+
     # Drawing import source:
     # - local path: "/Volumes/Dokumenty/TPV-dokumentace/Vykresy"
     # - SSH source: "ssh://user@host:22/absolute/path"
     DRAWINGS_SHARE_PATH: str = ""
+    # Manifest inkrementálního skenu (mtime složek, velikost/mtime/hash souborů)
+    DRAWINGS_SCAN_MANIFEST_PATH: Path = BASE_DIR / "drawing_scan_manifest.json"
+    DRAWING_IMPORT_WORKERS: int = 4  # Souběžné stahování/hash/kopie složek při importu
+    DRAWING_IMPORT_COMMIT_EVERY: int = 50  # Commit (+ checkpoint) po N složkách
 
 
 settings = Settings()
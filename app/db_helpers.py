@@ -173,3 +173,24 @@ async def safe_commit(
         await db.rollback()
         logger.error(f"Database error during {action}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Chyba databáze při {action}")
+
+
+async def ensure_db_transaction(db: AsyncSession) -> None:
+    """
+    Otevřít transakci před SAVEPOINT (SQLite).
+
+    pysqlite/aiosqlite posílá BEGIN až před DML, ne před SAVEPOINT — po commitu
+    by SAVEPOINT (begin_nested) založil vlastní transakci a RELEASE by jeho
+    změny rovnou commitnul, mimo dávku volajícího.
+
+    Usage:
+        await ensure_db_transaction(db)
+        async with db.begin_nested():
+            ...  # chyba → rollback jen této části
+    """
+    conn = await db.connection()
+    if conn.dialect.name != "sqlite":
+        return
+    raw = await conn.get_raw_connection()
+    if not raw.driver_connection.in_transaction:
+        await conn.exec_driver_sql("BEGIN")
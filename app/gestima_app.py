@@ -50,6 +50,8 @@ from app.routers import (
     user_layouts_router,  # Per-user workspace layouts
 )
 from app.database import async_session, engine, close_db
+from app.services.file_response import CachingStaticFiles
+from app.services.file_service import BLOBS_DIR_NAME
 
 
 # ============================================================================
@@ -142,6 +144,10 @@ async def lifespan(app: FastAPI):
     # TODO: implement FileService.cleanup_expired_temp_files() if needed
     logger.debug("Startup cleanup: FileService cleanup not yet implemented")
 
+    # SSE event bus (sqlite backend = poller pro eventy z ostatních workerů)
+    from app.services.event_bus import start_event_bus
+    await start_event_bus()
+
     # Start Infor Sync Service
     # Spouští se vždy když je INFOR_API_URL nastavena — workshop sync stepy
     # jsou enabled=True a zajistí DB-backed data pro workshop endpointy.
@@ -161,6 +167,22 @@ async def lifespan(app: FastAPI):
     if infor_sync_service.running:
         await infor_sync_service.stop()
 
+    # Stop SSE event bus (dopíše čekající eventy)
+    from app.services.event_bus import stop_event_bus
+    await stop_event_bus()
+
+    # Ukončit Chrome instance pro PDF nabídek
+    from app.services.pdf_service import close_renderer_pool
+    await close_renderer_pool()
+
+    # Ukončit procesy pro rasterizaci PDF výkresů
+    from app.services.pdf_raster import close_raster_pool
+    await close_raster_pool()
+
+    # Close shared Infor HTTP pools
+    from app.services.infor_api_client import close_shared_infor_clients
+    await close_shared_infor_clients()
+
     # Close database connections
     await close_db()
     logger.info("✅ Database connections closed")
@@ -204,7 +226,12 @@ app.mount("/static", StaticFiles(directory="app/static"), name="static")
 # Mount uploads directory (for PDF/STEP file access)
 uploads_dir = Path("uploads")
 if uploads_dir.exists():
-    app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+    # ETag/304 + Range; bloby (.blobs/<hh>/<sha256>) s immutable cache
+    app.mount(
+        "/uploads",
+        CachingStaticFiles(directory="uploads", content_addressed_dir=BLOBS_DIR_NAME),
+        name="uploads",
+    )
     logger.info(f"Mounted /uploads directory")
 
 # Mount Vue SPA assets
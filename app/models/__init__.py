@@ -134,6 +134,7 @@ from app.models.workshop_job_route import WorkshopJobRoute
 from app.models.workshop_order_overview import WorkshopOrderOverview
 from app.models.workshop_job_material_cache import WorkshopJobMaterialCache
 from app.models.infor_job_transaction import InforJobTransaction
+from app.models.purchase_po_line import PurchasePoLine, PurchasePriceQuarter, PurchasePoSyncYear
 
 __all__ = [
     "StockType", "StockShape", "CuttingMode", "FeatureType", "UserRole", "WorkCenterType", "QuoteStatus",
@@ -172,4 +173,5 @@ __all__ = [
     "WorkshopJobRoute", "WorkshopOrderOverview",
     "WorkshopJobMaterialCache",
     "InforJobTransaction",
+    "PurchasePoLine", "PurchasePriceQuarter", "PurchasePoSyncYear",
 ]
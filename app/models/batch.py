@@ -1,7 +1,7 @@
 """GESTIMA - Batch model"""
 
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, ConfigDict, Field, computed_field
 from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, JSON
 from sqlalchemy.orm import relationship
@@ -79,6 +79,22 @@ class BatchUpdate(BaseModel):
     version: int  # Optimistic locking (ADR-008)
 
 
+class BatchRepriceRequest(BaseModel):
+    """Hromadný přepočet batchí — explicitní díly a/nebo vše ovlivněné změnou."""
+    part_ids: Optional[List[int]] = Field(None, description="ID dílů k přepočtu")
+    work_center_id: Optional[int] = Field(None, gt=0, description="Díly s operací na tomto pracovišti")
+    price_category_id: Optional[int] = Field(None, gt=0, description="Díly s materiálem v této cenové kategorii")
+
+
+class BatchRepriceJobResponse(BaseModel):
+    job_id: str
+    status: str
+    started_by: str
+    started_at: str
+    finished_at: Optional[str] = None
+    progress: Dict[str, Any]
+
+
 class BatchResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -32,4 +32,5 @@ class InforJobTransaction(Base):
     qty_complete = Column(Float)
     qty_scrapped = Column(Float)
     record_date = Column(String(30))
+    sync_hash = Column(String(32), nullable=True)  # hash obsahu ze sync (sync_bulk_upsert)
     synced_at = Column(DateTime, nullable=False)
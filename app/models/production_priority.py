@@ -7,7 +7,7 @@ vzdy z Inforu. CO terminy pres existujici Item-based matching.
 
 from typing import Literal, Optional
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, Integer, String, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, Index, UniqueConstraint
 
 from app.database import Base, AuditMixin
 
@@ -20,6 +20,7 @@ class ProductionPriority(Base, AuditMixin):
             "infor_job", "infor_suffix",
             name="uq_production_priority_job_suffix",
         ),
+        Index("ix_production_priority_updated_at", "updated_at"),  # watermark pro ETag prehledu zakazek
     )
 
     id = Column(Integer, primary_key=True, index=True)
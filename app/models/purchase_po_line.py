@@ -0,0 +1,76 @@
+"""GESTIMA — Purchase PO Lines (DB mirror of Infor SLPoItems, materiály 1.*)
+
+Lokální tabulka nákupních řádků pro analýzu nákupních cen (PurchasePriceAnalyzer).
+Plněna inkrementálně: backfill roku podle PoOrderDate (jednou), dále delta přes
+RecordDate watermark (krok "purchase_po_items" v InforSyncService).
+
+Mapování Item → W.Nr → MaterialGroup → PriceCategory se počítá při zápisu,
+analýza je pak jen lokální dotaz. Agregát per PriceCategory × kvartál
+(purchase_price_quarters) se přepočítá pro kvartály dotčené každým upsertem.
+"""
+
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String, UniqueConstraint
+
+from app.database import Base
+
+
+class PurchasePoLine(Base):
+    """Mirror SLPoItems — přijatý nákupní řádek + namapovaná PriceCategory."""
+
+    __tablename__ = "purchase_po_lines"
+    __table_args__ = (
+        UniqueConstraint("po_num", "po_line", "item", name="uq_ppl_po_line_item"),
+        Index("ix_ppl_order_date", "order_date"),
+        Index("ix_ppl_quarter_category", "quarter", "price_category_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    po_num = Column(String(20), nullable=False)
+    po_line = Column(String(10), nullable=False)
+    item = Column(String(60), nullable=False)
+    description = Column(String(200))
+    qty_received = Column(Float, nullable=False, default=0.0)
+    total_cost = Column(Float, nullable=False, default=0.0)
+    unit_price = Column(Float)                    # total_cost / qty_received (jen qty > 0)
+    order_date = Column(String(10))               # "YYYY-MM-DD"
+    quarter = Column(String(7))                   # "YYYY-QN"
+    vendor_num = Column(String(20))
+    vendor_name = Column(String(100))
+    record_date = Column(String(30))
+
+    # Mapování (None = nenamapováno; důvod v unmatched_reason, nulové qty bez důvodu)
+    w_nr = Column(String(20))
+    shape = Column(String(30))
+    material_group_id = Column(Integer)
+    price_category_id = Column(Integer)
+    unmatched_reason = Column(String(200))
+
+    sync_hash = Column(String(32), nullable=True)  # hash obsahu (sync_bulk_upsert)
+    synced_at = Column(DateTime, nullable=False)
+
+
+class PurchasePriceQuarter(Base):
+    """Agregát namapovaných řádků per PriceCategory × kvartál."""
+
+    __tablename__ = "purchase_price_quarters"
+    __table_args__ = (
+        UniqueConstraint("price_category_id", "quarter", name="uq_ppq_category_quarter"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    price_category_id = Column(Integer, nullable=False)
+    quarter = Column(String(7), nullable=False, index=True)
+    po_lines = Column(Integer, nullable=False, default=0)
+    qty_received = Column(Float, nullable=False, default=0.0)
+    total_cost = Column(Float, nullable=False, default=0.0)
+    min_unit_price = Column(Float)
+    max_unit_price = Column(Float)
+
+
+class PurchasePoSyncYear(Base):
+    """Roky s dokončeným backfillem podle PoOrderDate (dál jen delta přes RecordDate)."""
+
+    __tablename__ = "purchase_po_sync_years"
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    synced_at = Column(DateTime, nullable=False)
@@ -40,6 +40,12 @@ class SyncState(Base):
     updated_count = Column(Integer, default=0, nullable=False)
     error_count = Column(Integer, default=0, nullable=False)
 
+    # Scheduler metrics — plánovaný další běh, délka posledního běhu, backoff
+    next_run_at = Column(DateTime, nullable=True)
+    last_duration_ms = Column(Integer, nullable=True)
+    consecutive_failures = Column(Integer, default=0, nullable=False)
+    overrun_count = Column(Integer, default=0, nullable=False)  # běhy delší než interval_seconds
+
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -97,6 +103,11 @@ class SyncStateRead(BaseModel):
     created_count: int
     updated_count: int
     error_count: int
+    next_run_at: Optional[datetime] = None
+    last_duration_ms: Optional[int] = None
+    consecutive_failures: int = 0
+    overrun_count: int = 0
+    running: bool = False  # právě běží ve scheduleru (doplňuje router)
     created_at: datetime
     updated_at: datetime
 
@@ -126,6 +137,7 @@ class SyncLogRead(BaseModel):
 class SyncStatusResponse(BaseModel):
     """Overall sync status response."""
     running: bool
+    running_steps: list[str] = []
     steps: list[SyncStateRead]
 
 
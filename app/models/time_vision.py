@@ -4,7 +4,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional, List, Literal
 from pydantic import BaseModel, ConfigDict, Field
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 
 from app.database import Base, AuditMixin
@@ -13,6 +13,9 @@ from app.database import Base, AuditMixin
 class TimeVisionEstimation(Base, AuditMixin):
     """AI-generated machining time estimation from PDF drawing"""
     __tablename__ = "time_vision_estimations"
+    __table_args__ = (
+        Index("ix_tve_cache_key", "source_hash", "estimation_type", "ai_model", "prompt_hash"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -78,6 +81,11 @@ class TimeVisionEstimation(Base, AuditMixin):
     features_corrected_json = Column(Text, nullable=True)  # Human-corrected features (ground truth for FT)
     calculated_time_min = Column(Float, nullable=True)  # Deterministic calculation from features
 
+    # Response cache key (vision_estimation_cache) — spolu s ai_model + estimation_type
+    source_hash = Column(String(64), nullable=True)  # SHA-256 obsahu PDF
+    prompt_hash = Column(String(64), nullable=True)  # SHA-256 system + user promptu
+    ai_detail = Column(String(10), nullable=True)  # Požadovaný detail mode obrázku
+
     # Relationships
     material_group = relationship("MaterialGroup", foreign_keys=[material_group_id])
     file_record = relationship("FileRecord", foreign_keys=[file_id])
@@ -4,7 +4,7 @@ Lokální SQLite tabulka pro workshop data — eliminuje live Infor HTTP volán
 Plněna přes InforSyncService (inkrementální diff sync přes RecordDate watermark).
 """
 
-from sqlalchemy import Column, Float, Index, Integer, String, UniqueConstraint
+from sqlalchemy import Boolean, Column, Float, Index, Integer, String, UniqueConstraint
 
 from app.database import AuditMixin, Base
 
@@ -17,6 +17,9 @@ class WorkshopJobRoute(Base, AuditMixin):
         UniqueConstraint("job", "suffix", "oper_num", name="uq_wjr_job_suffix_oper"),
         Index("ix_wjr_wc", "wc"),
         Index("ix_wjr_job_stat", "job_stat"),
+        # Fronta / plán stroje: WHERE wc, job_stat, is_completed ORDER BY op_datum_st_key
+        Index("ix_wjr_queue", "wc", "job_stat", "is_completed", "op_datum_st_key"),
+        Index("ix_wjr_updated_at", "updated_at"),  # watermark pro ETag přehledu zakázek
     )
 
     id = Column(Integer, primary_key=True)
@@ -43,3 +46,12 @@ class WorkshopJobRoute(Base, AuditMixin):
     jbr_lze_dokoncit = Column(String(10), nullable=True) # LzeDokoncit flag
     jbr_plan_flag = Column(String(10), nullable=True)    # PlanFlag
     jbr_synced_at = Column(String(30), nullable=True)    # Timestamp poslední JBR sync
+
+    # Odvozené sloupce (sync dispatchery) — SQL-side filtr dokončených + řazení přes index
+    is_completed = Column(Boolean, nullable=False, default=False, server_default="0")
+    op_datum_st_key = Column(String(40))          # normalizovaný klíč řazení (chybí → "\uffff")
+    op_datum_sp_key = Column(String(40))
+    oper_num_key = Column(Integer)                # numerické OperNum (nenumerické → 2**62)
+
+    # Hash obsahových sloupců ze sync (sync_bulk_upsert) — nezměněné řádky se přeskočí
+    sync_hash = Column(String(32), nullable=True)
@@ -2,9 +2,13 @@
 
 Lokální SQLite tabulka pro přehled zakázek — eliminuje live Infor HTTP volání.
 Plněna přes InforSyncService (inkrementální diff sync přes RecordDate watermark).
+
+Read model: dispatch_workshop_orders předpočítá selected_vp_job a view_json
+(operace + materiály z raw_data), FTS5 index (trigram = substring hledání)
+nad co_num/item/description/selected_vp_job udržují triggery.
 """
 
-from sqlalchemy import Boolean, Column, Float, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy import DDL, Boolean, Column, Float, Index, Integer, String, Text, UniqueConstraint, event
 
 from app.database import AuditMixin, Base
 
@@ -17,6 +21,7 @@ class WorkshopOrderOverview(Base, AuditMixin):
         UniqueConstraint("co_num", "co_line", "co_release", name="uq_woo_co_line_rel"),
         Index("ix_woo_item", "item"),
         Index("ix_woo_due_date", "due_date"),
+        Index("ix_woo_updated_at", "updated_at"),  # watermark pro ETag přehledu
     )
 
     id = Column(Integer, primary_key=True)
@@ -45,3 +50,42 @@ class WorkshopOrderOverview(Base, AuditMixin):
     # (Wc01-10, Comp01-10, Wip01-10, Mat01-03, MatComp01-03)
     raw_data = Column(Text)
     record_date = Column(String(30))
+
+    # Read model (dispatch_workshop_orders) — bez parsování raw_data při čtení
+    selected_vp_job = Column(String(30))          # job, pokud view má operace
+    view_json = Column(Text)                      # {"operations": [...], "materials": [...]}
+
+    # Hash obsahových sloupců ze sync (sync_bulk_upsert) — nezměněné řádky se přeskočí
+    sync_hash = Column(String(32), nullable=True)
+
+
+# ─── FTS5 index pro hledání (zakázka / díl / popis / VP) ─────────────────
+
+ORDER_OVERVIEW_FTS_TABLE = "workshop_order_overviews_fts"
+_FTS_COLUMNS = "co_num, item, description, selected_vp_job"
+
+ORDER_OVERVIEW_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {ORDER_OVERVIEW_FTS_TABLE} USING fts5("
+    f"{_FTS_COLUMNS}, content='workshop_order_overviews', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS woo_fts_ai AFTER INSERT ON workshop_order_overviews BEGIN "
+    f"INSERT INTO {ORDER_OVERVIEW_FTS_TABLE}(rowid, {_FTS_COLUMNS}) "
+    f"VALUES (new.id, new.co_num, new.item, new.description, new.selected_vp_job); END",
+    f"CREATE TRIGGER IF NOT EXISTS woo_fts_ad AFTER DELETE ON workshop_order_overviews BEGIN "
+    f"INSERT INTO {ORDER_OVERVIEW_FTS_TABLE}({ORDER_OVERVIEW_FTS_TABLE}, rowid, {_FTS_COLUMNS}) "
+    f"VALUES ('delete', old.id, old.co_num, old.item, old.description, old.selected_vp_job); END",
+    f"CREATE TRIGGER IF NOT EXISTS woo_fts_au AFTER UPDATE OF {_FTS_COLUMNS} ON workshop_order_overviews BEGIN "
+    f"INSERT INTO {ORDER_OVERVIEW_FTS_TABLE}({ORDER_OVERVIEW_FTS_TABLE}, rowid, {_FTS_COLUMNS}) "
+    f"VALUES ('delete', old.id, old.co_num, old.item, old.description, old.selected_vp_job); "
+    f"INSERT INTO {ORDER_OVERVIEW_FTS_TABLE}(rowid, {_FTS_COLUMNS}) "
+    f"VALUES (new.id, new.co_num, new.item, new.description, new.selected_vp_job); END",
+)
+
+for _statement in ORDER_OVERVIEW_FTS_DDL:
+    event.listen(
+        WorkshopOrderOverview.__table__, "after_create",
+        DDL(_statement).execute_if(dialect="sqlite"),
+    )
+event.listen(
+    WorkshopOrderOverview.__table__, "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {ORDER_OVERVIEW_FTS_TABLE}").execute_if(dialect="sqlite"),
+)
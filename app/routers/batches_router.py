@@ -18,7 +18,7 @@ from app.models.part import Part
 from app.models.material import MaterialItem
 from app.models.material_input import MaterialInput  # ADR-024
 from app.services.snapshot_service import create_batch_snapshot
-from app.services.batch_service import recalculate_batch_costs
+from app.services.batch_service import recalculate_batch_costs, recalculate_batches_costs
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -347,8 +347,7 @@ async def recalculate_part_batches(
         return
 
     try:
-        for batch in batches:
-            await recalculate_batch_costs(batch, db)
+        await recalculate_batches_costs(batches, db)
     except ValueError as e:
         await db.rollback()
         logger.error(f"Validation error recalculating batches for part {part_id}: {e}", exc_info=True)
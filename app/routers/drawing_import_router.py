@@ -6,7 +6,7 @@ Import drawings from network share to FileRecord system (ADR-044).
 
 import logging
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
@@ -27,8 +27,8 @@ router = APIRouter(prefix="/api/drawings/import", tags=["Drawing Import"])
 
 
 def _get_service() -> DrawingImportService:
-    """Create DrawingImportService with configured share path."""
-    return DrawingImportService(settings.DRAWINGS_SHARE_PATH)
+    """Create DrawingImportService with configured share path + scan manifest."""
+    return DrawingImportService(settings.DRAWINGS_SHARE_PATH, settings.DRAWINGS_SCAN_MANIFEST_PATH)
 
 
 @router.get(
@@ -59,13 +59,16 @@ async def get_share_status(
     summary="Scan share and preview import matches",
 )
 async def preview_import(
+    changed_only: bool = Query(False, description="Only folders new/changed since the previous scan"),
+    full_scan: bool = Query(False, description="Descend into every folder (ignore manifest mtimes)"),
     db: AsyncSession = Depends(get_db),
     _user=Depends(require_role([UserRole.ADMIN])),
 ):
     """
     Step 1: Scan network share, match folders to Parts, return preview.
 
-    This may take 5-10 seconds for 3000+ folders.
+    Incremental: only folders with a changed mtime are descended
+    (first scan / full_scan=true walks everything).
     """
     service = _get_service()
 
@@ -76,7 +79,7 @@ async def preview_import(
             folders=[],
         )
 
-    return await service.preview_import(db)
+    return await service.preview_import(db, changed_only=changed_only, full_scan=full_scan)
 
 
 @router.post(
@@ -27,7 +27,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import List
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
 from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -523,6 +523,7 @@ async def delete_drawing(
 async def get_drawing_file(
     part_number: str,
     drawing_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -571,7 +572,7 @@ async def get_drawing_file(
 
     # Serve file via FileService
     file_service = FileService()
-    return await file_service.serve_file(drawing_id, db)
+    return await file_service.serve_file(drawing_id, db, request)
 
 
 # ============================================================================
@@ -581,6 +582,7 @@ async def get_drawing_file(
 @router.get("/api/parts/{part_number}/drawing")
 async def get_primary_drawing_legacy(
     part_number: str,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -614,4 +616,4 @@ async def get_primary_drawing_legacy(
 
     # Serve file via FileService
     file_service = FileService()
-    return await file_service.serve_file(part.file_id, db)
+    return await file_service.serve_file(part.file_id, db, request)
@@ -1,52 +1,87 @@
 """GESTIMA — Server-Sent Events (SSE)
 
 Globální SSE stream pro real-time push notifikace napříč celou aplikací.
-Jeden endpoint, všechny event typy. Klienti filtrují podle `type` v payloadu.
+Jeden endpoint; klient si volí témata (?topics=tier_change,planner_schedule_delta,
+bez parametru = všechny typy). Každý event má `id:` → po výpadku se klient
+připojí s Last-Event-ID (hlavička nebo ?last_event_id=) a dostane zmeškané
+eventy z replay bufferu. Pokud už v bufferu nejsou → event `resync`.
+
+Rámec může nést dávku eventů: `data:` je pak JSON pole (klient rozbalí).
+Opakované tier_change stejného VP v okně EVENT_BUS_COALESCE_MS → jen poslední.
+GET /stats (admin) — čítače per klient (pending, dropped, lag, coalesced).
 
 Event typy:
-  tier_change  — { job, suffix, tier }
+  tier_change             — { job, suffix, tier }
+  batch_reprice_progress  — { job_id, total_parts, processed_parts, repriced_batches, failed_parts }
+  batch_reprice_done      — totéž po dokončení (nebo { job_id, status: "error", error })
+  quote_parse_progress    — { job_id, filename, kind, status, completed, total, analysis? }
+                            (po každém souboru AI parsování poptávky; výkres nese DrawingAnalysis)
+  quote_parse_done        — { job_id, status: "ok" | "error", ... }
+  planner_schedule_delta  — { version, base_version, vps, vp_order, wc_lanes, time_range }
+                            (jen změněné VP a WC lanes po změně priority / tieru;
+                            jen s EVENT_BUS_BACKEND=memory)
+  resync                  — {} (mezera v eventech → klient načte data znovu; bez id)
   (rozšiřitelné o další typy)
 """
 
-import asyncio
-import json
 import logging
+from typing import Optional
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Query, Request
 from fastapi.responses import StreamingResponse
 
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, require_role
 from app.models import User
+from app.models.enums import UserRole
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _parse_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
 @router.get("/stream")
 async def event_stream(
     request: Request,
+    topics: Optional[str] = Query(None, description="Typy eventů oddělené čárkou (bez = všechny)"),
+    last_event_id: Optional[str] = Query(None, description="Resume po reconnectu (alternativa k hlavičce Last-Event-ID)"),
     current_user: User = Depends(get_current_user),
 ):
-    """SSE stream — pushne všechny eventy připojeným klientům v reálném čase."""
-    from app.services.event_bus import subscribe, unsubscribe
+    """SSE stream — pushne eventy zvolených témat připojeným klientům v reálném čase."""
+    from app.services.event_bus import encode_frame, next_events, subscribe, unsubscribe
 
-    q = subscribe()
+    topic_set = {t.strip() for t in topics.split(",") if t.strip()} if topics else None
+    resume_id = _parse_event_id(request.headers.get("last-event-id") or last_event_id)
+    client = request.client.host if request.client else "?"
+    sub = subscribe(topic_set, resume_id, label=f"{current_user.username}@{client}", user_id=current_user.id)
 
     async def generate():
         try:
             while True:
                 if await request.is_disconnected():
                     break
-                try:
-                    msg = await asyncio.wait_for(q.get(), timeout=30)
-                    yield f"data: {json.dumps(msg)}\n\n"
-                except asyncio.TimeoutError:
-                    yield ": keepalive\n\n"
+                events = await next_events(sub, timeout=30)
+                yield encode_frame(events) if events else ": keepalive\n\n"
         finally:
-            unsubscribe(q)
+            unsubscribe(sub)
 
     return StreamingResponse(
         generate(),
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+
+
+@router.get("/stats")
+async def event_stats(
+    current_user: User = Depends(require_role([UserRole.ADMIN])),
+):
+    """Stav event busu + čítače per klient (pending, dropped, lag) — kdo nestíhá."""
+    from app.services.event_bus import event_bus_stats
+
+    return event_bus_stats()
@@ -16,6 +16,8 @@ Endpoints:
 
 - GET    /api/files                                           - List (query filters)
 - GET    /api/files/orphans                                   - Osiřelé soubory (admin)
+- DELETE /api/files/orphans/bulk                              - Hromadný soft delete osiřelých (admin)
+- POST   /api/files/gc                                        - Úklid temp souborů + blob GC (admin)
 
 Security:
 - Magic bytes validation (security-critical)
@@ -29,7 +31,7 @@ Business logic STAYS in respective routers/services.
 import logging
 from typing import Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile
 from fastapi.responses import FileResponse
 from sqlalchemy import select, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -38,8 +40,8 @@ from sqlalchemy.orm import selectinload
 from app.database import get_db
 from app.db_helpers import safe_commit
 from app.models.file_record import FileRecord, FileLink
-from app.models.user import User
-from app.dependencies import get_current_user
+from app.models.user import User, UserRole
+from app.dependencies import get_current_user, require_role
 from app.schemas.file_record import (
     FileRecordResponse,
     FileLinkResponse,
@@ -182,6 +184,7 @@ async def upload_file(
 @router.get("/orphans", response_model=FileListResponse)
 async def list_orphaned_files(
     include_linked_to_deleted: bool = False,
+    reclaimable_only: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -192,6 +195,8 @@ async def list_orphaned_files(
     Query params:
         include_linked_to_deleted: Pokud True, zahrne i soubory navázané
             pouze na soft-deleted díly (mazané/archivní díly).
+        reclaimable_only: Pokud True, jen soubory, jejichž smazání uvolní místo
+            (blob nesdílí žádný navázaný soubor).
 
     Returns:
         FileListResponse: Seznam osiřelých souborů
@@ -199,7 +204,8 @@ async def list_orphaned_files(
     try:
         orphans = await file_service.find_orphans(
             db,
-            include_linked_to_deleted=include_linked_to_deleted
+            include_linked_to_deleted=include_linked_to_deleted,
+            reclaimable_only=reclaimable_only,
         )
 
         # Build response + enrich entity names (article_number etc.)
@@ -230,23 +236,29 @@ async def list_orphaned_files(
 @router.delete("/orphans/bulk", status_code=200, response_model=dict)
 async def delete_orphaned_files_bulk(
     include_linked_to_deleted: bool = False,
+    reclaimable_only: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Hromadný soft delete všech osiřelých souborů.
 
+    Po commitu se soubory smažou i z disku a bloby bez další reference
+    se uvolní (refcount 0).
+
     Query params:
         include_linked_to_deleted: Pokud True, smaže i soubory navázané
             pouze na soft-deleted díly.
+        reclaimable_only: Pokud True, jen soubory, jejichž smazání uvolní místo.
 
     Returns:
-        dict: Počet smazaných souborů
+        dict: Počet smazaných souborů a uvolněné bajty
     """
     try:
         orphans = await file_service.find_orphans(
             db,
-            include_linked_to_deleted=include_linked_to_deleted
+            include_linked_to_deleted=include_linked_to_deleted,
+            reclaimable_only=reclaimable_only,
         )
 
         deleted_count = 0
@@ -255,14 +267,15 @@ async def delete_orphaned_files_bulk(
             deleted_count += 1
 
         await safe_commit(db, action="hromadné mazání osiřelých souborů")
+        bytes_freed = await file_service.purge_deleted(db, orphans)
 
         logger.info(
-            f"Bulk deleted {deleted_count} orphaned files "
+            f"Bulk deleted {deleted_count} orphaned files, freed {bytes_freed} bytes "
             f"(include_linked_to_deleted={include_linked_to_deleted}), "
             f"user={current_user.username}"
         )
 
-        return {"deleted": deleted_count}
+        return {"deleted": deleted_count, "bytes_freed": bytes_freed}
 
     except HTTPException:
         await db.rollback()
@@ -273,6 +286,42 @@ async def delete_orphaned_files_bulk(
         raise HTTPException(status_code=500, detail="Chyba při hromadném mazání osiřelých souborů")
 
 
+@router.post("/gc", status_code=200, response_model=dict)
+async def collect_file_garbage(
+    temp_max_age_hours: int = Query(24, ge=1, le=24 * 30),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Úklid úložiště: expirované temp soubory + nereferencované bloby.
+
+    Soubory smazané jednotlivě zůstávají na disku (jejich jméno drží blob;
+    hromadné mazání osiřelých je uklízí samo) — GC uvolní bloby po temp
+    souborech, přerušených importech a uploadech, jejichž zápis do DB selhal.
+
+    Returns:
+        dict: {"temp_deleted", "blobs_deleted", "bytes_freed"}
+    """
+    try:
+        temp_deleted = await file_service.cleanup_temp(db, max_age_hours=temp_max_age_hours)
+        await safe_commit(db, action="úklid temp souborů")
+        gc = await file_service.collect_garbage(db)
+
+        logger.info(
+            f"File GC: {temp_deleted} temp files, {gc['blobs_deleted']} blobs, "
+            f"{gc['bytes_freed']} bytes freed, user={current_user.username}"
+        )
+        return {"temp_deleted": temp_deleted, **gc}
+
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"File GC failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Chyba při úklidu souborů")
+
+
 @router.get("/{file_id}", response_model=FileWithLinksResponse)
 async def get_file_metadata(
     file_id: int,
@@ -333,6 +382,7 @@ async def get_file_metadata(
 @router.get("/{file_id}/preview", response_class=FileResponse)
 async def preview_file(
     file_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -341,6 +391,8 @@ async def preview_file(
     Iframe a pdf.js nemohou poslat Authorization header,
     proto tento endpoint NEMÁ auth dependency.
     Omezeno na PDF soubory — ostatní typy vrací 400.
+    Podporuje ETag/304 a Range (pdf.js stahuje jen potřebné části),
+    ?v=<file_hash> → immutable cache.
 
     Args:
         file_id: ID souboru
@@ -367,7 +419,7 @@ async def preview_file(
             raise HTTPException(status_code=400, detail="Preview je dostupný pouze pro PDF soubory")
 
         # Serve file inline (no download)
-        return await file_service.serve_file(file_id, db)
+        return await file_service.serve_file(file_id, db, request)
 
     except HTTPException:
         raise
@@ -379,6 +431,7 @@ async def preview_file(
 @router.get("/{file_id}/download", response_class=FileResponse)
 async def download_file(
     file_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -396,7 +449,7 @@ async def download_file(
     """
     try:
         # Serve file (validates existence on disk)
-        return await file_service.serve_file(file_id, db)
+        return await file_service.serve_file(file_id, db, request)
 
     except HTTPException:
         raise
@@ -1,6 +1,5 @@
 """GESTIMA - FT Debug router for fine-tuning data inspection."""
 
-import io
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -17,6 +16,7 @@ from app.schemas.ft_debug import (
     FtPartsResponse,
 )
 from app.services.ft_debug_service import FtDebugService
+from app.services.training_export import export_file_path, stream_jsonl, stream_jsonl_resumable
 
 logger = logging.getLogger(__name__)
 
@@ -80,19 +80,29 @@ async def export_jsonl(
     Generates OpenAI-compatible fine-tuning JSONL where each line is a
     training example: system prompt + drawing image + ground truth JSON answer.
 
+    Lines are streamed as drawings are rendered (process pool, bounded
+    memory). With `resumable` the export is also written to disk and a
+    repeated request for the same parts continues where it stopped.
+
     Returns JSONL as a downloadable file attachment.
     """
     service = FtDebugService(db)
     try:
-        jsonl_bytes = await service.export_jsonl(request.part_ids)
+        examples = await service.export_examples(request.part_ids)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:
         logger.exception("export_jsonl failed")
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
+    if request.resumable:
+        path = export_file_path("ft_v2_debug", examples)
+        content = stream_jsonl_resumable(examples, path, label="export_jsonl")
+    else:
+        content = stream_jsonl(examples, label="export_jsonl")
+
     return StreamingResponse(
-        io.BytesIO(jsonl_bytes),
+        content,
         media_type="application/x-ndjson",
         headers={
             "Content-Disposition": "attachment; filename=ft_v2_debug_export.jsonl"
@@ -27,7 +27,7 @@ from app.schemas.industream_tsd import (
 )
 from app.services import industream_tsd_service as tsd
 from app.services.industream_tsd_service import TsdError
-from app.services.infor_api_client import InforAPIClient
+from app.services.infor_api_client import InforAPIClient, get_shared_infor_client
 
 logger = logging.getLogger(__name__)
 
@@ -40,13 +40,7 @@ def _get_infor_client() -> InforAPIClient:
             status_code=501,
             detail="Infor API not configured (INFOR_API_URL)",
         )
-    return InforAPIClient(
-        base_url=settings.INFOR_API_URL,
-        config=settings.INFOR_CONFIG,
-        username=settings.INFOR_USERNAME,
-        password=settings.INFOR_PASSWORD,
-        verify_ssl=False,
-    )
+    return get_shared_infor_client()
 
 
 def _resolve_emp_num(user: Any) -> str:
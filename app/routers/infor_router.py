@@ -1,7 +1,6 @@
 """GESTIMA - Infor CloudSuite Industrial Integration Router"""
 
-import time
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
@@ -21,17 +20,13 @@ from app.schemas.purchase_prices import (
     ApplyPriceResponse,
     PurchasePriceAnalysisResponse,
 )
-from app.services.infor_api_client import InforAPIClient
+from app.services.infor_api_client import InforAPIClient, get_shared_infor_client, infor_client_metrics
 from app.services.infor_material_importer import MaterialImporter
 from app.services.number_generator import NumberGenerator
 from app.services.purchase_price_analyzer import PurchasePriceAnalyzer
 
 logger = logging.getLogger(__name__)
 
-# In-memory cache for purchase price analysis (TTL-based)
-_pp_cache: Dict[str, Tuple[float, Any]] = {}
-_PP_CACHE_TTL = 3600  # 1 hour
-
 router = APIRouter(prefix="/api/infor", tags=["infor"])
 
 
@@ -105,13 +100,7 @@ def get_infor_client() -> InforAPIClient:
             detail="Infor API integration not configured. Set INFOR_API_URL in .env"
         )
 
-    return InforAPIClient(
-        base_url=settings.INFOR_API_URL,
-        config=settings.INFOR_CONFIG,
-        username=settings.INFOR_USERNAME,
-        password=settings.INFOR_PASSWORD,
-        verify_ssl=False  # Self-signed certs
-    )
+    return get_shared_infor_client()
 
 
 @router.get("/test-connection", response_model=dict)
@@ -157,6 +146,19 @@ async def test_connection(
         }
 
 
+@router.get("/client-metrics", response_model=dict)
+async def get_client_metrics(
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Metriky sdíleného Infor klienta per IDO.
+
+    Počty požadavků/chyb, latency histogram, přenesené bajty a stránky/řádky
+    z LoadCollection — pro ladění syncu a pomalých obrazovek.
+    """
+    return {"clients": infor_client_metrics()}
+
+
 @router.get("/discover-idos", response_model=dict)
 async def discover_idos(
     custom_names: Optional[str] = None,
@@ -698,33 +700,21 @@ async def get_purchase_prices(
     """
     Analyze purchase prices from Infor SLPoItems.
 
-    Fetches PO line items, maps to PriceCategories via W.Nr,
-    computes real weighted averages per weight tier.
-    Results cached for 1 hour.
+    PO lines are mirrored locally (purchase_po_lines): a year is fetched
+    from Infor once, afterwards only the RecordDate delta is synced.
+    Re-opening or changing the year range is a local query.
 
     Args:
         year_from: Start year (inclusive, default 2024)
         year_to: End year (inclusive, default = year_from for single year)
     """
     effective_year_to = year_to if year_to is not None else year_from
-    cache_key = f"pp_{year_from}_{effective_year_to}"
-    now = time.time()
-
-    # Check cache
-    if cache_key in _pp_cache:
-        cached_time, cached_data = _pp_cache[cache_key]
-        if now - cached_time < _PP_CACHE_TTL:
-            logger.info(f"Purchase price cache hit for {year_from}-{effective_year_to}")
-            cached_data.cached = True
-            return cached_data
-
-    # Fresh analysis
+    if effective_year_to < year_from:
+        raise HTTPException(status_code=400, detail="year_to musí být >= year_from")
+
     try:
         analyzer = PurchasePriceAnalyzer(client, db)
-        result = await analyzer.analyze(year_from=year_from, year_to=effective_year_to)
-        result.cached = False
-        _pp_cache[cache_key] = (now, result)
-        return result
+        return await analyzer.analyze(year_from=year_from, year_to=effective_year_to)
     except Exception as e:
         logger.error(f"Purchase price analysis failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Analýza selhala: {str(e)}")
@@ -797,24 +787,38 @@ async def apply_purchase_prices(
 @router.post("/purchase-prices/refresh", response_model=dict)
 async def refresh_purchase_price_cache(
     year_from: int = Query(default=2024, ge=2000, le=2100),
+    full: bool = Query(default=False, description="Znovu načíst celý rok z Inforu"),
+    client: InforAPIClient = Depends(get_infor_client),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN])),
 ):
-    """Invalidate purchase price cache for given year_from."""
-    cache_key = f"pp_{year_from}"
-    was_cached = cache_key in _pp_cache
-    _pp_cache.pop(cache_key, None)
+    """
+    Refresh local purchase price data.
 
-    # Also clear all keys that start with pp_ for this year
-    keys_to_remove = [k for k in _pp_cache if k.startswith(f"pp_{year_from}")]
-    for k in keys_to_remove:
-        _pp_cache.pop(k, None)
+    Re-resolves stored PO lines against current norms/categories and pulls
+    the RecordDate delta from Infor. `full=true` drops year_from locally so
+    the next analysis re-crawls it (e.g. after PO lines were deleted in Infor).
+    """
+    analyzer = PurchasePriceAnalyzer(client, db)
+    try:
+        if full:
+            await analyzer.invalidate_year(year_from)
+        reresolved = await analyzer.reresolve()
+        await db.commit()
+        if not full:
+            await analyzer.sync(year_from, year_from, force=True)
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Purchase price refresh failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Obnovení selhalo: {str(e)}")
 
-    logger.info(f"Purchase price cache invalidated: {len(keys_to_remove)} keys for year_from={year_from}")
+    logger.info(f"Purchase price data refreshed for year_from={year_from} (full={full}, re-resolved {reresolved})")
 
     return {
         "status": "ok",
-        "cache_cleared": len(keys_to_remove) > 0,
+        "cache_cleared": full,
         "year_from": year_from,
+        "reresolved": reresolved,
     }
 
 
@@ -883,8 +887,6 @@ async def apply_tier_boundaries(
     except Exception as e:
         return ApplyPriceResponse(success=False, updated_count=0, errors=[str(e)])
 
-    # Invalidate all cached data (boundaries changed → analysis outdated)
-    _pp_cache.clear()
     logger.info(f"Applied tier boundaries for category {data.category_id}: {updated} tiers updated")
 
     return ApplyPriceResponse(success=True, updated_count=updated, errors=[])
@@ -5,7 +5,7 @@ All endpoints require ADMIN role.
 """
 
 import logging
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -38,7 +38,14 @@ async def get_sync_status(
     result = await db.execute(select(SyncState))
     steps = result.scalars().all()
 
-    return SyncStatusResponse(running=infor_sync_service.running, steps=[SyncStateRead.model_validate(s) for s in steps])
+    running_steps = infor_sync_service.running_steps
+    step_reads = []
+    for s in steps:
+        read = SyncStateRead.model_validate(s)
+        read.running = s.step_name in running_steps
+        step_reads.append(read)
+
+    return SyncStatusResponse(running=infor_sync_service.running, steps=step_reads, running_steps=running_steps)
 
 
 @router.get("/logs", response_model=dict)
@@ -78,9 +85,10 @@ async def trigger_sync_step(
     start_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
 
     try:
-        # Use service's internal executor
-        async with infor_sync_service._lock:
+        # Use service's internal executor — per-step lock (scheduler nesmí běžet souběžně)
+        async with infor_sync_service.step_lock(step_name):
             await infor_sync_service._execute_step(step, db)
+        infor_sync_service.reschedule(step_name, step.next_run_at)
 
         end_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
         duration_ms = end_ms - start_ms
@@ -117,8 +125,13 @@ async def update_sync_step(
     # Update fields
     if data.enabled is not None:
         step.enabled = data.enabled
-    if data.interval_seconds is not None:
+    if data.interval_seconds is not None and data.interval_seconds != step.interval_seconds:
         step.interval_seconds = data.interval_seconds
+        # Další běh podle nového intervalu od posledního syncu (bez watermarku → hned)
+        step.next_run_at = (
+            step.last_sync_at + timedelta(seconds=step.interval_seconds)
+            if step.last_sync_at else None
+        )
 
     step.updated_at = datetime.now(timezone.utc)
 
@@ -129,6 +142,7 @@ async def update_sync_step(
         await db.rollback()
         raise
 
+    infor_sync_service.apply_step_config(step_name, step.ido_name, step.enabled, step.next_run_at)
     return SyncStateRead.model_validate(step)
 
 
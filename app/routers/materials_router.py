@@ -36,7 +36,7 @@ from app.models.material import (
     MaterialItemWithGroupResponse,
     MaterialItemListResponse
 )
-from app.services.material_parser import MaterialParserService, ParseResult
+from app.services.material_parser import MaterialParserService, ParseManyRequest, ParseResult
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -695,3 +695,35 @@ async def parse_material_description(
             matched_pattern="error"
         )
 
+
+@router.post("/parse-many", response_model=List[ParseResult])
+async def parse_material_descriptions(
+    data: ParseManyRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Dávkový parsing materiálových popisů (např. všechny řádky poptávky).
+
+    Index norem se načte jednou pro celou dávku, duplicitní popisy
+    se parsují jen jednou. Výsledky jsou ve stejném pořadí jako vstup.
+    """
+    try:
+        parser = MaterialParserService(db)
+        results = await parser.parse_many(data.descriptions)
+
+        logger.info(
+            f"Materials parsed: {len(results)} descriptions",
+            extra={"user": current_user.username}
+        )
+
+        return results
+
+    except Exception as e:
+        logger.error(f"Material batch parsing error: {e}", exc_info=True)
+        # Graceful degradation jako /parse
+        return [
+            ParseResult(raw_input=description, confidence=0.0, matched_pattern="error")
+            for description in data.descriptions
+        ]
+
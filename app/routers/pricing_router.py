@@ -17,7 +17,13 @@ from app.database import get_db
 from app.db_helpers import set_audit, safe_commit, soft_delete
 from app.dependencies import get_current_user, require_role
 from app.models import User, UserRole
-from app.models.batch import Batch, BatchCreate, BatchResponse
+from app.models.batch import (
+    Batch,
+    BatchCreate,
+    BatchResponse,
+    BatchRepriceRequest,
+    BatchRepriceJobResponse,
+)
 from app.models.batch_set import (
     BatchSet,
     BatchSetCreate,
@@ -30,7 +36,7 @@ from app.models.batch_set import (
 from app.models.part import Part
 from app.models.material import MaterialItem
 from app.models.material_input import MaterialInput
-from app.services import batch_set_service
+from app.services import batch_service, batch_set_service
 from app.services.snapshot_service import create_batch_snapshot
 from app.services.number_generator import NumberGenerator, NumberGenerationError
 
@@ -327,6 +333,49 @@ async def freeze_batch_set(
     )
 
 
+@router.post("/reprice", response_model=BatchRepriceJobResponse, status_code=202)
+async def start_bulk_reprice(
+    data: BatchRepriceRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OPERATOR]))
+):
+    """
+    Hromadný přepočet unfrozen batchí na pozadí.
+
+    Díly = part_ids ∪ díly s operací na work_center_id ∪ díly s materiálem
+    v price_category_id. Průběh přes SSE (/api/events/stream):
+    batch_reprice_progress, batch_reprice_done.
+    """
+    if data.part_ids is None and data.work_center_id is None and data.price_category_id is None:
+        raise HTTPException(status_code=400, detail="Zadej part_ids, work_center_id nebo price_category_id")
+
+    part_ids = set(data.part_ids or [])
+    part_ids.update(await batch_service.find_parts_affected_by(
+        db,
+        work_center_id=data.work_center_id,
+        price_category_id=data.price_category_id,
+    ))
+
+    job = batch_service.start_reprice_job(sorted(part_ids), current_user.username)
+    logger.info(
+        f"Started bulk reprice job {job['job_id']} for {len(part_ids)} parts",
+        extra={"job_id": job["job_id"], "user": current_user.username}
+    )
+    return job
+
+
+@router.get("/reprice/{job_id}", response_model=BatchRepriceJobResponse)
+async def get_bulk_reprice_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Stav hromadného přepočtu."""
+    job = batch_service.get_reprice_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Přepočet nenalezen")
+    return job
+
+
 @router.post("/batch-sets/{set_id}/recalculate", response_model=BatchSetWithBatchesResponse)
 async def recalculate_batch_set(
     set_id: int,
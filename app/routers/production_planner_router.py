@@ -24,7 +24,7 @@ from app.models.production_priority import (
     ProductionPriorityTierRequest,
 )
 from app.services import production_planner_service
-from app.services.infor_api_client import InforAPIClient
+from app.services.infor_api_client import InforAPIClient, get_shared_infor_client
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -36,13 +36,7 @@ def get_infor_client() -> InforAPIClient:
             status_code=501,
             detail="Infor API integration not configured. Set INFOR_API_URL in .env"
         )
-    return InforAPIClient(
-        base_url=settings.INFOR_API_URL,
-        config=settings.INFOR_CONFIG,
-        username=settings.INFOR_USERNAME,
-        password=settings.INFOR_PASSWORD,
-        verify_ssl=False,
-    )
+    return get_shared_infor_client()
 
 
 @router.get("/data")
@@ -518,6 +518,7 @@ async def parse_quote_request_v2(
     request: Request,
     request_files: List[UploadFile] = File(..., description="PDF poptavky (typicky 1)"),
     drawing_files: List[UploadFile] = File(default=[], description="PDF vykresy"),
+    job_id: Optional[str] = Query(None, max_length=64, description="ID pro průběh přes SSE (quote_parse_progress)"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OPERATOR])),
 ):
@@ -528,6 +529,10 @@ async def parse_quote_request_v2(
     Request PDFs -> gpt-4.1 (extract customer + items).
     Drawing PDFs -> ft_v1 (title block + TimeVision estimation).
 
+    With job_id: per-file progress + partial DrawingAnalysis via SSE
+    (/api/events/stream, quote_parse_progress / quote_parse_done),
+    delivered only to the current user's streams.
+
     Returns QuoteRequestReviewV2 for user verification before creation.
     """
     from app.services.quote_request_parser import parse_quote_request_v2 as do_parse
@@ -561,7 +566,7 @@ async def parse_quote_request_v2(
     )
 
     try:
-        result = await do_parse(req_bytes, draw_bytes, db)
+        result = await do_parse(req_bytes, draw_bytes, db, job_id=job_id, user_id=current_user.id)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
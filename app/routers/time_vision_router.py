@@ -6,8 +6,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import AsyncGenerator, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy import select, or_
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -22,8 +22,24 @@ from app.models.time_vision import (
     TimeVisionActualTimeUpdate,
 )
 from app.models.file_record import FileRecord
-from app.services.openai_vision_service import estimate_from_pdf_openai, extract_features_from_pdf_openai, is_fine_tuned_model, OPENAI_MODEL
+from app.services.openai_vision_service import (
+    OPENAI_MODEL,
+    VISION_DETAIL,
+    estimate_from_pdf_openai,
+    extract_features_from_pdf_openai,
+    features_prompts,
+    is_fine_tuned_model,
+    time_estimation_prompts,
+)
+from app.services.vision_estimation_cache import estimate_cached, vision_cache_key
 from app.services.feature_calculator import calculate_features_time
+from app.services.training_export import (
+    TrainingExample,
+    export_file_path,
+    stream_jsonl,
+    stream_jsonl_resumable,
+)
+from app.services.file_response import file_response
 from app.dependencies import get_current_user, require_role
 from app.models import User, UserRole
 
@@ -192,8 +208,8 @@ async def list_drawings(db: AsyncSession = Depends(get_db), current_user: User =
 
 
 @router.get("/drawings/{filename}/pdf")
-async def serve_drawing_pdf(filename: str, current_user: User = Depends(get_current_user)):
-    """Serve a PDF drawing file for preview."""
+async def serve_drawing_pdf(filename: str, request: Request, current_user: User = Depends(get_current_user)):
+    """Serve a PDF drawing file for preview (ETag/304 + Range for pdf.js)."""
     # Security: prevent path traversal
     if ".." in filename or "/" in filename:
         raise HTTPException(status_code=400, detail="Invalid filename")
@@ -204,11 +220,7 @@ async def serve_drawing_pdf(filename: str, current_user: User = Depends(get_curr
     if not pdf_path.suffix.lower() == '.pdf':
         raise HTTPException(status_code=400, detail="Only PDF files supported")
 
-    return FileResponse(
-        str(pdf_path),
-        media_type="application/pdf",
-        content_disposition_type="inline",
-    )
+    return file_response(request, pdf_path, media_type="application/pdf")
 
 
 class ProcessRequest(BaseModel):
@@ -216,6 +228,7 @@ class ProcessRequest(BaseModel):
     filename: str = Field(default="", max_length=500)
     file_id: Optional[int] = Field(default=None, description="FileRecord ID (preferred over filename)")
     part_id: Optional[int] = Field(default=None, description="Part ID for direct Part↔TimeVision FK (ADR-045)")
+    force_refresh: bool = Field(default=False, description="Ignorovat cache odhadů a zavolat model znovu")
 
 
 @router.get("/estimations", response_model=List[TimeVisionListItem])
@@ -463,6 +476,9 @@ async def process_drawing_openai(
     SSE stream with 2 steps:
       1. OpenAI vision estimation
       2. Save to database
+
+    Same PDF content + model + prompt as an existing estimation → cached
+    response, no API call (force_refresh=True calls the model again).
     """
     # Resolve file path - prefer file_id, fallback to filename
     pdf_path = None
@@ -500,16 +516,22 @@ async def process_drawing_openai(
 
     async def event_generator() -> AsyncGenerator[dict, None]:
         try:
-            # Step 1: OpenAI Vision estimation
+            # Step 1: OpenAI Vision estimation (cache hit = stejné PDF + model + prompt)
             yield {"event": "step", "data": json.dumps({"step": 1, "total": 2, "label": "OpenAI GPT-4o vision odhad..."})}
 
-            raw_result = await estimate_from_pdf_openai(
-                pdf_path=str(pdf_path),
-                similar_parts=None,  # TODO: add similar parts lookup later
+            model, sys_prompt, user_prompt = time_estimation_prompts(similar_parts=None)
+            cache_key = await vision_cache_key(pdf_path, "time_v1", model, sys_prompt, user_prompt, VISION_DETAIL)
+            raw_result, cached = await estimate_cached(
+                db, cache_key,
+                lambda: estimate_from_pdf_openai(
+                    pdf_path=str(pdf_path),
+                    similar_parts=None,  # TODO: add similar parts lookup later
+                ),
+                force=request.force_refresh,
             )
 
             # Step 2: Save to database
-            yield {"event": "step", "data": json.dumps({"step": 2, "total": 2, "label": "Ukládám do databáze..."})}
+            yield {"event": "step", "data": json.dumps({"step": 2, "total": 2, "label": "Ukládám do databáze...", "cached": cached})}
 
             # Build breakdown JSON
             breakdown = raw_result.get("breakdown", [])
@@ -561,7 +583,8 @@ async def process_drawing_openai(
                 "part_id": request.part_id,
                 "estimation_type": "time_v1",
                 "ai_provider": "openai_ft" if is_fine_tuned_model() else "openai",
-                "ai_model": OPENAI_MODEL,
+                "ai_model": model,
+                **cache_key.columns(),
                 "part_type": raw_result.get("part_type"),
                 "complexity": raw_result.get("complexity"),
                 "material_detected": raw_result.get("material_detected"),
@@ -630,6 +653,8 @@ async def process_features(
     SSE stream with 2 steps:
       1. GPT-4o vision feature extraction
       2. Save to database
+
+    Cached like /process-openai (force_refresh=True bypasses the cache).
     """
     # Resolve file path - prefer file_id, fallback to filename
     pdf_path = None
@@ -670,10 +695,16 @@ async def process_features(
             # Step 1: GPT-4o Vision feature extraction
             yield {"event": "step", "data": json.dumps({"step": 1, "total": 2, "label": "GPT-4o feature extraction..."})}
 
-            raw_result = await extract_features_from_pdf_openai(pdf_path=str(pdf_path))
+            model, sys_prompt, user_prompt = features_prompts()
+            cache_key = await vision_cache_key(pdf_path, "features_v2", model, sys_prompt, user_prompt, VISION_DETAIL)
+            raw_result, cached = await estimate_cached(
+                db, cache_key,
+                lambda: extract_features_from_pdf_openai(pdf_path=str(pdf_path)),
+                force=request.force_refresh,
+            )
 
             # Step 2: Save to database
-            yield {"event": "step", "data": json.dumps({"step": 2, "total": 2, "label": "Ukládám do databáze..."})}
+            yield {"event": "step", "data": json.dumps({"step": 2, "total": 2, "label": "Ukládám do databáze...", "cached": cached})}
 
             features_json_str = json.dumps(raw_result, ensure_ascii=False)
 
@@ -722,7 +753,8 @@ async def process_features(
                 "part_id": request.part_id,
                 "estimation_type": "features_v2",
                 "ai_provider": "openai",
-                "ai_model": "gpt-4o",
+                "ai_model": model,
+                **cache_key.columns(),
                 "part_type": raw_result.get("part_type"),
                 "material_detected": raw_result.get("material", {}).get("designation") if isinstance(raw_result.get("material"), dict) else None,
                 "material_coefficient": 1.0,
@@ -894,8 +926,33 @@ async def calculate_time_from_features(
     return calc_result
 
 
+def _training_export_response(
+    examples: List[TrainingExample],
+    kind: str,
+    filename: str,
+    resumable: bool,
+) -> StreamingResponse:
+    """StreamingResponse s JSONL — render výkresů v process poolu během streamování."""
+    if resumable:
+        content = stream_jsonl_resumable(examples, export_file_path(kind, examples), label=kind)
+    else:
+        content = stream_jsonl(examples, label=kind)
+    return StreamingResponse(
+        content,
+        media_type="application/jsonl",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+def _example_key(record: TimeVisionEstimation) -> str:
+    """Klíč pro pokračování exportu — upravený záznam = nový příklad."""
+    updated = record.updated_at.isoformat() if record.updated_at else ""
+    return f"tve:{record.id}:{updated}"
+
+
 @router.get("/export-features-training")
 async def export_features_training_data(
+    resumable: bool = Query(False, description="Zapsat export i na disk; opakovaný požadavek pokračuje"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN])),
 ):
@@ -908,9 +965,10 @@ async def export_features_training_data(
     - estimation_type = "features_v2"
     - features_corrected_json IS NOT NULL
     - deleted_at IS NULL
+
+    Lines are streamed as drawings are rendered (training_export); PDFs that
+    fail to render are skipped. `resumable` also writes the export to disk.
     """
-    from starlette.responses import Response
-    from app.services.openai_vision_service import _pdf_to_base64_image
     from app.services.openai_vision_prompts import OPENAI_FEATURES_SYSTEM, build_features_prompt
 
     query = (
@@ -925,7 +983,8 @@ async def export_features_training_data(
     result = await db.execute(query)
     records = result.scalars().all()
 
-    lines = []
+    user_text = build_features_prompt()
+    examples: List[TrainingExample] = []
     skipped = []
     for record in records:
         pdf_path = _resolve_pdf_path(record.pdf_path, record.pdf_filename)
@@ -933,65 +992,30 @@ async def export_features_training_data(
             skipped.append(record.pdf_filename)
             continue
 
-        try:
-            img_b64 = _pdf_to_base64_image(str(pdf_path))
-        except Exception:
-            skipped.append(record.pdf_filename)
-            continue
-
-        training_example = {
-            "messages": [
-                {
-                    "role": "system",
-                    "content": OPENAI_FEATURES_SYSTEM,
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{img_b64}",
-                                "detail": "high",
-                            },
-                        },
-                        {
-                            "type": "text",
-                            "text": build_features_prompt(),
-                        },
-                    ],
-                },
-                {
-                    "role": "assistant",
-                    "content": record.features_corrected_json,
-                },
-            ]
-        }
-        lines.append(json.dumps(training_example, ensure_ascii=False))
+        examples.append(TrainingExample(
+            key=_example_key(record),
+            pdf_path=pdf_path,
+            system_prompt=OPENAI_FEATURES_SYSTEM,
+            user_text=user_text,
+            answer=record.features_corrected_json,
+        ))
 
     if skipped:
         logger.warning(
             "Skipped %d records (missing PDF): %s", len(skipped), skipped
         )
 
-    logger.info(
-        "Exported %d features training examples (%d skipped)", len(lines), len(skipped)
-    )
-
-    jsonl_content = "\n".join(lines)
-    return Response(
-        content=jsonl_content,
-        media_type="application/jsonl",
-        headers={
-            "Content-Disposition": (
-                f"attachment; filename=gestima_features_ft_{len(lines)}_samples.jsonl"
-            ),
-        },
+    return _training_export_response(
+        examples,
+        kind="features_training",
+        filename=f"gestima_features_ft_{len(examples)}_samples.jsonl",
+        resumable=resumable,
     )
 
 
 @router.get("/export-training")
 async def export_training_data(
+    resumable: bool = Query(False, description="Zapsat export i na disk; opakovaný požadavek pokračuje"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN])),
 ):
@@ -1009,11 +1033,9 @@ async def export_training_data(
     - actual_time_min OR human_estimate_min IS NOT NULL
     - deleted_at IS NULL
 
-    Uses _pdf_to_base64_image for consistent rendering (300 DPI, 4096px cap).
+    Uses the same rendering as inference (300 DPI, 4096px cap, raster cache),
+    streamed via training_export. `resumable` also writes the export to disk.
     """
-    from starlette.responses import Response
-    from app.services.openai_vision_service import _pdf_to_base64_image
-
     query = (
         select(TimeVisionEstimation)
         .where(
@@ -1039,7 +1061,7 @@ async def export_training_data(
         "Odpověz POUZE validním JSON."
     )
 
-    lines = []
+    examples: List[TrainingExample] = []
     skipped = []
     for record in records:
         pdf_path = _resolve_pdf_path(record.pdf_path, record.pdf_filename)
@@ -1047,12 +1069,6 @@ async def export_training_data(
             skipped.append(record.pdf_filename)
             continue
 
-        try:
-            img_b64 = _pdf_to_base64_image(str(pdf_path))
-        except Exception:
-            skipped.append(record.pdf_filename)
-            continue
-
         # Parse stored breakdown if available
         breakdown = []
         if record.estimation_breakdown_json:
@@ -1087,56 +1103,24 @@ async def export_training_data(
         if record.max_height_mm is not None:
             answer_dict["max_height_mm"] = record.max_height_mm
 
-        answer = json.dumps(answer_dict, ensure_ascii=False)
-
-        training_example = {
-            "messages": [
-                {
-                    "role": "system",
-                    "content": ft_system,
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{img_b64}",
-                                "detail": "high",
-                            },
-                        },
-                        {
-                            "type": "text",
-                            "text": "Odhadni produkční strojní čas v minutách.",
-                        },
-                    ],
-                },
-                {
-                    "role": "assistant",
-                    "content": answer,
-                },
-            ]
-        }
-        lines.append(json.dumps(training_example, ensure_ascii=False))
+        examples.append(TrainingExample(
+            key=_example_key(record),
+            pdf_path=pdf_path,
+            system_prompt=ft_system,
+            user_text="Odhadni produkční strojní čas v minutách.",
+            answer=json.dumps(answer_dict, ensure_ascii=False),
+        ))
 
     if skipped:
         logger.warning(
             "Skipped %d records (missing PDF): %s", len(skipped), skipped
         )
 
-    logger.info(
-        "Exported %d training examples (%d skipped)", len(lines), len(skipped)
-    )
-
-    jsonl_content = "\n".join(lines)
-    return Response(
-        content=jsonl_content,
-        media_type="application/jsonl",
-        headers={
-            "Content-Disposition": (
-                f"attachment; filename=gestima_ft_{len(lines)}_samples.jsonl"
-            ),
-        },
+    return _training_export_response(
+        examples,
+        kind="training",
+        filename=f"gestima_ft_{len(examples)}_samples.jsonl",
+        resumable=resumable,
     )
 
 
@@ -36,7 +36,7 @@ from app.services.tsd_fiddler_service import (
     TsdInfoBarError,
     TsdValidationError,
 )
-from app.services.infor_api_client import InforAPIClient
+from app.services.infor_api_client import InforAPIClient, get_shared_infor_client
 
 logger = logging.getLogger(__name__)
 
@@ -48,19 +48,13 @@ router = APIRouter(prefix="/api/tsd-fiddler", tags=["TSD Fiddler"])
 # ---------------------------------------------------------------------------
 
 def _get_infor_client() -> InforAPIClient:
-    """Factory: create InforAPIClient from settings."""
+    """Factory: shared InforAPIClient from settings (pooled, cached token)."""
     if not settings.INFOR_API_URL:
         raise HTTPException(
             status_code=501,
             detail="Infor API not configured (INFOR_API_URL)",
         )
-    return InforAPIClient(
-        base_url=settings.INFOR_API_URL,
-        config=settings.INFOR_CONFIG,
-        username=settings.INFOR_USERNAME,
-        password=settings.INFOR_PASSWORD,
-        verify_ssl=False,
-    )
+    return get_shared_infor_client()
 
 
 def _resolve_emp_num(user: Any) -> str:
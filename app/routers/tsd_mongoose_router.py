@@ -47,21 +47,15 @@ _CET = timezone(timedelta(hours=1))
 
 
 def _get_infor_client():
-    """Factory: create InforAPIClient for post-SP timestamp fix.
+    """Factory: shared InforAPIClient for post-SP timestamp fix.
 
     Uses IPS_CONFIG (not INFOR_CONFIG) — the Mongoose session creates records
     in the IPS database (Live), so fixes must query the same DB.
     """
-    from app.services.infor_api_client import InforAPIClient
+    from app.services.infor_api_client import get_shared_infor_client
     if not settings.INFOR_API_URL:
         return None
-    return InforAPIClient(
-        base_url=settings.INFOR_API_URL,
-        config=settings.IPS_CONFIG,
-        username=settings.INFOR_USERNAME,
-        password=settings.INFOR_PASSWORD,
-        verify_ssl=False,
-    )
+    return get_shared_infor_client(settings.IPS_CONFIG)
 
 
 # ---------------------------------------------------------------------------
@@ -18,11 +18,8 @@ from app.models.work_center import (
     WorkCenterUpdate,
     WorkCenterResponse
 )
-from app.models.batch import Batch
-from app.models.part import Part
-from app.models.operation import Operation
 from app.services.number_generator import NumberGenerator
-from app.services.batch_service import recalculate_batch_costs
+from app.services.batch_service import find_parts_affected_by, reprice_parts
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -264,38 +261,11 @@ async def recalculate_batches(
     if not work_center:
         raise HTTPException(status_code=404, detail="Pracoviště nenalezeno")
 
-    # Find all non-frozen batches using this work center
-    # Join through operations to find batches
-    batches_query = (
-        select(Batch)
-        .join(Part, Batch.part_id == Part.id)
-        .join(Operation, Operation.part_id == Part.id)
-        .where(
-            Operation.work_center_id == work_center.id,
-            Batch.is_frozen == False
-        )
-        .distinct()
-    )
-
-    batches_result = await db.execute(batches_query)
-    batches = batches_result.scalars().all()
-
-    recalculated_count = 0
-    failed_count = 0
-    for batch in batches:
-        try:
-            await recalculate_batch_costs(batch, db)
-            recalculated_count += 1
-        except Exception as e:
-            failed_count += 1
-            logger.error(
-                f"Failed to recalculate batch {batch.id}: {e}",
-                exc_info=True,
-                extra={"batch_id": batch.id, "work_center_id": work_center.id}
-            )
-
-    # Commit all batch updates
-    await safe_commit(db, action="přepočítání dávek")
+    # Hromadný přepočet unfrozen batchí všech dílů s operací na tomto pracovišti
+    part_ids = await find_parts_affected_by(db, work_center_id=work_center.id)
+    progress = await reprice_parts(db, part_ids)
+    recalculated_count = progress["repriced_batches"]
+    failed_count = progress["failed_parts"]
 
     # Update timestamp
     work_center.batches_recalculated_at = datetime.now()
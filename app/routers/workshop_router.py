@@ -8,8 +8,8 @@ import logging
 import time
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -19,7 +19,8 @@ from app.dependencies import get_current_user
 from app.models import User
 from app.models.workshop_transaction import WorkshopTransactionCreate, WorkshopTransactionResponse
 from app.services import workshop_service
-from app.services.infor_api_client import InforAPIClient
+from app.services.file_response import etag_matches
+from app.services.infor_api_client import InforAPIClient, get_shared_infor_client
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -138,13 +139,7 @@ def get_infor_client() -> InforAPIClient:
             status_code=501,
             detail="Infor API integration not configured. Set INFOR_API_URL in .env"
         )
-    return InforAPIClient(
-        base_url=settings.INFOR_API_URL,
-        config=settings.INFOR_CONFIG,
-        username=settings.INFOR_USERNAME,
-        password=settings.INFOR_PASSWORD,
-        verify_ssl=False,
-    )
+    return get_shared_infor_client()
 
 
 @router.get("/queue")
@@ -154,6 +149,7 @@ async def get_wc_queue(
     sort_by: str = Query("OpDatumSt", description="Řazení: OpDatumSt|OpDatumSp|Job|OperNum|Wc|DerJobItem|JobDescription|QtyComplete|JobQtyReleased"),
     sort_dir: str = Query("asc", description="Směr řazení: asc|desc"),
     limit: int = Query(200, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Kurzor další stránky (hlavička X-Next-Cursor)"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
     client: InforAPIClient = Depends(get_infor_client),
@@ -161,18 +157,23 @@ async def get_wc_queue(
     """
     Vrátí frontu práce pro pracoviště — flat seznam operací (Type=J, JobStat=R/F).
 
-    DB-first: čte z lokální tabulky workshop_job_routes.
+    DB-first: čte z lokální tabulky workshop_job_routes (keyset stránkování:
+    X-Next-Cursor → ?cursor=...).
     Fallback: live fetch z Inforu (cold start, sync ještě neproběhl).
     """
     # DB-first (fallback jen pokud sync ještě neproběhl)
     if await workshop_service.is_table_synced(db, "workshop_job_routes"):
         t0 = time.perf_counter()
         db_data = await workshop_service.read_wc_queue_from_db(
-            db, wc=wc, job_filter=job, sort_by=sort_by, sort_dir=sort_dir, limit=limit,
+            db, wc=wc, job_filter=job, sort_by=sort_by, sort_dir=sort_dir, limit=limit, after=cursor,
         )
         t1 = time.perf_counter()
         logger.info("GET /queue DB-read %.1fms (%d rows, wc=%s)", (t1 - t0) * 1000, len(db_data), wc)
-        return JSONResponse(content=db_data, headers={"X-Source": "db", "X-Timing-Ms": f"{(t1-t0)*1000:.0f}"})
+        headers = {"X-Source": "db", "X-Timing-Ms": f"{(t1-t0)*1000:.0f}"}
+        next_cursor = workshop_service.queue_next_cursor(db_data, sort_by, limit)
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return JSONResponse(content=db_data, headers=headers)
 
     # Fallback: live fetch z Inforu (cold start — sync ještě neproběhl)
     try:
@@ -192,27 +193,33 @@ async def get_wc_queue(
 
 @router.get("/orders-overview")
 async def get_orders_overview(
+    request: Request,
     customer: Optional[str] = Query(None, description="Zákazník (kód)"),
     due_from: Optional[str] = Query(None, description="Termín od (YYYY-MM-DD)"),
     due_to: Optional[str] = Query(None, description="Termín do (YYYY-MM-DD)"),
     search: Optional[str] = Query(None, description="Hledání: zakázka/díl/popis"),
     limit: int = Query(2000, ge=1, le=5000),
+    offset: int = Query(0, ge=0),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
     client: InforAPIClient = Depends(get_infor_client),
 ):
     """Přehled zakázek pro dispečink (zakázka + VP kandidáti + operace).
 
-    DB-first: čte z lokální tabulky workshop_order_overviews.
+    DB-first: čte z read modelu workshop_order_overviews (FTS hledání,
+    stránkování limit/offset, ETag → 304 při If-None-Match beze změny dat).
     Fallback: live fetch z Inforu (cold start).
     """
     # DB-first (fallback jen pokud sync ještě neproběhl)
     if await workshop_service.is_table_synced(db, "workshop_order_overviews"):
-        db_data = await workshop_service.read_orders_overview_from_db(
-            db, customer=customer, due_from=due_from, due_to=due_to,
-            search=search, limit=limit,
-        )
-        return JSONResponse(content=db_data, headers={"X-Source": "db"})
+        params = dict(customer=customer, due_from=due_from, due_to=due_to, search=search, limit=limit, offset=offset)
+        etag = await workshop_service.orders_overview_etag(db, **params)
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=cache_headers)
+
+        db_data = await workshop_service.read_orders_overview_from_db(db, **params)
+        return JSONResponse(content=db_data, headers={"X-Source": "db", **cache_headers})
 
     # Fallback: live fetch (cold start)
     try:
@@ -239,6 +246,7 @@ async def get_machine_plan(
     sort_by: str = Query("OpDatumSt", description="Řazení: OpDatumSt|OpDatumSp|Job|OperNum|Wc|DerJobItem|JobDescription|QtyComplete|JobQtyReleased"),
     sort_dir: str = Query("asc", description="Směr řazení: asc|desc"),
     limit: int = Query(500, ge=1, le=2000),
+    cursor: Optional[str] = Query(None, description="Kurzor další stránky (hlavička X-Next-Cursor)"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
     client: InforAPIClient = Depends(get_infor_client),
@@ -246,7 +254,8 @@ async def get_machine_plan(
     """
     Plán stroje — fronta operací včetně zásobníku (R/F/S/W).
 
-    DB-first: čte z lokální tabulky workshop_job_routes.
+    DB-first: čte z lokální tabulky workshop_job_routes (keyset stránkování:
+    X-Next-Cursor → ?cursor=...).
     Fallback: live fetch z Inforu (cold start).
     """
     from app.services import machine_plan_service
@@ -255,13 +264,18 @@ async def get_machine_plan(
     if await workshop_service.is_table_synced(db, "workshop_job_routes"):
         t0 = time.perf_counter()
         db_data = await workshop_service.read_machine_plan_from_db(
-            db, wc=wc, job_filter=job, search=search, sort_by=sort_by, sort_dir=sort_dir, record_cap=limit,
+            db, wc=wc, job_filter=job, search=search, sort_by=sort_by, sort_dir=sort_dir,
+            record_cap=limit, after=cursor,
         )
         t1 = time.perf_counter()
+        next_cursor = workshop_service.queue_next_cursor(db_data, sort_by, limit)
         await machine_plan_service.enrich_flat_rows(db, db_data, wc=wc)
         t2 = time.perf_counter()
         logger.info("GET /machine-plan DB-read %.1fms, enrich %.1fms (%d rows, wc=%s)", (t1 - t0) * 1000, (t2 - t1) * 1000, len(db_data), wc)
-        return JSONResponse(content=db_data, headers={"X-Source": "db", "X-Timing-Ms": f"{(t2-t0)*1000:.0f}"})
+        headers = {"X-Source": "db", "X-Timing-Ms": f"{(t2-t0)*1000:.0f}"}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return JSONResponse(content=db_data, headers=headers)
 
     # Fallback: live fetch (cold start)
     try:
@@ -32,6 +32,8 @@ class DrawingImportPreviewResponse(BaseModel):
     """Response for preview scan."""
     share_path: str = Field(...)
     total_folders: int = Field(..., ge=0)
+    changed: int = Field(0, ge=0, description="Folders new/changed since the previous scan")
+    removed: int = Field(0, ge=0, description="Folders gone since the previous scan")
     matched: int = Field(0, ge=0)
     unmatched: int = Field(0, ge=0)
     already_imported: int = Field(0, ge=0)
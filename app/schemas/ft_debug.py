@@ -102,3 +102,7 @@ class FtExportRequest(BaseModel):
         max_length=2000,
         description="List of part IDs to include in JSONL export",
     )
+    resumable: bool = Field(
+        False,
+        description="Also write the export to a file on disk; a repeated request resumes an interrupted export",
+    )
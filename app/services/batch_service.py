@@ -1,7 +1,17 @@
-"""GESTIMA - Batch Cost Recalculation Service"""
+"""GESTIMA - Batch Cost Recalculation Service
 
+- recalculate_batch_costs / recalculate_batches_costs: přepočet konkrétních batchí
+- reprice_parts: hromadný přepočet všech unfrozen batchí pro množinu dílů
+  (např. po změně sazby pracoviště nebo price tieru) — závislosti se načtou
+  po dávkách dílů, ceny se počítají v paměti, průběh jde přes SSE event_bus
+"""
+
+import asyncio
 import logging
+import time
+import uuid
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,11 +21,129 @@ from app.models.part import Part
 from app.models.operation import Operation
 from app.models.material_input import MaterialInput  # ADR-024
 from app.models.material import MaterialItem, MaterialPriceCategory
-from app.services.price_calculator import calculate_part_price
+from app.models.work_center import WorkCenter
+from app.db_helpers import ensure_db_transaction
+from app.services.price_calculator import PriceBreakdown, build_pricing_context, get_config_coefficients
 
 logger = logging.getLogger(__name__)
 
 
+def _part_pricing_options():
+    """Eager-load Part → material_inputs (ADR-024) + operations pro kalkulaci."""
+    # Migration 2026-01-26: + Part.price_category
+    return (
+        # MaterialInputs (ADR-024)
+        selectinload(Part.material_inputs)
+        .selectinload(MaterialInput.material_item)
+        .selectinload(MaterialItem.group),
+        selectinload(Part.material_inputs)
+        .selectinload(MaterialInput.price_category)
+        .selectinload(MaterialPriceCategory.tiers),
+        selectinload(Part.material_inputs)
+        .selectinload(MaterialInput.price_category)
+        .selectinload(MaterialPriceCategory.material_group),
+        # Operations (pro PricingContext - ADR-016)
+        selectinload(Part.operations),
+    )
+
+
+async def _load_part_for_pricing(part_id: int, db: AsyncSession):
+    """Part s material dependencies + operations (ADR-024) a aktivní operace dle seq."""
+    stmt = select(Part).where(Part.id == part_id).options(*_part_pricing_options())
+    result = await db.execute(stmt)
+    part = result.scalar_one_or_none()
+
+    if not part:
+        raise ValueError(f"Part {part_id} not found")
+
+    # Operace pro unit_time_min výpočet (kalkulace už má operace)
+    operations_stmt = (
+        select(Operation)
+        .where(Operation.part_id == part.id, Operation.deleted_at.is_(None))
+        .order_by(Operation.seq)
+    )
+    operations_result = await db.execute(operations_stmt)
+    return part, operations_result.scalars().all()
+
+
+def _apply_breakdown(batch: Batch, breakdown: PriceBreakdown, operations) -> None:
+    """Mapuje PriceBreakdown → Batch fields (za kus!) + material snapshot."""
+    # Material: již obsahuje stock_coefficient
+    batch.material_cost = breakdown.material_cost / batch.quantity if batch.quantity > 0 else 0.0
+
+    # Stroje: operace + setup (BEZ režie/marže)
+    batch.machining_cost = breakdown.machine_operation_cost / batch.quantity if batch.quantity > 0 else 0.0
+    batch.setup_cost = breakdown.machine_setup_cost / batch.quantity if batch.quantity > 0 else 0.0
+
+    # Režie a marže: pouze přirážky (computed properties)
+    batch.overhead_cost = breakdown.overhead_markup / batch.quantity if batch.quantity > 0 else 0.0
+    batch.margin_cost = breakdown.margin_markup / batch.quantity if batch.quantity > 0 else 0.0
+
+    # Kooperace: již obsahuje coop_coefficient
+    batch.coop_cost = breakdown.coop_cost / batch.quantity if batch.quantity > 0 else 0.0
+
+    # Celkem
+    batch.unit_cost = breakdown.cost_per_piece
+    batch.total_cost = breakdown.total_cost
+
+    # Material weight/price snapshot (z ADR-016 kalkulace — konzistentní s material_cost)
+    total_weight_kg = breakdown.material_weight_kg * batch.quantity
+    batch.material_weight_kg = round(total_weight_kg, 3) if breakdown.material_weight_kg else None
+    batch.material_price_per_kg = breakdown.material_price_per_kg or None
+
+    # Snapshot materiálu pro audit trail (u nefrozen batchí)
+    if not batch.snapshot_data:
+        batch.snapshot_data = {}
+    batch.snapshot_data["material"] = {
+        "weight_per_piece_kg": breakdown.material_weight_kg,
+        "total_weight_kg": round(total_weight_kg, 3) if breakdown.material_weight_kg else 0,
+        "price_per_kg": breakdown.material_price_per_kg,
+        "tier_calculation_timestamp": datetime.now().isoformat(),
+    }
+
+    # unit_time_min = součet operation_time_min (bez setup, bez coop)
+    batch.unit_time_min = sum(
+        op.operation_time_min or 0.0
+        for op in operations
+        if not op.is_coop
+    )
+
+    # Logging (batch.id může být None pokud není flushed)
+    log_extra = {
+        "part_id": batch.part_id,
+        "material": batch.material_cost,
+        "machining": batch.machining_cost,
+        "setup": batch.setup_cost,
+        "coop": batch.coop_cost,
+    }
+    if batch.id:
+        log_extra["batch_id"] = batch.id
+
+    logger.info(
+        f"Recalculated batch costs: quantity={batch.quantity}, "
+        f"unit_cost={batch.unit_cost} Kč, total_cost={batch.total_cost} Kč",
+        extra=log_extra
+    )
+
+
+def _log_recalculation_error(batch: Batch, e: Exception) -> None:
+    # Prepare error log extra (batch.id může být None)
+    error_extra = {
+        "part_id": batch.part_id,
+        "quantity": batch.quantity,
+        "error": str(e),
+        "error_type": type(e).__name__
+    }
+    if batch.id:
+        error_extra["batch_id"] = batch.id
+
+    logger.error(
+        f"CRITICAL: Batch recalculation failed for batch_id={batch.id or 'NEW'}, part_id={batch.part_id}",
+        exc_info=True,
+        extra=error_extra
+    )
+
+
 async def recalculate_batch_costs(batch: Batch, db: AsyncSession) -> Batch:
     """
     Přepočítá všechny náklady batche podle aktuálního stavu Part + Operations + Machines.
@@ -23,7 +151,7 @@ async def recalculate_batch_costs(batch: Batch, db: AsyncSession) -> Batch:
     Postup:
     1. Načte Part (s material_inputs → price_category, material_item - ADR-024)
     2. Načte Operations pro part
-    3. Vypočítá ceny přes calculate_part_price() (ADR-016)
+    3. Vypočítá ceny přes PricingContext (ADR-016)
     4. Updatne batch fields + material weight snapshot
 
     Args:
@@ -36,118 +164,253 @@ async def recalculate_batch_costs(batch: Batch, db: AsyncSession) -> Batch:
     Raises:
         ValueError: Part nenalezen, chybí material_item, atd.
     """
-    try:
-        # 1. Načíst Part s material dependencies + operations (Migration 2026-01-26: + Part.price_category)
-        stmt = select(Part).where(Part.id == batch.part_id).options(
-            # MaterialInputs (ADR-024)
-            selectinload(Part.material_inputs)
-            .selectinload(MaterialInput.material_item)
-            .selectinload(MaterialItem.group),
-            selectinload(Part.material_inputs)
-            .selectinload(MaterialInput.price_category)
-            .selectinload(MaterialPriceCategory.tiers),
-            selectinload(Part.material_inputs)
-            .selectinload(MaterialInput.price_category)
-            .selectinload(MaterialPriceCategory.material_group),
-            # Operations (pro calculate_part_price - ADR-016)
-            selectinload(Part.operations),
-        )
-        result = await db.execute(stmt)
-        part = result.scalar_one_or_none()
+    await recalculate_batches_costs([batch], db)
+    return batch
+
+
+async def recalculate_batches_costs(batches: List[Batch], db: AsyncSession) -> List[Batch]:
+    """
+    Přepočítá náklady více batchí — Part, operace, koeficienty a tiers se
+    načtou jednou per díl, ceny pro všechna množství se počítají v paměti.
+
+    Returns:
+        List[Batch]: Updatnuté batche (caller musí commitnout!)
+
+    Raises:
+        ValueError: Part nenalezen, chybí material_item, atd.
+    """
+    by_part: Dict[int, List[Batch]] = {}
+    for batch in batches:
+        by_part.setdefault(batch.part_id, []).append(batch)
+
+    for part_id, part_batches in by_part.items():
+        current = part_batches[0]
+        try:
+            part, operations = await _load_part_for_pricing(part_id, db)
+            context = await build_pricing_context(part, db)
+            for current in part_batches:
+                _apply_breakdown(current, context.price(current.quantity), operations)
+        except Exception as e:
+            _log_recalculation_error(current, e)
+            # Re-raise aby caller mohl handlovat
+            raise
+
+    return batches
 
-        if not part:
-            raise ValueError(f"Part {batch.part_id} not found")
 
-        # 2. Načíst Operations pro unit_time_min výpočet (kalkulace už má operace)
-        operations_stmt = (
-            select(Operation)
-            .where(Operation.part_id == part.id, Operation.deleted_at.is_(None))
-            .order_by(Operation.seq)
+# ============================================================================
+# HROMADNÝ PŘEPOČET (změna sazby pracoviště / price tieru)
+# ============================================================================
+
+_REPRICE_PART_CHUNK = 200  # dílů na jeden eager-load dotaz + commit
+_REPRICE_PROGRESS_EVERY = 25  # SSE progress po N dílech
+
+# Běžící/dokončené joby (in-process, pro GET status); dokončené se po
+# _REPRICE_JOB_TTL_SEC zapomenou, nejvýš _REPRICE_JOBS_MAX záznamů
+_REPRICE_JOB_TTL_SEC = 3600
+_REPRICE_JOBS_MAX = 100
+_reprice_jobs: Dict[str, Dict[str, Any]] = {}
+_reprice_finished: Dict[str, float] = {}  # job_id → time.monotonic() dokončení
+_reprice_tasks: set = set()
+
+
+def _prune_reprice_jobs() -> None:
+    """Vyhodí dokončené joby po TTL; nad limitem i nejstarší dokončené."""
+    now = time.monotonic()
+    for job_id, finished in list(_reprice_finished.items()):
+        if now - finished > _REPRICE_JOB_TTL_SEC:
+            _reprice_finished.pop(job_id, None)
+            _reprice_jobs.pop(job_id, None)
+    for job_id in sorted(_reprice_finished, key=_reprice_finished.get):
+        if len(_reprice_jobs) <= _REPRICE_JOBS_MAX:
+            break
+        _reprice_finished.pop(job_id, None)
+        _reprice_jobs.pop(job_id, None)
+
+
+async def find_parts_affected_by(
+    db: AsyncSession,
+    work_center_id: Optional[int] = None,
+    price_category_id: Optional[int] = None,
+) -> List[int]:
+    """ID dílů, jejichž cena závisí na daném pracovišti / cenové kategorii."""
+    part_ids: set = set()
+    if work_center_id is not None:
+        result = await db.execute(
+            select(Operation.part_id)
+            .where(Operation.work_center_id == work_center_id, Operation.deleted_at.is_(None))
+            .distinct()
         )
-        operations_result = await db.execute(operations_stmt)
-        operations = operations_result.scalars().all()
-
-        # 4. Vypočítat batch prices (NOVÁ KALKULACE - ADR-016)
-        breakdown = await calculate_part_price(
-            part=part,
-            quantity=batch.quantity,
-            db=db
+        part_ids.update(result.scalars().all())
+    if price_category_id is not None:
+        result = await db.execute(
+            select(MaterialInput.part_id)
+            .where(MaterialInput.price_category_id == price_category_id, MaterialInput.deleted_at.is_(None))
+            .distinct()
         )
+        part_ids.update(result.scalars().all())
+    return sorted(part_ids)
+
+
+def _active_operations(part) -> List[Operation]:
+    """Aktivní operace dílu dle seq (ekvivalent dotazu v _load_part_for_pricing)."""
+    return sorted((op for op in part.operations if op.deleted_at is None), key=lambda op: op.seq)
 
-        # 5. Mapovat PriceBreakdown → Batch fields (za kus!)
-        # Material: již obsahuje stock_coefficient
-        batch.material_cost = breakdown.material_cost / batch.quantity if batch.quantity > 0 else 0.0
-
-        # Stroje: operace + setup (BEZ režie/marže)
-        batch.machining_cost = breakdown.machine_operation_cost / batch.quantity if batch.quantity > 0 else 0.0
-        batch.setup_cost = breakdown.machine_setup_cost / batch.quantity if batch.quantity > 0 else 0.0
-
-        # Režie a marže: pouze přirážky (computed properties)
-        batch.overhead_cost = breakdown.overhead_markup / batch.quantity if batch.quantity > 0 else 0.0
-        batch.margin_cost = breakdown.margin_markup / batch.quantity if batch.quantity > 0 else 0.0
-
-        # Kooperace: již obsahuje coop_coefficient
-        batch.coop_cost = breakdown.coop_cost / batch.quantity if batch.quantity > 0 else 0.0
-
-        # Celkem
-        batch.unit_cost = breakdown.cost_per_piece
-        batch.total_cost = breakdown.total_cost
-
-        # Material weight/price snapshot (z ADR-016 kalkulace — konzistentní s material_cost)
-        total_weight_kg = breakdown.material_weight_kg * batch.quantity
-        batch.material_weight_kg = round(total_weight_kg, 3) if breakdown.material_weight_kg else None
-        batch.material_price_per_kg = breakdown.material_price_per_kg or None
-
-        # Snapshot materiálu pro audit trail (u nefrozen batchí)
-        if not batch.snapshot_data:
-            batch.snapshot_data = {}
-        batch.snapshot_data["material"] = {
-            "weight_per_piece_kg": breakdown.material_weight_kg,
-            "total_weight_kg": round(total_weight_kg, 3) if breakdown.material_weight_kg else 0,
-            "price_per_kg": breakdown.material_price_per_kg,
-            "tier_calculation_timestamp": datetime.now().isoformat(),
-        }
-
-        # unit_time_min = součet operation_time_min (bez setup, bez coop)
-        batch.unit_time_min = sum(
-            op.operation_time_min or 0.0
-            for op in operations
-            if not op.is_coop
-        )
 
-        # Logging (batch.id může být None pokud není flushed)
-        log_extra = {
-            "part_id": batch.part_id,
-            "material": batch.material_cost,
-            "machining": batch.machining_cost,
-            "setup": batch.setup_cost,
-            "coop": batch.coop_cost,
-        }
-        if batch.id:
-            log_extra["batch_id"] = batch.id
-
-        logger.info(
-            f"Recalculated batch costs: quantity={batch.quantity}, "
-            f"unit_cost={batch.unit_cost} Kč, total_cost={batch.total_cost} Kč",
-            extra=log_extra
+def _broadcast_reprice(job_id: Optional[str], event_type: str, progress: Dict[str, Any]) -> None:
+    if job_id is None:
+        return
+    from app.services.event_bus import broadcast
+    broadcast(event_type, {"job_id": job_id, **progress})
+
+
+async def reprice_parts(
+    db: AsyncSession,
+    part_ids: Sequence[int],
+    job_id: Optional[str] = None,
+    progress: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Přepočítá všechny unfrozen, nesmazané batche daných dílů.
+
+    Koeficienty a pracoviště se načtou jednou pro celý job, díly + batche po
+    dávkách (_REPRICE_PART_CHUNK). Každá dávka se commitne zvlášť — SQLite
+    writer lock se nedrží po celou dobu přepočtu. Chyba jednoho dílu job
+    nezastaví (failed_parts).
+
+    Args:
+        progress: Volitelný dict, který se průběžně aktualizuje (stav jobu)
+
+    Returns:
+        Dict: total_parts, processed_parts, repriced_batches, failed_parts, errors
+    """
+    part_ids = list(dict.fromkeys(part_ids))
+    if progress is None:
+        progress = {}
+    progress.update({
+        "total_parts": len(part_ids),
+        "processed_parts": 0,
+        "repriced_batches": 0,
+        "failed_parts": 0,
+        "errors": [],
+    })
+    _broadcast_reprice(job_id, "batch_reprice_progress", progress)
+    if not part_ids:
+        return progress
+
+    coefficients = await get_config_coefficients(db)
+    wc_result = await db.execute(select(WorkCenter))
+    work_centers = {wc.id: wc for wc in wc_result.scalars().all()}
+
+    for start in range(0, len(part_ids), _REPRICE_PART_CHUNK):
+        chunk = part_ids[start:start + _REPRICE_PART_CHUNK]
+
+        parts_result = await db.execute(
+            select(Part).where(Part.id.in_(chunk)).options(*_part_pricing_options())
         )
+        parts = {part.id: part for part in parts_result.scalars().all()}
 
-        return batch
-    except Exception as e:
-        # Prepare error log extra (batch.id může být None)
-        error_extra = {
-            "part_id": batch.part_id,
-            "quantity": batch.quantity,
-            "error": str(e),
-            "error_type": type(e).__name__
-        }
-        if batch.id:
-            error_extra["batch_id"] = batch.id
-
-        logger.error(
-            f"CRITICAL: Batch recalculation failed for batch_id={batch.id or 'NEW'}, part_id={batch.part_id}",
-            exc_info=True,
-            extra=error_extra
+        batches_result = await db.execute(
+            select(Batch)
+            .where(
+                Batch.part_id.in_(chunk),
+                Batch.is_frozen == False,  # noqa: E712
+                Batch.deleted_at.is_(None),
+            )
+            .order_by(Batch.part_id, Batch.quantity)
         )
-        # Re-raise aby caller mohl handlovat
-        raise
+        batches_by_part: Dict[int, List[Batch]] = {}
+        for batch in batches_result.scalars().all():
+            batches_by_part.setdefault(batch.part_id, []).append(batch)
+
+        for part_id in chunk:
+            part_batches = batches_by_part.get(part_id, [])
+            try:
+                part = parts.get(part_id)
+                if part is None:
+                    raise ValueError(f"Part {part_id} not found")
+                if part_batches:
+                    context = await build_pricing_context(
+                        part, db, coefficients=coefficients, work_centers=work_centers,
+                    )
+                    operations = _active_operations(part)
+                    # Savepoint per díl: chyba uprostřed → rollback (a expire) jen batchí tohoto dílu
+                    await ensure_db_transaction(db)
+                    async with db.begin_nested():
+                        for batch in part_batches:
+                            _apply_breakdown(batch, context.price(batch.quantity), operations)
+                    progress["repriced_batches"] += len(part_batches)
+            except Exception as e:
+                progress["failed_parts"] += 1
+                progress["errors"].append(f"Part {part_id}: {e}")
+                logger.error(
+                    f"Failed to reprice batches for part {part_id}: {e}",
+                    exc_info=True,
+                    extra={"part_id": part_id, "job_id": job_id},
+                )
+            progress["processed_parts"] += 1
+            if progress["processed_parts"] % _REPRICE_PROGRESS_EVERY == 0:
+                _broadcast_reprice(job_id, "batch_reprice_progress", _progress_event(progress))
+
+        # Zápis dávky: UPDATE batchí flushnuté po dílech (savepointy) + jeden commit
+        await db.commit()
+
+    logger.info(
+        f"Repriced {progress['repriced_batches']} batches for {progress['total_parts']} parts "
+        f"({progress['failed_parts']} failed)",
+        extra={"job_id": job_id, "total_parts": progress["total_parts"]},
+    )
+    _broadcast_reprice(job_id, "batch_reprice_done", _progress_event(progress))
+    return progress
+
+
+def _progress_event(progress: Dict[str, Any]) -> Dict[str, Any]:
+    """SSE payload — bez seznamu chyb (může být dlouhý)."""
+    return {k: v for k, v in progress.items() if k != "errors"}
+
+
+def start_reprice_job(part_ids: Sequence[int], username: str) -> Dict[str, Any]:
+    """Spustí reprice_parts na pozadí (vlastní session), vrátí stav jobu."""
+    from app.database import async_session
+
+    job_id = uuid.uuid4().hex[:12]
+    progress: Dict[str, Any] = {
+        "total_parts": len(part_ids),
+        "processed_parts": 0,
+        "repriced_batches": 0,
+        "failed_parts": 0,
+        "errors": [],
+    }
+    job: Dict[str, Any] = {
+        "job_id": job_id,
+        "status": "running",
+        "started_by": username,
+        "started_at": datetime.now().isoformat(),
+        "progress": progress,
+    }
+    _prune_reprice_jobs()
+    _reprice_jobs[job_id] = job
+
+    async def _run() -> None:
+        try:
+            async with async_session() as db:
+                await reprice_parts(db, part_ids, job_id=job_id, progress=progress)
+            job["status"] = "done"
+        except Exception as e:
+            logger.error(f"Reprice job {job_id} failed: {e}", exc_info=True)
+            job["status"] = "error"
+            progress["errors"].append(str(e))
+            _broadcast_reprice(job_id, "batch_reprice_done", {"status": "error", "error": str(e)})
+        finally:
+            job["finished_at"] = datetime.now().isoformat()
+            _reprice_finished[job_id] = time.monotonic()
+
+    task = asyncio.create_task(_run())
+    _reprice_tasks.add(task)
+    task.add_done_callback(_reprice_tasks.discard)
+    return job
+
+
+def get_reprice_job(job_id: str) -> Optional[Dict[str, Any]]:
+    _prune_reprice_jobs()
+    return _reprice_jobs.get(job_id)
@@ -9,7 +9,7 @@ from app.models import User
 from app.models.batch import Batch
 from app.models.batch_set import BatchSet, generate_batch_set_name
 from app.services.snapshot_service import create_batch_snapshot
-from app.services.batch_service import recalculate_batch_costs
+from app.services.batch_service import recalculate_batches_costs
 from app.services.number_generator import NumberGenerator
 
 logger = logging.getLogger(__name__)
@@ -71,8 +71,7 @@ async def recalculate_all_batches(
         ValueError: On invalid batch data
         SQLAlchemyError: On DB error (safe_commit handles rollback)
     """
-    for batch in active_batches:
-        await recalculate_batch_costs(batch, db)
+    await recalculate_batches_costs(active_batches, db)
 
     batch_set.updated_by = user.username
     batch_set.updated_at = datetime.utcnow()
@@ -7,23 +7,35 @@ Business logic for importing drawings from either:
 2-step workflow:
 1. scan_share() + preview_import() -> show what matches
 2. execute_import() -> copy files, create records, link to parts
+
+Incremental scan (ScanManifest, persisted as JSON):
+- per folder: mtime + supported files (size, mtime, SHA-256 once imported)
+- local source: folders with unchanged mtime are not descended (one stat
+  per folder instead of a stat per file); full=True forces a rescan —
+  in-place overwrite of a file does not change the folder mtime
+- SSH source: one streaming `find` listing folders + files together
+- preview can return only new/changed folders; execute takes file lists
+  from the manifest instead of listing every folder again
 """
 
 import asyncio
+import json
 import logging
 import os
 import posixpath
 import shlex
 import subprocess
 import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 from urllib.parse import unquote, urlparse
 
 from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.file_record import FileLink
+from app.models.file_record import FileLink, FileRecord
 from app.models.part import Part
 from app.schemas.drawing_import import (
     DrawingImportExecuteResponse,
@@ -33,7 +45,9 @@ from app.schemas.drawing_import import (
     ShareFolderPreview,
     ShareStatusResponse,
 )
-from app.services.file_service import file_service
+from app.config import settings
+from app.db_helpers import ensure_db_transaction
+from app.services.file_service import PreparedFile, file_service
 
 logger = logging.getLogger(__name__)
 
@@ -63,10 +77,165 @@ def _detect_share_file_type(filename: str) -> Optional[str]:
     return None
 
 
-def _scan_local_share_sync(share_path: Path) -> list[dict]:
+MANIFEST_VERSION = 1
+
+
+class ScanManifest:
+    """
+    Persistent scan manifest of one source.
+
+    folders: {folder_name: {"mtime": float, "files": {filename: {"size", "mtime", "hash"}}}}
+    After a scan: changed (new or different file set), removed, skipped (46*/47*).
+    """
+
+    def __init__(self, path: Optional[Path], source: str):
+        self.path = path
+        self.source = source
+        self.folders: dict[str, dict] = {}
+        self.imported: dict[str, dict] = {}  # checkpoint: folder → {"part_id", "signature"} (committed)
+        self.scanned_at: Optional[float] = None
+        self.changed: set[str] = set()
+        self.removed: set[str] = set()
+        self.skipped = 0
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: Optional[Path], source: str) -> "ScanManifest":
+        manifest = cls(path, source)
+        if path is None or not path.exists():
+            return manifest
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logger.warning("Drawing scan manifest unreadable, full scan: %s", exc)
+            return manifest
+        if data.get("version") == MANIFEST_VERSION and data.get("source") == source:
+            manifest.folders = data.get("folders") or {}
+            manifest.imported = data.get("imported") or {}
+            manifest.scanned_at = data.get("scanned_at")
+        return manifest
+
+    def replace(self, folders: dict[str, dict], skipped: int) -> None:
+        """Apply a finished scan (computes changed / removed against the previous state)."""
+        self.changed = {
+            name for name, entry in folders.items()
+            if self.folders.get(name, {}).get("files") != entry["files"]
+        }
+        self.removed = set(self.folders) - set(folders)
+        self.folders = folders
+        self.skipped = skipped
+        self.scanned_at = time.time()
+        self.dirty = True
+
+    def set_hash(self, folder_name: str, filename: str, file_hash: str) -> None:
+        entry = self.folders.get(folder_name, {}).get("files", {}).get(filename)
+        if entry is not None and entry.get("hash") != file_hash:
+            entry["hash"] = file_hash
+            self.dirty = True
+
+    def signature(self, folder_name: str) -> Optional[str]:
+        """Folder content fingerprint (file names, sizes, mtimes)."""
+        entry = self.folders.get(folder_name)
+        if entry is None:
+            return None
+        files = entry["files"]
+        return json.dumps(sorted((name, f["size"], f["mtime"]) for name, f in files.items()))
+
+    def mark_imported(self, folder_name: str, part_id: int) -> None:
+        self.imported[folder_name] = {"part_id": part_id, "signature": self.signature(folder_name)}
+        self.dirty = True
+
+    def is_imported(self, folder_name: str, part_id: int) -> bool:
+        """Folder committed for this part earlier and unchanged since (resume)."""
+        checkpoint = self.imported.get(folder_name)
+        return (
+            checkpoint is not None
+            and checkpoint["part_id"] == part_id
+            and checkpoint["signature"] is not None
+            and checkpoint["signature"] == self.signature(folder_name)
+        )
+
+    def save(self) -> None:
+        """Atomic write (temp file + rename)."""
+        if self.path is None or not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": MANIFEST_VERSION,
+            "source": self.source,
+            "scanned_at": self.scanned_at,
+            "folders": self.folders,
+            "imported": self.imported,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.path.parent), prefix=".drawing_manifest_")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(payload, fh, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self.dirty = False
+
+
+def _parse_float(value: str) -> float:
+    try:
+        return float(value.strip())
+    except ValueError:
+        return 0.0
+
+
+def _folder_result(folder_name: str, files: dict[str, dict]) -> dict:
+    """Manifest folder entry -> scan result shape (pdf_files / step_files)."""
+    pdf_files = []
+    step_files = []
+    for filename in sorted(files):
+        file_type = _detect_share_file_type(filename)
+        data = {
+            "filename": filename,
+            "file_size": files[filename]["size"],
+            "file_type": file_type,
+        }
+        if file_type == "pdf":
+            pdf_files.append(data)
+        elif file_type == "step":
+            step_files.append(data)
+    return {
+        "folder_name": folder_name,
+        "pdf_files": pdf_files,
+        "step_files": step_files,
+    }
+
+
+def _stat_local_folder_sync(folder_path: Path, previous: dict[str, dict]) -> dict[str, dict]:
+    """Supported files of one folder; hash carried over when size + mtime are unchanged."""
+    files: dict[str, dict] = {}
+    with os.scandir(folder_path) as entries:
+        for file_entry in entries:
+            if not file_entry.is_file() or not _detect_share_file_type(file_entry.name):
+                continue
+            st = file_entry.stat()
+            old = previous.get(file_entry.name)
+            same = old is not None and old["size"] == st.st_size and old["mtime"] == st.st_mtime
+            files[file_entry.name] = {
+                "size": st.st_size,
+                "mtime": st.st_mtime,
+                "hash": old.get("hash") if same else None,
+            }
+    return files
+
+
+def _scan_local_share_sync(
+    share_path: Path,
+    manifest: Optional[ScanManifest] = None,
+    full: bool = False,
+) -> list[dict]:
     """
     Synchronous scan of local folder source.
 
+    With a manifest only folders whose mtime changed are descended
+    (full=True descends all of them).
+
     Returns list of dicts with:
     - folder_name
     - pdf_files
@@ -75,54 +244,36 @@ def _scan_local_share_sync(share_path: Path) -> list[dict]:
     if not share_path.exists() or not share_path.is_dir():
         return []
 
-    results = []
-    for entry in sorted(share_path.iterdir(), key=lambda p: p.name):
-        if not entry.is_dir():
-            continue
+    manifest = manifest or ScanManifest(None, str(share_path))
+    reusable = {} if full else manifest.folders
+    folders: dict[str, dict] = {}
+    skipped = 0
+
+    with os.scandir(share_path) as entries:
+        folder_entries = sorted((e for e in entries if e.is_dir()), key=lambda e: e.name)
 
+    for entry in folder_entries:
         folder_name = entry.name
         if _should_skip_folder(folder_name):
+            skipped += 1
             continue
 
-        pdf_files = []
-        step_files = []
-
         try:
-            folder_entries = list(entry.iterdir())
+            folder_mtime = entry.stat().st_mtime
+            known = reusable.get(folder_name)
+            if known is not None and known["mtime"] == folder_mtime:
+                folders[folder_name] = known
+                continue
+            previous_files = manifest.folders.get(folder_name, {}).get("files", {})
+            files = _stat_local_folder_sync(Path(entry.path), previous_files)
         except PermissionError:
-            logger.warning("Permission denied while scanning folder: %s", entry)
+            logger.warning("Permission denied while scanning folder: %s", entry.path)
             continue
 
-        for file_entry in folder_entries:
-            if not file_entry.is_file():
-                continue
+        folders[folder_name] = {"mtime": folder_mtime, "files": files}
 
-            file_type = _detect_share_file_type(file_entry.name)
-            if not file_type:
-                continue
-
-            file_size = file_entry.stat().st_size
-            data = {
-                "filename": file_entry.name,
-                "file_size": file_size,
-                "file_type": file_type,
-            }
-            if file_type == "pdf":
-                pdf_files.append(data)
-            else:
-                step_files.append(data)
-
-        pdf_files.sort(key=lambda f: f["filename"])
-        step_files.sort(key=lambda f: f["filename"])
-        results.append(
-            {
-                "folder_name": folder_name,
-                "pdf_files": pdf_files,
-                "step_files": step_files,
-            }
-        )
-
-    return results
+    manifest.replace(folders, skipped)
+    return [_folder_result(name, folders[name]["files"]) for name in sorted(folders)]
 
 
 def _list_local_folder_files_sync(folder_path: Path) -> list[dict]:
@@ -157,12 +308,14 @@ class DrawingImportService:
     - ssh URI: "ssh://user@host:22/absolute/path"
     """
 
-    def __init__(self, share_path: str):
+    def __init__(self, share_path: str, manifest_path: Optional[Path] = None):
         self.share_path_raw = (share_path or "").strip()
         self.share_path = Path(self.share_path_raw) if self.share_path_raw else Path("")
         self.source_mode = "local"
         self._last_scan_skipped = 0
         self._init_error: Optional[str] = None
+        self._manifest_path = manifest_path  # None = manifest only in memory (no incremental scan)
+        self._manifest: Optional[ScanManifest] = None
 
         self._ssh_user = ""
         self._ssh_host = ""
@@ -237,104 +390,116 @@ class DrawingImportService:
             check=False,
         )
 
-    def _scan_share_ssh_sync(self) -> list[dict]:
-        """Scan remote SSH source and return same shape as local scanner."""
-        if self._init_error:
-            return []
-
-        base = self._quote_remote(self._ssh_base_path)
+    def _stream_ssh_lines_sync(
+        self,
+        remote_cmd: str,
+        *,
+        timeout: int = 600,
+        partial_returncodes: tuple[int, ...] = (),
+    ) -> Iterator[str]:
+        """Run SSH command and yield stdout lines while it runs (no full buffering).
 
-        folders_cmd = (
-            f"if [ -d {base} ]; then "
-            f"find {base} -mindepth 1 -maxdepth 1 -type d -printf '%f\\n'; "
-            f"fi"
-        )
-        folders_res = self._run_ssh_command_sync(folders_cmd)
-        if folders_res.returncode != 0:
-            logger.error(
-                "SSH scan failed (folders): rc=%s, stderr=%s",
-                folders_res.returncode,
-                (folders_res.stderr or "").strip(),
+        Return codes in `partial_returncodes` (e.g. find's 1 = some paths unreadable)
+        are logged as a warning instead of raising; yielded lines stay valid.
+        """
+        cmd = ["ssh", "-p", str(self._ssh_port), self._ssh_target, remote_cmd]
+        # stderr do souboru — find může vypsat hodně "Permission denied" a plná pipe by zablokovala stdout
+        with tempfile.TemporaryFile(mode="w+", encoding="utf-8", errors="replace") as stderr_file:
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=stderr_file,
+                text=True,
+                errors="replace",
             )
-            return []
-
-        all_folders = [
-            line.strip()
-            for line in (folders_res.stdout or "").splitlines()
-            if line.strip()
-        ]
-
-        filtered_folders = [f for f in all_folders if not _should_skip_folder(f)]
-        self._last_scan_skipped = max(0, len(all_folders) - len(filtered_folders))
+            watchdog = threading.Timer(timeout, proc.kill)
+            watchdog.start()
+            try:
+                for line in proc.stdout:
+                    yield line.rstrip("\n")
+                returncode = proc.wait()
+            finally:
+                watchdog.cancel()
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+                proc.stdout.close()
+            if returncode != 0:
+                stderr_file.seek(0)
+                stderr_head = stderr_file.read(2000).strip()
+                if returncode in partial_returncodes:
+                    logger.warning("SSH command finished partially: rc=%s, stderr=%s", returncode, stderr_head)
+                    return
+                raise ValueError(f"rc={returncode}, stderr={stderr_head}")
+
+    def _scan_share_ssh_sync(
+        self,
+        manifest: Optional[ScanManifest] = None,
+        full: bool = False,
+    ) -> list[dict]:
+        """
+        Scan remote SSH source and return same shape as local scanner.
 
-        results_map = {
-            folder_name: {
-                "folder_name": folder_name,
-                "pdf_files": [],
-                "step_files": [],
-            }
-            for folder_name in filtered_folders
-        }
+        One streaming `find` lists folders (D) and supported files (F) together;
+        the remote side walks the tree once, nothing is buffered whole.
+        `full` is accepted for symmetry with the local scanner (listing is always complete).
+        """
+        if self._init_error:
+            return []
 
-        files_cmd = (
+        manifest = manifest or ScanManifest(None, self.share_path_raw)
+        base = self._quote_remote(self._ssh_base_path)
+        listing_cmd = (
             f"if [ -d {base} ]; then "
-            f"find {base} -mindepth 2 -maxdepth 2 -type f "
-            f"\\( -iname '*.pdf' -o -iname '*.step' -o -iname '*.stp' \\) "
-            f"-printf '%P\\t%s\\n'; "
+            f"find {base} -mindepth 1 -maxdepth 2 "
+            f"\\( -type d -printf 'D\\t%P\\t%T@\\n' \\) -o "
+            f"\\( -type f \\( -iname '*.pdf' -o -iname '*.step' -o -iname '*.stp' \\) "
+            f"-printf 'F\\t%P\\t%s\\t%T@\\n' \\); "
             f"fi"
         )
-        files_res = self._run_ssh_command_sync(files_cmd)
-        if files_res.returncode != 0:
-            logger.error(
-                "SSH scan failed (files): rc=%s, stderr=%s",
-                files_res.returncode,
-                (files_res.stderr or "").strip(),
-            )
-            return sorted(results_map.values(), key=lambda item: item["folder_name"])
-
-        for line in (files_res.stdout or "").splitlines():
-            if "\t" not in line:
-                continue
-            relative_path, size_txt = line.split("\t", 1)
-            if "/" not in relative_path:
-                continue
-
-            folder_name, filename = relative_path.split("/", 1)
-            if _should_skip_folder(folder_name):
-                continue
 
-            file_type = _detect_share_file_type(filename)
-            if not file_type:
-                continue
-
-            try:
-                file_size = int(size_txt.strip())
-            except ValueError:
-                file_size = 0
-
-            payload = {
-                "filename": filename,
-                "file_size": file_size,
-                "file_type": file_type,
-            }
-
-            if folder_name not in results_map:
-                results_map[folder_name] = {
-                    "folder_name": folder_name,
-                    "pdf_files": [],
-                    "step_files": [],
-                }
-
-            if file_type == "pdf":
-                results_map[folder_name]["pdf_files"].append(payload)
-            else:
-                results_map[folder_name]["step_files"].append(payload)
+        folders: dict[str, dict] = {}
+        skipped_folders: set[str] = set()
+        try:
+            # rc=1 z find = některé podsložky nečitelné ("Permission denied") → výpis je
+            # neúplný, ale platný; selže jen ssh/transport (255) a ostatní rc
+            for line in self._stream_ssh_lines_sync(listing_cmd, partial_returncodes=(1,)):
+                kind, _, rest = line.partition("\t")
+                if kind == "D":
+                    folder_name, _, mtime_txt = rest.rpartition("\t")
+                    if not folder_name or "/" in folder_name:
+                        continue
+                    if _should_skip_folder(folder_name):
+                        skipped_folders.add(folder_name)
+                        continue
+                    folders.setdefault(folder_name, {"mtime": 0.0, "files": {}})["mtime"] = _parse_float(mtime_txt)
+                elif kind == "F":
+                    parts = rest.rsplit("\t", 2)
+                    if len(parts) != 3 or "/" not in parts[0]:
+                        continue
+                    relative_path, size_txt, mtime_txt = parts
+                    folder_name, filename = relative_path.split("/", 1)
+                    if _should_skip_folder(folder_name) or not _detect_share_file_type(filename):
+                        continue
+                    try:
+                        file_size = int(size_txt.strip())
+                    except ValueError:
+                        file_size = 0
+                    file_mtime = _parse_float(mtime_txt)
+                    old = manifest.folders.get(folder_name, {}).get("files", {}).get(filename)
+                    same = old is not None and old["size"] == file_size and old["mtime"] == file_mtime
+                    folders.setdefault(folder_name, {"mtime": 0.0, "files": {}})["files"][filename] = {
+                        "size": file_size,
+                        "mtime": file_mtime,
+                        "hash": old.get("hash") if same else None,
+                    }
+        except (ValueError, OSError, subprocess.SubprocessError) as exc:
+            logger.error("SSH scan failed: %s", exc)
+            return []
 
-        results = sorted(results_map.values(), key=lambda item: item["folder_name"])
-        for item in results:
-            item["pdf_files"].sort(key=lambda f: f["filename"])
-            item["step_files"].sort(key=lambda f: f["filename"])
-        return results
+        manifest.replace(folders, len(skipped_folders))
+        self._last_scan_skipped = len(skipped_folders)
+        return [_folder_result(name, folders[name]["files"]) for name in sorted(folders)]
 
     def _list_ssh_folder_files_sync(self, folder_name: str) -> list[dict]:
         """List supported files inside one remote SSH folder."""
@@ -490,66 +655,139 @@ class DrawingImportService:
                 message="Permission denied",
             )
 
-    async def scan_share(self) -> list[dict]:
-        """Scan source folders (async wrapper)."""
+    async def _load_manifest(self) -> ScanManifest:
+        if self._manifest is None:
+            self._manifest = await asyncio.to_thread(
+                ScanManifest.load, self._manifest_path, self.share_path_raw
+            )
+        return self._manifest
+
+    async def _save_manifest(self) -> None:
+        if self._manifest is None:
+            return
+        try:
+            await asyncio.to_thread(self._manifest.save)
+        except OSError as exc:
+            logger.warning("Failed to save drawing scan manifest: %s", exc)
+
+    async def scan_share(self, *, full: bool = False) -> list[dict]:
+        """Scan source folders (async wrapper), incremental against the manifest."""
         if self._init_error:
             return []
+        manifest = await self._load_manifest()
         if self.source_mode == "ssh":
-            return await asyncio.to_thread(self._scan_share_ssh_sync)
-        return await asyncio.to_thread(_scan_local_share_sync, self.share_path)
+            results = await asyncio.to_thread(self._scan_share_ssh_sync, manifest, full)
+        else:
+            results = await asyncio.to_thread(_scan_local_share_sync, self.share_path, manifest, full)
+        self._last_scan_skipped = manifest.skipped
+        await self._save_manifest()
+        return results
 
     async def _list_folder_files(self, folder_name: str) -> list[dict]:
-        """List files inside one folder from active source."""
+        """
+        List files inside one folder from active source.
+
+        Uses the manifest when it is current for the folder (local: same folder
+        mtime; ssh: listed by the preceding preview scan) — no extra listing.
+        """
+        manifest = await self._load_manifest()
+        known = manifest.folders.get(folder_name)
+        if known is not None:
+            listed = _folder_result(folder_name, known["files"])
+            files = listed["pdf_files"] + listed["step_files"]
+            if self.source_mode == "ssh":
+                return [{**f, "hash": known["files"][f["filename"]].get("hash")} for f in files]
+            folder_path = self.share_path / folder_name
+            try:
+                current_mtime = (await asyncio.to_thread(folder_path.stat)).st_mtime
+            except OSError:
+                current_mtime = None
+            if current_mtime == known["mtime"]:
+                return [
+                    {**f, "source_path": folder_path / f["filename"], "hash": known["files"][f["filename"]].get("hash")}
+                    for f in files
+                ]
+
         if self.source_mode == "ssh":
             return await asyncio.to_thread(self._list_ssh_folder_files_sync, folder_name)
         folder_path = self.share_path / folder_name
         return await asyncio.to_thread(_list_local_folder_files_sync, folder_path)
 
-    async def _store_source_file(
+    def _prepare_source_file_sync(
         self,
-        *,
         folder_name: str,
         file_info: dict,
         directory: str,
-        db: AsyncSession,
         allowed_types: list[str],
-        created_by: str,
-    ):
-        """Store one file from active source into FileService."""
+    ) -> PreparedFile:
+        """Fetch (ssh download / local path) + validate + hash + store on disk (worker thread)."""
         if self.source_mode == "local":
-            source_path: Path = file_info["source_path"]
-            return await file_service.store_from_path(
-                source_path=source_path,
-                directory=directory,
-                db=db,
+            return file_service.prepare_from_path(
+                file_info["source_path"],
+                directory,
                 allowed_types=allowed_types,
-                created_by=created_by,
             )
 
-        tmp_path = await asyncio.to_thread(
-            self._download_ssh_file_sync, folder_name, file_info["filename"]
-        )
+        tmp_path = self._download_ssh_file_sync(folder_name, file_info["filename"])
         try:
-            return await file_service.store_from_path(
-                source_path=tmp_path,
-                directory=directory,
-                db=db,
+            return file_service.prepare_from_path(
+                tmp_path,
+                directory,
                 allowed_types=allowed_types,
-                created_by=created_by,
+                original_filename=file_info["filename"],
             )
         finally:
             tmp_path.unlink(missing_ok=True)
 
+    async def _parts_with_files(
+        self,
+        part_ids: set[int],
+        db: AsyncSession,
+    ) -> tuple[dict[int, Part], dict[int, dict[str, FileRecord]]]:
+        """Active parts by ID + their linked files keyed by SHA-256 (chunked IN queries)."""
+        ids = sorted(part_ids)
+        parts: dict[int, Part] = {}
+        files: dict[int, dict[str, FileRecord]] = {part_id: {} for part_id in ids}
+        chunk_size = 500
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i : i + chunk_size]
+            result = await db.execute(
+                select(Part).where(and_(Part.id.in_(chunk), Part.deleted_at.is_(None)))
+            )
+            parts.update({part.id: part for part in result.scalars().all()})
+            result = await db.execute(
+                select(FileLink.entity_id, FileRecord)
+                .join(FileRecord, FileLink.file_id == FileRecord.id)
+                .where(
+                    and_(
+                        FileLink.entity_type == "part",
+                        FileLink.entity_id.in_(chunk),
+                        FileLink.deleted_at.is_(None),
+                        FileRecord.deleted_at.is_(None),
+                    )
+                )
+            )
+            for part_id, record in result.all():
+                files[part_id][record.file_hash] = record
+        return parts, files
+
     async def preview_import(
         self,
         db: AsyncSession,
+        *,
+        changed_only: bool = False,
+        full_scan: bool = False,
     ) -> DrawingImportPreviewResponse:
         """
         Step 1: Scan source + match folders to Parts + return preview.
 
         Uses batch DB queries for performance.
+
+        Args:
+            changed_only: Match and return only folders new/changed since the previous scan
+            full_scan: Descend into every folder (ignore folder mtimes in the manifest)
         """
-        share_folders = await self.scan_share()
+        share_folders = await self.scan_share(full=full_scan)
 
         if not share_folders:
             return DrawingImportPreviewResponse(
@@ -558,15 +796,12 @@ class DrawingImportService:
                 folders=[],
             )
 
-        if self.source_mode == "local":
-            total_on_disk = (
-                sum(1 for e in self.share_path.iterdir() if e.is_dir())
-                if self.share_path.exists()
-                else 0
-            )
-            skipped_count = total_on_disk - len(share_folders)
-        else:
-            skipped_count = self._last_scan_skipped
+        skipped_count = self._last_scan_skipped
+        total_folders = len(share_folders)
+        changed = self._manifest.changed if self._manifest is not None else set()
+        removed = self._manifest.removed if self._manifest is not None else set()
+        if changed_only:
+            share_folders = [f for f in share_folders if f["folder_name"] in changed]
 
         folder_names = [f["folder_name"] for f in share_folders]
 
@@ -684,7 +919,9 @@ class DrawingImportService:
 
         return DrawingImportPreviewResponse(
             share_path=self.share_path_raw or str(self.share_path),
-            total_folders=len(share_folders),
+            total_folders=total_folders,
+            changed=len(changed),
+            removed=len(removed),
             matched=stats["matched"],
             unmatched=stats["unmatched"],
             already_imported=stats["already_imported"],
@@ -705,7 +942,19 @@ class DrawingImportService:
         Step 2: Execute import for confirmed folders.
 
         Copies files from source to uploads/, creates FileRecord + FileLink,
-        sets Part.file_id. Commits in batches of 50.
+        sets Part.file_id.
+
+        Pipeline:
+        - DRAWING_IMPORT_WORKERS fetchers: listing, ssh download / local read,
+          magic bytes, SHA-256 and copy in worker threads (event loop stays free)
+        - one DB writer (this task): records + links per folder in a savepoint,
+          commit every DRAWING_IMPORT_COMMIT_EVERY folders
+        - committed folders are checkpointed in the scan manifest → a re-run
+          after a crash skips folders already imported (unchanged content)
+        - files whose SHA-256 is already linked to the part are not recorded
+          again (re-run without a preceding scan → no checkpoint, no known hash)
+        - abort (error, cancelled request) → uncommitted folders are rolled
+          back and their prepared files removed from disk
         """
         if self._init_error:
             return DrawingImportExecuteResponse(
@@ -717,96 +966,186 @@ class DrawingImportService:
                 errors=[self._init_error],
             )
 
-        files_created = 0
-        links_created = 0
-        parts_updated = 0
-        skipped = 0
+        manifest = await self._load_manifest()
+        totals = {"files": 0, "links": 0, "parts": 0, "skipped": 0}
         errors: list[str] = []
-        batch_size = 50
 
-        for idx, folder_req in enumerate(folders):
-            try:
-                async with db.begin_nested():
-                    counts = await self._import_folder(
-                        folder_req,
-                        db,
-                        created_by=created_by,
-                    )
-                files_created += counts["files"]
-                links_created += counts["links"]
-                parts_updated += counts["parts"]
-                skipped += counts["skipped"]
-            except Exception as exc:
-                error_msg = f"{folder_req.folder_name}: {exc}"
-                errors.append(error_msg)
-                logger.error(
-                    "Import failed for folder %s: %s",
-                    folder_req.folder_name,
-                    exc,
-                    exc_info=True,
-                )
+        parts, part_files = await self._parts_with_files({f.part_id for f in folders}, db)
+        pending: list[tuple[ImportFolderRequest, Part]] = []
+        for folder_req in folders:
+            part = parts.get(folder_req.part_id)
+            if part is None:
+                errors.append(f"{folder_req.folder_name}: Part not found: ID {folder_req.part_id}")
                 continue
+            if part.file_id is not None and manifest.is_imported(folder_req.folder_name, part.id):
+                totals["skipped"] += 1  # checkpoint z předchozího (přerušeného) běhu
+                continue
+            pending.append((folder_req, part))
+
+        workers = max(1, min(settings.DRAWING_IMPORT_WORKERS, len(pending) or 1))
+        commit_every = max(1, settings.DRAWING_IMPORT_COMMIT_EVERY)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)  # back-pressure na fetchery
+        source = iter(pending)
+        stop = asyncio.Event()
 
-            if (idx + 1) % batch_size == 0:
+        async def fetcher() -> None:
+            for folder_req, part in source:
+                if stop.is_set():
+                    break
                 try:
-                    await db.commit()
-                    logger.info(
-                        "Batch commit: %s/%s folders processed",
-                        idx + 1,
-                        len(folders),
-                    )
+                    prepared = await self._prepare_folder(folder_req, part, part_files[part.id])
                 except Exception as exc:
-                    logger.error("Batch commit failed at %s: %s", idx + 1, exc, exc_info=True)
-                    errors.append(f"Batch commit failed at {idx + 1}: {exc}")
-                    await db.rollback()
+                    prepared = exc
+                await queue.put((folder_req, part, prepared))
+
+        async def close_queue_when_done(tasks: list[asyncio.Task]) -> None:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await queue.put(None)
+
+        fetchers = [asyncio.create_task(fetcher()) for _ in range(workers)]
+        closer = asyncio.create_task(close_queue_when_done(fetchers))
+        uncommitted: list[tuple[str, int]] = []
+        uncommitted_files: list[dict] = []  # prepared soubory necommitnutých složek
+        processed = 0
+        queue_closed = False
+
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    queue_closed = True
                     break
+                folder_req, part, prepared = item
+
+                if isinstance(prepared, Exception):
+                    errors.append(f"{folder_req.folder_name}: {prepared}")
+                    logger.error(
+                        "Import failed for folder %s: %s",
+                        folder_req.folder_name,
+                        prepared,
+                        exc_info=prepared,
+                    )
+                    continue
+
+                existing = part_files[part.id]
+                existing_before = dict(existing)
+                uncommitted_files.append(prepared)
+                try:
+                    await ensure_db_transaction(db)
+                    async with db.begin_nested():
+                        counts = await self._write_folder(
+                            folder_req, part, prepared, existing, db, created_by=created_by
+                        )
+                except Exception as exc:
+                    uncommitted_files.pop()
+                    _discard_prepared(prepared)
+                    existing.clear()  # savepoint rollback → záznamy z této složky neexistují
+                    existing.update(existing_before)
+                    errors.append(f"{folder_req.folder_name}: {exc}")
+                    logger.error(
+                        "Import failed for folder %s: %s",
+                        folder_req.folder_name,
+                        exc,
+                        exc_info=True,
+                    )
+                    continue
+
+                for key in totals:
+                    totals[key] += counts[key]
+                uncommitted.append((folder_req.folder_name, part.id))
+                processed += 1
+
+                if processed % commit_every == 0:
+                    try:
+                        await db.commit()
+                        self._checkpoint(uncommitted)
+                        uncommitted_files.clear()
+                        await self._save_manifest()
+                        logger.info(
+                            "Batch commit: %s/%s folders processed",
+                            processed,
+                            len(pending),
+                        )
+                    except Exception as exc:
+                        logger.error("Batch commit failed at %s: %s", processed, exc, exc_info=True)
+                        errors.append(f"Batch commit failed at {processed}: {exc}")
+                        await db.rollback()
+                        uncommitted.clear()
+                        _discard_all(uncommitted_files)
+                        break
+        except BaseException:
+            _discard_all(uncommitted_files)
+            await db.rollback()
+            raise
+        finally:
+            # Přerušení: fetchery dokončí rozpracované složky, jejich soubory
+            # (bez DB záznamu) se smažou z disku
+            stop.set()
+            while not queue_closed:
+                item = await queue.get()
+                if item is None:
+                    queue_closed = True
+                elif not isinstance(item[2], Exception):
+                    _discard_prepared(item[2])
+            await closer
 
         try:
             await db.commit()
+            self._checkpoint(uncommitted)
+            uncommitted_files.clear()
         except Exception as exc:
             logger.error("Final commit failed: %s", exc, exc_info=True)
             errors.append(f"Final commit failed: {exc}")
             await db.rollback()
+            _discard_all(uncommitted_files)
+
+        await self._save_manifest()
 
         success = len(errors) == 0
         logger.info(
             "Drawing import complete: %s files, %s links, %s parts, %s skipped, %s errors",
-            files_created,
-            links_created,
-            parts_updated,
-            skipped,
+            totals["files"],
+            totals["links"],
+            totals["parts"],
+            totals["skipped"],
             len(errors),
         )
 
         return DrawingImportExecuteResponse(
             success=success,
-            files_created=files_created,
-            links_created=links_created,
-            parts_updated=parts_updated,
-            skipped=skipped,
+            files_created=totals["files"],
+            links_created=totals["links"],
+            parts_updated=totals["parts"],
+            skipped=totals["skipped"],
             errors=errors,
         )
 
-    async def _import_folder(
+    def _checkpoint(self, committed: list[tuple[str, int]]) -> None:
+        if self._manifest is not None:
+            for folder_name, part_id in committed:
+                self._manifest.mark_imported(folder_name, part_id)
+        committed.clear()
+
+    async def _prepare_folder(
         self,
         folder_req: ImportFolderRequest,
-        db: AsyncSession,
-        *,
-        created_by: str,
-    ) -> dict[str, int]:
-        """Import a single folder's files and return counters."""
+        part: Part,
+        existing: dict[str, FileRecord],
+    ) -> dict:
+        """
+        Fetch stage for one folder: list files and prepare them on disk (no DB access).
+
+        Files whose known hash (manifest) is already linked to the part are not copied again.
+
+        Returns:
+            dict: primary (PreparedFile | existing FileRecord), pdfs, steps
+                  (lists of (filename, PreparedFile)), skipped
+        """
         if self.source_mode == "local":
             folder_path = self.share_path / folder_req.folder_name
-            if not folder_path.exists():
+            if not await asyncio.to_thread(folder_path.exists):
                 raise ValueError(f"Folder not found: {folder_req.folder_name}")
 
-        result = await db.execute(
-            select(Part).where(and_(Part.id == folder_req.part_id, Part.deleted_at.is_(None)))
-        )
-        part = result.scalar_one_or_none()
-        if not part:
-            raise ValueError(f"Part not found: ID {folder_req.part_id}")
-
         folder_files = await self._list_folder_files(folder_req.folder_name)
         pdf_files = [f for f in folder_files if f["file_type"] == "pdf"]
         step_files = [f for f in folder_files if f["file_type"] == "step"]
@@ -816,17 +1155,71 @@ class DrawingImportService:
             raise ValueError(f"Primary PDF not found: {folder_req.primary_pdf}")
 
         directory = f"parts/{part.part_number}"
-        counters = {"files": 0, "links": 0, "parts": 0, "skipped": 0}
-
         primary_info = primary_candidates[0]
-        primary_record = await self._store_source_file(
-            folder_name=folder_req.folder_name,
-            file_info=primary_info,
-            directory=directory,
-            db=db,
-            allowed_types=["pdf"],
-            created_by=created_by,
-        )
+        prepared: dict = {
+            "primary_name": primary_info["filename"],
+            "primary": existing.get(primary_info.get("hash") or ""),
+            "pdfs": [],
+            "steps": [],
+            "skipped": 0,
+        }
+        if prepared["primary"] is None:
+            prepared["primary"] = await asyncio.to_thread(
+                self._prepare_source_file_sync, folder_req.folder_name, primary_info, directory, ["pdf"]
+            )
+
+        extras = [
+            (f, ["pdf"], "pdfs") for f in pdf_files if f["filename"] != folder_req.primary_pdf
+        ]
+        if folder_req.import_step:
+            extras += [(f, ["step"], "steps") for f in step_files]
+
+        for file_info, allowed_types, bucket in extras:
+            if file_info.get("hash") in existing:
+                prepared["skipped"] += 1
+                continue
+            try:
+                prepared[bucket].append((
+                    file_info["filename"],
+                    await asyncio.to_thread(
+                        self._prepare_source_file_sync,
+                        folder_req.folder_name,
+                        file_info,
+                        directory,
+                        allowed_types,
+                    ),
+                ))
+            except Exception as exc:
+                prepared["skipped"] += 1
+                logger.warning("Failed to import %s %s: %s", bucket[:-1].upper(), file_info["filename"], exc)
+
+        return prepared
+
+    async def _write_folder(
+        self,
+        folder_req: ImportFolderRequest,
+        part: Part,
+        prepared: dict,
+        existing: dict[str, FileRecord],
+        db: AsyncSession,
+        *,
+        created_by: str,
+    ) -> dict[str, int]:
+        """DB stage for one folder: records, links, Part.file_id. Returns counters."""
+        counters = {"files": 0, "links": 0, "parts": 0, "skipped": prepared["skipped"]}
+
+        primary = prepared["primary"]
+        if isinstance(primary, PreparedFile) and primary.file_hash in existing:
+            # Stejný obsah už je u dílu (hash nebyl předem známý) → jen nová vazba
+            primary.discard()
+            primary = prepared["primary"] = existing[primary.file_hash]
+        if isinstance(primary, PreparedFile):
+            primary_record = await self._record(folder_req.folder_name, prepared["primary_name"], primary, db, created_by)
+            existing[primary_record.file_hash] = primary_record
+            counters["files"] += 1
+        else:
+            primary_record = primary
+
         await file_service.link(
             file_id=primary_record.id,
             entity_type="part",
@@ -839,62 +1232,59 @@ class DrawingImportService:
         part.file_id = primary_record.id
         part.drawing_path = primary_record.file_path
 
-        counters["files"] += 1
         counters["links"] += 1
         counters["parts"] += 1
 
-        for extra_pdf in pdf_files:
-            if extra_pdf["filename"] == folder_req.primary_pdf:
-                continue
-
-            try:
-                extra_record = await self._store_source_file(
-                    folder_name=folder_req.folder_name,
-                    file_info=extra_pdf,
-                    directory=directory,
-                    db=db,
-                    allowed_types=["pdf"],
-                    created_by=created_by,
-                )
-                await file_service.link(
-                    file_id=extra_record.id,
-                    entity_type="part",
-                    entity_id=part.id,
-                    db=db,
-                    is_primary=False,
-                    link_type="drawing",
-                    created_by=created_by,
-                )
-                counters["files"] += 1
-                counters["links"] += 1
-            except Exception as exc:
-                counters["skipped"] += 1
-                logger.warning("Failed to import extra PDF %s: %s", extra_pdf["filename"], exc)
-
-        if folder_req.import_step:
-            for step_file in step_files:
+        for bucket, link_type in (("pdfs", "drawing"), ("steps", "step_model")):
+            for filename, prepared_file in prepared[bucket]:
+                if prepared_file.file_hash in existing:
+                    prepared_file.discard()
+                    counters["skipped"] += 1
+                    continue
                 try:
-                    step_record = await self._store_source_file(
-                        folder_name=folder_req.folder_name,
-                        file_info=step_file,
-                        directory=directory,
-                        db=db,
-                        allowed_types=["step"],
-                        created_by=created_by,
-                    )
+                    record = await self._record(folder_req.folder_name, filename, prepared_file, db, created_by)
                     await file_service.link(
-                        file_id=step_record.id,
+                        file_id=record.id,
                         entity_type="part",
                         entity_id=part.id,
                         db=db,
                         is_primary=False,
-                        link_type="step_model",
+                        link_type=link_type,
                         created_by=created_by,
                     )
+                    existing[record.file_hash] = record
                     counters["files"] += 1
                     counters["links"] += 1
                 except Exception as exc:
                     counters["skipped"] += 1
-                    logger.warning("Failed to import STEP %s: %s", step_file["filename"], exc)
+                    logger.warning("Failed to import %s: %s", filename, exc)
 
         return counters
+
+    async def _record(
+        self,
+        folder_name: str,
+        filename: str,
+        prepared: PreparedFile,
+        db: AsyncSession,
+        created_by: str,
+    ) -> FileRecord:
+        record = await file_service.record_prepared(prepared, db, created_by=created_by)
+        if self._manifest is not None:
+            self._manifest.set_hash(folder_name, filename, record.file_hash)
+        return record
+
+
+def _discard_all(prepared_folders: list[dict]) -> None:
+    """Rollback → soubory složek bez DB záznamu pryč z disku."""
+    for prepared in prepared_folders:
+        _discard_prepared(prepared)
+    prepared_folders.clear()
+
+
+def _discard_prepared(prepared: dict) -> None:
+    """Remove prepared (not recorded) files of a folder from disk."""
+    candidates = [prepared["primary"]] + [p for _, p in prepared["pdfs"]] + [p for _, p in prepared["steps"]]
+    for candidate in candidates:
+        if isinstance(candidate, PreparedFile):
+            candidate.discard()
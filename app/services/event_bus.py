@@ -1,31 +1,549 @@
-"""In-process pub/sub pro SSE broadcast (single-worker)."""
+"""Pub/sub pro SSE broadcast — ID eventů, replay, témata, více workerů.
+
+Každý event dostane monotónně rostoucí ID a uloží se do omezeného replay
+bufferu (EVENT_BUS_REPLAY_SIZE). Klient se po výpadku připojí s Last-Event-ID
+a dostane zmeškané eventy; pokud už v bufferu nejsou, dostane `resync`
+(= načíst data znovu).
+
+Back-pressure: fronta odběratele je omezená. Pomalý klient se místo tichého
+zahazování označí jako `lagged` a doplní se z replay bufferu od posledního
+doručeného ID (případně `resync`).
+
+Témata: odběratel může poslouchat jen vybrané typy eventů (topics=None = vše).
+Adresát: event s "user_id" (broadcast(..., user_id=...)) dostane jen odběratel
+téhož uživatele — průběh akce jednoho uživatele neuvidí ostatní.
+
+Coalescing: JSON se kóduje jednou při broadcastu. Odběratel dostává dávky
+(jeden SSE rámec = JSON pole); u typů v COALESCE_KEYS se po prvním eventu
+čeká EVENT_BUS_COALESCE_MS a z dávky zůstane jen poslední event na klíč.
+Čítače per odběratel (delivered / coalesced / dropped / lag) → stats().
+
+Backendy (EVENT_BUS_BACKEND):
+  memory — jeden proces (uvicorn s jedním workerem, testy)
+  sqlite — sdílený SQLite soubor ve WAL módu; broadcast zapíše řádek,
+           každý worker ho načte pollingem a rozešle svým klientům.
+           ID = AUTOINCREMENT → stejná napříč workery i po restartu.
+
+Usage:
+    broadcast("tier_change", {"job": job, "suffix": suffix, "tier": tier})
+
+    sub = subscribe(topics={"tier_change"})
+    events = await next_events(sub, timeout=30)   # [Event, ...] / [..., RESYNC]
+    frame = encode_frame(events)
+    unsubscribe(sub)
+"""
 
 import asyncio
 import json
 import logging
-from typing import Any, Dict, Set
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-_subscribers: Set[asyncio.Queue] = set()
+_SUBSCRIBER_QUEUE_SIZE = 64
+_PRUNE_EVERY = 200  # sqlite: po kolika zápisech mazat staré řádky
 
+# Coalescing: typ eventu → pole klíče; v jedné dávce zůstane jen poslední event
+# se stejným klíčem (N změn tieru jednoho VP → jedna). Delty plánu se neslučují
+# (navazují přes base_version).
+COALESCE_KEYS: Dict[str, Tuple[str, ...]] = {
+    "tier_change": ("job", "suffix"),
+    "batch_reprice_progress": ("job_id",),
+}
 
-def subscribe() -> asyncio.Queue:
-    q: asyncio.Queue = asyncio.Queue(maxsize=64)
-    _subscribers.add(q)
-    logger.debug("SSE subscriber added (%d total)", len(_subscribers))
-    return q
 
+class Event(NamedTuple):
+    id: int
+    msg: Dict[str, Any]
+    data: str  # JSON zakódovaný jednou při broadcastu (sdílený všemi odběrateli)
 
-def unsubscribe(q: asyncio.Queue) -> None:
-    _subscribers.discard(q)
-    logger.debug("SSE subscriber removed (%d total)", len(_subscribers))
 
+# Pseudo-event: klient má mezeru v eventech → musí načíst data znovu
+RESYNC = Event(0, {"type": "resync"}, '{"type": "resync"}')
 
-def broadcast(event_type: str, data: Dict[str, Any]) -> None:
-    msg = {"type": event_type, **data}
-    for q in list(_subscribers):
+
+def _visible(msg: Dict[str, Any], topics: Optional[Set[str]], user_id: Optional[int]) -> bool:
+    """Téma odpovídá filtru a event je veřejný nebo pro tohoto uživatele."""
+    if topics is not None and msg.get("type") not in topics:
+        return False
+    recipient = msg.get("user_id")
+    return recipient is None or recipient == user_id
+
+
+def _coalesce_key(msg: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+    fields = COALESCE_KEYS.get(msg.get("type"))
+    if not fields:
+        return None
+    values = tuple(msg.get(f) for f in fields)
+    if all(v is None for v in values):
+        return None
+    return (msg["type"],) + values
+
+
+class Subscriber:
+    """Jeden SSE klient — omezená fronta + filtr témat + čítače."""
+
+    def __init__(
+        self,
+        topics: Optional[Iterable[str]] = None,
+        last_id: int = 0,
+        label: str = "",
+        user_id: Optional[int] = None,
+    ):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=_SUBSCRIBER_QUEUE_SIZE)
+        self.topics: Optional[Set[str]] = set(topics) if topics else None
+        self.user_id = user_id  # adresné eventy (msg["user_id"]) jen pro tohoto uživatele
+        self.last_id = last_id  # poslední doručené ID
+        self.lagged = False
+        self.label = label
+        self.connected_at = time.time()
+        # Čítače (GET /api/events/stats)
+        self.delivered = 0   # odeslané eventy
+        self.coalesced = 0   # sloučené (nahrazené novějším se stejným klíčem)
+        self.dropped = 0     # nevešly se do fronty (doplní replay, jinak resync)
+        self.lag_count = 0   # kolikrát fronta přetekla
+        self.resyncs = 0     # mezera větší než replay buffer
+
+    def wants(self, msg: Dict[str, Any]) -> bool:
+        return _visible(msg, self.topics, self.user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "label": self.label,
+            "topics": sorted(self.topics) if self.topics else None,
+            "connected_s": round(time.time() - self.connected_at, 1),
+            "last_id": self.last_id,
+            "pending": self.queue.qsize(),
+            "lagged": self.lagged,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "lag_count": self.lag_count,
+            "resyncs": self.resyncs,
+        }
+
+
+class EventBus:
+    """Lokální fan-out + replay buffer; backend dodává eventy přes _deliver()."""
+
+    def __init__(self, backend: "EventBusBackend", replay_size: int, coalesce_window: float = 0.0):
+        self.backend = backend
+        self.backend.deliver = self._deliver
+        self.coalesce_window = coalesce_window
+        self._ring: Deque[Event] = deque(maxlen=replay_size)
+        self._subscribers: Set[Subscriber] = set()
+        self.last_id = 0
+
+    # ---------- životní cyklus ----------
+
+    async def start(self) -> None:
+        await self.backend.start(self._ring)
+        if self._ring:
+            self.last_id = self._ring[-1].id
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+
+    # ---------- publish / deliver ----------
+
+    def publish(self, msg: Dict[str, Any]) -> None:
+        self.backend.publish(msg)
+
+    def _deliver(self, event_id: int, msg: Dict[str, Any], data: str) -> None:
+        if event_id <= self.last_id:
+            return  # duplicita (např. znovu načtený řádek)
+        self.last_id = event_id
+        event = Event(event_id, msg, data)
+        self._ring.append(event)
+        for sub in list(self._subscribers):
+            if not sub.wants(msg):
+                continue
+            if sub.lagged:
+                sub.dropped += 1
+                continue
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Pomalý klient → doplní se z replay bufferu (next_events)
+                sub.lagged = True
+                sub.lag_count += 1
+                sub.dropped += 1
+                logger.debug("SSE subscriber %s lagged at event %d", sub.label, event_id)
+
+    # ---------- odběratelé ----------
+
+    def subscribe(
+        self,
+        topics: Optional[Iterable[str]] = None,
+        last_event_id: Optional[int] = None,
+        label: str = "",
+        user_id: Optional[int] = None,
+    ) -> Subscriber:
+        """Nový odběratel; s last_event_id se nejdřív doplní zmeškané eventy."""
+        sub = Subscriber(topics, last_event_id if last_event_id is not None else self.last_id, label, user_id)
+        # Resume → první next_events() projde replay (stejná cesta jako pomalý klient)
+        sub.lagged = last_event_id is not None and last_event_id != self.last_id
+        self._subscribers.add(sub)
+        logger.debug("SSE subscriber added (%d total)", len(self._subscribers))
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self._subscribers.discard(sub)
+        logger.debug("SSE subscriber removed (%d total)", len(self._subscribers))
+
+    def stats(self) -> Dict[str, Any]:
+        """Stav busu + čítače jednotlivých odběratelů (kdo nestíhá)."""
+        subscribers = sorted(
+            (sub.stats() for sub in self._subscribers),
+            key=lambda st: (-st["dropped"], -st["pending"], st["label"]),
+        )
+        return {
+            "backend": type(self.backend).__name__,
+            "last_id": self.last_id,
+            "replay_size": len(self._ring),
+            "subscribers": subscribers,
+        }
+
+    def replay(
+        self,
+        after_id: int,
+        topics: Optional[Set[str]] = None,
+        user_id: Optional[int] = None,
+    ) -> Optional[List[Event]]:
+        """Eventy s ID > after_id z bufferu; None = mezera (už nejsou v bufferu)."""
+        if after_id > self.last_id:
+            return None  # ID z jiné instance (restart memory backendu)
+        if after_id == self.last_id:
+            return []
+        if not self._ring or self._ring[0].id > after_id + 1:
+            return None
+        return [
+            event for event in self._ring
+            if event.id > after_id and _visible(event.msg, topics, user_id)
+        ]
+
+    async def next_events(self, sub: Subscriber, timeout: float) -> List[Event]:
+        """Další dávka eventů pro odběratele ([] = timeout → keepalive).
+
+        Po prvním slučitelném eventu se čeká coalesce_window na další — dávka
+        se pak odešle jedním SSE rámcem, duplicitní klíče jen poslední.
+        """
+        events: List[Event] = []
+        if not sub.lagged:
+            try:
+                first = await asyncio.wait_for(sub.queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return []
+            events = self._accept(sub, [first]) + self._drain(sub)
+            if self.coalesce_window > 0 and any(_coalesce_key(e.msg) for e in events):
+                await asyncio.sleep(self.coalesce_window)
+                events += self._drain(sub)
+
+        if sub.lagged:
+            # Co je ve frontě + zbytek z bufferu od posledního doručeného ID
+            sub.lagged = False
+            events += self._drain(sub)
+            missed = self.replay(sub.last_id, sub.topics, sub.user_id)
+            sub.last_id = max(sub.last_id, self.last_id)
+            if missed is None:
+                sub.resyncs += 1
+                return self._coalesce(sub, events) + [RESYNC]
+            events += missed
+            if not events:
+                return await self.next_events(sub, timeout)
+
+        return self._coalesce(sub, events)
+
+    @staticmethod
+    def _accept(sub: Subscriber, events: List[Event]) -> List[Event]:
+        accepted = [e for e in events if e.id > sub.last_id]
+        if accepted:
+            sub.last_id = accepted[-1].id
+        return accepted
+
+    def _drain(self, sub: Subscriber) -> List[Event]:
+        events: List[Event] = []
+        while not sub.queue.empty():
+            events.append(sub.queue.get_nowait())
+        return self._accept(sub, events)
+
+    @staticmethod
+    def _coalesce(sub: Subscriber, events: List[Event]) -> List[Event]:
+        latest: Dict[Tuple[Any, ...], int] = {}
+        for i, event in enumerate(events):
+            key = _coalesce_key(event.msg)
+            if key is not None:
+                latest[key] = i
+        out = [
+            event for i, event in enumerate(events)
+            if (key := _coalesce_key(event.msg)) is None or latest[key] == i
+        ]
+        sub.coalesced += len(events) - len(out)
+        sub.delivered += len(out)
+        return out
+
+
+def encode_frame(events: List[Event]) -> str:
+    """SSE rámec pro dávku: jeden event = objekt, více = JSON pole (bez překódování)."""
+    data = events[0].data if len(events) == 1 else "[" + ",".join(e.data for e in events) + "]"
+    last_id = max(e.id for e in events)
+    id_line = f"id: {last_id}\n" if last_id else ""
+    return f"{id_line}data: {data}\n\n"
+
+
+# ---------------------------------------------------------------------------
+# Backendy
+# ---------------------------------------------------------------------------
+
+Deliver = Callable[[int, Dict[str, Any], str], None]
+
+
+class EventBusBackend:
+    """Rozhraní backendu: publish() přidělí ID a (případně přes jiný proces) zavolá deliver."""
+
+    deliver: Optional[Deliver] = None
+
+    async def start(self, ring: Deque[Event]) -> None:
+        """Startup — ring lze naplnit historií (bez doručení)."""
+
+    async def stop(self) -> None:
+        pass
+
+    def publish(self, msg: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+
+class MemoryBackend(EventBusBackend):
+    """Jeden proces. ID začínají časem startu (µs) → po restartu nenavazují na stará."""
+
+    def __init__(self) -> None:
+        self._next_id = time.time_ns() // 1000
+
+    def publish(self, msg: Dict[str, Any]) -> None:
+        self._next_id += 1
+        if self.deliver is not None:
+            self.deliver(self._next_id, msg, json.dumps(msg, default=str))
+
+
+class SQLiteBackend(EventBusBackend):
+    """Sdílený SQLite soubor (WAL) pro fan-out mezi uvicorn workery.
+
+    publish() je synchronní a neblokuje event loop — zprávy se zapisují dávkově
+    v threadu. Poller načítá nové řádky (id > poslední) a předává je do deliver.
+    """
+
+    def __init__(self, path: Path, retention: int, poll_interval: float):
+        self.path = Path(path)
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._pending: List[str] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._last_read = 0
+        self._writes = 0
+
+    # ---------- sqlite (v threadu) ----------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _write(self, payloads: List[str]) -> None:
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT INTO events (payload, created_at) VALUES (?, ?)",
+                    [(p, now) for p in payloads],
+                )
+            self._writes += len(payloads)
+            if self._writes >= _PRUNE_EVERY:
+                self._writes = 0
+                conn.execute(
+                    "DELETE FROM events WHERE id <= (SELECT MAX(id) FROM events) - ?",
+                    (self.retention,),
+                )
+
+    def _read_after(self, after_id: int, limit: int) -> List[Tuple[int, str]]:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT id, payload FROM events WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit),
+            ).fetchall()
+
+    def _read_tail(self, limit: int) -> List[Tuple[int, str]]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, payload FROM events ORDER BY id DESC LIMIT ?", (limit,),
+            ).fetchall()
+        return rows[::-1]
+
+    # ---------- async API ----------
+
+    async def start(self, ring: Deque[Event]) -> None:
+        # Replay buffer přežije restart workeru — načíst konec tabulky bez doručení
+        for event_id, payload in await asyncio.to_thread(self._read_tail, ring.maxlen or 0):
+            ring.append(Event(event_id, json.loads(payload), payload))
+        self._last_read = ring[-1].id if ring else 0
+        if not ring:
+            rows = await asyncio.to_thread(self._read_tail, 1)
+            self._last_read = rows[0][0] if rows else 0
+        self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self) -> None:
+        if self._flush_task is not None:
+            await self._flush_task
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def publish(self, msg: Dict[str, Any]) -> None:
+        self._pending.append(json.dumps(msg, default=str))
         try:
-            q.put_nowait(msg)
-        except asyncio.QueueFull:
-            pass  # slow client — drop
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Mimo event loop (skript, thread) → zapsat hned
+            self._write(self._drain_pending())
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    def _drain_pending(self) -> List[str]:
+        payloads, self._pending = self._pending, []
+        return payloads
+
+    async def _flush(self) -> None:
+        while self._pending:
+            payloads = self._drain_pending()
+            try:
+                await asyncio.to_thread(self._write, payloads)
+            except Exception:
+                logger.exception("Event bus write failed (%d events dropped)", len(payloads))
+        self._wake.set()
+
+    async def _poll_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Event bus poll failed")
+
+    async def poll(self) -> int:
+        """Načte a doručí nové eventy (i z jiných workerů). Vrací počet."""
+        count = 0
+        while True:
+            rows = await asyncio.to_thread(self._read_after, self._last_read, 500)
+            for event_id, payload in rows:
+                self._last_read = event_id
+                if self.deliver is not None:
+                    self.deliver(event_id, json.loads(payload), payload)
+            count += len(rows)
+            if len(rows) < 500:
+                return count
+
+
+# ---------------------------------------------------------------------------
+# Process-level bus + modulové API
+# ---------------------------------------------------------------------------
+
+_bus: Optional[EventBus] = None
+
+
+def _build_bus() -> EventBus:
+    replay_size = settings.EVENT_BUS_REPLAY_SIZE
+    if settings.EVENT_BUS_BACKEND == "sqlite":
+        backend: EventBusBackend = SQLiteBackend(
+            settings.EVENT_BUS_DB_PATH,
+            retention=replay_size * 4,
+            poll_interval=settings.EVENT_BUS_POLL_INTERVAL_MS / 1000,
+        )
+    else:
+        if settings.EVENT_BUS_BACKEND != "memory":
+            logger.error("Unknown EVENT_BUS_BACKEND %r — using memory", settings.EVENT_BUS_BACKEND)
+        backend = MemoryBackend()
+    return EventBus(backend, replay_size, coalesce_window=settings.EVENT_BUS_COALESCE_MS / 1000)
+
+
+def get_event_bus() -> EventBus:
+    global _bus
+    if _bus is None:
+        _bus = _build_bus()
+    return _bus
+
+
+async def start_event_bus() -> None:
+    """Startup (lifespan) — sqlite backend spustí poller."""
+    await get_event_bus().start()
+    logger.info("Event bus started (%s)", settings.EVENT_BUS_BACKEND)
+
+
+async def stop_event_bus() -> None:
+    global _bus
+    if _bus is not None:
+        await _bus.stop()
+        _bus = None
+
+
+def subscribe(
+    topics: Optional[Iterable[str]] = None,
+    last_event_id: Optional[int] = None,
+    label: str = "",
+    user_id: Optional[int] = None,
+) -> Subscriber:
+    return get_event_bus().subscribe(topics, last_event_id, label, user_id)
+
+
+def unsubscribe(sub: Subscriber) -> None:
+    get_event_bus().unsubscribe(sub)
+
+
+async def next_events(sub: Subscriber, timeout: float) -> List[Event]:
+    return await get_event_bus().next_events(sub, timeout)
+
+
+def event_bus_stats() -> Dict[str, Any]:
+    return get_event_bus().stats()
+
+
+def broadcast(event_type: str, data: Dict[str, Any], user_id: Optional[int] = None) -> None:
+    """Publikovat event; s user_id ho dostanou jen odběratelé tohoto uživatele."""
+    msg = {"type": event_type, **data}
+    if user_id is not None:
+        msg["user_id"] = user_id
+    get_event_bus().publish(msg)
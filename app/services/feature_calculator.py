@@ -3,6 +3,10 @@
 Converts AI-extracted features (JSON) into deterministic machining time
 using cutting conditions from database.
 
+calculate_features_time_batch() přepočítá mnoho seznamů features najednou
+(kalibrace, přetrénování): detail string se parsuje jedním tokenizerem,
+řezné podmínky se memoizují a vzorce běží vektorově nad numpy poli.
+
 ADR: To be created for feature-based estimation architecture
 Version: 1.0.0 (2026-02-15)
 """
@@ -10,7 +14,11 @@ Version: 1.0.0 (2026-02-15)
 import logging
 import math
 import re
-from typing import Dict, Any, List, Optional, Tuple
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
 
 from app.services.cutting_conditions_catalog import (
     get_catalog_conditions,
@@ -30,6 +38,107 @@ logger = logging.getLogger(__name__)
 # DETAIL STRING PARSING
 # ============================================================================
 
+class DetailDims(NamedTuple):
+    """Rozměry vyčtené z detail stringu (None = nenalezeno)."""
+    diameter: Optional[float]
+    length: Optional[float]
+    width: Optional[float]
+    depth: Optional[float]
+    pitch: Optional[float]
+
+
+_NUM = r'\d+\.?\d*'
+
+# Jeden průchod stringem: ø60 | M10 | L=50 / H 5 | 22 | ×
+_DETAIL_TOKEN_RE = re.compile(
+    rf'ø\s*(?P<dia>{_NUM})'
+    rf'|\bM\s*(?P<thread>{_NUM})'
+    rf'|(?P<mark>[LH])\s*=?\s*(?P<mark_val>{_NUM})'
+    rf'|(?P<num>{_NUM})'
+    r'|(?P<times>×)',
+    re.IGNORECASE,
+)
+
+# Standard ISO metric coarse thread pitches
+_STANDARD_PITCHES = {
+    3: 0.5, 4: 0.7, 5: 0.8, 6: 1.0, 8: 1.25,
+    10: 1.5, 12: 1.75, 14: 2.0, 16: 2.0, 20: 2.5,
+}
+
+_NO_DIMS = DetailDims(None, None, None, None, None)
+
+
+@lru_cache(maxsize=4096)
+def parse_detail(detail: str) -> DetailDims:
+    """Extract all dimensions from detail string in a single tokenizer pass.
+
+    Pravidla (priorita):
+        diameter: ø60 → M10 → první číslo
+        length:   L=50 → číslo před ×
+        width:    číslo mezi × a ×
+        depth:    H=5 → třetí číslo
+        pitch:    číslo za × → standardní stoupání dle M (default 1.5)
+
+    Examples:
+        "80×22×3.4mm" → length 80, width 22, depth 3.4
+        "M10×1.5"     → diameter 10, length 10, pitch 1.5
+    """
+    if not detail:
+        return _NO_DIMS
+
+    dia = thread = mark_l = mark_h = None
+    before_times = after_times = width = None
+    thread_int: Optional[int] = None
+    numbers: List[float] = []
+
+    prev_kind: Optional[str] = None
+    prev_value: Optional[float] = None
+    prev_end = 0
+    prev_after_times = False  # předchozí token je číslo hned za ×
+
+    for match in _DETAIL_TOKEN_RE.finditer(detail):
+        adjacent = not detail[prev_end:match.start()].strip()
+        kind = match.lastgroup
+
+        if kind == "times":
+            if adjacent and prev_kind is not None and prev_kind != "times":
+                if before_times is None:
+                    before_times = prev_value
+                if width is None and prev_after_times:
+                    width = prev_value
+            prev_kind, prev_value, prev_after_times = "times", None, False
+        else:
+            raw = match.group(kind)
+            value = float(raw)
+            numbers.append(value)
+            follows_times = kind == "num" and adjacent and prev_kind == "times"
+            if follows_times and after_times is None:
+                after_times = value
+            if kind == "dia" and dia is None:
+                dia = value
+            elif kind == "thread" and thread is None:
+                thread = value
+                thread_int = int(raw.split(".")[0])
+            elif kind == "mark_val":
+                if match.group("mark").upper() == "L":
+                    mark_l = value if mark_l is None else mark_l
+                else:
+                    mark_h = value if mark_h is None else mark_h
+            prev_kind, prev_value, prev_after_times = kind, value, follows_times
+        prev_end = match.end()
+
+    diameter = dia if dia is not None else thread if thread is not None else (numbers[0] if numbers else None)
+    length = mark_l if mark_l is not None else before_times
+    depth = mark_h if mark_h is not None else (numbers[2] if len(numbers) >= 3 else None)
+    if after_times is not None:
+        pitch = after_times
+    elif thread_int is not None:
+        pitch = _STANDARD_PITCHES.get(thread_int, 1.5)  # Default 1.5mm
+    else:
+        pitch = None
+    return DetailDims(diameter, length, width, depth, pitch)
+
+
 def parse_diameter(detail: str) -> Optional[float]:
     """Extract diameter from detail string.
 
@@ -39,25 +148,7 @@ def parse_diameter(detail: str) -> Optional[float]:
         "M5" → 5.0
         "ø12.5" → 12.5
     """
-    if not detail:
-        return None
-
-    # Try ø pattern first
-    match = re.search(r'ø\s*(\d+\.?\d*)', detail, re.IGNORECASE)
-    if match:
-        return float(match.group(1))
-
-    # Try M thread pattern (M5 → diameter 5)
-    match = re.search(r'\bM\s*(\d+\.?\d*)', detail, re.IGNORECASE)
-    if match:
-        return float(match.group(1))
-
-    # Try standalone number if nothing else
-    match = re.search(r'(\d+\.?\d*)\s*(?:mm)?', detail)
-    if match:
-        return float(match.group(1))
-
-    return None
+    return parse_detail(detail).diameter
 
 
 def parse_length(detail: str) -> Optional[float]:
@@ -67,20 +158,7 @@ def parse_length(detail: str) -> Optional[float]:
         "80×22×3.4mm" → 80.0 (first dimension)
         "L=50" → 50.0
     """
-    if not detail:
-        return None
-
-    # Try L= pattern
-    match = re.search(r'L\s*=?\s*(\d+\.?\d*)', detail, re.IGNORECASE)
-    if match:
-        return float(match.group(1))
-
-    # Try dimension pattern (first number in ×× format)
-    match = re.search(r'(\d+\.?\d*)\s*×', detail)
-    if match:
-        return float(match.group(1))
-
-    return None
+    return parse_detail(detail).length
 
 
 def parse_width(detail: str) -> Optional[float]:
@@ -89,15 +167,7 @@ def parse_width(detail: str) -> Optional[float]:
     Examples:
         "80×22×3.4mm" → 22.0 (second dimension)
     """
-    if not detail:
-        return None
-
-    # Try dimension pattern (second number in ×× format)
-    match = re.search(r'×\s*(\d+\.?\d*)\s*×', detail)
-    if match:
-        return float(match.group(1))
-
-    return None
+    return parse_detail(detail).width
 
 
 def parse_depth(detail: str) -> Optional[float]:
@@ -107,20 +177,7 @@ def parse_depth(detail: str) -> Optional[float]:
         "80×22×3.4mm" → 3.4 (third dimension)
         "H=5" → 5.0
     """
-    if not detail:
-        return None
-
-    # Try H= pattern
-    match = re.search(r'H\s*=?\s*(\d+\.?\d*)', detail, re.IGNORECASE)
-    if match:
-        return float(match.group(1))
-
-    # Try dimension pattern (third number after ××)
-    parts = re.findall(r'(\d+\.?\d*)', detail.replace('×', ' '))
-    if len(parts) >= 3:
-        return float(parts[2])
-
-    return None
+    return parse_detail(detail).depth
 
 
 def parse_thread_pitch(detail: str) -> Optional[float]:
@@ -130,25 +187,7 @@ def parse_thread_pitch(detail: str) -> Optional[float]:
         "M5" → 0.8 (standard pitch for M5)
         "M10×1.5" → 1.5
     """
-    if not detail:
-        return None
-
-    # Try explicit pitch pattern
-    match = re.search(r'×\s*(\d+\.?\d*)', detail)
-    if match:
-        return float(match.group(1))
-
-    # Standard ISO metric thread pitches
-    match = re.search(r'\bM\s*(\d+)', detail, re.IGNORECASE)
-    if match:
-        diameter = int(match.group(1))
-        standard_pitches = {
-            3: 0.5, 4: 0.7, 5: 0.8, 6: 1.0, 8: 1.25,
-            10: 1.5, 12: 1.75, 14: 2.0, 16: 2.0, 20: 2.5,
-        }
-        return standard_pitches.get(diameter, 1.5)  # Default 1.5mm
-
-    return None
+    return parse_detail(detail).pitch
 
 
 # ============================================================================
@@ -286,6 +325,107 @@ def calc_threading_time(
     return max(time_min, 0.01)
 
 
+# ============================================================================
+# VECTORIZED FORMULAS (batch)
+# ============================================================================
+# Stejné vzorce jako calc_*_time výše, ale nad numpy poli — stejné pořadí
+# operací, takže výsledek je bit po bitu shodný se skalární verzí.
+
+def _as_arrays(*values) -> Tuple[np.ndarray, ...]:
+    return tuple(np.asarray(v, dtype=np.float64) for v in values)
+
+
+def _finish(time_min: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    return np.where(valid, np.maximum(time_min, 0.01), 0.01)
+
+
+def calc_turning_time_array(
+    diameter_mm,
+    length_mm,
+    Vc,
+    f,
+    Ap=None,
+    material_removal_mm=None,
+) -> np.ndarray:
+    """Vectorized calc_turning_time (neplatné vstupy → 0.01 min)."""
+    d, length, vc, feed = _as_arrays(diameter_mm, length_mm, Vc, f)
+    valid = (d > 0) & (length > 0) & (vc > 0) & (feed > 0)
+    d, length, vc, feed = (np.where(valid, x, 1.0) for x in (d, length, vc, feed))
+
+    rpm = (vc * 1000) / (math.pi * d)
+    feed_rate = rpm * feed  # mm/min
+
+    passes = np.ones_like(d)
+    if material_removal_mm is not None and Ap is not None:
+        removal, ap = _as_arrays(material_removal_mm, Ap)
+        use = (removal != 0) & (ap > 0)
+        passes = np.where(use, np.ceil(removal / np.where(use, ap, 1.0)), 1.0)
+
+    return _finish(passes * (length / feed_rate), valid)
+
+
+def calc_drilling_time_array(diameter_mm, depth_mm, Vc, f) -> np.ndarray:
+    """Vectorized calc_drilling_time."""
+    d, depth, vc, feed = _as_arrays(diameter_mm, depth_mm, Vc, f)
+    valid = (d > 0) & (depth > 0) & (vc > 0) & (feed > 0)
+    d, depth, vc, feed = (np.where(valid, x, 1.0) for x in (d, depth, vc, feed))
+
+    rpm = (vc * 1000) / (math.pi * d)
+    feed_rate = rpm * feed  # mm/min
+    return _finish(depth / feed_rate, valid)
+
+
+def calc_milling_time_array(
+    length_mm,
+    depth_mm,
+    Vc,
+    fz,
+    Ap,
+    tool_diameter: float = 10.0,
+    num_teeth: int = 3,
+) -> np.ndarray:
+    """Vectorized calc_milling_time (šířka do zjednodušené dráhy nevstupuje)."""
+    length, depth, vc, fz_, ap = _as_arrays(length_mm, depth_mm, Vc, fz, Ap)
+    valid = (length > 0) & (depth > 0) & (vc > 0) & (fz_ > 0) & (ap > 0)
+    length, depth, vc, fz_, ap = (np.where(valid, x, 1.0) for x in (length, depth, vc, fz_, ap))
+
+    rpm = (vc * 1000) / (math.pi * tool_diameter)
+    feed_rate = rpm * fz_ * num_teeth  # mm/min
+    depth_passes = np.ceil(depth / ap)
+    return _finish(depth_passes * (length / feed_rate), valid)
+
+
+def calc_threading_time_array(diameter_mm, length_mm, pitch_mm, Vc) -> np.ndarray:
+    """Vectorized calc_threading_time (5 průchodů)."""
+    d, length, pitch, vc = _as_arrays(diameter_mm, length_mm, pitch_mm, Vc)
+    valid = (d > 0) & (length > 0) & (pitch > 0) & (vc > 0)
+    d, length, pitch, vc = (np.where(valid, x, 1.0) for x in (d, length, pitch, vc))
+
+    rpm = (vc * 1000) / (math.pi * d)
+    passes = 5
+    feed_rate = rpm * pitch  # mm/min (feed = pitch for threading)
+    return _finish(passes * (length / feed_rate), valid)
+
+
+_ARRAY_FORMULAS = {
+    "turning": calc_turning_time_array,
+    "drilling": calc_drilling_time_array,
+    "milling": calc_milling_time_array,
+    "threading": calc_threading_time_array,
+}
+
+
+@lru_cache(maxsize=1024)
+def _cached_conditions(
+    material_group: str,
+    operation_type: str,
+    operation: str,
+    cutting_mode: str,
+) -> "MappingProxyType[str, Any]":
+    """Memoized get_catalog_conditions — katalog je statický, výsledek read-only."""
+    return MappingProxyType(get_catalog_conditions(material_group, operation_type, operation, cutting_mode))
+
+
 # ============================================================================
 # MAIN CALCULATION FUNCTION
 # ============================================================================
@@ -314,181 +454,236 @@ def calculate_features_time(
             "material_group": str
         }
     """
-    warnings = []
-    feature_times = []
-    total_time_sec = 0.0
-
-    # Validate material group
-    if material_group not in MATERIAL_GROUP_MAP:
-        material_group = "20910004"  # Default to konstrukční ocel
-        warnings.append(
-            f"Unknown material group, defaulting to {material_group} "
-            f"({MATERIAL_GROUP_MAP[material_group]['name']})"
-        )
-
-    for feature in features_json:
-        try:
-            feature_type = feature.get("type", "unknown")
-            detail = feature.get("detail", "")
-            count = feature.get("count", 1)
-            location = feature.get("location", "")
-
-            # Get DB operation mapping from feature_types catalog
-            db_operation = get_operation_for_feature(feature_type)
-
-            # Skip informational features
-            if db_operation is None and feature_type not in CONSTANT_TIMES:
-                # Check if it's a known info-only feature
-                if feature_type in FEATURE_TYPES:
+    return calculate_features_time_batch([{
+        "features_json": features_json,
+        "material_group": material_group,
+        "cutting_mode": cutting_mode,
+        "part_type": part_type,
+    }])[0]
+
+
+class _FeatureSlot:
+    """Mezivýsledek jedné feature mezi přípravou a vektorovým výpočtem."""
+
+    __slots__ = ("feature", "entry", "warnings", "time_sec", "formula", "row", "method")
+
+    def __init__(self, feature: Any):
+        self.feature = feature
+        self.entry: Optional[Dict[str, Any]] = None  # hotový záznam (informational)
+        self.warnings: List[str] = []
+        self.time_sec = 0.0
+        self.formula: Optional[str] = None  # klíč _ARRAY_FORMULAS, čas dopočítá batch
+        self.row = -1
+        self.method = ""
+
+    def error(self, exc: Exception) -> str:
+        logger.exception(f"Feature calculation error for {self.feature}")
+        return f"Error calculating {self.feature.get('type', 'unknown')}: {str(exc)}"
+
+
+def _prepare_feature(
+    slot: _FeatureSlot,
+    material_group: str,
+    cutting_mode: str,
+    columns: Dict[str, List[List[float]]],
+) -> None:
+    """Rozparsuje feature a zařadí vstupy vzorce do sloupců příslušného výpočtu."""
+    feature = slot.feature
+    feature_type = feature.get("type", "unknown")
+    detail = feature.get("detail", "")
+    count = feature.get("count", 1)
+
+    # Get DB operation mapping from feature_types catalog
+    db_operation = get_operation_for_feature(feature_type)
+
+    # Skip informational features
+    if db_operation is None and feature_type not in CONSTANT_TIMES:
+        # Check if it's a known info-only feature
+        if feature_type in FEATURE_TYPES:
+            slot.entry = {
+                "type": feature_type,
+                "detail": detail,
+                "count": count,
+                "time_sec": 0.0,
+                "method": "informational (no machining time)"
+            }
+        else:
+            slot.warnings.append(f"Unknown feature type: {feature_type}")
+        return
+
+    # Constant time features
+    if feature_type in CONSTANT_TIMES:
+        slot.time_sec = CONSTANT_TIMES[feature_type] * 60 * count  # Convert min to sec
+        slot.method = f"constant {CONSTANT_TIMES[feature_type]} min"
+        return
+
+    operation_type, operation = db_operation
+
+    # Get cutting conditions
+    conditions = _cached_conditions(material_group, operation_type, operation, cutting_mode)
+
+    if not conditions:
+        # Try fallback
+        if operation == "hrubovani":
+            conditions = _cached_conditions(material_group, operation_type, "dokoncovani", cutting_mode)
+            if conditions:
+                slot.warnings.append(f"Using 'dokoncovani' as fallback for {feature_type}")
+
+        if not conditions:
+            slot.warnings.append(
+                f"No cutting conditions for {feature_type} "
+                f"(material={material_group}, op={operation_type}/{operation})"
+            )
+            return
+
+    # Extract dimensions from detail (one tokenizer pass, cached per string)
+    dims = parse_detail(detail)
+    diameter, length, width, depth = dims.diameter, dims.length, dims.width, dims.depth
+
+    # Calculate based on feature type
+    if operation_type == "turning":
+        # For turning, if no length specified, assume default based on diameter
+        if diameter:
+            turn_length = length if length else diameter  # Default to diameter if no length
+            inputs = [diameter, turn_length, conditions.get("Vc", 220), conditions.get("f", 0.25)]
+            slot.method = f"turning Vc={conditions.get('Vc')} f={conditions.get('f')}"
+        else:
+            slot.warnings.append(f"Missing diameter for turning: {detail}")
+            return
+
+    elif operation_type == "drilling":
+        # For drilling, if no depth specified, assume 2× diameter
+        if diameter:
+            drill_depth = depth if depth else (diameter * 2)
+            inputs = [diameter, drill_depth, conditions.get("Vc", 90), conditions.get("f", 0.2)]
+            slot.method = f"drilling Vc={conditions.get('Vc')} f={conditions.get('f')}"
+        else:
+            slot.warnings.append(f"Missing diameter for drilling: {detail}")
+            return
+
+    elif operation_type == "threading":
+        if diameter:
+            thread_length = length if length else (diameter * 1.5)  # Default to 1.5× diameter
+            thread_pitch = dims.pitch if dims.pitch else 1.5  # Default pitch
+            inputs = [diameter, thread_length, thread_pitch, conditions.get("Vc", 80)]
+            slot.method = f"threading Vc={conditions.get('Vc')} pitch={thread_pitch}"
+        else:
+            slot.warnings.append(f"Missing diameter for threading: {detail}")
+            return
+
+    elif operation_type == "milling":
+        if length and depth:
+            inputs = [
+                length, depth,
+                conditions.get("Vc", 160), conditions.get("fz", 0.1), conditions.get("Ap", 2.0),
+            ]
+            slot.method = f"milling Vc={conditions.get('Vc')} fz={conditions.get('fz')}"
+        else:
+            slot.warnings.append(f"Missing dimensions for milling: {detail}")
+            return
+
+    elif operation_type == "grooving":
+        if diameter and width:
+            # Simplified: groove width as "length", single pass → turning formula
+            operation_type = "turning"
+            inputs = [diameter, width, conditions.get("Vc", 130), conditions.get("f", 0.08)]
+            slot.method = f"grooving Vc={conditions.get('Vc')} f={conditions.get('f')}"
+        else:
+            slot.warnings.append(f"Missing dimensions for grooving: {detail}")
+            return
+
+    else:
+        return
+
+    rows = columns.setdefault(operation_type, [])
+    slot.formula = operation_type
+    slot.row = len(rows)
+    rows.append([float(v) for v in inputs])
+
+
+def calculate_features_time_batch(
+    jobs: Sequence[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """Calculate machining time for many feature lists at once.
+
+    Each job has the keyword arguments of calculate_features_time
+    (features_json, material_group, cutting_mode="mid", part_type="PRI");
+    results are in the same order and identical to calling it per job.
+
+    Detail stringy se parsují jedním tokenizerem (cache per string), řezné
+    podmínky se memoizují a časy soustružení / vrtání / frézování / závitů
+    se počítají najednou nad numpy poli pro všechny joby.
+
+    Returns:
+        List of result dicts (see calculate_features_time).
+    """
+    prepared: List[Tuple[str, str, List[str], List[_FeatureSlot]]] = []
+    columns: Dict[str, List[List[float]]] = {}  # formula → řádky vstupů
+
+    for job in jobs:
+        material_group = job["material_group"]
+        cutting_mode = job.get("cutting_mode", "mid")
+        job_warnings: List[str] = []
+
+        # Validate material group
+        if material_group not in MATERIAL_GROUP_MAP:
+            material_group = "20910004"  # Default to konstrukční ocel
+            job_warnings.append(
+                f"Unknown material group, defaulting to {material_group} "
+                f"({MATERIAL_GROUP_MAP[material_group]['name']})"
+            )
+
+        slots = []
+        for feature in job["features_json"]:
+            slot = _FeatureSlot(feature)
+            try:
+                _prepare_feature(slot, material_group, cutting_mode, columns)
+            except Exception as e:
+                slot.warnings.append(slot.error(e))
+            slots.append(slot)
+        prepared.append((material_group, cutting_mode, job_warnings, slots))
+
+    # One vectorized evaluation per formula over all jobs
+    times_min: Dict[str, List[float]] = {}
+    for formula, rows in columns.items():
+        matrix = np.array(rows, dtype=np.float64)
+        times_min[formula] = _ARRAY_FORMULAS[formula](*matrix.T).tolist()
+
+    results = []
+    for material_group, cutting_mode, warnings, slots in prepared:
+        feature_times = []
+        total_time_sec = 0.0
+        for slot in slots:
+            warnings.extend(slot.warnings)
+            if slot.entry is not None:
+                feature_times.append(slot.entry)
+                continue
+            try:
+                time_sec = slot.time_sec
+                if slot.formula is not None:
+                    time_min = times_min[slot.formula][slot.row]
+                    time_sec = time_min * 60 * slot.feature.get("count", 1)
+
+                # Add to results
+                if time_sec > 0:
+                    total_time_sec += time_sec
                     feature_times.append({
-                        "type": feature_type,
-                        "detail": detail,
-                        "count": count,
-                        "time_sec": 0.0,
-                        "method": "informational (no machining time)"
+                        "type": slot.feature.get("type", "unknown"),
+                        "detail": slot.feature.get("detail", ""),
+                        "count": slot.feature.get("count", 1),
+                        "location": slot.feature.get("location", ""),
+                        "time_sec": round(time_sec, 2),
+                        "method": slot.method
                     })
-                else:
-                    warnings.append(f"Unknown feature type: {feature_type}")
-                continue
-
-            # Calculate time for this feature
-            time_sec = 0.0
-            method = ""
-
-            # Constant time features
-            if feature_type in CONSTANT_TIMES:
-                time_sec = CONSTANT_TIMES[feature_type] * 60 * count  # Convert min to sec
-                method = f"constant {CONSTANT_TIMES[feature_type]} min"
-
-            # Features requiring cutting conditions lookup
-            elif db_operation:
-                operation_type, operation = db_operation
-
-                # Get cutting conditions
-                conditions = get_catalog_conditions(
-                    material_group,
-                    operation_type,
-                    operation,
-                    cutting_mode
-                )
-
-                if not conditions:
-                    # Try fallback
-                    if operation == "hrubovani":
-                        conditions = get_catalog_conditions(
-                            material_group, operation_type, "dokoncovani", cutting_mode
-                        )
-                        if conditions:
-                            warnings.append(
-                                f"Using 'dokoncovani' as fallback for {feature_type}"
-                            )
-
-                    if not conditions:
-                        warnings.append(
-                            f"No cutting conditions for {feature_type} "
-                            f"(material={material_group}, op={operation_type}/{operation})"
-                        )
-                        continue
-
-                # Extract dimensions from detail
-                diameter = parse_diameter(detail)
-                length = parse_length(detail)
-                width = parse_width(detail)
-                depth = parse_depth(detail)
-                pitch = parse_thread_pitch(detail)
-
-                # Calculate based on feature type
-                if operation_type == "turning":
-                    # For turning, if no length specified, assume default based on diameter
-                    if diameter:
-                        turn_length = length if length else diameter  # Default to diameter if no length
-                        time_min = calc_turning_time(
-                            diameter, turn_length,
-                            conditions.get("Vc", 220),
-                            conditions.get("f", 0.25),
-                            conditions.get("Ap", 2.5)
-                        )
-                        time_sec = time_min * 60 * count
-                        method = f"turning Vc={conditions.get('Vc')} f={conditions.get('f')}"
-                    else:
-                        warnings.append(f"Missing diameter for turning: {detail}")
-
-                elif operation_type == "drilling":
-                    # For drilling, if no depth specified, assume 2× diameter
-                    if diameter:
-                        drill_depth = depth if depth else (diameter * 2)
-                        time_min = calc_drilling_time(
-                            diameter, drill_depth,
-                            conditions.get("Vc", 90),
-                            conditions.get("f", 0.2)
-                        )
-                        time_sec = time_min * 60 * count
-                        method = f"drilling Vc={conditions.get('Vc')} f={conditions.get('f')}"
-                    else:
-                        warnings.append(f"Missing diameter for drilling: {detail}")
-
-                elif operation_type == "threading":
-                    if diameter:
-                        thread_length = length if length else (diameter * 1.5)  # Default to 1.5× diameter
-                        thread_pitch = pitch if pitch else 1.5  # Default pitch
-                        time_min = calc_threading_time(
-                            diameter, thread_length, thread_pitch,
-                            conditions.get("Vc", 80)
-                        )
-                        time_sec = time_min * 60 * count
-                        method = f"threading Vc={conditions.get('Vc')} pitch={thread_pitch}"
-                    else:
-                        warnings.append(f"Missing diameter for threading: {detail}")
-
-                elif operation_type == "milling":
-                    if length and depth:
-                        # Use width if available, else assume tool width
-                        w = width or 10.0
-                        time_min = calc_milling_time(
-                            length, w, depth,
-                            conditions.get("Vc", 160),
-                            conditions.get("fz", 0.1),
-                            conditions.get("Ap", 2.0)
-                        )
-                        time_sec = time_min * 60 * count
-                        method = f"milling Vc={conditions.get('Vc')} fz={conditions.get('fz')}"
-                    else:
-                        warnings.append(f"Missing dimensions for milling: {detail}")
-
-                elif operation_type == "grooving":
-                    if diameter and width:
-                        # Simplified: groove width as "length"
-                        time_min = calc_turning_time(
-                            diameter, width,
-                            conditions.get("Vc", 130),
-                            conditions.get("f", 0.08),
-                            1.0  # Single pass for grooving
-                        )
-                        time_sec = time_min * 60 * count
-                        method = f"grooving Vc={conditions.get('Vc')} f={conditions.get('f')}"
-                    else:
-                        warnings.append(f"Missing dimensions for grooving: {detail}")
-
-            # Add to results
-            if time_sec > 0:
-                total_time_sec += time_sec
-                feature_times.append({
-                    "type": feature_type,
-                    "detail": detail,
-                    "count": count,
-                    "location": location,
-                    "time_sec": round(time_sec, 2),
-                    "method": method
-                })
-
-        except Exception as e:
-            warnings.append(f"Error calculating {feature.get('type', 'unknown')}: {str(e)}")
-            logger.exception(f"Feature calculation error for {feature}")
-
-    return {
-        "calculated_time_min": round(total_time_sec / 60, 2),
-        "feature_times": feature_times,
-        "warnings": warnings,
-        "cutting_mode": cutting_mode,
-        "material_group": material_group,
-    }
+            except Exception as e:
+                warnings.append(slot.error(e))
+
+        results.append({
+            "calculated_time_min": round(total_time_sec / 60, 2),
+            "feature_times": feature_times,
+            "warnings": warnings,
+            "cutting_mode": cutting_mode,
+            "material_group": material_group,
+        })
+
+    return results
@@ -0,0 +1,222 @@
+"""GESTIMA - HTTP odpovědi pro soubory (ETag, 304, Range)
+
+Společné pro FileService.serve_file, mount /uploads a PDF endpoint time-vision.
+
+- silný ETag z SHA-256 (FileRecord.file_hash / jméno blobu), jinak z velikosti + mtime
+- If-None-Match → 304, If-Range
+- jeden Range "bytes=a-b" / "bytes=a-" / "bytes=-n" → 206 (pdf.js načítá stránky
+  postupně), nesplnitelný → 416; více rozsahů → celý soubor 200 (RFC 9110 dovoluje)
+- celý soubor jde přes starlette FileResponse (ASGI pathsend → sendfile, pokud
+  server rozšíření nabízí), část souboru po 1 MB blocích v threadu
+- content-addressed URL (?v=<hash>, /uploads/.blobs/..) → Cache-Control immutable
+
+Usage:
+    return file_response(request, path, media_type="application/pdf", etag=strong_etag(record.file_hash))
+"""
+
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import anyio
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from fastapi.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+CACHE_REVALIDATE = "private, no-cache"  # vždy ověřit ETagem (levné 304)
+CACHE_IMMUTABLE = "private, max-age=31536000, immutable"
+
+_RANGE_CHUNK = 1024 * 1024
+_SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def strong_etag(file_hash: str) -> str:
+    """SHA-256 obsahu → silný ETag."""
+    return f'"{file_hash}"'
+
+
+def stat_etag(stat_result: os.stat_result) -> str:
+    """ETag pro soubory bez hashe v DB (mění se s obsahem i při přepsání)."""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match (slabé porovnání, seznam i "*")."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in header.split(","))
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Range hlavička → (start, end) včetně konce.
+
+    Returns:
+        None: hlavičku ignorovat (neznámá jednotka, více rozsahů, chybná syntaxe)
+
+    Raises:
+        ValueError: rozsah nelze splnit (→ 416)
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first.isdigit() or first == "") or not (last.isdigit() or last == ""):
+        return None
+
+    if first == "":
+        if last == "":
+            return None
+        suffix = int(last)  # posledních N bajtů
+        if suffix == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    end = int(last) if last else size - 1
+    return start, min(end, size - 1)
+
+
+class PartialFileResponse(Response):
+    """206 Partial Content — čte jen požadovaný úsek souboru."""
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        start: int,
+        length: int,
+        media_type: str,
+        headers: Optional[dict] = None,
+    ):
+        self.path = path
+        self.start = start
+        self.length = length
+        self.status_code = 206
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+        self.headers["content-length"] = str(length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await f.read(min(_RANGE_CHUNK, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # Soubor se zkrátil během odesílání — ukončit tělo
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def file_response(
+    request: Optional[Request],
+    path: Union[str, Path],
+    *,
+    media_type: str,
+    etag: Optional[str] = None,
+    filename: Optional[str] = None,
+    immutable: bool = False,
+    content_disposition_type: str = "inline",
+    stat_result: Optional[os.stat_result] = None,
+) -> Response:
+    """
+    Odpověď se souborem: 304 / 206 / 416 / 200 podle podmíněných a Range hlaviček.
+
+    Args:
+        request: HTTP request (None → vždy celý soubor, jen cache hlavičky)
+        path: Cesta k souboru na disku
+        media_type: Content-Type
+        etag: ETag (default: stat_etag)
+        filename: Název pro Content-Disposition
+        immutable: URL je content-addressed → dlouhodobá cache bez revalidace
+        stat_result: Předem získaný os.stat (ušetří syscall)
+    """
+    stat_result = stat_result or os.stat(path)
+    size = stat_result.st_size
+    etag = etag or stat_etag(stat_result)
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": CACHE_IMMUTABLE if immutable else CACHE_REVALIDATE,
+    }
+
+    if request is not None:
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and (if_range is None or if_range.strip() == etag):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+            if byte_range is not None:
+                start, end = byte_range
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+                return PartialFileResponse(path, start, end - start + 1, media_type, headers)
+
+    return FileResponse(
+        path=str(path),
+        media_type=media_type,
+        filename=filename,
+        headers=headers,
+        stat_result=stat_result,
+        content_disposition_type=content_disposition_type,
+    )
+
+
+class CachingStaticFiles(StaticFiles):
+    """
+    StaticFiles s ETag/304/Range z file_response.
+
+    Soubory v `content_addressed_dir` (jméno = SHA-256 obsahu) dostanou silný
+    ETag z názvu a immutable cache.
+    """
+
+    def __init__(self, *args, content_addressed_dir: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.content_addressed_dir = content_addressed_dir
+
+    def file_response(
+        self,
+        full_path: Union[str, "os.PathLike[str]"],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        if status_code != 200:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        path = Path(full_path)
+        content_addressed = (
+            self.content_addressed_dir is not None
+            and path.parent.parent.name == self.content_addressed_dir
+            and _SHA256_RE.fullmatch(path.name) is not None
+        )
+        return file_response(
+            Request(scope),
+            path,
+            media_type=mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+            etag=strong_etag(path.name) if content_addressed else None,
+            immutable=content_addressed,
+            stat_result=stat_result,
+        )
@@ -5,36 +5,70 @@ NO business logic (primary drawing, TimeVision matching, etc.).
 
 Features:
 - Magic bytes validation (security-critical)
-- SHA-256 hash for integrity
+- SHA-256 hash for integrity (computed while streaming, 1 MB buffer)
+- Content-addressed blob store: uploads/.blobs/<hh>/<sha256>, each content
+  stored once; FileRecord.file_path is a hardlink to the blob (existing
+  readers keep using UPLOADS_DIR / file_path). Refcount of a blob = active
+  FileRecords with that hash; unreferenced blobs are garbage-collected.
 - Soft delete via FileRecord.deleted_at
-- Temp file cleanup via status field
+- Temp file cleanup via status field (+ blob GC)
 - Orphan detection (files without links)
 - Path traversal prevention
 - File size limits
+- Serving with strong ETag (file_hash), 304 and Range (see file_response)
 
 Business logic STAYS in respective routers/services.
 """
 
+import asyncio
 import hashlib
 import logging
 import os
 import re
 import shutil
+import tempfile
+import time
 import uuid
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
-from fastapi import HTTPException, UploadFile
-from fastapi.responses import FileResponse
-from sqlalchemy import select, and_, text
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import Response
+from sqlalchemy import func, select, and_, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.models.file_record import FileRecord, FileLink
+from app.services.file_response import file_response, strong_etag
 
 logger = logging.getLogger(__name__)
 
+BLOBS_DIR_NAME = ".blobs"
+_STREAM_CHUNK = 1024 * 1024  # 1 MB (hash + kopie)
+_INCOMING_PREFIX = ".incoming-"
+_INCOMING_MAX_AGE_SECONDS = 3600  # nedokončené zápisy (pád procesu) → GC
+
+
+@dataclass
+class PreparedFile:
+    """File validated, hashed and linked under uploads/ — DB record not created yet."""
+    file_hash: str
+    file_path: Path
+    relative_path: str
+    original_filename: str
+    file_size: int
+    file_type: str
+    mime_type: str
+
+    def discard(self) -> None:
+        """Remove the logical path (record will not be created); blob is left to GC."""
+        try:
+            self.file_path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to discard prepared file {self.file_path}: {e}")
+
 
 class FileService:
     """
@@ -107,13 +141,14 @@ class FileService:
         2. Validate allowed_types (if provided)
         3. Validate magic bytes (for pdf, step)
         4. Validate file size
-        5. Save to disk: uploads/{directory}/{sanitized_filename}
-        6. Calculate SHA-256 hash
+        5. Stream to blob store, SHA-256 computed while writing
+           (content already stored → temp copy discarded)
+        6. Hardlink uploads/{directory}/{sanitized_filename} → blob
         7. Create FileRecord in DB
         8. Return FileRecord
 
         Transaction handling (L-008):
-        - If DB fails → delete file from disk (compensating transaction)
+        - If DB fails → delete file (link) from disk (compensating transaction)
         - Commit handled by CALLER
 
         Args:
@@ -150,38 +185,22 @@ class FileService:
         # 4. Validate file size
         file_size = await self._validate_file_size_upload(file, file_type)
 
-        # 5. Save to disk
-        target_dir = self._ensure_directory(directory)
-        safe_filename = self._sanitize_filename(file.filename)
-
-        # Handle duplicate filenames (add UUID suffix)
-        file_path = target_dir / safe_filename
-        if file_path.exists():
-            stem = file_path.stem
-            suffix = file_path.suffix
-            unique_suffix = str(uuid.uuid4())[:8]
-            safe_filename = f"{stem}_{unique_suffix}{suffix}"
-            file_path = target_dir / safe_filename
+        # 5. Blob: hash během streamování do úložiště (uložen jednou pod hashem)
+        try:
+            file_hash = self._store_blob_from_stream(file.file)
+        except Exception as e:
+            logger.error(f"Failed to save file to disk: {e}", exc_info=True)
+            raise HTTPException(status_code=500, detail="Failed to save file to disk")
 
-        # Save file to disk (atomic: write to temp, then rename)
+        # 6. Logical path → hardlink na blob
+        safe_filename, file_path = self._unique_target(directory, self._sanitize_filename(file.filename))
         try:
-            import tempfile
-            fd, tmp_path = tempfile.mkstemp(dir=str(target_dir), suffix=file_path.suffix)
-            try:
-                with os.fdopen(fd, "wb") as buffer:
-                    shutil.copyfileobj(file.file, buffer)
-                os.replace(tmp_path, str(file_path))
-            except Exception:
-                os.unlink(tmp_path)
-                raise
+            self._link_blob(file_hash, file_path)
             logger.info(f"Saved file to disk: {file_path} ({file_size} bytes)")
         except Exception as e:
             logger.error(f"Failed to save file to disk: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail="Failed to save file to disk")
 
-        # 6. Calculate hash
-        file_hash = self._calculate_hash(file_path)
-
         # 7. Create DB record
         relative_path = f"{directory}/{safe_filename}"
         mime_type = self.MIME_TYPES.get(file_type, "application/octet-stream")
@@ -225,25 +244,60 @@ class FileService:
         db: AsyncSession,
         *,
         allowed_types: Optional[list[str]] = None,
-        created_by: Optional[str] = None
+        created_by: Optional[str] = None,
+        original_filename: Optional[str] = None,
     ) -> FileRecord:
         """
         Store file from local path (copy to uploads) and create DB record.
 
         Used for batch import from network shares where files already exist on disk.
         Unlike store() which receives UploadFile, this copies from a Path.
+        Validation, hashing and copying run in a worker thread (prepare_from_path),
+        only the DB insert runs on the event loop (record_prepared).
 
         Transaction handling (L-008):
         - If DB fails → delete copy from disk (compensating transaction)
         - Commit handled by CALLER
         """
+        prepared = await asyncio.to_thread(
+            self.prepare_from_path,
+            source_path,
+            directory,
+            allowed_types=allowed_types,
+            original_filename=original_filename,
+        )
+        return await self.record_prepared(prepared, db, created_by=created_by)
+
+    def prepare_from_path(
+        self,
+        source_path: Path,
+        directory: str,
+        *,
+        allowed_types: Optional[list[str]] = None,
+        original_filename: Optional[str] = None,
+    ) -> PreparedFile:
+        """
+        Validate + hash + store file on disk, without touching the DB (blocking, thread-safe).
+
+        Args:
+            source_path: File to import
+            directory: Target directory under uploads/
+            allowed_types: Optional type whitelist
+            original_filename: Name to record instead of source_path.name
+                (e.g. source file downloaded to a temp path)
+
+        Returns:
+            PreparedFile: pass to record_prepared(), or discard() it
+        """
         import unicodedata
 
         if not source_path.exists():
             raise HTTPException(status_code=400, detail=f"Source file not found: {source_path.name}")
 
+        original_filename = original_filename or source_path.name
+
         # 1. Detect file type
-        file_type = self._detect_file_type(source_path.name)
+        file_type = self._detect_file_type(original_filename)
 
         # 2. Validate allowed types
         if allowed_types and file_type not in allowed_types:
@@ -260,46 +314,60 @@ class FileService:
         file_size = source_path.stat().st_size
 
         # 5. Sanitize filename (normalize diacritics to ASCII for safety)
-        original_filename = source_path.name
         normalized = unicodedata.normalize('NFD', original_filename)
         ascii_name = normalized.encode('ascii', 'ignore').decode('ascii')
         if not ascii_name or not Path(ascii_name).stem:
-            ascii_name = f"file_{uuid.uuid4().hex[:8]}{source_path.suffix.lower()}"
+            ascii_name = f"file_{uuid.uuid4().hex[:8]}{Path(original_filename).suffix.lower()}"
         safe_filename = self._sanitize_filename(ascii_name)
 
-        # 6. Copy to uploads directory
-        target_dir = self._ensure_directory(directory)
-        file_path = target_dir / safe_filename
-
-        if file_path.exists():
-            stem = file_path.stem
-            suffix = file_path.suffix
-            unique_suffix = str(uuid.uuid4())[:8]
-            safe_filename = f"{stem}_{unique_suffix}{suffix}"
-            file_path = target_dir / safe_filename
-
+        # 6. Blob (hash během kopírování; obsah, který už v úložišti je, se nezapisuje znovu)
         try:
-            shutil.copy2(str(source_path), str(file_path))
-            logger.info(f"Copied file from share: {source_path.name} -> {file_path} ({file_size} bytes)")
+            with source_path.open("rb") as src:
+                file_hash = self._store_blob_from_stream(src)
+            safe_filename, file_path = self._unique_target(directory, safe_filename)
+            try:
+                self._link_blob(file_hash, file_path)
+            except FileExistsError:
+                # Souběžný import stejného názvu do stejného adresáře
+                safe_filename, file_path = self._unique_target(directory, safe_filename)
+                self._link_blob(file_hash, file_path)
+            logger.info(f"Copied file from share: {original_filename} -> {file_path} ({file_size} bytes)")
         except Exception as e:
             logger.error(f"Failed to copy file from share: {e}", exc_info=True)
-            raise HTTPException(status_code=500, detail=f"Failed to copy file: {source_path.name}")
-
-        # 7. Calculate hash
-        file_hash = self._calculate_hash(file_path)
+            raise HTTPException(status_code=500, detail=f"Failed to copy file: {original_filename}")
+
+        return PreparedFile(
+            file_hash=file_hash,
+            file_path=file_path,
+            relative_path=f"{directory}/{safe_filename}",
+            original_filename=original_filename,
+            file_size=file_size,
+            file_type=file_type,
+            mime_type=self.MIME_TYPES.get(file_type, "application/octet-stream"),
+        )
 
-        # 8. Create DB record
-        relative_path = f"{directory}/{safe_filename}"
-        mime_type = self.MIME_TYPES.get(file_type, "application/octet-stream")
+    async def record_prepared(
+        self,
+        prepared: PreparedFile,
+        db: AsyncSession,
+        *,
+        created_by: Optional[str] = None,
+    ) -> FileRecord:
+        """
+        Create FileRecord for a prepared file.
 
+        Transaction handling (L-008):
+        - If DB fails → delete file from disk (compensating transaction)
+        - Commit handled by CALLER
+        """
         try:
             record = FileRecord(
-                file_hash=file_hash,
-                file_path=relative_path,
-                original_filename=original_filename,
-                file_size=file_size,
-                file_type=file_type,
-                mime_type=mime_type,
+                file_hash=prepared.file_hash,
+                file_path=prepared.relative_path,
+                original_filename=prepared.original_filename,
+                file_size=prepared.file_size,
+                file_type=prepared.file_type,
+                mime_type=prepared.mime_type,
                 status="active",
                 created_by=created_by,
                 updated_by=created_by
@@ -308,17 +376,14 @@ class FileService:
             await db.flush()
 
             logger.info(
-                f"Created FileRecord from path: ID={record.id}, path='{relative_path}', "
-                f"type={file_type}, size={file_size}, hash={file_hash[:16]}..."
+                f"Created FileRecord from path: ID={record.id}, path='{prepared.relative_path}', "
+                f"type={prepared.file_type}, size={prepared.file_size}, hash={prepared.file_hash[:16]}..."
             )
             return record
 
-        except Exception as e:
-            logger.error(f"DB insert failed, deleting copy: {file_path}", exc_info=True)
-            try:
-                file_path.unlink()
-            except Exception as cleanup_error:
-                logger.error(f"Failed to cleanup file after DB error: {cleanup_error}")
+        except Exception:
+            logger.error(f"DB insert failed, deleting copy: {prepared.file_path}", exc_info=True)
+            prepared.discard()
             raise HTTPException(status_code=500, detail="Failed to create file record in database")
 
     async def store_from_bytes(
@@ -342,10 +407,10 @@ class FileService:
         2. Validate allowed_types (if provided)
         3. Validate magic bytes directly from content bytes
         4. Validate file size from len(content)
-        5. Sanitize filename and write bytes to uploads/{directory}/{safe_filename}
-        6. Calculate SHA-256 hash from disk
-        7. Create FileRecord in DB
-        8. Return FileRecord
+        5. SHA-256 from content, write blob only if missing,
+           hardlink uploads/{directory}/{safe_filename} → blob
+        6. Create FileRecord in DB
+        7. Return FileRecord
 
         Transaction handling (L-008):
         - If DB insert fails → delete file from disk (compensating transaction)
@@ -386,38 +451,17 @@ class FileService:
         # 4. Validate file size from len(content)
         file_size = self._validate_file_size_from_bytes(content, file_type)
 
-        # 5. Sanitize filename and resolve target path
-        safe_filename = self._sanitize_filename(filename)
-        target_dir = self._ensure_directory(directory)
-        file_path = target_dir / safe_filename
-
-        if file_path.exists():
-            stem = file_path.stem
-            suffix = file_path.suffix
-            unique_suffix = str(uuid.uuid4())[:8]
-            safe_filename = f"{stem}_{unique_suffix}{suffix}"
-            file_path = target_dir / safe_filename
-
-        # Write bytes to disk (atomic: write to temp, then rename)
+        # 5. Blob (hash z paměti; existující obsah se nezapisuje) + logical path
+        safe_filename, file_path = self._unique_target(directory, self._sanitize_filename(filename))
         try:
-            import tempfile
-            fd, tmp_path = tempfile.mkstemp(dir=str(target_dir), suffix=file_path.suffix)
-            try:
-                with os.fdopen(fd, "wb") as buffer:
-                    buffer.write(content)
-                os.replace(tmp_path, str(file_path))
-            except Exception:
-                os.unlink(tmp_path)
-                raise
+            file_hash = self._store_blob_from_bytes(content)
+            self._link_blob(file_hash, file_path)
             logger.info(f"Wrote bytes to disk: {file_path} ({file_size} bytes)")
         except Exception as e:
             logger.error(f"Failed to write bytes to disk: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail="Failed to save file to disk")
 
-        # 6. Calculate hash from disk
-        file_hash = self._calculate_hash(file_path)
-
-        # 7. Create DB record
+        # 6. Create DB record
         relative_path = f"{directory}/{safe_filename}"
         mime_type = self.MIME_TYPES.get(file_type, "application/octet-stream")
 
@@ -929,7 +973,8 @@ class FileService:
         """
         Delete temp files (status='temp') older than max_age_hours.
 
-        Deletes from both disk and DB.
+        Deletes from both disk and DB. Blobs left without any reference
+        (refcount 0, no other link on disk) are deleted as well.
 
         Transaction handling (L-008):
         - Commit handled by CALLER
@@ -973,9 +1018,10 @@ class FileService:
                 deleted_count += 1
 
             if deleted_count > 0:
+                freed = await self.release_blobs(db, {r.file_hash for r in expired_files})
                 logger.info(
                     f"Cleanup: deleted {deleted_count} temp files "
-                    f"(older than {max_age_hours}h)"
+                    f"(older than {max_age_hours}h), freed {freed} bytes of blobs"
                 )
 
             return deleted_count
@@ -988,6 +1034,7 @@ class FileService:
         self,
         db: AsyncSession,
         include_linked_to_deleted: bool = False,
+        reclaimable_only: bool = False,
     ) -> list[FileRecord]:
         """
         Find files without any active FileLink (excluding temp files).
@@ -997,6 +1044,8 @@ class FileService:
             include_linked_to_deleted: When True, also return files whose only
                 active FileLinks point to soft-deleted entities (parts etc.).
                 Useful for cleanup of drawings belonging to deleted/archived parts.
+            reclaimable_only: When True, return only orphans whose blob is not
+                shared with a non-orphan record (deleting them frees disk space).
 
         Returns:
             list[FileRecord]: Orphaned files
@@ -1047,29 +1096,49 @@ class FileService:
                     )
                 )
 
-            orphans = result.scalars().all()
+            orphans = list(result.scalars().all())
+
+            if reclaimable_only and orphans:
+                refcounts = await self.blob_refcounts(db, {r.file_hash for r in orphans})
+                orphan_refs: dict[str, int] = {}
+                for record in orphans:
+                    orphan_refs[record.file_hash] = orphan_refs.get(record.file_hash, 0) + 1
+                orphans = [
+                    r for r in orphans
+                    if refcounts.get(r.file_hash, 0) <= orphan_refs[r.file_hash]
+                ]
 
             logger.info(
                 f"Found {len(orphans)} orphaned files "
                 f"(include_linked_to_deleted={include_linked_to_deleted})"
             )
 
-            return list(orphans)
+            return orphans
 
         except Exception as e:
             logger.error(f"Failed to find orphans: {e}", exc_info=True)
             return []
 
-    async def serve_file(self, file_id: int, db: AsyncSession) -> FileResponse:
+    async def serve_file(
+        self,
+        file_id: int,
+        db: AsyncSession,
+        request: Optional[Request] = None,
+    ) -> Response:
         """
         Serve file for download/preview.
 
+        - Strong ETag = file_hash, If-None-Match → 304
+        - Range requests → 206 (pdf.js progressive loading)
+        - ?v=<file_hash> (content-addressed URL) → immutable cache headers
+
         Args:
             file_id: File ID
             db: Database session
+            request: HTTP request (conditional / Range headers); None → full file
 
         Returns:
-            FileResponse: FastAPI file response
+            Response: FileResponse (200), partial (206) or 304/416
 
         Raises:
             HTTPException 404: File not found (DB or disk)
@@ -1078,19 +1147,26 @@ class FileService:
 
         # Check file exists on disk
         file_path = self.UPLOADS_DIR / record.file_path
-        if not file_path.exists():
+        try:
+            stat_result = file_path.stat()
+        except FileNotFoundError:
             logger.error(f"File missing on disk: {file_path}")
             raise HTTPException(
                 status_code=404,
                 detail="File not found on disk (orphaned record)"
             )
 
+        immutable = request is not None and request.query_params.get("v") == record.file_hash
+
         # content_disposition_type="inline" → browser shows PDF in-page (not download)
-        return FileResponse(
-            path=str(file_path),
+        return file_response(
+            request,
+            file_path,
             media_type=record.mime_type,
+            etag=strong_etag(record.file_hash),
             filename=record.original_filename,
-            content_disposition_type="inline",
+            immutable=immutable,
+            stat_result=stat_result,
         )
 
     # ==================== PRIVATE HELPERS ====================
@@ -1318,10 +1394,206 @@ class FileService:
         sha256_hash = hashlib.sha256()
         with file_path.open("rb") as f:
             # Read in chunks to avoid memory issues with large files
-            for byte_block in iter(lambda: f.read(4096), b""):
+            for byte_block in iter(lambda: f.read(_STREAM_CHUNK), b""):
                 sha256_hash.update(byte_block)
         return sha256_hash.hexdigest()
 
+    # ==================== BLOB STORE ====================
+
+    def _blob_path(self, file_hash: str) -> Path:
+        """uploads/.blobs/ab/abcdef... (content-addressed)."""
+        return self.UPLOADS_DIR / BLOBS_DIR_NAME / file_hash[:2] / file_hash
+
+    def _store_blob_from_stream(self, src) -> str:
+        """
+        Stream file object into the blob store, hashing while writing.
+
+        Returns:
+            str: SHA-256 hex digest (blob key)
+        """
+        blobs_dir = self.UPLOADS_DIR / BLOBS_DIR_NAME
+        blobs_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(blobs_dir), prefix=_INCOMING_PREFIX)
+        try:
+            sha256_hash = hashlib.sha256()
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: src.read(_STREAM_CHUNK), b""):
+                    sha256_hash.update(chunk)
+                    out.write(chunk)
+            file_hash = sha256_hash.hexdigest()
+            blob = self._blob_path(file_hash)
+            if blob.exists():
+                os.unlink(tmp_path)  # obsah už je uložen
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, str(blob))
+            return file_hash
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _store_blob_from_bytes(self, content: bytes) -> str:
+        """Store bytes as blob (write skipped when content already exists)."""
+        file_hash = hashlib.sha256(content).hexdigest()
+        blob = self._blob_path(file_hash)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(blob.parent), prefix=_INCOMING_PREFIX)
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    out.write(content)
+                os.replace(tmp_path, str(blob))
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+        return file_hash
+
+    def _link_blob(self, file_hash: str, target: Path) -> None:
+        """Create logical file path as hardlink to blob (copy if FS has no hardlinks).
+
+        NOTE: The copy fallback doubles disk use for every stored file (blob +
+        independent copy), and the blob is then never shared on disk — the
+        dedup only pays off on filesystems with hardlink support.
+        """
+        blob = self._blob_path(file_hash)
+        try:
+            os.link(blob, target)
+        except OSError as e:
+            if target.exists():
+                raise
+            logger.warning(f"Hardlink not supported ({e}), copying blob to {target}")
+            shutil.copyfile(blob, target)
+
+    def _unique_target(self, directory: str, safe_filename: str) -> tuple[str, Path]:
+        """Target path under directory; UUID suffix on name clash."""
+        target_dir = self._ensure_directory(directory)
+        file_path = target_dir / safe_filename
+        if file_path.exists():
+            stem = file_path.stem
+            suffix = file_path.suffix
+            unique_suffix = str(uuid.uuid4())[:8]
+            safe_filename = f"{stem}_{unique_suffix}{suffix}"
+            file_path = target_dir / safe_filename
+        return safe_filename, file_path
+
+    async def blob_refcounts(self, db: AsyncSession, hashes: set[str]) -> dict[str, int]:
+        """
+        Refcount per blob = number of active (not deleted) FileRecords with that hash.
+
+        Args:
+            db: Database session (pending changes are autoflushed)
+            hashes: Blob hashes to count
+
+        Returns:
+            dict: hash → refcount (missing = 0)
+        """
+        counts: dict[str, int] = {}
+        hash_list = sorted(hashes)
+        for i in range(0, len(hash_list), 500):
+            result = await db.execute(
+                select(FileRecord.file_hash, func.count(FileRecord.id))
+                .where(
+                    and_(
+                        FileRecord.file_hash.in_(hash_list[i:i + 500]),
+                        FileRecord.deleted_at.is_(None)
+                    )
+                )
+                .group_by(FileRecord.file_hash)
+            )
+            counts.update({h: n for h, n in result.all()})
+        return counts
+
+    async def release_blobs(self, db: AsyncSession, hashes: set[str]) -> int:
+        """
+        Delete blobs with refcount 0 and no other name on disk.
+
+        A blob is kept while any active FileRecord references it, or while a
+        file path still links to it (soft-deleted records keep their file —
+        see delete()).
+
+        Returns:
+            int: Bytes freed
+        """
+        if not hashes:
+            return 0
+        refcounts = await self.blob_refcounts(db, hashes)
+        freed = 0
+        for file_hash in hashes:
+            if refcounts.get(file_hash, 0) > 0:
+                continue
+            blob = self._blob_path(file_hash)
+            try:
+                st = blob.stat()
+            except FileNotFoundError:
+                continue
+            if st.st_nlink > 1:
+                continue
+            try:
+                blob.unlink()
+                freed += st.st_size
+                logger.debug(f"Released unreferenced blob {file_hash[:16]}...")
+            except OSError as e:
+                logger.warning(f"Failed to delete blob {blob}: {e}")
+        return freed
+
+    async def purge_deleted(self, db: AsyncSession, records: list[FileRecord]) -> int:
+        """
+        Remove files of soft-deleted records from disk and release their blobs.
+
+        Call after the soft delete is committed: the logical file path (hardlink
+        to the blob) is unlinked, then blobs left with refcount 0 and no other
+        name on disk are deleted. Active records are skipped.
+
+        Returns:
+            int: Bytes freed
+        """
+        hashes: set[str] = set()
+        for record in records:
+            if record.deleted_at is None:
+                continue
+            file_path = self.UPLOADS_DIR / record.file_path
+            try:
+                file_path.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"Failed to delete file {file_path}: {e}")
+                continue
+            hashes.add(record.file_hash)
+        return await self.release_blobs(db, hashes)
+
+    async def collect_garbage(self, db: AsyncSession) -> dict:
+        """
+        Sweep the blob store: remove unreferenced blobs and stale incoming temp files.
+
+        Returns:
+            dict: {"blobs_deleted": int, "bytes_freed": int}
+        """
+        blobs_dir = self.UPLOADS_DIR / BLOBS_DIR_NAME
+        if not blobs_dir.exists():
+            return {"blobs_deleted": 0, "bytes_freed": 0}
+
+        now = time.time()
+        candidates: set[str] = set()
+        freed = 0
+        for path in blobs_dir.rglob("*"):
+            if not path.is_file():
+                continue
+            if path.name.startswith(_INCOMING_PREFIX):
+                st = path.stat()
+                if now - st.st_mtime > _INCOMING_MAX_AGE_SECONDS:
+                    path.unlink(missing_ok=True)
+                    freed += st.st_size
+                continue
+            if path.stat().st_nlink <= 1:
+                candidates.add(path.name)
+
+        before = {h for h in candidates if self._blob_path(h).exists()}
+        freed += await self.release_blobs(db, candidates)
+        deleted = sum(1 for h in before if not self._blob_path(h).exists())
+        if deleted:
+            logger.info(f"Blob GC: deleted {deleted} blobs, freed {freed} bytes")
+        return {"blobs_deleted": deleted, "bytes_freed": freed}
+
     def _sanitize_filename(self, filename: str) -> str:
         """
         Sanitize filename to prevent path traversal attacks.
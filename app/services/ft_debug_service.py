@@ -4,10 +4,9 @@ Ports GT computation logic from scripts/generate_ft_v2_data.py to async SQLAlche
 Provides three main capabilities:
   1. list_eligible_parts — bulk GT computation + CV for all FT-eligible parts
   2. run_inference      — GPT-4.1 few-shot call + comparison with GT
-  3. export_jsonl       — JSONL bytes ready for OpenAI fine-tuning upload
+  3. export_examples    — FT examples for the streamed JSONL export (training_export)
 """
 
-import base64
 import json
 import logging
 import re
@@ -34,6 +33,8 @@ from app.schemas.ft_debug import (
     FtPartSummary,
     FtPartsResponse,
 )
+from app.services.pdf_raster import rasterize_pdf_sync
+from app.services.training_export import TrainingExample
 
 logger = logging.getLogger(__name__)
 
@@ -281,23 +282,13 @@ def _find_pdf_path(file_path: str) -> Optional[Path]:
 
 
 def _pdf_to_base64(pdf_path: Path) -> Optional[str]:
-    """Render first page of PDF to base64-encoded PNG. Returns None on failure."""
+    """Render first page of PDF to base64-encoded PNG. Returns None on failure.
+
+    Stejný render (300 DPI, strop MAX_IMAGE_DIMENSION) a sdílený raster cache
+    jako odhad přes openai_vision_service — trénovací obrázky = inference.
+    """
     try:
-        import fitz  # PyMuPDF
-
-        doc = fitz.open(str(pdf_path))
-        page = doc[0]
-        rect = page.rect
-        scale_w = MAX_IMAGE_DIMENSION / rect.width
-        scale_h = MAX_IMAGE_DIMENSION / rect.height
-        dpi = min(300, int(72 * min(scale_w, scale_h)))
-        dpi = max(dpi, 150)
-        zoom = dpi / 72.0
-        mat = fitz.Matrix(zoom, zoom)
-        pix = page.get_pixmap(matrix=mat, alpha=False)
-        png_bytes = pix.tobytes("png")
-        doc.close()
-        return base64.b64encode(png_bytes).decode("utf-8")
+        return rasterize_pdf_sync(pdf_path, max_pages=1, dpi=300, max_dim=MAX_IMAGE_DIMENSION)[0]
     except Exception as exc:
         logger.warning("PDF render failed for %s: %s", pdf_path, exc)
         return None
@@ -915,20 +906,21 @@ class FtDebugService:
             cost_estimate=round(cost_estimate, 4),
         )
 
-    async def export_jsonl(self, part_ids: list[int]) -> bytes:
-        """Generate JSONL bytes for download — OpenAI FT format.
+    async def export_examples(self, part_ids: list[int]) -> list[TrainingExample]:
+        """Build FT training examples (without images) for the given parts.
 
-        For each part: renders PDF to base64 PNG, builds training message triplet
-        (system + user_image + assistant_json).
+        For each part resolves GT, material and drawing PDF and prepares the
+        message triplet (system + user_image + assistant_json). The image is
+        rendered later while streaming (training_export).
 
         Args:
             part_ids: List of part IDs to include.
 
         Returns:
-            JSONL-encoded bytes (one JSON object per line).
+            Examples in part_ids order; parts without GT, PDF or material are skipped.
         """
         if not part_ids:
-            return b""
+            return []
 
         # Load part + file info
         parts_stmt = (
@@ -1040,8 +1032,8 @@ class FtDebugService:
             if pid not in fallback_by_part:
                 fallback_by_part[pid] = row["w_nr"]
 
-        # Build JSONL
-        lines: list[bytes] = []
+        # Build examples
+        examples: list[TrainingExample] = []
         skipped = 0
 
         for part_id in part_ids:
@@ -1079,17 +1071,12 @@ class FtDebugService:
                 skipped += 1
                 continue
 
-            # Find and render PDF
+            # Find PDF (render až při streamování)
             pdf_path = _find_pdf_path(part_row.get("file_path") or "")
             if not pdf_path:
                 skipped += 1
                 continue
 
-            img_b64 = _pdf_to_base64(pdf_path)
-            if not img_b64:
-                skipped += 1
-                continue
-
             # Build answer (matches few-shot format: material_norm key + real dimensions)
             stock_dims = {}
             if mat_row:
@@ -1120,38 +1107,18 @@ class FtDebugService:
                 ],
             }
 
-            ft_entry = {
-                "messages": [
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{img_b64}",
-                                    "detail": "high",
-                                },
-                            },
-                            {
-                                "type": "text",
-                                "text": "Analyzuj výkres a navrhni technologický postup.",
-                            },
-                        ],
-                    },
-                    {
-                        "role": "assistant",
-                        "content": json.dumps(answer, ensure_ascii=False),
-                    },
-                ]
-            }
-
-            lines.append(json.dumps(ft_entry, ensure_ascii=False).encode("utf-8"))
+            examples.append(TrainingExample(
+                key=f"part:{part_id}",
+                pdf_path=pdf_path,
+                system_prompt=SYSTEM_PROMPT,
+                user_text="Analyzuj výkres a navrhni technologický postup.",
+                answer=json.dumps(answer, ensure_ascii=False),
+            ))
 
         if skipped:
             logger.info("export_jsonl: skipped %d parts (no GT, PDF, or material)", skipped)
 
-        return b"\n".join(lines) + (b"\n" if lines else b"")
+        return examples
 
     # ── Private helpers ────────────────────────────────────────────────────────
 
@@ -1,12 +1,88 @@
-"""GESTIMA - Infor CloudSuite Industrial API Client"""
-
+"""GESTIMA - Infor CloudSuite Industrial API Client
+
+Aplikace používá sdílené instance přes get_shared_infor_client() — jeden
+connection pool (keep-alive, HTTP/2 pokud je nainstalován `h2`) a jeden token
+pro sync, workshop, planner i importery. Metriky požadavků per IDO viz
+InforRequestMetrics / infor_client_metrics().
+"""
+
+import asyncio
+import bisect
+import importlib.util
+import time
 import httpx
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime, timedelta
 import logging
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
+# HTTP/2 vyžaduje volitelný balíček `h2` (pip install httpx[http2])
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Hranice latency histogramu (ms); poslední bucket = vše nad 10 s
+_LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class InforRequestMetrics:
+    """Metriky HTTP požadavků per IDO (počty, latence, objem, stránky)."""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, ido_name: str) -> Dict[str, Any]:
+        entry = self._stats.get(ido_name)
+        if entry is None:
+            entry = self._stats[ido_name] = {
+                "requests": 0,
+                "errors": 0,
+                "bytes": 0,
+                "pages": 0,
+                "rows": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "latency_buckets": [0] * (len(_LATENCY_BUCKETS_MS) + 1),
+            }
+        return entry
+
+    def record_request(self, ido_name: str, elapsed_ms: float, size: int, error: bool = False) -> None:
+        entry = self._entry(ido_name)
+        entry["requests"] += 1
+        entry["bytes"] += size
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["latency_buckets"][bisect.bisect_left(_LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        if error:
+            entry["errors"] += 1
+
+    def record_page(self, ido_name: str, rows: int) -> None:
+        entry = self._entry(ido_name)
+        entry["pages"] += 1
+        entry["rows"] += rows
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Kopie metrik pro API/diagnostiku (histogram jako {"<=50ms": n, ...})."""
+        labels = [f"<={b}ms" for b in _LATENCY_BUCKETS_MS] + [f">{_LATENCY_BUCKETS_MS[-1]}ms"]
+        result = {}
+        for ido_name, entry in sorted(self._stats.items()):
+            requests = entry["requests"]
+            result[ido_name] = {
+                "requests": requests,
+                "errors": entry["errors"],
+                "bytes": entry["bytes"],
+                "pages": entry["pages"],
+                "rows": entry["rows"],
+                "avg_ms": round(entry["total_ms"] / requests, 1) if requests else 0.0,
+                "max_ms": round(entry["max_ms"], 1),
+                "latency_histogram": dict(zip(labels, entry["latency_buckets"])),
+            }
+        return result
+
+    def reset(self) -> None:
+        self._stats.clear()
+
 
 class InforAPIClient:
     """
@@ -41,7 +117,10 @@ class InforAPIClient:
         config: str = "TEST",
         username: str = "",
         password: str = "",
-        verify_ssl: bool = False  # Default False pro self-signed certs
+        verify_ssl: bool = False,  # Default False pro self-signed certs
+        max_connections: int = 4,
+        max_keepalive_connections: int = 4,
+        http2: bool = False,
     ):
         # ℹ️ READONLY LIVE: Čtení z live Inforu povoleno.
         # Zápisy (POST transakce) jsou blokované v workshop_router.py.
@@ -52,23 +131,69 @@ class InforAPIClient:
         self.password = password
         self.verify_ssl = verify_ssl
 
-        # Token cache
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.http2 = http2 and _HTTP2_AVAILABLE
+
+        # Token cache (single-flight: souběžné požadavky čekají na jeden /json/token)
         self._token: Optional[str] = None
         self._token_expires: Optional[datetime] = None
+        self._token_lock = asyncio.Lock()
 
         # Shared HTTP client (connection pool, reuse TCP/TLS)
         self._client: Optional[httpx.AsyncClient] = None
 
+        self.metrics = InforRequestMetrics()
+
     def _get_http_client(self) -> httpx.AsyncClient:
         """Vrátí sdílený httpx client (connection pool, reuse TCP/TLS)."""
         if self._client is None or self._client.is_closed:
             self._client = httpx.AsyncClient(
                 verify=self.verify_ssl,
                 timeout=60.0,
-                limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                ),
+                http2=self.http2,
             )
         return self._client
 
+    async def _send(self, method: str, url: str, *, metrics_key: str, **kwargs) -> httpx.Response:
+        """HTTP požadavek přes sdílený pool + záznam metrik.
+
+        Požadavek s tokenem, který server odmítne (401 — např. po restartu Inforu),
+        se jednou zopakuje s novým tokenem.
+        """
+        client = self._get_http_client()
+        headers = kwargs.pop("headers", None) or {}
+        for attempt in range(2):
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, headers=headers, **kwargs)
+            except Exception:
+                self.metrics.record_request(metrics_key, (time.perf_counter() - started) * 1000, 0, error=True)
+                raise
+            self.metrics.record_request(
+                metrics_key,
+                (time.perf_counter() - started) * 1000,
+                len(response.content),
+                error=response.status_code >= 400,
+            )
+            if response.status_code == 401 and "Authorization" in headers and attempt == 0:
+                logger.warning("Infor API 401 for %s — refreshing token", metrics_key)
+                self.invalidate_token(headers["Authorization"])
+                headers = {**headers, "Authorization": await self.get_token()}
+                continue
+            return response
+        return response
+
+    def invalidate_token(self, token: Optional[str] = None) -> None:
+        """Zneplatní cached token (jen pokud je to stále ten odmítnutý)."""
+        if token is None or token == self._token:
+            self._token = None
+            self._token_expires = None
+
     async def close(self) -> None:
         """Uzavře sdílený HTTP client."""
         if self._client and not self._client.is_closed:
@@ -81,16 +206,27 @@ class InforAPIClient:
         Token je cached a automaticky obnovován před expirací.
         """
         # Pokud máme platný token, vrátit ho
-        if self._token and self._token_expires and self._token_expires > datetime.now():
+        if self._token_valid():
             return self._token
 
-        # Jinak získat nový token
+        async with self._token_lock:
+            # Mezitím ho mohl získat jiný požadavek
+            if self._token_valid():
+                return self._token
+            return await self._fetch_token()
+
+    def _token_valid(self) -> bool:
+        return bool(self._token and self._token_expires and self._token_expires > datetime.now())
+
+    async def _fetch_token(self) -> str:
+        """Jeden /json/token round-trip (volat pod _token_lock)."""
         logger.info(f"Requesting new token from Infor API (config={self.config})")
 
-        client = self._get_http_client()
         try:
-            response = await client.get(
+            response = await self._send(
+                "GET",
                 f"{self.base_url}/json/token/{self.config}",
+                metrics_key="token",
                 headers={
                     "UserId": self.username,
                     "Password": self.password,
@@ -186,10 +322,11 @@ class InforAPIClient:
         log_params = {k: (v[:80] + "..." if isinstance(v, str) and len(v) > 80 else v) for k, v in params.items()}
         logger.info("LoadCollection: %s params=%s", ido_name, log_params)
 
-        client = self._get_http_client()
         try:
-            response = await client.get(
+            response = await self._send(
+                "GET",
                 url,
+                metrics_key=ido_name,
                 params=params,
                 headers={"Authorization": token},  # Infor: NO Bearer prefix
             )
@@ -246,6 +383,7 @@ class InforAPIClient:
                     result.append(row)
 
             logger.info(f"LoadCollection {ido_name}: {len(result)} rows")
+            self.metrics.record_page(ido_name, len(result))
 
             # Infor API stránkuje interně (typicky 200 řádků/stránku).
             # Bookmark existuje → jsou další stránky (nezáleží na record_cap).
@@ -282,10 +420,11 @@ class InforAPIClient:
 
         logger.debug(f"Getting IDO info for: {ido_name}")
 
-        client = self._get_http_client()
         try:
-            response = await client.get(
+            response = await self._send(
+                "GET",
                 f"{self.base_url}/json/idoinfo/{ido_name}",
+                metrics_key=ido_name,
                 headers={"Authorization": token},
                 timeout=30.0
             )
@@ -327,10 +466,11 @@ class InforAPIClient:
 
         logger.debug(f"Invoking method: {ido_name}.{method_name}({params})")
 
-        client = self._get_http_client()
         try:
-            response = await client.get(
+            response = await self._send(
+                "GET",
                 f"{self.base_url}/json/method/{ido_name}/{method_name}",
+                metrics_key=ido_name,
                 params=params,
                 headers={"Authorization": token},
                 timeout=30.0
@@ -369,10 +509,11 @@ class InforAPIClient:
 
         logger.debug(f"POST InvokeMethod: {ido_name}.{method_name}({parameters})")
 
-        client = self._get_http_client()
         try:
-            response = await client.post(
+            response = await self._send(
+                "POST",
                 f"{self.base_url}/json/method/{ido_name}/{method_name}",
+                metrics_key=ido_name,
                 json=body,
                 headers={
                     "Authorization": token,
@@ -420,11 +561,12 @@ class InforAPIClient:
         )
         logger.debug("InvokeMethod POST body: %s", body)
 
-        client = self._get_http_client()
         try:
             # Trailing slash required — Infor IIS returns 307 redirect without it
-            response = await client.post(
+            response = await self._send(
+                "POST",
                 f"{self.base_url}/json/method/{ido_name}/{method_name}/",
+                metrics_key=ido_name,
                 json=body,
                 headers={
                     "Authorization": token,
@@ -498,10 +640,11 @@ class InforAPIClient:
         # because it would encode commas as %2C which breaks Infor parsing.
         url = f"{self.base_url}/json/method/{ido_name}/{method_name}?parms={parms}"
 
-        client = self._get_http_client()
         try:
-            response = await client.get(
+            response = await self._send(
+                "GET",
                 url,
+                metrics_key=ido_name,
                 headers={"Authorization": token},
                 timeout=30.0
             )
@@ -551,10 +694,11 @@ class InforAPIClient:
 
         logger.debug(f"AddItem: {ido_name} with {list(properties.keys())}")
 
-        client = self._get_http_client()
         try:
-            response = await client.post(
+            response = await self._send(
+                "POST",
                 f"{self.base_url}/json/{ido_name}/additem",
+                metrics_key=ido_name,
                 json=body,
                 headers={
                     "Authorization": token,
@@ -594,10 +738,11 @@ class InforAPIClient:
         """
         token = await self.get_token()
 
-        client = self._get_http_client()
         try:
-            response = await client.post(
+            response = await self._send(
+                "POST",
                 f"{self.base_url}/json/updaterequest",
+                metrics_key=request_body.get("IDOName") or "updaterequest",
                 params={"response": response_mode},
                 json=request_body,
                 headers={
@@ -629,10 +774,11 @@ class InforAPIClient:
         """
         logger.debug("Getting available configurations")
 
-        client = self._get_http_client()
         try:
-            response = await client.get(
+            response = await self._send(
+                "GET",
                 f"{self.base_url}/json/configurations",
+                metrics_key="configurations",
                 headers={
                     "UserId": self.username,
                     "Password": self.password,
@@ -698,3 +844,60 @@ class InforAPIClient:
                 logger.debug(f"✗ IDO not found: {ido_name}")
 
         return results
+
+
+# ---------------------------------------------------------------------------
+# Sdílené instance (application-scoped)
+# ---------------------------------------------------------------------------
+
+_shared_clients: Dict[Tuple[str, str, str], InforAPIClient] = {}
+
+
+def get_shared_infor_client(config: Optional[str] = None) -> InforAPIClient:
+    """Vrátí sdílený InforAPIClient pro danou konfiguraci (default INFOR_CONFIG).
+
+    Jedna instance per (URL, config, user) = jeden connection pool a jeden token
+    pro celou aplikaci. Volající klienta NEzavírají — uzavře ho shutdown
+    přes close_shared_infor_clients().
+    """
+    config = config or settings.INFOR_CONFIG
+    key = (settings.INFOR_API_URL.rstrip("/"), config, settings.INFOR_USERNAME)
+    client = _shared_clients.get(key)
+    if client is None:
+        client = InforAPIClient(
+            base_url=settings.INFOR_API_URL,
+            config=config,
+            username=settings.INFOR_USERNAME,
+            password=settings.INFOR_PASSWORD,
+            verify_ssl=False,  # Self-signed certs
+            max_connections=settings.INFOR_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.INFOR_HTTP_MAX_KEEPALIVE,
+            http2=settings.INFOR_HTTP2,
+        )
+        _shared_clients[key] = client
+        logger.info(
+            "Shared Infor client created (config=%s, pool=%d, http2=%s)",
+            config, client.max_connections, client.http2,
+        )
+    return client
+
+
+async def close_shared_infor_clients() -> None:
+    """Uzavře všechny sdílené klienty (app shutdown)."""
+    clients = list(_shared_clients.values())
+    _shared_clients.clear()
+    for client in clients:
+        await client.close()
+
+
+def infor_client_metrics() -> Dict[str, Any]:
+    """Metriky sdílených klientů per konfigurace → per IDO."""
+    return {
+        client.config: {
+            "http2": client.http2,
+            "max_connections": client.max_connections,
+            "token_cached": client._token_valid(),
+            "idos": client.metrics.snapshot(),
+        }
+        for client in _shared_clients.values()
+    }
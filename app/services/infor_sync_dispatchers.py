@@ -1,6 +1,7 @@
 """GESTIMA - Infor Sync Dispatchers
 
-Dispatch functions for syncing operations, production, material_inputs, and documents.
+Dispatch functions for syncing operations, production, material_inputs, documents
+and purchase PO lines.
 Extracted from InforSyncService to keep each file under 300 LOC.
 
 All dispatchers follow the preview → execute flow:
@@ -8,6 +9,7 @@ All dispatchers follow the preview → execute flow:
 2. Batch Part lookup (single query)
 3. Per-part: importer.map_row() → collect valid mapped data
 4. Per-part: importer.execute_import() OR inline UPSERT
+   (production: one bulk diff sync via sync_bulk_upsert for all parts)
 """
 
 import logging
@@ -21,15 +23,27 @@ from app.models.material import MaterialItem
 from app.models.material_input import MaterialInput, material_operation_link
 from app.models.operation import Operation
 from app.models.part import Part
+from app.models.production_record import ProductionRecord
 from app.services.infor_api_client import InforAPIClient
 from app.services.infor_document_importer import InforDocumentImporter
 from app.services.infor_job_materials_importer import JobMaterialsImporter
 from app.services.infor_job_routing_importer import JobRoutingImporter
 from app.services.infor_production_importer import ProductionImporter
 from app.services.infor_wc_mapper import InforWcMapper
+from app.services.sync_bulk_upsert import bulk_sync_by_key
 
 logger = logging.getLogger(__name__)
 
+# ProductionRecord nemá unique constraint → bulk_sync_by_key (diff podle hodnot, UPDATE podle id)
+_PRODUCTION_KEY_COLUMNS = ("part_id", "infor_order_number", "operation_seq")
+_PRODUCTION_CONTENT_COLUMNS = (
+    "batch_quantity", "work_center_id",
+    "planned_time_min", "planned_labor_time_min", "planned_setup_min",
+    "actual_time_min", "actual_labor_time_min", "actual_setup_min",
+    "actual_run_machine_min", "actual_run_labor_min",
+    "manning_coefficient", "actual_manning_coefficient",
+)
+
 
 async def dispatch_operations(rows: List[Dict[str, Any]], db: AsyncSession) -> Dict[str, Any]:
     """Sync operations from Infor SLJobRoutes (Type='S').
@@ -90,8 +104,10 @@ async def dispatch_operations(rows: List[Dict[str, Any]], db: AsyncSession) -> D
 async def dispatch_production(rows: List[Dict[str, Any]], db: AsyncSession) -> Dict[str, Any]:
     """Sync production records from Infor SLJobRoutes (Type='J').
 
-    Groups by JobItem, resolves Parts, maps via ProductionImporter,
-    then executes import per-part with duplicate_action='update'.
+    Groups by JobItem, resolves Parts, maps via ProductionImporter
+    (rows that fail mapping or repeat a key are skipped and reported in errors),
+    then writes the valid rows in one bulk diff sync keyed by
+    (part_id, infor_order_number, operation_seq) — unchanged records are skipped.
     """
     if not rows:
         return _empty_result()
@@ -107,40 +123,67 @@ async def dispatch_production(rows: List[Dict[str, Any]], db: AsyncSession) -> D
 
     parts_by_article = await _batch_part_lookup(list(groups.keys()), db)
 
-    total_created = 0
-    total_updated = 0
     total_skipped = 0
     all_errors: List[str] = []
 
     importer = ProductionImporter(wc_mapper=wc_mapper)
+    mapped_rows: List[Dict] = []
+    seen_keys: set = set()
 
     for article_number, group_rows in groups.items():
         part = parts_by_article.get(article_number)
         if not part:
             continue
 
-        mapped_rows: List[Dict] = []
         for row in group_rows:
-            mapped = await importer.map_row(row, db)
+            # Mapování + validace po řádcích — vadný řádek se přeskočí a zapíše
+            # do errors, bulk sync dostane jen platné řádky
+            try:
+                mapped = await importer.map_row(row, db)
+            except Exception as e:
+                total_skipped += 1
+                all_errors.append(f"Production row skipped for {article_number}: {e}")
+                logger.warning(f"Production row mapping failed for {article_number}: {e}")
+                continue
             if mapped.get("_skip"):
                 continue
-            mapped["article_number"] = article_number
             mapped["part_id"] = part.id
-            mapped["duplicate_action"] = "update"
-            mapped_rows.append(mapped)
-
-        if mapped_rows:
-            try:
-                result = await importer.execute_import(mapped_rows, db)
-                total_created += result.get("created_count", 0)
-                total_updated += result.get("updated_count", 0)
-                total_skipped += result.get("skipped_count", 0)
-                all_errors.extend(result.get("errors", []))
-            except Exception as e:
-                all_errors.append(f"Production sync failed for {article_number}: {e}")
-                logger.error(f"Production sync error for {article_number}: {e}", exc_info=True)
+            if not mapped.get("infor_order_number") or not mapped.get("operation_seq"):
+                total_skipped += 1
+                continue
+            key = tuple(mapped[c] for c in _PRODUCTION_KEY_COLUMNS)
+            if key in seen_keys:
+                total_skipped += 1
+                all_errors.append(
+                    f"Production row skipped for {article_number}: duplicate "
+                    f"{mapped['infor_order_number']}/{mapped['operation_seq']}"
+                )
+                continue
+            seen_keys.add(key)
+            mapped_rows.append({c: mapped.get(c) for c in (*_PRODUCTION_KEY_COLUMNS, *_PRODUCTION_CONTENT_COLUMNS)})
+
+    if not mapped_rows:
+        return _build_result(0, 0, total_skipped, all_errors)
+
+    try:
+        result = await bulk_sync_by_key(
+            db,
+            ProductionRecord,
+            mapped_rows,
+            key_columns=_PRODUCTION_KEY_COLUMNS,
+            content_columns=_PRODUCTION_CONTENT_COLUMNS,
+            where=ProductionRecord.deleted_at.is_(None),
+            insert_values={"source": "infor"},
+        )
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        all_errors.append(f"Production sync failed: {e}")
+        logger.error(f"Production sync error: {e}", exc_info=True)
+        return _build_result(0, 0, total_skipped, all_errors)
 
-    return _build_result(total_created, total_updated, total_skipped, all_errors)
+    result.errors.extend(all_errors)
+    return result.as_dispatch_result(skipped=total_skipped)
 
 
 async def dispatch_material_inputs(rows: List[Dict[str, Any]], db: AsyncSession) -> Dict[str, Any]:
@@ -316,6 +359,27 @@ async def dispatch_documents(
     }
 
 
+async def dispatch_purchase_po_items(rows: List[Dict[str, Any]], db: AsyncSession) -> Dict[str, Any]:
+    """Sync SLPoItems delta (RecordDate) into purchase_po_lines.
+
+    Mapping to PriceCategory and the per-quarter aggregate are maintained by
+    PurchasePriceAnalyzer, so the purchase price analysis stays a local query.
+    """
+    from app.services.purchase_price_analyzer import PurchasePriceAnalyzer
+
+    if not rows:
+        return _empty_result()
+
+    analyzer = PurchasePriceAnalyzer(None, db)
+    try:
+        result = await analyzer.store_po_items(rows)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return result.as_dispatch_result()
+
+
 # ==================== HELPERS ====================
 
 
@@ -3,17 +3,27 @@
 Background service that polls Infor API for changes and imports them automatically.
 Uses asyncio task scheduler (no external dependencies).
 
+Scheduling:
+- Priority queue (heap) keyed by next-due time per step
+- Steps run concurrently, each in its own task + DB session
+- Bounded concurrency per Infor IDO endpoint + global cap
+- Jittered exponential backoff for failing steps
+- Metrics in SyncState: next_run_at, last_duration_ms, overrun_count
+
 Safety:
 - READ-ONLY Infor access (GET only)
 - Preview → Execute flow (W.Nr parsing, validation, mapping)
-- Lock prevents concurrent sync + manual import conflicts
+- Per-step lock prevents concurrent sync + manual trigger of the same step
 - Per-step enable/disable + interval config
 """
 
 import asyncio
+import heapq
 import logging
+import random
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set, Tuple
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -21,17 +31,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.database import async_session
 from app.models.sync_state import SyncState, SyncLog
-from app.services.infor_api_client import InforAPIClient
+from app.services.infor_api_client import InforAPIClient, get_shared_infor_client
 
 logger = logging.getLogger(__name__)
 
 
 def _merge_dispatch_results(*results: Dict[str, Any]) -> Dict[str, Any]:
     """Merge multiple dispatch results by summing counts and concatenating errors."""
-    merged: Dict[str, Any] = {"created_count": 0, "updated_count": 0, "errors": []}
+    merged: Dict[str, Any] = {"created_count": 0, "updated_count": 0, "unchanged_count": 0, "errors": []}
     for r in results:
         merged["created_count"] += r.get("created_count", 0)
         merged["updated_count"] += r.get("updated_count", 0)
+        merged["unchanged_count"] += r.get("unchanged_count", 0)
         merged["errors"].extend(r.get("errors", []))
     return merged
 
@@ -128,6 +139,18 @@ DEFAULT_STEPS = [
         "interval_seconds": 120,
         "enabled": True,
     },
+    {
+        "step_name": "purchase_po_items",
+        "ido_name": "SLPoItems",
+        "filter_template": "Item LIKE '1.%' AND DerTotalRcvdCost > 0",
+        "properties": (
+            "PoNum,PoLine,Item,Description,QtyOrdered,QtyReceived,ItemCost,"
+            "DerTotalRcvdCost,UM,PoOrderDate,DueDate,RcvdDate,PoVendNum,"
+            "VenadrName,Stat,RecordDate"
+        ),
+        "date_field": "RecordDate",
+        "interval_seconds": 3600,
+    },
     {
         "step_name": "workshop_jbr",
         "ido_name": "IteCzTsdJbrDetails",
@@ -142,6 +165,31 @@ DEFAULT_STEPS = [
     },
 ]
 
+# Scheduler limits
+_MAX_CONCURRENT_STEPS = 3  # globální strop souběžných kroků (SQLite má jednoho writera)
+_MAX_CONCURRENT_PER_IDO = 1  # souběžné kroky nad stejným Infor IDO (např. SLJobRoutes S/J)
+_SCHEDULE_REFRESH_SECONDS = 5.0  # jak často se načítá konfigurace kroků z DB
+_MAX_BACKOFF_SECONDS = 900  # strop backoffu pro opakovaně padající krok
+
+
+def _backoff_seconds(interval_seconds: int, failures: int) -> float:
+    """Jittered exponential backoff: interval * 2^(n-1), strop 15 min, jitter 50–100 %."""
+    if failures <= 0:
+        return float(interval_seconds)
+    delay = min(interval_seconds * (2 ** (failures - 1)), _MAX_BACKOFF_SECONDS)
+    delay = max(delay, interval_seconds)
+    return random.uniform(delay / 2, delay)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite vrací naive datetime — v sync_states jsou vždy UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
 # JBR property set variants for fallback fetch (mirrors _QUEUE_PROP_SETS in workshop_service)
 _JBR_PROP_SETS: List[List[str]] = [
     # Set with col* prefix (most common)
@@ -159,9 +207,21 @@ class InforSyncService:
     def __init__(self):
         self._task: Optional[asyncio.Task] = None
         self._running = False
-        self._lock = asyncio.Lock()
         self._jbr_working_propset: Optional[List[str]] = None
 
+        # Scheduler state: heap (due_monotonic, seq, step_name) + aktuální due per step.
+        # Přeplánování = nový záznam v heapu, staré záznamy se zahodí při popu.
+        self._queue: List[Tuple[float, int, str]] = []
+        self._due: Dict[str, float] = {}
+        self._seq = 0
+        self._step_ido: Dict[str, str] = {}
+        self._running_steps: Set[str] = set()
+        self._step_tasks: Set[asyncio.Task] = set()
+        self._step_locks: Dict[str, asyncio.Lock] = {}
+        self._ido_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._global_semaphore = asyncio.Semaphore(_MAX_CONCURRENT_STEPS)
+        self._wakeup = asyncio.Event()
+
     async def start(self):
         """Start sync scheduler."""
         if self._running:
@@ -176,49 +236,215 @@ class InforSyncService:
         logger.info("Infor Sync Service started")
 
     async def stop(self):
-        """Stop sync scheduler."""
+        """Stop sync scheduler (and cancel running steps)."""
         if not self._running:
             return
 
         self._running = False
-        if self._task:
-            self._task.cancel()
+        tasks = [t for t in (self._task, *self._step_tasks) if t]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
             try:
-                await self._task
+                await task
             except asyncio.CancelledError:
                 pass
+        self._queue.clear()
+        self._due.clear()
+        self._running_steps.clear()
+        self._step_tasks.clear()
         logger.info("Infor Sync Service stopped")
 
+    def step_lock(self, step_name: str) -> asyncio.Lock:
+        """Lock pro jeden krok — scheduler i manuální trigger."""
+        lock = self._step_locks.get(step_name)
+        if lock is None:
+            lock = self._step_locks[step_name] = asyncio.Lock()
+        return lock
+
+    @property
+    def running_steps(self) -> List[str]:
+        """Kroky, které právě běží."""
+        return sorted(self._running_steps)
+
+    def reschedule(self, step_name: str, next_run_at: Optional[datetime]) -> None:
+        """Naplánuje krok na daný čas (UTC). Běžící krok se přeplánuje po doběhnutí."""
+        if not self._running or step_name in self._running_steps:
+            return
+        self._schedule(step_name, self._monotonic_from(next_run_at))
+        self._wakeup.set()
+
+    def apply_step_config(
+        self,
+        step_name: str,
+        ido_name: str,
+        enabled: bool,
+        next_run_at: Optional[datetime],
+    ) -> None:
+        """Promítne změnu konfigurace kroku do fronty hned (ne až při dalším refreshi).
+
+        Vypnutý krok se z fronty vyřadí (záznam v heapu se zahodí při popu),
+        zapnutý se přeplánuje na `next_run_at`.
+        """
+        if not enabled:
+            self._due.pop(step_name, None)
+            return
+        self._step_ido[step_name] = ido_name
+        self.reschedule(step_name, next_run_at)
+
+    def _schedule(self, step_name: str, due: float) -> None:
+        self._seq += 1
+        self._due[step_name] = due
+        heapq.heappush(self._queue, (due, self._seq, step_name))
+
+    @staticmethod
+    def _monotonic_from(when: Optional[datetime]) -> float:
+        now_mono = time.monotonic()
+        when = _as_utc(when)
+        if when is None:
+            return now_mono
+        return now_mono + (when - datetime.now(timezone.utc)).total_seconds()
+
+    def _ido_semaphore(self, ido_name: str) -> asyncio.Semaphore:
+        sem = self._ido_semaphores.get(ido_name)
+        if sem is None:
+            sem = self._ido_semaphores[ido_name] = asyncio.Semaphore(_MAX_CONCURRENT_PER_IDO)
+        return sem
+
     async def _sync_loop(self):
-        """Main sync loop - runs every 5s, checks intervals per step."""
+        """Main scheduler loop — spouští kroky podle next-due času z prioritní fronty."""
+        next_refresh = 0.0
         while self._running:
+            if time.monotonic() >= next_refresh:
+                try:
+                    await self._refresh_schedule()
+                except Exception as e:
+                    logger.error(f"Sync schedule refresh error: {e}", exc_info=True)
+                next_refresh = time.monotonic() + _SCHEDULE_REFRESH_SECONDS
+
+            self._dispatch_due()
+
+            wake_at = next_refresh
+            if self._queue:
+                wake_at = min(wake_at, self._queue[0][0])
+            self._wakeup.clear()
             try:
-                async with async_session() as db:
-                    result = await db.execute(
-                        select(SyncState).where(SyncState.enabled == True)  # noqa: E712
-                    )
-                    steps = result.scalars().all()
-
-                    now = datetime.now(timezone.utc)
-                    for step in steps:
-                        if step.last_sync_at:
-                            elapsed = (now - step.last_sync_at.replace(tzinfo=timezone.utc)).total_seconds()
-                            if elapsed < step.interval_seconds:
-                                continue
-
-                        # Execute step (with lock to prevent conflicts)
-                        async with self._lock:
-                            await self._execute_step(step, db)
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(wake_at - time.monotonic(), 0.05))
+            except asyncio.TimeoutError:
+                pass
 
-            except Exception as e:
-                logger.error(f"Sync loop error: {e}", exc_info=True)
+    async def _refresh_schedule(self):
+        """Synchronizuje frontu s konfigurací kroků v DB (enable/disable, nové kroky)."""
+        async with async_session() as db:
+            result = await db.execute(
+                select(
+                    SyncState.step_name,
+                    SyncState.ido_name,
+                    SyncState.interval_seconds,
+                    SyncState.last_sync_at,
+                    SyncState.next_run_at,
+                ).where(SyncState.enabled == True)  # noqa: E712
+            )
+            rows = result.all()
 
-            await asyncio.sleep(5)  # Check every 5s
+        enabled = set()
+        for step_name, ido_name, interval_seconds, last_sync_at, next_run_at in rows:
+            enabled.add(step_name)
+            self._step_ido[step_name] = ido_name
+            if step_name in self._due or step_name in self._running_steps:
+                continue
+            if next_run_at is None and last_sync_at is not None:
+                next_run_at = _as_utc(last_sync_at) + timedelta(seconds=interval_seconds)
+            self._schedule(step_name, self._monotonic_from(next_run_at))
+
+        # Vypnuté/smazané kroky — záznam v heapu se zahodí při popu
+        for step_name in list(self._due):
+            if step_name not in enabled:
+                del self._due[step_name]
+
+    def _dispatch_due(self):
+        """Spustí všechny kroky, jejichž čas nastal (každý ve vlastním tasku)."""
+        now = time.monotonic()
+        while self._queue and self._queue[0][0] <= now:
+            due, _, step_name = heapq.heappop(self._queue)
+            if self._due.get(step_name) != due:
+                continue  # zastaralý záznam (přeplánováno / vypnuto)
+            del self._due[step_name]
+            if step_name in self._running_steps:
+                continue
+            self._running_steps.add(step_name)
+            task = asyncio.create_task(self._run_step(step_name))
+            self._step_tasks.add(task)
+            task.add_done_callback(self._step_tasks.discard)
+
+    async def _run_step(self, step_name: str):
+        """Izolovaný běh jednoho kroku: limity endpointu, vlastní DB session."""
+        next_run_at: Optional[datetime] = None
+        reschedule = False
+        try:
+            ido_name = self._step_ido.get(step_name, step_name)
+            async with self._ido_semaphore(ido_name), self._global_semaphore:
+                async with self.step_lock(step_name):
+                    async with async_session() as db:
+                        result = await db.execute(select(SyncState).where(SyncState.step_name == step_name))
+                        step = result.scalar_one_or_none()
+                        if step is None or not step.enabled:
+                            return
+                        await self._execute_step(step, db)
+                        next_run_at = step.next_run_at
+                        reschedule = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Sync step {step_name} crashed: {e}", exc_info=True)
+            next_run_at = datetime.now(timezone.utc) + timedelta(seconds=_backoff_seconds(30, 1))
+            reschedule = True
+        finally:
+            self._running_steps.discard(step_name)
+            if reschedule and self._running:
+                self._schedule(step_name, self._monotonic_from(next_run_at))
+                self._wakeup.set()
+
+    def _record_run(
+        self,
+        step: SyncState,
+        snapshot: Dict[str, int],
+        start_time: datetime,
+        duration_ms: int,
+        success: bool,
+    ) -> None:
+        """Uloží metriky běhu a spočítá next_run_at (interval, nebo backoff po chybě).
+
+        `snapshot` = hodnoty kroku načtené před během — po rollbacku v dispatcheru
+        jsou atributy ORM objektu expirované a v async session je nelze líně načíst.
+        """
+        interval = snapshot["interval_seconds"]
+        step.last_duration_ms = duration_ms
+        if duration_ms > interval * 1000:
+            step.overrun_count = snapshot["overrun_count"] + 1
+            logger.warning(
+                "Sync %s overran its interval (%dms > %ds)",
+                snapshot["step_name"], duration_ms, interval,
+            )
+        if success:
+            step.consecutive_failures = 0
+            step.next_run_at = start_time + timedelta(seconds=interval)
+        else:
+            failures = snapshot["consecutive_failures"] + 1
+            step.consecutive_failures = failures
+            delay = _backoff_seconds(interval, failures)
+            step.next_run_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
 
     async def _execute_step(self, step: SyncState, db: AsyncSession):
-        """Execute one sync step."""
+        """Execute one sync step (fetch → dispatch → state + metrics commit)."""
         start_time = datetime.now(timezone.utc)
         start_ms = int(start_time.timestamp() * 1000)
+        snapshot = {
+            "step_name": step.step_name,
+            "interval_seconds": step.interval_seconds,
+            "consecutive_failures": step.consecutive_failures or 0,
+            "overrun_count": step.overrun_count or 0,
+        }
 
         try:
             # Build filter
@@ -241,12 +467,7 @@ class InforSyncService:
                 full_filter = step.filter_template or ""
 
             # Fetch from Infor
-            client = InforAPIClient(
-                base_url=settings.INFOR_API_URL,
-                config=settings.INFOR_CONFIG,
-                username=settings.INFOR_USERNAME,
-                password=settings.INFOR_PASSWORD,
-            )
+            client = get_shared_infor_client()
 
             if step.step_name == "workshop_jbr":
                 rows = await self._fetch_jbr_with_fallback(step, client, full_filter)
@@ -279,6 +500,7 @@ class InforSyncService:
 
             end_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
             duration_ms = end_ms - start_ms
+            self._record_run(step, snapshot, start_time, duration_ms, success=True)
 
             # Log success
             db.add(
@@ -302,15 +524,25 @@ class InforSyncService:
             logger.info(
                 f"Sync {step.step_name}: success ({duration_ms}ms, "
                 f"+{import_result.get('created_count', 0)}, "
-                f"~{import_result.get('updated_count', 0)})"
+                f"~{import_result.get('updated_count', 0)}, "
+                f"={import_result.get('unchanged_count', 0)})"
             )
 
         except Exception as e:
-            logger.error(f"Sync {step.step_name} failed: {e}", exc_info=True)
+            logger.error(f"Sync {snapshot['step_name']} failed: {e}", exc_info=True)
 
             step.last_error = str(e)[:500]
+            duration_ms = int(datetime.now(timezone.utc).timestamp() * 1000) - start_ms
+            self._record_run(step, snapshot, start_time, duration_ms, success=False)
 
-            db.add(SyncLog(step_name=step.step_name, status="error", error_message=str(e)[:500]))
+            db.add(
+                SyncLog(
+                    step_name=snapshot["step_name"],
+                    status="error",
+                    duration_ms=duration_ms,
+                    error_message=str(e)[:500],
+                )
+            )
 
             try:
                 await db.commit()
@@ -405,6 +637,11 @@ class InforSyncService:
 
             return await dispatch_workshop_orders(rows, db)
 
+        elif step_name == "purchase_po_items":
+            from app.services.infor_sync_dispatchers import dispatch_purchase_po_items
+
+            return await dispatch_purchase_po_items(rows, db)
+
         logger.warning(f"Unknown sync step: {step_name}")
         return {"created_count": 0, "updated_count": 0, "errors": [f"Unknown step: {step_name}"]}
 
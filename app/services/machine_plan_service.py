@@ -6,6 +6,7 @@ se vzdy ctou z Inforu.
 
 Enrichment: kazdy radek obohacen o OrderDueDate (z CO pres Item matching)
 a priority/hot flag z lokalni DB (production_priorities).
+Planned fronta dostane odhad SchedStart/SchedEnd v pracovnim kalendari WC.
 """
 
 from __future__ import annotations
@@ -25,7 +26,13 @@ from app.models.part import Part
 from app.models.production_priority import ProductionPriority
 from app.models.workshop_job_route import WorkshopJobRoute
 from app.services import workshop_service
-from app.services.production_planner_service import _fetch_co_deadlines, _derive_tier
+from app.services.production_planner_service import (
+    _compute_duration_hrs,
+    _derive_tier,
+    _fetch_co_deadlines,
+    _parse_float,
+)
+from app.services.work_calendar import WorkCalendar, get_work_calendars
 
 logger = logging.getLogger(__name__)
 
@@ -150,6 +157,37 @@ def _unassigned_sort_key(row: Dict[str, Any]):
     )
 
 
+def _remaining_qty(row: Dict[str, Any]) -> Optional[float]:
+    released = _parse_float(row.get("JobQtyReleased"))
+    if released is None:
+        return None
+    done = (_parse_float(row.get("QtyComplete")) or 0) + (_parse_float(row.get("QtyScrapped")) or 0)
+    return max(released - done, 0.0)
+
+
+def _estimate_planned_times(
+    planned: List[Dict[str, Any]],
+    calendar: WorkCalendar,
+    now: Optional[datetime] = None,
+) -> None:
+    """Sekvencni odhad SchedStart/SchedEnd pro planned frontu (in-place).
+
+    Operace jdou za sebou v poradi fronty, delka = setup + zbyvajici ks / ks za hod.
+    """
+    cursor = calendar.clamp(now or datetime.now())
+    for row in planned:
+        duration = _compute_duration_hrs(
+            _parse_float(row.get("JshSetupHrs")),
+            _parse_float(row.get("DerRunMchHrs")),
+            _remaining_qty(row),
+        )
+        end = calendar.add_work_hours(cursor, duration)
+        row["SchedStart"] = cursor.isoformat()
+        row["SchedEnd"] = end.isoformat()
+        row["DurationHrs"] = round(duration, 2)
+        cursor = calendar.clamp(end)
+
+
 async def enrich_flat_rows(
     db: AsyncSession,
     rows: List[Dict[str, Any]],
@@ -474,6 +512,7 @@ async def get_plan(
     non_hot_positioned.sort(key=lambda r: r.get("_position", 9999))
     non_hot_auto.sort(key=_planned_sort_key)
     planned = hot_items + non_hot_positioned + non_hot_auto
+    _estimate_planned_times(planned, get_work_calendars().for_wc(wc))
 
     # 7. Unassigned = F/S/W, sorted
     unassigned.sort(key=_unassigned_sort_key)
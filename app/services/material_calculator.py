@@ -16,13 +16,16 @@ Usage:
     )
 """
 
+import asyncio
 import logging
 import math
-from typing import Dict, Any, Optional
+import time
+from bisect import bisect_right
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from dataclasses import dataclass, field
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session, selectinload
 from fastapi import HTTPException, status
 
 from app.models.enums import StockShape
@@ -293,78 +296,251 @@ def calculate_volume(stock_shape: StockShape, dimensions: Dict[str, float]) -> f
 
 
 # ============================================================================
-# PRICE TIER SELECTION
+# PRICE CATEGORY CACHE (tiers seřazené pro bisect)
 # ============================================================================
 
-async def find_price_tier(
-    price_category_id: int,
-    total_weight_kg: float,
+@dataclass(frozen=True)
+class PriceTierEntry:
+    """Snapshot MaterialPriceTier (stejné atributy jako ORM pro volající)."""
+    id: int
+    min_weight: float
+    max_weight: Optional[float]
+    price_per_kg: Optional[float]
+
+
+@dataclass(frozen=True)
+class PriceCategoryTiers:
+    """Cenová kategorie s tiers seřazenými dle min_weight (duplicitní min_weight vynechány)."""
+    id: int
+    code: str
+    min_weights: Tuple[float, ...]
+    tiers: Tuple[PriceTierEntry, ...]
+
+    @classmethod
+    def from_tiers(cls, category_id: int, code: str, tiers) -> "PriceCategoryTiers":
+        """Tiers v pořadí dle id; při shodném min_weight vyhrává první (jako max()).
+
+        Soft-deleted tiers se ignorují.
+        """
+        min_weights: List[float] = []
+        entries: List[PriceTierEntry] = []
+        active = [t for t in tiers if getattr(t, "deleted_at", None) is None]
+        for tier in sorted(active, key=lambda t: t.min_weight):
+            if min_weights and min_weights[-1] == tier.min_weight:
+                continue
+            min_weights.append(tier.min_weight)
+            entries.append(PriceTierEntry(tier.id, tier.min_weight, tier.max_weight, tier.price_per_kg))
+        return cls(category_id, code, tuple(min_weights), tuple(entries))
+
+    def tier_for_weight(self, total_weight_kg: float) -> Optional[PriceTierEntry]:
+        """Největší min_weight <= total_weight (nejbližší nižší tier)."""
+        idx = bisect_right(self.min_weights, total_weight_kg) - 1
+        return self.tiers[idx] if idx >= 0 else None
+
+
+_PRICE_CACHE_TTL_SECONDS = 600  # pojistka pro zápisy mimo ORM (jiný worker, ruční SQL)
+_price_categories: Dict[int, PriceCategoryTiers] = {}
+_price_cache_bind = None  # engine, ze kterého jsou kategorie načtené
+_price_cache_version = 0
+_price_cache_loaded_at = 0.0
+_price_cache_lock = asyncio.Lock()
+
+
+_SESSION_DIRTY_KEY = "price_category_cache_dirty"
+
+
+def invalidate_price_category_cache() -> None:
+    """Zahodí cache cenových kategorií (ORM zápisy ji invalidují samy po commitu)."""
+    global _price_cache_version, _price_cache_bind
+    _price_cache_version += 1
+    _price_categories.clear()
+    _price_cache_bind = None
+
+
+def _mark_session_dirty(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info[_SESSION_DIRTY_KEY] = True
+
+
+for _model in (MaterialPriceCategory, MaterialPriceTier):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _mark_session_dirty)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session) -> None:
+    if session.info.pop(_SESSION_DIRTY_KEY, False):
+        invalidate_price_category_cache()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_dirty_after_rollback(session) -> None:
+    session.info.pop(_SESSION_DIRTY_KEY, None)
+
+
+async def get_price_categories(
+    price_category_ids: Sequence[int],
     db: AsyncSession
-) -> Optional[MaterialPriceTier]:
+) -> Dict[int, PriceCategoryTiers]:
     """
-    Find matching MaterialPriceTier based on weight.
+    Cenové kategorie s tiers z process-level cache; chybějící dotáhne jedním dotazem.
 
-    Selection rule: Largest min_weight <= total_weight (closest lower tier).
+    Returns:
+        {category_id: PriceCategoryTiers} — neexistující kategorie chybí
+    """
+    global _price_cache_bind, _price_cache_loaded_at
+    bind = db.bind
+    if (
+        _price_cache_bind is not bind
+        or time.monotonic() - _price_cache_loaded_at >= _PRICE_CACHE_TTL_SECONDS
+    ):
+        invalidate_price_category_cache()
+
+    wanted = set(price_category_ids)
+    loaded: Dict[int, PriceCategoryTiers] = {}
+    if any(cid not in _price_categories for cid in wanted):
+        async with _price_cache_lock:
+            missing = [cid for cid in wanted if cid not in _price_categories]
+            if missing:
+                version = _price_cache_version
+                loaded = await _load_price_categories(missing, db)
+                # Invalidace během načítání → výsledek použít, ale necachovat
+                if version == _price_cache_version:
+                    if not _price_categories:
+                        _price_cache_loaded_at = time.monotonic()
+                    _price_categories.update(loaded)
+                    _price_cache_bind = bind
+
+    result = {cid: _price_categories[cid] for cid in wanted if cid in _price_categories}
+    result.update(loaded)
+    return result
 
-    Args:
-        price_category_id: MaterialPriceCategory.id
-        total_weight_kg: Total weight (weight_per_piece × quantity)
-        db: AsyncSession
 
-    Returns:
-        MaterialPriceTier or None if no matching tier found
+async def _load_price_categories(
+    price_category_ids: Sequence[int],
+    db: AsyncSession
+) -> Dict[int, PriceCategoryTiers]:
+    cat_result = await db.execute(
+        select(MaterialPriceCategory.id, MaterialPriceCategory.code)
+        .where(MaterialPriceCategory.id.in_(price_category_ids))
+    )
+    codes = dict(cat_result.all())
 
-    Example:
-        Tiers: [0-15: 49.4], [15-100: 34.5], [100+: 26.3]
-        weight=5 → tier 0-15
-        weight=25 → tier 15-100
-        weight=150 → tier 100+
-    """
-    # Load price category with tiers
-    stmt = select(MaterialPriceCategory).where(
-        MaterialPriceCategory.id == price_category_id
-    ).options(selectinload(MaterialPriceCategory.tiers))
+    tier_result = await db.execute(
+        select(MaterialPriceTier)
+        .where(
+            MaterialPriceTier.price_category_id.in_(list(codes)),
+            MaterialPriceTier.deleted_at.is_(None)
+        )
+        .order_by(MaterialPriceTier.id)
+    )
+    tiers_by_category: Dict[int, list] = {cid: [] for cid in codes}
+    for tier in tier_result.scalars().all():
+        tiers_by_category[tier.price_category_id].append(tier)
 
-    result = await db.execute(stmt)
-    price_category = result.scalar_one_or_none()
+    return {
+        cid: PriceCategoryTiers.from_tiers(cid, codes[cid], tiers)
+        for cid, tiers in tiers_by_category.items()
+    }
 
-    if not price_category:
+
+# ============================================================================
+# PRICE TIER SELECTION
+# ============================================================================
+
+def _select_tier(
+    category: Optional[PriceCategoryTiers],
+    price_category_id: int,
+    total_weight_kg: float
+) -> Optional[PriceTierEntry]:
+    if category is None:
         logger.error(f"MaterialPriceCategory {price_category_id} not found")
         return None
 
-    if not price_category.tiers:
+    if not category.tiers:
         logger.error(
             f"No tiers configured for MaterialPriceCategory {price_category_id} "
-            f"({price_category.code})"
+            f"({category.code})"
         )
         return None
 
-    # Filter tiers where min_weight <= total_weight
-    valid_tiers = [
-        tier for tier in price_category.tiers
-        if tier.min_weight <= total_weight_kg
-    ]
-
-    if not valid_tiers:
+    selected_tier = category.tier_for_weight(total_weight_kg)
+    if selected_tier is None:
         logger.error(
             f"No valid tier for weight {total_weight_kg}kg in category "
-            f"{price_category.code}. Check tier configuration (should have "
+            f"{category.code}. Check tier configuration (should have "
             f"tier with min_weight=0)."
         )
         return None
 
-    # Select tier with largest min_weight (closest lower)
-    selected_tier = max(valid_tiers, key=lambda t: t.min_weight)
-
     logger.debug(
         f"Selected tier for {total_weight_kg}kg: "
         f"[{selected_tier.min_weight}-{selected_tier.max_weight or '∞'}] → "
         f"{selected_tier.price_per_kg} Kč/kg"
     )
-
     return selected_tier
 
 
+async def find_price_tier(
+    price_category_id: int,
+    total_weight_kg: float,
+    db: AsyncSession
+) -> Optional[PriceTierEntry]:
+    """
+    Find matching MaterialPriceTier based on weight.
+
+    Selection rule: Largest min_weight <= total_weight (closest lower tier).
+    Tiers come from the price category cache (bisect over sorted min_weights).
+
+    Args:
+        price_category_id: MaterialPriceCategory.id
+        total_weight_kg: Total weight (weight_per_piece × quantity)
+        db: AsyncSession
+
+    Returns:
+        PriceTierEntry (id, min_weight, max_weight, price_per_kg) or None
+
+    Example:
+        Tiers: [0-15: 49.4], [15-100: 34.5], [100+: 26.3]
+        weight=5 → tier 0-15
+        weight=25 → tier 15-100
+        weight=150 → tier 100+
+    """
+    categories = await get_price_categories([price_category_id], db)
+    return _select_tier(categories.get(price_category_id), price_category_id, total_weight_kg)
+
+
+async def find_price_tiers(
+    price_category_ids: Sequence[int],
+    total_weights_kg: Sequence[float],
+    db: AsyncSession
+) -> List[Optional[PriceTierEntry]]:
+    """
+    Bulk varianta find_price_tier pro batch pricing.
+
+    Kategorie se načtou jedním čtením cache (chybějící jedním dotazem),
+    tier se pak vybírá bisectem pro každý pár.
+
+    Args:
+        price_category_ids: MaterialPriceCategory.id pro každý požadavek
+        total_weights_kg: Celková váha pro každý požadavek (stejná délka)
+
+    Returns:
+        Tier (nebo None) pro každý pár (kategorie, váha), ve stejném pořadí
+    """
+    if len(price_category_ids) != len(total_weights_kg):
+        raise ValueError("price_category_ids and total_weights_kg must have the same length")
+    if not price_category_ids:
+        return []
+
+    categories = await get_price_categories(price_category_ids, db)
+    return [
+        _select_tier(categories.get(cid), cid, weight)
+        for cid, weight in zip(price_category_ids, total_weights_kg)
+    ]
+
+
 # ============================================================================
 # MAIN CALCULATION FUNCTION
 # ============================================================================
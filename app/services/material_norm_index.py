@@ -0,0 +1,308 @@
+"""GESTIMA - In-memory index materiálových norem pro MaterialParserService
+
+Jedna instance na proces, načtená jedním průchodem tabulek:
+  - MaterialNorm (w_nr / en_iso / csn / aisi) → exact hash mapa, seřazené klíče
+    pro prefix hledání (bisect) a trigram index pro "contains" hledání
+  - MaterialGroup (jen nesmazané) → id, code, name, density
+  - MaterialPriceCategory → podle id + první nesmazaná pro (group, shape)
+  - MaterialPriceTier → základní cena (tier s nejnižším min_weight)
+
+Sémantika odpovídá dřívějším SQL dotazům: exact = přesná shoda (case-sensitive
+jako `==` v SQLite), prefix/contains = case-insensitive (jako LIKE), při více
+shodách vyhrává nejnižší id (LIMIT 1 bez ORDER BY = rowid pořadí).
+
+Invalidace: zápis (insert/update/delete) do některé z tabulek přes ORM označí
+session; po commitu se index zahodí a příští parse ho načte znovu. Session
+s neuloženými změnami dostane vlastní (necachovaný) index — vidí své zápisy.
+Cache je vázaná na engine (testy = každý test vlastní in-memory DB).
+Pojistka pro změny mimo ORM / jiné workery: TTL.
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.models.material import MaterialGroup, MaterialPriceCategory, MaterialPriceTier
+from app.models.material_norm import MaterialNorm
+
+logger = logging.getLogger(__name__)
+
+_NGRAM = 3
+_INDEX_TTL_SECONDS = 600  # pojistka pro zápisy mimo ORM (bulk UPDATE, jiný worker)
+_SESSION_DIRTY_KEY = "material_norm_index_dirty"
+
+
+@dataclass(frozen=True)
+class NormEntry:
+    id: int
+    w_nr: Optional[str]
+    en_iso: Optional[str]
+    csn: Optional[str]
+    aisi: Optional[str]
+    material_group_id: int
+
+    def values(self) -> List[str]:
+        return [v for v in (self.w_nr, self.en_iso, self.csn, self.aisi) if v]
+
+
+@dataclass(frozen=True)
+class GroupEntry:
+    id: int
+    code: str
+    name: str
+    density: float
+
+
+@dataclass(frozen=True)
+class PriceCategoryEntry:
+    id: int
+    code: str
+    name: str
+    shape: Optional[str]
+    material_group_id: Optional[int]
+    base_price_per_kg: Optional[float]  # tier s nejnižším min_weight
+
+
+def _ngrams(value: str) -> Set[str]:
+    return {value[i:i + _NGRAM] for i in range(len(value) - _NGRAM + 1)}
+
+
+class MaterialNormIndex:
+    """Neměnný snapshot norem, skupin a cenových kategorií."""
+
+    def __init__(
+        self,
+        norms: List[NormEntry],
+        groups: Dict[int, GroupEntry],
+        categories: Dict[int, PriceCategoryEntry],
+        active_category_ids: Set[int],
+    ):
+        self.loaded_at = time.monotonic()
+        self._norms = sorted(norms, key=lambda n: n.id)
+        self._groups = groups
+        self._categories = categories
+
+        # exact: hodnota (case-sensitive) → pozice v _norms (vzestupně dle id)
+        self._exact: Dict[str, List[int]] = {}
+        # prefix: seřazené (UPPER hodnota, pozice)
+        prefix_keys: List[Tuple[str, int]] = []
+        # contains: trigram (UPPER) → pozice
+        self._ngram_index: Dict[str, Set[int]] = {}
+        self._upper_values: List[List[str]] = []
+
+        for pos, norm in enumerate(self._norms):
+            uppers = []
+            for value in norm.values():
+                self._exact.setdefault(value, []).append(pos)
+                upper = value.upper()
+                uppers.append(upper)
+                prefix_keys.append((upper, pos))
+                for gram in _ngrams(upper):
+                    self._ngram_index.setdefault(gram, set()).add(pos)
+            self._upper_values.append(uppers)
+
+        prefix_keys.sort()
+        self._prefix_keys = prefix_keys
+
+        # (group_id, shape) → první nesmazaná kategorie (nejnižší id)
+        self._category_by_group_shape: Dict[Tuple[int, str], PriceCategoryEntry] = {}
+        for cat_id in sorted(active_category_ids):
+            cat = categories[cat_id]
+            if cat.material_group_id is None or cat.shape is None:
+                continue
+            self._category_by_group_shape.setdefault((cat.material_group_id, cat.shape), cat)
+
+    # ---------- normy ----------
+
+    def _first(self, positions, group_id: Optional[int]) -> Optional[NormEntry]:
+        for pos in sorted(positions):
+            norm = self._norms[pos]
+            if group_id is None or norm.material_group_id == group_id:
+                return norm
+        return None
+
+    def find_exact(self, code: str, group_id: Optional[int] = None) -> Optional[NormEntry]:
+        """Přesná shoda v libovolném ze 4 sloupců."""
+        positions: Set[int] = set(self._exact.get(code, ()))
+        return self._first(positions, group_id)
+
+    def find_prefix(self, code: str, group_id: Optional[int] = None) -> Optional[NormEntry]:
+        """Hodnota začíná na `code` (např. S235 → S235JR)."""
+        prefix = code.upper()
+        start = bisect.bisect_left(self._prefix_keys, (prefix, -1))
+        positions: Set[int] = set()
+        for key, pos in self._prefix_keys[start:]:
+            if not key.startswith(prefix):
+                break
+            positions.add(pos)
+        return self._first(positions, group_id)
+
+    def find_contains(self, code: str, group_id: Optional[int] = None) -> Optional[NormEntry]:
+        """Hodnota obsahuje `code` (např. 6082 → AW 6082)."""
+        needle = code.upper()
+        if len(needle) >= _NGRAM:
+            candidates: Optional[Set[int]] = None
+            for gram in _ngrams(needle):
+                hits = self._ngram_index.get(gram)
+                if not hits:
+                    return None
+                candidates = set(hits) if candidates is None else candidates & hits
+                if not candidates:
+                    return None
+        else:
+            candidates = set(range(len(self._norms)))
+
+        matches = {
+            pos for pos in candidates
+            if any(needle in value for value in self._upper_values[pos])
+        }
+        return self._first(matches, group_id)
+
+    # ---------- skupiny + kategorie ----------
+
+    def group(self, group_id: int) -> Optional[GroupEntry]:
+        """Nesmazaná MaterialGroup podle id."""
+        return self._groups.get(group_id)
+
+    def price_category(self, category_id: int) -> Optional[PriceCategoryEntry]:
+        """Cenová kategorie podle id (i smazaná — jako přímý lookup podle FK)."""
+        return self._categories.get(category_id)
+
+    def price_category_for(self, group_id: int, shape: str) -> Optional[PriceCategoryEntry]:
+        """První nesmazaná cenová kategorie pro skupinu + tvar."""
+        return self._category_by_group_shape.get((group_id, shape))
+
+
+# ---------------------------------------------------------------------------
+# Process-level cache + invalidace
+# ---------------------------------------------------------------------------
+
+_index: Optional[MaterialNormIndex] = None
+_index_bind = None  # engine, ze kterého byl index načten
+_generation = 0
+_load_lock = asyncio.Lock()
+
+
+async def _load_index(db: AsyncSession) -> MaterialNormIndex:
+    norm_rows = await db.execute(
+        select(
+            MaterialNorm.id, MaterialNorm.w_nr, MaterialNorm.en_iso,
+            MaterialNorm.csn, MaterialNorm.aisi, MaterialNorm.material_group_id,
+        ).where(MaterialNorm.deleted_at.is_(None))
+    )
+    norms = [NormEntry(*row) for row in norm_rows.all()]
+
+    group_rows = await db.execute(
+        select(MaterialGroup.id, MaterialGroup.code, MaterialGroup.name, MaterialGroup.density)
+        .where(MaterialGroup.deleted_at.is_(None))
+    )
+    groups = {row.id: GroupEntry(*row) for row in group_rows.all()}
+
+    # Základní cena = tier s nejnižším min_weight (při shodě nejnižší id)
+    base_prices: Dict[int, Tuple[float, int, float]] = {}
+    tier_rows = await db.execute(
+        select(
+            MaterialPriceTier.price_category_id, MaterialPriceTier.min_weight,
+            MaterialPriceTier.id, MaterialPriceTier.price_per_kg,
+        )
+    )
+    for category_id, min_weight, tier_id, price in tier_rows.all():
+        current = base_prices.get(category_id)
+        if current is None or (min_weight, tier_id) < current[:2]:
+            base_prices[category_id] = (min_weight, tier_id, price)
+
+    category_rows = await db.execute(
+        select(
+            MaterialPriceCategory.id, MaterialPriceCategory.code, MaterialPriceCategory.name,
+            MaterialPriceCategory.shape, MaterialPriceCategory.material_group_id,
+            MaterialPriceCategory.deleted_at,
+        )
+    )
+    categories: Dict[int, PriceCategoryEntry] = {}
+    active_category_ids: Set[int] = set()
+    for cat_id, code, name, shape, group_id, deleted_at in category_rows.all():
+        base = base_prices.get(cat_id)
+        categories[cat_id] = PriceCategoryEntry(
+            id=cat_id, code=code, name=name, shape=shape, material_group_id=group_id,
+            base_price_per_kg=base[2] if base else None,
+        )
+        if deleted_at is None:
+            active_category_ids.add(cat_id)
+
+    index = MaterialNormIndex(norms, groups, categories, active_category_ids)
+    logger.info(
+        "Material norm index loaded: %d norms, %d groups, %d price categories",
+        len(norms), len(groups), len(categories),
+    )
+    return index
+
+
+def _cached_for(bind) -> Optional[MaterialNormIndex]:
+    index = _index
+    if index is None or _index_bind is not bind:
+        return None
+    if time.monotonic() - index.loaded_at >= _INDEX_TTL_SECONDS:
+        return None
+    return index
+
+
+async def get_material_norm_index(db: AsyncSession) -> MaterialNormIndex:
+    """Vrátí (případně načte) process-level index pro engine dané session."""
+    global _index, _index_bind
+    # Neuložené změny norem/kategorií v této session → vlastní snapshot
+    if db.info.get(_SESSION_DIRTY_KEY):
+        return await _load_index(db)
+
+    bind = db.bind
+    index = _cached_for(bind)
+    if index is not None:
+        return index
+
+    async with _load_lock:
+        index = _cached_for(bind)
+        if index is not None:
+            return index
+        generation = _generation
+        index = await _load_index(db)
+        # Invalidace během načítání → použít, ale necachovat
+        if generation == _generation:
+            _index = index
+            _index_bind = bind
+        return index
+
+
+def invalidate_material_norm_index() -> None:
+    """Zahodí index (další get_material_norm_index ho načte znovu)."""
+    global _index, _index_bind, _generation
+    _generation += 1
+    _index = None
+    _index_bind = None
+
+
+def _mark_session_dirty(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info[_SESSION_DIRTY_KEY] = True
+
+
+for _model in (MaterialNorm, MaterialGroup, MaterialPriceCategory, MaterialPriceTier):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _mark_session_dirty)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session) -> None:
+    if session.info.pop(_SESSION_DIRTY_KEY, False):
+        invalidate_material_norm_index()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_dirty_after_rollback(session) -> None:
+    session.info.pop(_SESSION_DIRTY_KEY, None)
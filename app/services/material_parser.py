@@ -17,8 +17,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_, and_
 
 from app.models.enums import StockShape
-from app.models.material import MaterialGroup, MaterialPriceCategory, MaterialItem, MaterialPriceTier
-from app.models.material_norm import MaterialNorm
+from app.models.material import MaterialItem
+from app.services.material_norm_index import (
+    GroupEntry,
+    MaterialNormIndex,
+    PriceCategoryEntry,
+    get_material_norm_index,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -80,6 +85,11 @@ class ParseResult(BaseModel):
     warnings: List[str] = Field(default_factory=list)  # Chybové hlášky pro uživatele
 
 
+class ParseManyRequest(BaseModel):
+    """Vstup pro dávkový parsing (řádky poptávky / BOM)"""
+    descriptions: List[str] = Field(..., min_length=1, max_length=500)
+
+
 class MaterialParserService:
     """
     Regex-based parser pro materiálové popisy.
@@ -96,6 +106,15 @@ class MaterialParserService:
 
     def __init__(self, db: AsyncSession):
         self.db = db
+        self._index: Optional[MaterialNormIndex] = None
+        # Memo katalogových dotazů — aktivní jen během parse_many()
+        self._items_memo: Optional[Dict[tuple, tuple]] = None
+
+    async def _get_index(self) -> MaterialNormIndex:
+        """Index norem/skupin/kategorií — jednou na instanci parseru."""
+        if self._index is None:
+            self._index = await get_material_norm_index(self.db)
+        return self._index
 
     # ========== REGEX PATTERNS ==========
 
@@ -278,40 +297,13 @@ class MaterialParserService:
             if group:
                 norm_upper = material_match["norm"].upper()
                 # Also fetch the MaterialNorm to get W.Nr. — 3 úrovně shody
+                index = await self._get_index()
                 # 1. Exact match
-                material_norm_result = await self.db.execute(
-                    select(MaterialNorm)
-                    .where(
-                        MaterialNorm.material_group_id == group.id,
-                        or_(
-                            MaterialNorm.w_nr == norm_upper,
-                            MaterialNorm.en_iso == norm_upper,
-                            MaterialNorm.csn == norm_upper,
-                            MaterialNorm.aisi == norm_upper
-                        ),
-                        MaterialNorm.deleted_at.is_(None)
-                    )
-                    .limit(1)
-                )
-                material_norm = material_norm_result.scalar_one_or_none()
+                material_norm = index.find_exact(norm_upper, group_id=group.id)
 
                 # 2. Contains match (pro "5083" matchující "AW 5083")
                 if not material_norm and len(norm_upper) >= 3:
-                    material_norm_result2 = await self.db.execute(
-                        select(MaterialNorm)
-                        .where(
-                            MaterialNorm.material_group_id == group.id,
-                            or_(
-                                MaterialNorm.w_nr.like(f'%{norm_upper}%'),
-                                MaterialNorm.en_iso.like(f'%{norm_upper}%'),
-                                MaterialNorm.csn.like(f'%{norm_upper}%'),
-                                MaterialNorm.aisi.like(f'%{norm_upper}%')
-                            ),
-                            MaterialNorm.deleted_at.is_(None)
-                        )
-                        .limit(1)
-                    )
-                    material_norm = material_norm_result2.scalar_one_or_none()
+                    material_norm = index.find_contains(norm_upper, group_id=group.id)
 
                 # Use W.Nr. from database if found, otherwise keep raw input
                 if material_norm and material_norm.w_nr:
@@ -345,16 +337,9 @@ class MaterialParserService:
                 result.suggested_price_category_name = price_cat.name
                 result.confidence += 0.05
 
-                # Load first tier (cheapest) as baseline price
-                tier_result = await self.db.execute(
-                    select(MaterialPriceTier)
-                    .where(MaterialPriceTier.price_category_id == price_cat.id)
-                    .order_by(MaterialPriceTier.min_weight)
-                    .limit(1)
-                )
-                tier = tier_result.scalar_one_or_none()
-                if tier:
-                    result.suggested_price_per_kg = tier.price_per_kg
+                # First tier (cheapest) as baseline price
+                if price_cat.base_price_per_kg is not None:
+                    result.suggested_price_per_kg = price_cat.base_price_per_kg
             # 4a. FLAT_BAR → PLATE re-interpretace
             # Pokud materiál nemá FLAT_BAR ale má PLATE, vstup "20,30 100"
             # znamená desku: tloušťka=20, přířez 30×100
@@ -378,16 +363,9 @@ class MaterialParserService:
                 result.suggested_price_category_name = price_cat.name
                 result.confidence += 0.05
 
-                # Load first tier (cheapest) as baseline price
-                tier_result = await self.db.execute(
-                    select(MaterialPriceTier)
-                    .where(MaterialPriceTier.price_category_id == price_cat.id)
-                    .order_by(MaterialPriceTier.min_weight)
-                    .limit(1)
-                )
-                tier = tier_result.scalar_one_or_none()
-                if tier:
-                    result.suggested_price_per_kg = tier.price_per_kg
+                # First tier (cheapest) as baseline price
+                if price_cat.base_price_per_kg is not None:
+                    result.suggested_price_per_kg = price_cat.base_price_per_kg
             else:
                 # WARNING: Nenalezena cenová kategorie pro tento materiál + tvar
                 shape_label = {
@@ -434,25 +412,14 @@ class MaterialParserService:
                 result.suggested_material_item_name = item.name
                 result.suggested_price_category_id = item.price_category_id
 
-                # Reload price category with name
-                cat_result = await self.db.execute(
-                    select(MaterialPriceCategory)
-                    .where(MaterialPriceCategory.id == item.price_category_id)
-                )
-                price_cat = cat_result.scalar_one_or_none()
+                # Price category položky (název + baseline cena z indexu)
+                price_cat = (await self._get_index()).price_category(item.price_category_id)
                 if price_cat:
                     result.suggested_price_category_code = price_cat.code
                     result.suggested_price_category_name = price_cat.name
 
-                    tier_result = await self.db.execute(
-                        select(MaterialPriceTier)
-                        .where(MaterialPriceTier.price_category_id == price_cat.id)
-                        .order_by(MaterialPriceTier.min_weight)
-                        .limit(1)
-                    )
-                    tier = tier_result.scalar_one_or_none()
-                    if tier:
-                        result.suggested_price_per_kg = tier.price_per_kg
+                    if price_cat.base_price_per_kg is not None:
+                        result.suggested_price_per_kg = price_cat.base_price_per_kg
 
                     result.warnings = [
                         w for w in result.warnings
@@ -484,6 +451,31 @@ class MaterialParserService:
 
         return result
 
+    async def parse_many(self, descriptions: List[str]) -> List[ParseResult]:
+        """
+        Parsuje více popisů najednou (import poptávky, BOM).
+
+        Index norem se načte jednou, duplicitní popisy se parsují jen jednou
+        a dotazy do katalogu (MaterialItem) se sdílí pro stejné rozměry.
+
+        Returns:
+            ParseResult pro každý vstup, ve stejném pořadí
+        """
+        await self._get_index()
+        self._items_memo = {}
+        parsed: Dict[str, ParseResult] = {}
+        try:
+            results: List[ParseResult] = []
+            for description in descriptions:
+                cached = parsed.get(description)
+                if cached is None:
+                    cached = await self.parse(description)
+                    parsed[description] = cached
+                results.append(cached.model_copy(deep=True))
+            return results
+        finally:
+            self._items_memo = None
+
     # ========== HELPER METHODS ==========
 
     def _extract_shape(self, text: str) -> Optional[Dict[str, Any]]:
@@ -555,28 +547,11 @@ class MaterialParserService:
 
         logger.debug(f"_extract_material: potential codes found: {potential_codes}")
 
-        # Try to find these codes in MaterialNorm DB
+        # Try to find these codes in MaterialNorm (index: exact i contains,
+        # kódy uložené ve formátu "AW 6082" apod.)
+        index = await self._get_index()
         for code in potential_codes:
-            code_upper = code.upper()
-            result = await self.db.execute(
-                select(MaterialNorm)
-                .where(
-                    or_(
-                        MaterialNorm.w_nr == code_upper,
-                        MaterialNorm.en_iso == code_upper,
-                        MaterialNorm.csn == code_upper,
-                        MaterialNorm.aisi == code_upper,
-                        # Contains match pro kódy uložené ve formátu "AW 6082" apod.
-                        MaterialNorm.w_nr.like(f'%{code_upper}%'),
-                        MaterialNorm.en_iso.like(f'%{code_upper}%'),
-                        MaterialNorm.csn.like(f'%{code_upper}%'),
-                        MaterialNorm.aisi.like(f'%{code_upper}%'),
-                    ),
-                    MaterialNorm.deleted_at.is_(None)
-                )
-                .limit(1)
-            )
-            norm = result.scalar_one_or_none()
+            norm = index.find_contains(code.upper())
 
             if norm:
                 logger.debug(f"_extract_material: DB match found for '{code}' → MaterialNorm ID {norm.id}")
@@ -679,7 +654,7 @@ class MaterialParserService:
 
         return None
 
-    async def _find_material_group(self, norm: str) -> Optional[MaterialGroup]:
+    async def _find_material_group(self, norm: str) -> Optional[GroupEntry]:
         """
         Najde MaterialGroup podle normy (hledá v MaterialNorm).
 
@@ -687,107 +662,46 @@ class MaterialParserService:
             norm: Materiálová norma (např. "C45", "1.4301", "S235")
 
         Returns:
-            MaterialGroup nebo None
+            GroupEntry (id, code, name, density) nebo None
 
         Strategy:
             1. Try exact match first (fastest, most specific)
             2. If not found, try prefix match (e.g. "S235" → "S235JR", "S235J2")
         """
         norm_upper = norm.upper()
+        index = await self._get_index()
 
         # 1. Try exact match first (hledá ve všech 4 sloupcích)
-        result = await self.db.execute(
-            select(MaterialNorm)
-            .where(
-                or_(
-                    MaterialNorm.w_nr == norm_upper,
-                    MaterialNorm.en_iso == norm_upper,
-                    MaterialNorm.csn == norm_upper,
-                    MaterialNorm.aisi == norm_upper
-                ),
-                MaterialNorm.deleted_at.is_(None)
-            )
-            .limit(1)
-        )
-
-        material_norm = result.scalar_one_or_none()
+        material_norm = index.find_exact(norm_upper)
 
         # 2. If not found, try prefix match (for cases like S235 → S235JR)
         if not material_norm:
-            result = await self.db.execute(
-                select(MaterialNorm)
-                .where(
-                    or_(
-                        MaterialNorm.w_nr.like(f'{norm_upper}%'),
-                        MaterialNorm.en_iso.like(f'{norm_upper}%'),
-                        MaterialNorm.csn.like(f'{norm_upper}%'),
-                        MaterialNorm.aisi.like(f'{norm_upper}%')
-                    ),
-                    MaterialNorm.deleted_at.is_(None)
-                )
-                .limit(1)
-            )
-
-            material_norm = result.scalar_one_or_none()
+            material_norm = index.find_prefix(norm_upper)
 
         # 3. Fallback: contains match (e.g. "6082" matchuje "AW 6082")
         # Pouze pro kódy délky >= 3 (aby se zabránilo false positive krátkých čísel)
         if not material_norm and len(norm_upper) >= 3:
-            result = await self.db.execute(
-                select(MaterialNorm)
-                .where(
-                    or_(
-                        MaterialNorm.w_nr.like(f'%{norm_upper}%'),
-                        MaterialNorm.en_iso.like(f'%{norm_upper}%'),
-                        MaterialNorm.csn.like(f'%{norm_upper}%'),
-                        MaterialNorm.aisi.like(f'%{norm_upper}%')
-                    ),
-                    MaterialNorm.deleted_at.is_(None)
-                )
-                .limit(1)
-            )
-
-            material_norm = result.scalar_one_or_none()
+            material_norm = index.find_contains(norm_upper)
 
         if not material_norm:
             return None
 
-        # Načíst MaterialGroup
-        result = await self.db.execute(
-            select(MaterialGroup)
-            .where(
-                MaterialGroup.id == material_norm.material_group_id,
-                MaterialGroup.deleted_at.is_(None)
-            )
-        )
-
-        return result.scalar_one_or_none()
+        return index.group(material_norm.material_group_id)
 
     async def _find_price_category(
         self,
         material_group_id: int,
         shape: StockShape
-    ) -> Optional[MaterialPriceCategory]:
+    ) -> Optional[PriceCategoryEntry]:
         """
         Najde MaterialPriceCategory podle MaterialGroup + Shape.
 
         Používá sloupec `shape` (StockShape enum value) pro spolehlivý matching.
-        Fallback: keyword search v názvu (pro starší záznamy bez shape sloupce).
         """
         logger.debug(f"_find_price_category: Looking for material_group_id={material_group_id}, shape={shape}")
 
-        # Primary: exact match on shape column (reliable, no diacritics issues)
-        result = await self.db.execute(
-            select(MaterialPriceCategory)
-            .where(
-                MaterialPriceCategory.material_group_id == material_group_id,
-                MaterialPriceCategory.shape == shape.value,
-                MaterialPriceCategory.deleted_at.is_(None)
-            )
-            .limit(1)
-        )
-
-        category = result.scalar_one_or_none()
+        index = await self._get_index()
+        category = index.price_category_for(material_group_id, shape.value)
         if category:
             logger.debug(f"_find_price_category: Found category: {category.code} ({category.name})")
             return category
@@ -819,6 +733,9 @@ class MaterialParserService:
           3. Bez filtru — jen group + shape + rozměry (last resort)
         """
         args = (material_group_id, shape, diameter, width, height, thickness, wall_thickness)
+        memo_key = (*args, material_norm, original_norm)
+        if self._items_memo is not None and memo_key in self._items_memo:
+            return self._items_memo[memo_key]
 
         # Sestavit kaskádu norm k vyzkoušení (deduplikace, jen platné)
         norms_to_try: List[Optional[str]] = []
@@ -842,6 +759,8 @@ class MaterialParserService:
                 if alt_items:
                     break
 
+        if self._items_memo is not None:
+            self._items_memo[memo_key] = (exact_items, alt_items)
         return exact_items, alt_items
 
     async def _find_exact_items(
@@ -6,14 +6,13 @@ Single-call pipeline:
 Supports both base GPT-4o and fine-tuned models for improved accuracy.
 """
 
+import asyncio
 import json
-import base64
 import logging
 from pathlib import Path
 from typing import Optional, Callable
 
-import fitz  # PyMuPDF
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from app.config import settings
 from app.services.openai_vision_prompts import (
@@ -24,6 +23,7 @@ from app.services.openai_vision_prompts import (
     build_openai_ft_prompt,
     build_features_prompt,
 )
+from app.services.pdf_raster import rasterize_pdf_sync
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +37,91 @@ def is_fine_tuned_model() -> bool:
     """Check if the currently configured model is a fine-tuned model."""
     return OPENAI_MODEL.startswith("ft:")
 
+
+FEATURES_MODEL = "gpt-4.1"  # Base model for features — better vision than gpt-4o
+VISION_DETAIL = "high"  # První pokus; při odmítnutí druhý pokus s "auto"
+
+
+def time_estimation_prompts(similar_parts: Optional[list] = None) -> tuple[str, str, str]:
+    """(model, system prompt, user prompt) for single-call time estimation.
+
+    Fine-tuned model uses compact prompts (tables learned from training data),
+    base model uses full prompts with reference tables and calibration examples.
+    """
+    if is_fine_tuned_model():
+        return OPENAI_MODEL, OPENAI_FT_SYSTEM, build_openai_ft_prompt()
+    return OPENAI_MODEL, OPENAI_VISION_SYSTEM, build_openai_vision_prompt(similar_parts=similar_parts)
+
+
+def features_prompts() -> tuple[str, str, str]:
+    """(model, system prompt, user prompt) for feature extraction (never fine-tuned)."""
+    return FEATURES_MODEL, OPENAI_FEATURES_SYSTEM, build_features_prompt()
+
+
+def _create_client() -> AsyncOpenAI:
+    return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None)
+
+
+async def _call_vision_with_fallback(
+    model: str,
+    sys_prompt: str,
+    user_prompt: str,
+    image_b64: str,
+    max_tokens: int,
+):
+    """Vision call: high detail → auto detail on refusal/error. Returns (raw_text, response).
+
+    No fallback to minimal prompt — better to fail than return garbage estimates.
+    """
+    strategies = [VISION_DETAIL, "auto"]
+
+    async with _create_client() as client:
+        for attempt, detail_mode in enumerate(strategies, 1):
+            try:
+                response = await client.chat.completions.create(
+                    model=model,
+                    max_tokens=max_tokens,
+                    temperature=0,
+                    store=True,  # Log to OpenAI dashboard
+                    messages=[
+                        {"role": "system", "content": sys_prompt},
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "image_url",
+                                    "image_url": {
+                                        "url": f"data:image/png;base64,{image_b64}",
+                                        "detail": detail_mode,
+                                    },
+                                },
+                                {"type": "text", "text": user_prompt},
+                            ],
+                        },
+                    ],
+                )
+            except Exception as exc:
+                logger.error("OpenAI API call failed (attempt %d, detail=%s): %s", attempt, detail_mode, exc)
+                if attempt == len(strategies):
+                    raise RuntimeError(f"OpenAI API call failed: {exc}") from exc
+                continue
+
+            raw_text = response.choices[0].message.content
+            logger.info("OpenAI response (attempt %d, detail=%s, %d chars): %s...",
+                         attempt, detail_mode, len(raw_text), raw_text[:200])
+
+            # Check for refusal — try next strategy
+            if raw_text and ("can't assist" in raw_text.lower() or "cannot assist" in raw_text.lower()
+                             or "i'm sorry" in raw_text.lower()):
+                logger.warning("OpenAI refused (attempt %d/%d, detail=%s): %s",
+                               attempt, len(strategies), detail_mode, raw_text[:100])
+                if attempt < len(strategies):
+                    logger.info("Retrying with strategy %d...", attempt + 1)
+                    continue
+                raise RuntimeError(f"OpenAI refused to process drawing: {raw_text[:200]}")
+
+            return raw_text, response
+
 MAX_IMAGE_DIMENSION = 4096  # OpenAI high-detail max tile size
 
 
@@ -45,6 +130,8 @@ def _pdf_to_base64_image(pdf_path: str, page_num: int = 0, dpi: int = 300) -> st
 
     Automatically caps image dimensions to MAX_IMAGE_DIMENSION to stay within
     OpenAI vision API limits while maintaining 300+ DPI for standard drawings.
+    Rendered pages come from the shared raster cache (pdf_raster) when the
+    same file content was already rendered with the same DPI.
 
     Args:
         pdf_path: Path to the PDF file.
@@ -62,48 +149,20 @@ def _pdf_to_base64_image(pdf_path: str, page_num: int = 0, dpi: int = 300) -> st
         raise FileNotFoundError(f"PDF file not found: {pdf_path}")
 
     try:
-        doc = fitz.open(pdf_path)
+        images = rasterize_pdf_sync(pdf_path, max_pages=page_num + 1, dpi=dpi, max_dim=MAX_IMAGE_DIMENSION)
     except Exception as exc:
-        logger.error("Failed to open PDF %s: %s", pdf_path, exc)
-        raise RuntimeError(f"Failed to open PDF: {exc}") from exc
+        logger.error("Failed to render PDF %s: %s", pdf_path, exc)
+        raise RuntimeError(f"Failed to render PDF page: {exc}") from exc
 
-    try:
-        if page_num >= len(doc):
-            raise ValueError(
-                f"Page {page_num} out of range (PDF has {len(doc)} pages)"
-            )
-
-        page = doc[page_num]
-
-        # Calculate scale factor, cap at MAX_IMAGE_DIMENSION
-        scale = dpi / 72.0
-        page_w = page.rect.width * scale
-        page_h = page.rect.height * scale
-
-        if max(page_w, page_h) > MAX_IMAGE_DIMENSION:
-            scale = MAX_IMAGE_DIMENSION / max(page.rect.width, page.rect.height)
-            effective_dpi = scale * 72
-            logger.info(
-                "Capping image size: %dx%d → %dx%d (DPI %d→%d)",
-                int(page_w), int(page_h),
-                int(page.rect.width * scale), int(page.rect.height * scale),
-                dpi, int(effective_dpi),
-            )
-
-        mat = fitz.Matrix(scale, scale)
-        pix = page.get_pixmap(matrix=mat)
-        png_bytes = pix.tobytes("png")
-        logger.info(
-            "Rendered %s page %d: %dx%d px, %d KB",
-            Path(pdf_path).name, page_num, pix.width, pix.height,
-            len(png_bytes) // 1024,
+    if page_num >= len(images):
+        raise RuntimeError(
+            f"Failed to render PDF page: page {page_num} out of range (PDF has {len(images)} pages)"
         )
-        return base64.b64encode(png_bytes).decode("utf-8")
-    except Exception as exc:
-        logger.error("Failed to render PDF page: %s", exc)
-        raise RuntimeError(f"Failed to render PDF page: {exc}") from exc
-    finally:
-        doc.close()
+    logger.info(
+        "Rendered %s page %d: %d KB",
+        Path(pdf_path).name, page_num, len(images[page_num]) * 3 // 4 // 1024,
+    )
+    return images[page_num]
 
 
 async def estimate_from_pdf_openai(
@@ -144,7 +203,7 @@ async def estimate_from_pdf_openai(
         on_step("Rendering PDF to image...")
 
     try:
-        image_b64 = _pdf_to_base64_image(pdf_path)
+        image_b64 = await asyncio.to_thread(_pdf_to_base64_image, pdf_path)
     except Exception as exc:
         logger.error("PDF rendering failed for %s: %s", path.name, exc)
         raise
@@ -157,73 +216,12 @@ async def estimate_from_pdf_openai(
     if on_step:
         on_step(f"OpenAI {model_label} vision odhad...")
 
-    # Fine-tuned model uses compact prompts (tables learned from training data)
-    # Base model uses full prompts with reference tables and calibration examples
-    if ft:
-        sys_prompt = OPENAI_FT_SYSTEM
-        user_prompt = build_openai_ft_prompt()
-        logger.info("Using COMPACT prompts for fine-tuned model")
-    else:
-        sys_prompt = OPENAI_VISION_SYSTEM
-        user_prompt = build_openai_vision_prompt(similar_parts=similar_parts)
-        logger.info("Using FULL prompts for base model")
-
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-    # 2 attempts: high detail → auto detail
-    # No fallback to minimal prompt — better to fail than return garbage estimates
-    strategies = [
-        ("high", sys_prompt, user_prompt),
-        ("auto", sys_prompt, user_prompt),
-    ]
-
-    raw_text = None
-    for attempt, (detail_mode, sys_prompt, usr_prompt) in enumerate(strategies, 1):
-        try:
-            response = client.chat.completions.create(
-                model=OPENAI_MODEL,
-                max_tokens=2000,
-                temperature=0,
-                store=True,
-                messages=[
-                    {"role": "system", "content": sys_prompt},
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{image_b64}",
-                                    "detail": detail_mode,
-                                },
-                            },
-                            {"type": "text", "text": usr_prompt},
-                        ],
-                    },
-                ],
-            )
-        except Exception as exc:
-            logger.error("OpenAI API call failed (attempt %d, detail=%s): %s", attempt, detail_mode, exc)
-            if attempt == len(strategies):
-                raise RuntimeError(f"OpenAI API call failed: {exc}") from exc
-            continue
-
-        raw_text = response.choices[0].message.content
-        logger.info("OpenAI response (attempt %d, detail=%s, %d chars): %s...",
-                     attempt, detail_mode, len(raw_text), raw_text[:200])
-
-        # Check for refusal — try next strategy
-        if raw_text and ("can't assist" in raw_text.lower() or "cannot assist" in raw_text.lower()
-                         or "i'm sorry" in raw_text.lower()):
-            logger.warning("OpenAI refused (attempt %d/%d, detail=%s): %s",
-                           attempt, len(strategies), detail_mode, raw_text[:100])
-            if attempt < len(strategies):
-                logger.info("Retrying with strategy %d...", attempt + 1)
-                continue
-            raise RuntimeError(f"OpenAI refused to process drawing: {raw_text[:200]}")
+    model, sys_prompt, user_prompt = time_estimation_prompts(similar_parts)
+    logger.info("Using %s prompts for %s model", "COMPACT" if ft else "FULL", model_label)
 
-        # Success
-        break
+    raw_text, response = await _call_vision_with_fallback(
+        model, sys_prompt, user_prompt, image_b64, max_tokens=2000,
+    )
 
     # Extract JSON from response (handle potential markdown wrapping)
     result = _parse_json_response(raw_text)
@@ -288,7 +286,7 @@ async def extract_features_from_pdf_openai(
         on_step("Rendering PDF to image...")
 
     try:
-        image_b64 = _pdf_to_base64_image(pdf_path)
+        image_b64 = await asyncio.to_thread(_pdf_to_base64_image, pdf_path)
     except Exception as exc:
         logger.error("PDF rendering failed for %s: %s", path.name, exc)
         raise
@@ -299,65 +297,12 @@ async def extract_features_from_pdf_openai(
     if on_step:
         on_step("OpenAI gpt-4.1 feature extraction...")
 
-    sys_prompt = OPENAI_FEATURES_SYSTEM
-    user_prompt = build_features_prompt()
-    logger.info("Using base gpt-4.1 for feature extraction (NOT fine-tuned model)")
-
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-    # 2 attempts: high detail → auto detail
-    strategies = [
-        ("high", sys_prompt, user_prompt),
-        ("auto", sys_prompt, user_prompt),
-    ]
-
-    raw_text = None
-    for attempt, (detail_mode, sys_prompt, usr_prompt) in enumerate(strategies, 1):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4.1",  # Base model for features — better vision than gpt-4o
-                max_tokens=4000,  # Features need more output than time estimation
-                temperature=0,
-                store=True,  # Log to OpenAI dashboard
-                messages=[
-                    {"role": "system", "content": sys_prompt},
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{image_b64}",
-                                    "detail": detail_mode,
-                                },
-                            },
-                            {"type": "text", "text": usr_prompt},
-                        ],
-                    },
-                ],
-            )
-        except Exception as exc:
-            logger.error("OpenAI API call failed (attempt %d, detail=%s): %s", attempt, detail_mode, exc)
-            if attempt == len(strategies):
-                raise RuntimeError(f"OpenAI API call failed: {exc}") from exc
-            continue
-
-        raw_text = response.choices[0].message.content
-        logger.info("OpenAI response (attempt %d, detail=%s, %d chars): %s...",
-                     attempt, detail_mode, len(raw_text), raw_text[:200])
-
-        # Check for refusal — try next strategy
-        if raw_text and ("can't assist" in raw_text.lower() or "cannot assist" in raw_text.lower()
-                         or "i'm sorry" in raw_text.lower()):
-            logger.warning("OpenAI refused (attempt %d/%d, detail=%s): %s",
-                           attempt, len(strategies), detail_mode, raw_text[:100])
-            if attempt < len(strategies):
-                logger.info("Retrying with strategy %d...", attempt + 1)
-                continue
-            raise RuntimeError(f"OpenAI refused to process drawing: {raw_text[:200]}")
+    model, sys_prompt, user_prompt = features_prompts()
+    logger.info("Using base %s for feature extraction (NOT fine-tuned model)", model)
 
-        # Success
-        break
+    raw_text, response = await _call_vision_with_fallback(
+        model, sys_prompt, user_prompt, image_b64, max_tokens=4000,  # Features need more output
+    )
 
     # Extract JSON from response (handle potential markdown wrapping)
     result = _parse_json_response(raw_text)
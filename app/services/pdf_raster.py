@@ -0,0 +1,355 @@
+"""GESTIMA - Rasterizace PDF stránek mimo event loop + diskový cache renderů
+
+PyMuPDF drží GIL po celou dobu renderu, takže render v `async def` (nebo
+v threadu) zastaví celý uvicorn worker. Render proto běží v process poolu
+(PDF_RASTER_WORKERS procesů, spawn — child nedědí vlákna event busu / DB),
+výsledkem jsou base64 PNG pro OpenAI Vision.
+
+Vyrenderované stránky se ukládají na disk (RasterCache) s klíčem
+(SHA-256 obsahu PDF, stránka, DPI, max rozměr) — stejný výkres se při
+opakovaném odhadu, exportu trénovacích dat nebo parsování poptávky
+nerenderuje znovu. Eviction LRU podle celkové velikosti (RASTER_CACHE_MAX_MB).
+
+- render_pdf_pages()   — synchronní render → PNG bytes (běží v child procesu)
+- rasterize_pdf()      — async: cache + pool, PDF_RASTER_WORKERS=0 → thread
+- rasterize_pdf_sync() — totéž synchronně (volající už běží mimo event loop)
+- close_raster_pool()  — ukončení poolu v lifespan shutdown
+"""
+
+import asyncio
+import base64
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Optional, Union
+
+import fitz  # PyMuPDF
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_IMAGE_DIM = 4096  # OpenAI high-detail max tile size
+DEFAULT_DPI = 300
+
+# Změna způsobu renderu (alpha, formát, …) → zvýšit, staré záznamy se přestanou trefovat
+_RASTER_REV = 1
+# Jak často cache přenačte adresář (zápisy/evikce ostatních workerů)
+_CACHE_RESCAN_INTERVAL_S = 60.0
+
+PdfSource = Union[bytes, str, Path]
+
+
+def render_pdf_pages(
+    pdf_bytes: bytes,
+    page_nums: list[int],
+    dpi: int = DEFAULT_DPI,
+    max_dim: int = MAX_IMAGE_DIM,
+) -> tuple[int, list[bytes]]:
+    """Render given pages of a PDF to PNG bytes -> (page_count, pngs).
+
+    Stránky větší než `max_dim` px se zmenší (zachová poměr stran), čísla
+    stránek mimo rozsah se přeskočí. Top-level funkce — musí jít picklovat
+    do child procesu.
+    """
+    try:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    except Exception as exc:
+        raise RuntimeError(f"Failed to open PDF bytes: {exc}") from exc
+
+    try:
+        if len(doc) == 0:
+            raise ValueError("PDF has no pages")
+
+        images: list[bytes] = []
+        for page_num in page_nums:
+            if page_num >= len(doc):
+                continue
+            page = doc[page_num]
+            scale = dpi / 72.0
+            if max(page.rect.width, page.rect.height) * scale > max_dim:
+                scale = max_dim / max(page.rect.width, page.rect.height)
+
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+            images.append(pix.tobytes("png"))
+        return len(doc), images
+    finally:
+        doc.close()
+
+
+# =============================================================================
+# Disk cache
+# =============================================================================
+
+class RasterCache:
+    """Content-addressed cache of rendered pages on disk, LRU by total size.
+
+    Index (klíč → velikost) se načte líně ze souborů seřazených podle mtime;
+    hit posune mtime, takže pořadí LRU přežije restart. Zápis přes
+    tmp + os.replace — souběžné workery nikdy nečtou rozepsaný soubor.
+
+    Víc workerů sdílí adresář, ale každý má vlastní index: soubor, který
+    index nezná (zapsal ho jiný worker), get() najde na disku a převezme;
+    před evikcí (a aspoň jednou za _CACHE_RESCAN_INTERVAL_S) se index přenačte
+    z disku, aby velikost odpovídala skutečnosti.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._size = 0
+        self._scanned_at = 0.0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.bin"
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        # Explicitní ns čas — jádro jinak dává hrubé mtime a LRU pořadí z disku by se remízovalo
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+
+    def _ensure_index(self, rescan: bool = False) -> "OrderedDict[str, int]":
+        if self._index is None or rescan:
+            entries = []
+            if self.root.is_dir():
+                for path in self.root.glob("*/*.bin"):
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime_ns, path.stem, st.st_size))
+            entries.sort()
+            self._index = OrderedDict((key, size) for _, key, size in entries)
+            self._size = sum(size for _, _, size in entries)
+            self._scanned_at = time.monotonic()
+        return self._index
+
+    @property
+    def size_bytes(self) -> int:
+        with self._lock:
+            self._ensure_index()
+            return self._size
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            # Nikdy nezapsáno, nebo smazáno jiným workerem (eviction) — miss
+            with self._lock:
+                self._size -= self._ensure_index().pop(key, 0)
+                self.misses += 1
+            return None
+        try:
+            self._touch(path)
+        except OSError:
+            pass  # Mezitím smazáno jiným workerem — přečtená data jsou platná
+        with self._lock:
+            index = self._ensure_index()
+            if key in index:
+                index.move_to_end(key)
+            else:
+                # Zapsal jiný worker — převzít do indexu (velikost i LRU pořadí)
+                index[key] = len(data)
+                self._size += len(data)
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            self._touch(path)
+        except OSError as exc:
+            logger.warning("Raster cache write failed for %s: %s", key, exc)
+            return
+
+        evicted: list[str] = []
+        with self._lock:
+            index = self._ensure_index()
+            self._size -= index.pop(key, 0)
+            index[key] = len(data)
+            self._size += len(data)
+            stale = time.monotonic() - self._scanned_at >= _CACHE_RESCAN_INTERVAL_S
+            if self._size > self.max_bytes or stale:
+                # Ostatní workery mezitím zapisovaly/mazaly — počítat se skutečným obsahem
+                index = self._ensure_index(rescan=True)
+            while self._size > self.max_bytes and len(index) > 1:
+                old_key, old_size = index.popitem(last=False)
+                self._size -= old_size
+                evicted.append(old_key)
+        for old_key in evicted:
+            self._path(old_key).unlink(missing_ok=True)
+
+
+_cache: Optional[RasterCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_raster_cache() -> Optional[RasterCache]:
+    """Sdílený cache dle settings (None = RASTER_CACHE_MAX_MB=0)."""
+    global _cache
+    max_bytes = settings.RASTER_CACHE_MAX_MB * 1024 * 1024
+    if max_bytes <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.root != Path(settings.RASTER_CACHE_DIR) or _cache.max_bytes != max_bytes:
+            _cache = RasterCache(Path(settings.RASTER_CACHE_DIR), max_bytes)
+        return _cache
+
+
+def _page_key(file_hash: str, page_num: int, dpi: int, max_dim: int) -> str:
+    return hashlib.sha256(f"{_RASTER_REV}:{file_hash}:{page_num}:{dpi}:{max_dim}".encode()).hexdigest()
+
+
+def _count_key(file_hash: str) -> str:
+    return hashlib.sha256(f"{_RASTER_REV}:{file_hash}:pages".encode()).hexdigest()
+
+
+def _read_source(source: PdfSource) -> bytes:
+    if isinstance(source, bytes):
+        return source
+    return Path(source).read_bytes()
+
+
+def _lookup(
+    cache: Optional[RasterCache], file_hash: str, max_pages: int, dpi: int, max_dim: int,
+) -> tuple[list[int], dict[int, bytes]]:
+    """Stránky k renderu + PNG nalezené v cache."""
+    page_count = None
+    if cache is not None:
+        raw = cache.get(_count_key(file_hash))
+        page_count = int(raw) if raw else None
+    wanted = list(range(min(max_pages, page_count) if page_count else max_pages))
+
+    found: dict[int, bytes] = {}
+    if cache is not None and page_count:
+        for page_num in wanted:
+            png = cache.get(_page_key(file_hash, page_num, dpi, max_dim))
+            if png is not None:
+                found[page_num] = png
+    return [p for p in wanted if p not in found], found
+
+
+def _store(
+    cache: Optional[RasterCache], file_hash: str, missing: list[int],
+    page_count: int, pngs: list[bytes], dpi: int, max_dim: int,
+) -> dict[int, bytes]:
+    rendered = dict(zip([p for p in missing if p < page_count], pngs))
+    if cache is not None:
+        cache.put(_count_key(file_hash), str(page_count).encode())
+        for page_num, png in rendered.items():
+            cache.put(_page_key(file_hash, page_num, dpi, max_dim), png)
+    return rendered
+
+
+def _to_b64(pages: dict[int, bytes]) -> list[str]:
+    return [base64.b64encode(pages[p]).decode("utf-8") for p in sorted(pages)]
+
+
+def rasterize_pdf_sync(
+    source: PdfSource,
+    max_pages: int = 1,
+    dpi: int = DEFAULT_DPI,
+    max_dim: int = MAX_IMAGE_DIM,
+) -> list[str]:
+    """Render first `max_pages` pages to base64 PNG, through the raster cache.
+
+    Pro synchronní volající (thread, CLI); render běží v aktuálním procesu.
+    """
+    pdf_bytes = _read_source(source)
+    file_hash = hashlib.sha256(pdf_bytes).hexdigest()
+    cache = get_raster_cache()
+    missing, pages = _lookup(cache, file_hash, max_pages, dpi, max_dim)
+    if missing:
+        page_count, pngs = render_pdf_pages(pdf_bytes, missing, dpi, max_dim)
+        pages.update(_store(cache, file_hash, missing, page_count, pngs, dpi, max_dim))
+    return _to_b64(pages)
+
+
+# =============================================================================
+# Process pool
+# =============================================================================
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if settings.PDF_RASTER_WORKERS <= 0:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_RASTER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+async def _render_off_loop(
+    pdf_bytes: bytes, page_nums: list[int], dpi: int, max_dim: int,
+) -> tuple[int, list[bytes]]:
+    global _pool
+    pool = _get_pool()
+    if pool is None:
+        return await asyncio.to_thread(render_pdf_pages, pdf_bytes, page_nums, dpi, max_dim)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(pool, render_pdf_pages, pdf_bytes, page_nums, dpi, max_dim)
+    except BrokenProcessPool:
+        # Spadlý child (např. OOM na obřím výkresu) — další render dostane nový pool
+        logger.error("PDF raster pool broken, recreating")
+        if _pool is pool:
+            _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise RuntimeError("PDF rasterization worker crashed")
+
+
+async def rasterize_pdf(
+    source: PdfSource,
+    max_pages: int = 1,
+    dpi: int = DEFAULT_DPI,
+    max_dim: int = MAX_IMAGE_DIM,
+) -> list[str]:
+    """Render first `max_pages` pages to base64 PNG without blocking the event loop.
+
+    Hash + cache lookup v threadu, chybějící stránky v process poolu.
+    """
+    def _prepare() -> tuple[bytes, str, list[int], dict[int, bytes]]:
+        pdf_bytes = _read_source(source)
+        file_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        return (pdf_bytes, file_hash, *_lookup(get_raster_cache(), file_hash, max_pages, dpi, max_dim))
+
+    pdf_bytes, file_hash, missing, pages = await asyncio.to_thread(_prepare)
+    if missing:
+        page_count, pngs = await _render_off_loop(pdf_bytes, missing, dpi, max_dim)
+        pages.update(await asyncio.to_thread(
+            _store, get_raster_cache(), file_hash, missing, page_count, pngs, dpi, max_dim,
+        ))
+    return _to_b64(pages)
+
+
+async def close_raster_pool() -> None:
+    """Shutdown the raster process pool (app lifespan)."""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await asyncio.to_thread(pool.shutdown, True, cancel_futures=True)
@@ -1,21 +1,40 @@
 """GESTIMA - PDF generation service for quotes
 
-Uses Chrome headless (--print-to-pdf) for pixel-perfect rendering.
+Uses Chrome headless for pixel-perfect rendering.
 Template: app/templates/quote_pdf.html.jinja2 (identical to quote-pdf-preview.html)
+
+Rendering:
+- ChromeRendererPool: dlouho běžící headless Chrome ovládané DevTools
+  protokolem přes pipe (--remote-debugging-pipe, bez síťového portu);
+  max PDF_RENDERER_POOL_SIZE souběžných renderů, health check, recyklace
+  po _MAX_RENDERS_PER_BROWSER PDF
+- PDF_RENDERER_POOL_SIZE=0 nebo selhání poolu → jednorázový Chrome --print-to-pdf
+- zkompilovaná šablona a base64 logo se načtou jednou
+- LRU cache PDF podle hashe HTML (obsah nabídky + šablona) + _RENDER_REV →
+  opakované stažení nezměněné nabídky bez renderu
 """
 
 import asyncio
 import base64
+import hashlib
+import json
 import logging
 import os
 import shutil
+import signal
+import sys
 import tempfile
+import time
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
 from itertools import groupby
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
+
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
 
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +73,7 @@ def _find_chrome() -> Optional[str]:
 
 
 _jinja_env: Optional[Environment] = None
+_template: Optional[Template] = None
 
 
 def _get_jinja_env() -> Environment:
@@ -62,12 +82,20 @@ def _get_jinja_env() -> Environment:
         _jinja_env = Environment(
             loader=FileSystemLoader(str(_TEMPLATE_DIR)),
             autoescape=select_autoescape(["html"]),
+            auto_reload=False,  # šablona se mění jen s deployem → bez stat() při každém renderu
         )
         _jinja_env.filters["czk"] = _format_czk
         _jinja_env.filters["datecz"] = _format_date_cz
     return _jinja_env
 
 
+def _get_template() -> Template:
+    global _template
+    if _template is None:
+        _template = _get_jinja_env().get_template("quote_pdf.html.jinja2")
+    return _template
+
+
 def _format_czk(value: float) -> str:
     """Format float as Czech currency: 1 248,50 Kč"""
     try:
@@ -98,6 +126,7 @@ def _format_date_cz(value) -> str:
     return str(value)
 
 
+@lru_cache(maxsize=1)
 def _load_logo_b64() -> Optional[str]:
     if not _LOGO_PATH.exists():
         return None
@@ -143,9 +172,7 @@ def _group_items(items) -> list:
 
 def _render_html(quote, partner, items) -> str:
     """Render Jinja2 template to HTML string."""
-    env = _get_jinja_env()
-    template = env.get_template("quote_pdf.html.jinja2")
-    return template.render(
+    return _get_template().render(
         quote=quote,
         partner=partner,
         groups=_group_items(items),
@@ -154,16 +181,384 @@ def _render_html(quote, partner, items) -> str:
     )
 
 
+# ---------------------------------------------------------------------------
+# Chrome renderer pool (DevTools protokol přes pipe)
+# ---------------------------------------------------------------------------
+
+_MAX_RENDERS_PER_BROWSER = 200  # recyklace (paměť Chrome roste)
+_HEALTH_CHECK_IDLE_S = 30.0  # nečinný déle → ping před použitím
+_PING_TIMEOUT_S = 3.0
+_DEVTOOLS_READ_LIMIT = 256 * 1024 * 1024  # printToPDF vrací base64 v jedné zprávě
+
+# Počkat na fonty a obrázky (logo je data URI, ale dekóduje se asynchronně)
+_READY_JS = (
+    "document.fonts.ready.then(() => Promise.all(Array.from(document.images)"
+    ".filter(img => !img.complete)"
+    ".map(img => new Promise(resolve => { img.onload = img.onerror = resolve; }))))"
+    ".then(() => true)"
+)
+
+# Odpovídá CLI --print-to-pdf --no-pdf-header-footer; @page { size: A4; margin: 0 }
+_PRINT_PARAMS = {
+    "printBackground": True,
+    "preferCSSPageSize": True,
+    "displayHeaderFooter": False,
+    "marginTop": 0,
+    "marginBottom": 0,
+    "marginLeft": 0,
+    "marginRight": 0,
+}
+
+_CHROME_FLAGS = [
+    "--headless",
+    "--disable-gpu",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--run-all-compositor-stages-before-draw",
+]
+
+
+# --remote-debugging-pipe čte příkazy z fd 3 a odpovídá na fd 4. subprocess umí
+# předat fd jen pod stejným číslem (pass_fds), takže konce pipe přesune na 3/4
+# krátký Python wrapper a pak exec Chrome (bez preexec_fn — ten není bezpečný
+# s vlákny v procesu). Přes F_DUPFD ≥ 10, aby se zdroj a cíl nepřekryly.
+_PIPE_FD_TRAMPOLINE = (
+    "import fcntl, os, sys\n"
+    "src = [int(fd) for fd in sys.argv[1:3]]\n"
+    "tmp = [fcntl.fcntl(fd, fcntl.F_DUPFD, 10) for fd in src]\n"
+    "for fd in src:\n"
+    "    os.close(fd)\n"
+    "for fd, target in zip(tmp, (3, 4)):\n"
+    "    os.dup2(fd, target)\n"
+    "    os.close(fd)\n"
+    "os.execv(sys.argv[3], sys.argv[3:])\n"
+)
+
+
+class DevToolsError(RuntimeError):
+    """Chyba DevTools příkazu nebo ukončený Chrome."""
+
+
+class ChromeRenderer:
+    """Jeden běžící headless Chrome; příkazy jako JSON zprávy oddělené NUL (fd 3 → Chrome, fd 4 → my)."""
+
+    def __init__(self, chrome: str):
+        self.chrome = chrome
+        self.renders = 0
+        self.last_used = time.monotonic()
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._profile_dir: Optional[str] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_id = 0
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._profile_dir = tempfile.mkdtemp(prefix="gestima-chrome-")
+        to_chrome_r, to_chrome_w = os.pipe()
+        from_chrome_r, from_chrome_w = os.pipe()
+
+        try:
+            self._proc = await asyncio.create_subprocess_exec(
+                sys.executable, "-I", "-S", "-c", _PIPE_FD_TRAMPOLINE,
+                str(to_chrome_r), str(from_chrome_w),
+                self.chrome,
+                *_CHROME_FLAGS,
+                "--remote-debugging-pipe",
+                f"--user-data-dir={self._profile_dir}",
+                "--no-first-run",
+                "--no-default-browser-check",
+                "--disable-extensions",
+                "--disable-background-networking",
+                "about:blank",
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+                pass_fds=(to_chrome_r, from_chrome_w),
+                # Vlastní skupina procesů: Ctrl+C uvicornu nedoletí do Chrome
+                # a close() ukončí i jeho renderer/GPU podprocesy
+                start_new_session=True,
+            )
+        finally:
+            os.close(to_chrome_r)
+            os.close(from_chrome_w)
+
+        reader = asyncio.StreamReader(limit=_DEVTOOLS_READ_LIMIT)
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(from_chrome_r, "rb", 0)
+        )
+        transport, protocol = await loop.connect_write_pipe(
+            lambda: asyncio.StreamReaderProtocol(asyncio.StreamReader()), os.fdopen(to_chrome_w, "wb", 0)
+        )
+        self._writer = asyncio.StreamWriter(transport, protocol, None, loop)
+        self._reader_task = asyncio.create_task(self._read_loop(reader))
+
+        version = await self.send("Browser.getVersion", timeout=float(settings.PDF_RENDER_TIMEOUT_S))
+        logger.info("Chrome renderer started (pid=%s, %s)", self._proc.pid, version.get("product"))
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                raw = await reader.readuntil(b"\0")
+                message = json.loads(raw[:-1])
+                future = self._pending.pop(message.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+                # Eventy (bez "id") nepotřebujeme — čekání řeší _READY_JS
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.warning("Chrome DevTools read loop failed: %s", e)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(DevToolsError("Chrome DevTools pipe closed"))
+            self._pending.clear()
+
+    @property
+    def alive(self) -> bool:
+        return (
+            self._proc is not None
+            and self._proc.returncode is None
+            and self._reader_task is not None
+            and not self._reader_task.done()
+        )
+
+    async def send(
+        self,
+        method: str,
+        params: Optional[dict] = None,
+        session_id: Optional[str] = None,
+        timeout: float = _PING_TIMEOUT_S,
+    ) -> dict:
+        if not self.alive or self._writer is None:
+            raise DevToolsError("Chrome renderer is not running")
+        self._next_id += 1
+        message_id = self._next_id
+        message: dict = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            self._writer.write(json.dumps(message).encode("utf-8") + b"\0")
+            await self._writer.drain()
+            response = await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(message_id, None)
+        if "error" in response:
+            raise DevToolsError(f"{method}: {response['error'].get('message')}")
+        return response.get("result", {})
+
+    async def healthy(self) -> bool:
+        if not self.alive:
+            return False
+        if time.monotonic() - self.last_used < _HEALTH_CHECK_IDLE_S:
+            return True
+        try:
+            await self.send("Browser.getVersion")
+            return True
+        except (DevToolsError, asyncio.TimeoutError):
+            return False
+
+    async def render(self, html: str) -> bytes:
+        """HTML → PDF v novém tabu (izolace mezi nabídkami), tab se vždy zavře."""
+        timeout = float(settings.PDF_RENDER_TIMEOUT_S)
+        target = await self.send("Target.createTarget", {"url": "about:blank"}, timeout=timeout)
+        target_id = target["targetId"]
+        try:
+            attached = await self.send(
+                "Target.attachToTarget", {"targetId": target_id, "flatten": True}, timeout=timeout
+            )
+            session = attached["sessionId"]
+            frame_tree = await self.send("Page.getFrameTree", session_id=session, timeout=timeout)
+            await self.send(
+                "Page.setDocumentContent",
+                {"frameId": frame_tree["frameTree"]["frame"]["id"], "html": html},
+                session_id=session,
+                timeout=timeout,
+            )
+            await self.send(
+                "Runtime.evaluate",
+                {"expression": _READY_JS, "awaitPromise": True},
+                session_id=session,
+                timeout=timeout,
+            )
+            result = await self.send("Page.printToPDF", _PRINT_PARAMS, session_id=session, timeout=timeout)
+            self.renders += 1
+            return base64.b64decode(result["data"])
+        finally:
+            self.last_used = time.monotonic()
+            if self.alive:
+                try:
+                    await self.send("Target.closeTarget", {"targetId": target_id})
+                except (DevToolsError, asyncio.TimeoutError):
+                    pass
+
+    async def close(self) -> None:
+        if self.alive:
+            try:
+                await self.send("Browser.close")
+            except (DevToolsError, asyncio.TimeoutError):
+                pass
+        if self._proc is not None and self._proc.returncode is None:
+            try:
+                await asyncio.wait_for(self._proc.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                try:
+                    os.killpg(self._proc.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                await self._proc.wait()
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._profile_dir:
+            shutil.rmtree(self._profile_dir, ignore_errors=True)
+
+
+class ChromeRendererPool:
+    """Omezený pool teplých Chrome instancí (startují líně při prvním PDF)."""
+
+    def __init__(self, chrome: str, size: int):
+        self.chrome = chrome
+        self.size = size
+        self._semaphore = asyncio.Semaphore(size)
+        self._idle: List[ChromeRenderer] = []
+
+    async def render(self, html: str) -> bytes:
+        async with self._semaphore:
+            renderer = await self._acquire()
+            try:
+                pdf = await renderer.render(html)
+            except BaseException:
+                await renderer.close()  # nekonzistentní stav → nahradit
+                raise
+            if renderer.renders >= _MAX_RENDERS_PER_BROWSER:
+                await renderer.close()
+            else:
+                self._idle.append(renderer)
+            return pdf
+
+    async def _acquire(self) -> ChromeRenderer:
+        while self._idle:
+            renderer = self._idle.pop()
+            if await renderer.healthy():
+                return renderer
+            logger.warning("Chrome renderer unhealthy, replacing")
+            await renderer.close()
+        renderer = ChromeRenderer(self.chrome)
+        try:
+            await renderer.start()
+        except BaseException:
+            await renderer.close()
+            raise
+        return renderer
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for renderer in idle:
+            await renderer.close()
+
+
+_pool: Optional[ChromeRendererPool] = None
+
+
+def _get_renderer_pool(chrome: str) -> Optional[ChromeRendererPool]:
+    global _pool
+    if settings.PDF_RENDERER_POOL_SIZE <= 0 or os.name != "posix":
+        return None
+    if _pool is None:
+        _pool = ChromeRendererPool(chrome, settings.PDF_RENDERER_POOL_SIZE)
+    return _pool
+
+
+async def close_renderer_pool() -> None:
+    """Ukončí Chrome instance poolu (shutdown aplikace)."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+# ---------------------------------------------------------------------------
+# Cache vyrenderovaných PDF
+# ---------------------------------------------------------------------------
+
+_RENDER_REV = "1"  # zvýšit při změně _PRINT_PARAMS / flagů Chrome (šablonu pokrývá hash HTML)
+
+_pdf_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_pdf_inflight: Dict[str, asyncio.Future] = {}
+
+
+def _pdf_cache_key(html: str) -> str:
+    """HTML obsahuje vše (nabídka, položky, partner, logo, šablona) → hash = verze PDF."""
+    return hashlib.blake2b(f"{_RENDER_REV}\0{html}".encode("utf-8"), digest_size=20).hexdigest()
+
+
+def clear_pdf_cache() -> None:
+    _pdf_cache.clear()
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
 async def generate_quote_pdf(quote, partner, items) -> bytes:
-    """Generate PDF bytes using Chrome headless --print-to-pdf."""
+    """Generate PDF bytes (cache → Chrome pool → one-shot Chrome --print-to-pdf)."""
+    html_content = _render_html(quote, partner, items)
+    key = _pdf_cache_key(html_content)
+
+    cached = _pdf_cache.get(key)
+    if cached is not None:
+        _pdf_cache.move_to_end(key)
+        return cached
+
+    # Souběžné stažení stejné nabídky → jeden render
+    inflight = _pdf_inflight.get(key)
+    if inflight is not None:
+        return await asyncio.shield(inflight)
+
+    future = asyncio.get_running_loop().create_future()
+    _pdf_inflight[key] = future
+    try:
+        pdf = await _render_pdf(html_content)
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # čekající ho dostanou, bez "exception never retrieved"
+        raise
+    else:
+        future.set_result(pdf)
+        if settings.PDF_CACHE_SIZE > 0:
+            _pdf_cache[key] = pdf
+            while len(_pdf_cache) > settings.PDF_CACHE_SIZE:
+                _pdf_cache.popitem(last=False)
+        return pdf
+    finally:
+        _pdf_inflight.pop(key, None)
+
+
+async def _render_pdf(html_content: str) -> bytes:
     chrome = _find_chrome()
     if not chrome:
         raise RuntimeError(
             "Chrome/Chromium not found. Install Google Chrome or Chromium."
         )
 
-    html_content = _render_html(quote, partner, items)
+    pool = _get_renderer_pool(chrome)
+    if pool is not None:
+        try:
+            return await pool.render(html_content)
+        except (DevToolsError, OSError, asyncio.TimeoutError, KeyError) as e:
+            logger.warning("Chrome renderer pool failed (%s), falling back to --print-to-pdf", e)
+
+    return await _render_pdf_cli(chrome, html_content)
+
 
+async def _render_pdf_cli(chrome: str, html_content: str) -> bytes:
+    """Jednorázový Chrome --print-to-pdf (fallback, PDF_RENDERER_POOL_SIZE=0)."""
     with tempfile.TemporaryDirectory() as tmpdir:
         html_path = os.path.join(tmpdir, "quote.html")
         pdf_path = os.path.join(tmpdir, "quote.pdf")
@@ -173,11 +568,7 @@ async def generate_quote_pdf(quote, partner, items) -> bytes:
 
         cmd = [
             chrome,
-            "--headless",
-            "--disable-gpu",
-            "--no-sandbox",
-            "--disable-dev-shm-usage",
-            "--run-all-compositor-stages-before-draw",
+            *_CHROME_FLAGS,
             f"--print-to-pdf={pdf_path}",
             "--no-pdf-header-footer",
             "--print-to-pdf-no-header",
@@ -189,7 +580,7 @@ async def generate_quote_pdf(quote, partner, items) -> bytes:
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
         )
-        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=30)
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=settings.PDF_RENDER_TIMEOUT_S)
 
         if proc.returncode != 0:
             logger.error("Chrome PDF failed (rc=%d): %s", proc.returncode, stderr.decode())
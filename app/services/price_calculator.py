@@ -7,13 +7,15 @@ ADR-024: MaterialInput refactor (v1.8.0)
 
 import logging
 import math
-from typing import Dict, Any, List
-from dataclasses import dataclass
+from bisect import bisect_right
+from typing import Dict, Any, List, Optional, Sequence
+from dataclasses import dataclass, field
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.models.enums import StockShape
 from app.services import unit_converter
+from app.services.material_calculator import PriceCategoryTiers, find_price_tiers, get_price_categories
 
 logger = logging.getLogger(__name__)
 
@@ -71,47 +73,25 @@ async def get_price_per_kg_for_weight(
         Tiers: [0-15: 49.4], [15-100: 34.5], [100+: 26.3]
         weight=5 → 49.4, weight=25 → 34.5, weight=150 → 26.3
     """
-    # Načíst tiers pokud nejsou eager loaded (safe check to avoid lazy-load in async)
-    from sqlalchemy.exc import MissingGreenlet
-
-    try:
-        # Try to access tiers - if not loaded, will raise MissingGreenlet in async context
-        tiers = price_category.tiers if price_category else None
-    except (MissingGreenlet, AttributeError):
-        # Tiers not loaded, fetch them explicitly
-        from app.models.material import MaterialPriceCategory
-        from sqlalchemy import select
+    # Tiers z eager-loaded relace, jinak z cache cenových kategorií (bez dotazu)
+    category_tiers = await _load_price_tiers(price_category, db) if price_category else None
 
-        stmt = select(MaterialPriceCategory).where(
-            MaterialPriceCategory.id == price_category.id
-        ).options(selectinload(MaterialPriceCategory.tiers))
-
-        result = await db.execute(stmt)
-        price_category = result.scalar_one_or_none()
-        tiers = price_category.tiers if price_category else None
-
-    if not price_category or not tiers:
+    if not price_category or not category_tiers or not category_tiers.tiers:
         logger.error(
             f"No tiers found for price category {price_category.id if price_category else 'unknown'}"
         )
         return 0
 
-    # Filtrovat tiers: min_weight <= total_weight
-    valid_tiers = [
-        tier for tier in tiers
-        if tier.min_weight <= total_weight_kg
-    ]
+    # Tier s největším min_weight <= total_weight (nejbližší nižší) — bisect
+    selected_tier = category_tiers.tier_for_weight(total_weight_kg)
 
-    if not valid_tiers:
+    if selected_tier is None:
         logger.error(
             f"No valid tier for weight {total_weight_kg}kg in category {price_category.code}. "
             f"Check tier configuration (should have tier with min_weight=0)."
         )
         return 0
 
-    # Vybrat tier s největším min_weight (nejbližší nižší)
-    selected_tier = max(valid_tiers, key=lambda t: t.min_weight)
-
     logger.debug(
         f"Selected tier for {total_weight_kg}kg: "
         f"[{selected_tier.min_weight}-{selected_tier.max_weight or '∞'}] → {selected_tier.price_per_kg} Kč/kg"
@@ -490,6 +470,15 @@ class PriceBreakdown:
         return (self.margin_coefficient - 1) * 100
 
 
+# Výchozí koeficienty, pokud nejsou v SystemConfig (ADR-016)
+_COEFFICIENT_DEFAULTS: Dict[str, float] = {
+    "overhead_coefficient": 1.20,
+    "margin_coefficient": 1.25,
+    "stock_coefficient": 1.15,
+    "coop_coefficient": 1.10,
+}
+
+
 async def get_config_coefficient(db: AsyncSession, key: str, default: float = 1.0) -> float:
     """Helper: načte koeficient ze SystemConfig"""
     from sqlalchemy import select
@@ -502,66 +491,228 @@ async def get_config_coefficient(db: AsyncSession, key: str, default: float = 1.
     return config.value_float if config else default
 
 
-async def calculate_part_price(
-    part,
-    quantity: int = 1,
-    db: AsyncSession = None
-) -> PriceBreakdown:
+async def get_config_coefficients(
+    db: AsyncSession,
+    defaults: Optional[Dict[str, float]] = None,
+) -> Dict[str, float]:
+    """Helper: načte více koeficientů ze SystemConfig jedním dotazem."""
+    from sqlalchemy import select
+    from app.models.config import SystemConfig
+
+    defaults = defaults or _COEFFICIENT_DEFAULTS
+    result = await db.execute(
+        select(SystemConfig.key, SystemConfig.value_float).where(SystemConfig.key.in_(list(defaults)))
+    )
+    coefficients = dict(defaults)
+    coefficients.update({key: value for key, value in result.all()})
+    return coefficients
+
+
+@dataclass
+class _MachineOperationRates:
+    """Strojní operace připravená pro kalkulaci (časy + sazby pracoviště)."""
+    setup_time_min: float
+    operation_time_min: float
+    ko: float                 # Mzdová složka × ko
+    eff_setup_hours: float
+    eff_op_hours: float       # Strojní čas ÷ ke, za 1 kus
+    amortization: float
+    labor: float
+    tools: float
+    overhead: float
+
+
+@dataclass
+class PricingContext:
     """
-    Výpočet ceny dílu s rozpadem nákladů (ADR-016).
+    Vstupy kalkulace dílu nezávislé na množství (ADR-016).
+
+    Načte se jednou (koeficienty, operace + sazby pracovišť, materiál + price tiers)
+    a price()/price_series() pak počítá PriceBreakdown pro libovolná množství
+    bez dalších DB dotazů.
+    """
+    coefficients: Dict[str, float]
+    machine_operations: List[_MachineOperationRates]
+    coop_cost_raw: float = 0.0
+    scrap_rate_percent: float = 0.0
+    material_inputs: List[Optional["_MaterialInputPricing"]] = field(default_factory=list)
+
+    def material_cost(self, quantity: int) -> MaterialCost:
+        """Ekvivalent calculate_part_material_cost() nad předpočítanými vstupy."""
+        result = MaterialCost()
+        is_first = True
+        for pricing in self.material_inputs:
+            mat_cost = pricing.cost_for_quantity(quantity) if pricing else MaterialCost()
+            result.cost += mat_cost.cost
+            result.weight_kg += mat_cost.weight_kg
+            if is_first:
+                result.price_per_kg = mat_cost.price_per_kg
+                is_first = False
+        result.cost = round(result.cost, 2)
+        result.weight_kg = round(result.weight_kg, 3)
+        return result
+
+    def price(self, quantity: int) -> PriceBreakdown:
+        """
+        Vzorec:
+        1. Stroje: setup (bez nástrojů) + operace (s nástroji)
+        2. Režie: machine_cost × overhead_coefficient
+        3. Marže: (machine + režie) × margin_coefficient
+        4. Kooperace: coop_raw × coop_coefficient
+        5. Materiál: material_raw × stock_coefficient
+        6. Celkem: work_with_margin + coop_cost + material_cost
+        """
+        result = PriceBreakdown(quantity=quantity)
+        result.overhead_coefficient = self.coefficients["overhead_coefficient"]
+        result.margin_coefficient = self.coefficients["margin_coefficient"]
+        result.stock_coefficient = self.coefficients["stock_coefficient"]
+        result.coop_coefficient = self.coefficients["coop_coefficient"]
+
+        # === 1. NÁKLADY STROJŮ ===
+        machine_cost = 0.0
+        setup_cost = 0.0
+        operation_cost = 0.0
+        total_setup_time = 0.0
+        total_operation_time = 0.0
+
+        machine_breakdown = {
+            'amortization': 0.0,
+            'labor': 0.0,
+            'tools': 0.0,
+            'overhead': 0.0,
+            'setup_amortization': 0.0,
+            'setup_labor': 0.0,
+            'setup_overhead': 0.0,
+            'operation_amortization': 0.0,
+            'operation_labor': 0.0,
+            'operation_tools': 0.0,
+            'operation_overhead': 0.0,
+        }
+
+        for op in self.machine_operations:
+            eff_setup_hours = op.eff_setup_hours
+            eff_op_hours = op.eff_op_hours
+            ko = op.ko
+
+            # Seřízení: ke ani ko neplatí — operátor musí být plně přítomen, manuální práce
+            op_setup_cost = eff_setup_hours * (
+                op.amortization
+                + op.labor        # Plná mzda — operátor musí být přítomen
+                + op.overhead
+            )
+            setup_cost += op_setup_cost
+            total_setup_time += op.setup_time_min
+
+            # Operace: ke prodlužuje strojní čas, ko snižuje mzdovou složku
+            # (operátor obsluhuje více strojů → je přítomen jen část doby chodu)
+            op_operation_cost = quantity * (
+                eff_op_hours * (op.amortization + op.tools + op.overhead)
+                + eff_op_hours * ko * op.labor
+            )
+            operation_cost += op_operation_cost
+            total_operation_time += op.operation_time_min
 
-    Vzorec:
-    1. Stroje: setup (bez nástrojů) + operace (s nástroji)
-    2. Režie: machine_cost × overhead_coefficient
-    3. Marže: (machine + režie) × margin_coefficient
-    4. Kooperace: coop_raw × coop_coefficient
-    5. Materiál: material_raw × stock_coefficient
-    6. Celkem: work_with_margin + coop_cost + material_cost
+            machine_cost += op_setup_cost + op_operation_cost
+
+            # Rozpad do komponent (součet = machine_cost matematicky ověřeno)
+            machine_breakdown['amortization'] += (eff_setup_hours + eff_op_hours * quantity) * op.amortization
+            machine_breakdown['labor'] += (
+                eff_setup_hours * op.labor                    # setup: plná mzda
+                + eff_op_hours * quantity * ko * op.labor     # operace: × ko
+            )
+            machine_breakdown['tools'] += eff_op_hours * quantity * op.tools  # POUZE operace!
+            machine_breakdown['overhead'] += (eff_setup_hours + eff_op_hours * quantity) * op.overhead
+
+            # Split breakdown: seřízení vs výroba (pro modal)
+            machine_breakdown['setup_amortization'] += eff_setup_hours * op.amortization
+            machine_breakdown['setup_labor'] += eff_setup_hours * op.labor
+            machine_breakdown['setup_overhead'] += eff_setup_hours * op.overhead
+            machine_breakdown['operation_amortization'] += eff_op_hours * quantity * op.amortization
+            machine_breakdown['operation_labor'] += eff_op_hours * quantity * ko * op.labor
+            machine_breakdown['operation_tools'] += eff_op_hours * quantity * op.tools
+            machine_breakdown['operation_overhead'] += eff_op_hours * quantity * op.overhead
+
+        result.coop_cost_raw = self.coop_cost_raw
+
+        result.machine_setup_time_min = total_setup_time
+        result.machine_setup_cost = setup_cost
+        result.machine_setup_rate = setup_cost / (total_setup_time / 60) if total_setup_time > 0 else 0.0
+        result.machine_operation_time_min = total_operation_time
+        result.machine_operation_cost = operation_cost
+        result.machine_operation_rate = (operation_cost / quantity / (total_operation_time / 60)) if (total_operation_time > 0 and quantity > 0) else 0.0
+
+        result.machine_amortization = machine_breakdown['amortization']
+        result.machine_labor = machine_breakdown['labor']
+        result.machine_tools = machine_breakdown['tools']
+        result.machine_overhead = machine_breakdown['overhead']
+
+        result.setup_amortization = machine_breakdown['setup_amortization']
+        result.setup_labor = machine_breakdown['setup_labor']
+        result.setup_overhead = machine_breakdown['setup_overhead']
+        result.operation_amortization = machine_breakdown['operation_amortization']
+        result.operation_labor = machine_breakdown['operation_labor']
+        result.operation_tools = machine_breakdown['operation_tools']
+        result.operation_overhead = machine_breakdown['operation_overhead']
+
+        # === SCRAP RATE (zmetkovitost — PŘED overhead a margin) ===
+        result.scrap_rate_percent = self.scrap_rate_percent
+        scrap_factor = 1.0 + result.scrap_rate_percent / 100.0
+        result.machine_total = machine_cost * scrap_factor
+
+        # === 2. REŽIE (administrativní - pouze na stroje) ===
+        result.work_with_overhead = result.machine_total * result.overhead_coefficient
+
+        # === 3. MARŽE (pouze na stroje + režii) ===
+        result.work_with_margin = result.work_with_overhead * result.margin_coefficient
+
+        # === 4. KOOPERACE (s koeficientem) ===
+        result.coop_cost = result.coop_cost_raw * result.coop_coefficient * quantity
+
+        # === 5. MATERIÁL (s koeficientem + scrap) ===
+        # ADR-024: MaterialInput-based calculation (tier podle quantity)
+        material_calc = self.material_cost(quantity)
+        result.material_cost_raw = material_calc.cost  # Za 1 kus
+        result.material_cost = result.material_cost_raw * result.stock_coefficient * quantity * scrap_factor
+        result.material_weight_kg = material_calc.weight_kg        # za 1 kus
+        result.material_price_per_kg = material_calc.price_per_kg  # primární materiál
+
+        # === 6. CELKEM ===
+        result.total_cost = result.work_with_margin + result.coop_cost + result.material_cost
+        result.cost_per_piece = result.total_cost / quantity if quantity > 0 else 0
+
+        return result
+
+    def price_series(self, quantities: Sequence[int]) -> List[PriceBreakdown]:
+        return [self.price(qty) for qty in quantities]
+
+
+async def build_pricing_context(
+    part,
+    db: AsyncSession,
+    *,
+    coefficients: Optional[Dict[str, float]] = None,
+    work_centers: Optional[Dict[int, Any]] = None,
+) -> PricingContext:
+    """
+    Načte vše, co kalkulace dílu potřebuje, v konstantním počtu dotazů.
 
     Args:
-        part: Part instance (s eager-loaded operations + material_item)
-        quantity: Množství kusů (setup distribuce + material tier)
-        db: AsyncSession (required pro config a material cost)
+        part: Part instance (s eager-loaded operations + material_inputs → price_category.tiers)
+        db: AsyncSession
+        coefficients: Předem načtené koeficienty (hromadný přepočet — jeden dotaz pro všechny díly)
+        work_centers: Předem načtená pracoviště {id: WorkCenter}
 
     Returns:
-        PriceBreakdown: Detailní rozpad nákladů
+        PricingContext: připravený pro price(quantity) / price_series(quantities)
     """
-    if db is None:
-        raise ValueError("DB session required for price calculation")
+    from sqlalchemy import select
+    from app.models.work_center import WorkCenter
 
-    result = PriceBreakdown(quantity=quantity)
-
-    # Načíst koeficienty ze SystemConfig
-    result.overhead_coefficient = await get_config_coefficient(db, "overhead_coefficient", 1.20)
-    result.margin_coefficient = await get_config_coefficient(db, "margin_coefficient", 1.25)
-    result.stock_coefficient = await get_config_coefficient(db, "stock_coefficient", 1.15)
-    result.coop_coefficient = await get_config_coefficient(db, "coop_coefficient", 1.10)
-
-    # === 1. NÁKLADY STROJŮ ===
-    machine_cost = 0.0
-    setup_cost = 0.0
-    operation_cost = 0.0
-    total_setup_time = 0.0
-    total_operation_time = 0.0
-
-    machine_breakdown = {
-        'amortization': 0.0,
-        'labor': 0.0,
-        'tools': 0.0,
-        'overhead': 0.0,
-        'setup_amortization': 0.0,
-        'setup_labor': 0.0,
-        'setup_overhead': 0.0,
-        'operation_amortization': 0.0,
-        'operation_labor': 0.0,
-        'operation_tools': 0.0,
-        'operation_overhead': 0.0,
-    }
+    if coefficients is None:
+        coefficients = await get_config_coefficients(db)
 
     # Načíst operace (pokud nejsou eager loaded)
     if not hasattr(part, 'operations') or not part.operations:
-        from sqlalchemy import select
-        from sqlalchemy.orm import selectinload
         from app.models.part import Part
 
         stmt = select(Part).where(Part.id == part.id).options(
@@ -571,18 +722,19 @@ async def calculate_part_price(
         part = loaded.scalar_one()
 
     # Pre-load all work centers in ONE query (N+1 fix)
-    from sqlalchemy import select
-    from app.models.work_center import WorkCenter
-
     # CRITICAL: Filter out soft-deleted operations (data integrity fix)
     work_center_ids = {op.work_center_id for op in part.operations if op.work_center_id and not op.is_coop and not op.deleted_at}
     work_centers_dict = {}
-    if work_center_ids:
+    if work_centers is not None:
+        work_centers_dict = work_centers
+    elif work_center_ids:
         work_centers_result = await db.execute(
             select(WorkCenter).where(WorkCenter.id.in_(work_center_ids))
         )
         work_centers_dict = {wc.id: wc for wc in work_centers_result.scalars().all()}
 
+    context = PricingContext(coefficients=coefficients, machine_operations=[])
+
     for op in part.operations:
         # CRITICAL: Skip soft-deleted operations (data integrity fix)
         if op.deleted_at:
@@ -590,7 +742,7 @@ async def calculate_part_price(
 
         if op.is_coop:
             # Kooperace - zpracujeme později
-            result.coop_cost_raw += op.coop_price
+            context.coop_cost_raw += op.coop_price
             continue
 
         if not op.work_center_id:
@@ -625,93 +777,62 @@ async def calculate_part_price(
         ko = (op.manning_coefficient or 100.0) / 100.0          # Mzdová složka × ko
         ke = (op.machine_utilization_coefficient or 100.0) / 100.0  # Strojní čas ÷ ke
 
-        # Seřízení: ke ani ko neplatí — operátor musí být plně přítomen, manuální práce
-        eff_setup_hours = op.setup_time_min / 60
-        op_setup_cost = eff_setup_hours * (
-            work_center.hourly_rate_amortization
-            + work_center.hourly_rate_labor        # Plná mzda — operátor musí být přítomen
-            + work_center.hourly_rate_overhead
-        )
-        setup_cost += op_setup_cost
-        total_setup_time += op.setup_time_min
-
-        # Operace: ke prodlužuje strojní čas, ko snižuje mzdovou složku
-        # (operátor obsluhuje více strojů → je přítomen jen část doby chodu)
-        eff_op_hours = (op.operation_time_min / max(ke, 0.01)) / 60
-        op_operation_cost = quantity * (
-            eff_op_hours * (work_center.hourly_rate_amortization + work_center.hourly_rate_tools + work_center.hourly_rate_overhead)
-            + eff_op_hours * ko * work_center.hourly_rate_labor
+        context.machine_operations.append(_MachineOperationRates(
+            setup_time_min=op.setup_time_min,
+            operation_time_min=op.operation_time_min,
+            ko=ko,
+            eff_setup_hours=op.setup_time_min / 60,
+            eff_op_hours=(op.operation_time_min / max(ke, 0.01)) / 60,
+            amortization=work_center.hourly_rate_amortization,
+            labor=work_center.hourly_rate_labor,
+            tools=work_center.hourly_rate_tools,
+            overhead=work_center.hourly_rate_overhead,
+        ))
+
+    context.scrap_rate_percent = getattr(part, 'scrap_rate_percent', 0.0) or 0.0
+
+    # Materiál: geometrie/váha + tiers jednou, tier se vybírá až podle quantity
+    if not hasattr(part, 'material_inputs'):
+        from app.models.part import Part
+
+        stmt = select(Part).where(Part.id == part.id).options(
+            selectinload(Part.material_inputs)
         )
-        operation_cost += op_operation_cost
-        total_operation_time += op.operation_time_min
+        loaded = await db.execute(stmt)
+        part = loaded.scalar_one()
 
-        machine_cost += op_setup_cost + op_operation_cost
+    for material_input in part.material_inputs:
+        if material_input.deleted_at:  # Skip soft-deleted
+            continue
+        context.material_inputs.append(await _prepare_material_input_pricing(material_input, db))
 
-        # Rozpad do komponent (součet = machine_cost matematicky ověřeno)
-        machine_breakdown['amortization'] += (eff_setup_hours + eff_op_hours * quantity) * work_center.hourly_rate_amortization
-        machine_breakdown['labor'] += (
-            eff_setup_hours * work_center.hourly_rate_labor                    # setup: plná mzda
-            + eff_op_hours * quantity * ko * work_center.hourly_rate_labor     # operace: × ko
-        )
-        machine_breakdown['tools'] += eff_op_hours * quantity * work_center.hourly_rate_tools  # POUZE operace!
-        machine_breakdown['overhead'] += (eff_setup_hours + eff_op_hours * quantity) * work_center.hourly_rate_overhead
-
-        # Split breakdown: seřízení vs výroba (pro modal)
-        machine_breakdown['setup_amortization'] += eff_setup_hours * work_center.hourly_rate_amortization
-        machine_breakdown['setup_labor'] += eff_setup_hours * work_center.hourly_rate_labor
-        machine_breakdown['setup_overhead'] += eff_setup_hours * work_center.hourly_rate_overhead
-        machine_breakdown['operation_amortization'] += eff_op_hours * quantity * work_center.hourly_rate_amortization
-        machine_breakdown['operation_labor'] += eff_op_hours * quantity * ko * work_center.hourly_rate_labor
-        machine_breakdown['operation_tools'] += eff_op_hours * quantity * work_center.hourly_rate_tools
-        machine_breakdown['operation_overhead'] += eff_op_hours * quantity * work_center.hourly_rate_overhead
-
-    result.machine_setup_time_min = total_setup_time
-    result.machine_setup_cost = setup_cost
-    result.machine_setup_rate = setup_cost / (total_setup_time / 60) if total_setup_time > 0 else 0.0
-    result.machine_operation_time_min = total_operation_time
-    result.machine_operation_cost = operation_cost
-    result.machine_operation_rate = (operation_cost / quantity / (total_operation_time / 60)) if (total_operation_time > 0 and quantity > 0) else 0.0
-
-    result.machine_amortization = machine_breakdown['amortization']
-    result.machine_labor = machine_breakdown['labor']
-    result.machine_tools = machine_breakdown['tools']
-    result.machine_overhead = machine_breakdown['overhead']
-
-    result.setup_amortization = machine_breakdown['setup_amortization']
-    result.setup_labor = machine_breakdown['setup_labor']
-    result.setup_overhead = machine_breakdown['setup_overhead']
-    result.operation_amortization = machine_breakdown['operation_amortization']
-    result.operation_labor = machine_breakdown['operation_labor']
-    result.operation_tools = machine_breakdown['operation_tools']
-    result.operation_overhead = machine_breakdown['operation_overhead']
-
-    # === SCRAP RATE (zmetkovitost — PŘED overhead a margin) ===
-    result.scrap_rate_percent = getattr(part, 'scrap_rate_percent', 0.0) or 0.0
-    scrap_factor = 1.0 + result.scrap_rate_percent / 100.0
-    result.machine_total = machine_cost * scrap_factor
-
-    # === 2. REŽIE (administrativní - pouze na stroje) ===
-    result.work_with_overhead = result.machine_total * result.overhead_coefficient
-
-    # === 3. MARŽE (pouze na stroje + režii) ===
-    result.work_with_margin = result.work_with_overhead * result.margin_coefficient
-
-    # === 4. KOOPERACE (s koeficientem) ===
-    result.coop_cost = result.coop_cost_raw * result.coop_coefficient * quantity
-
-    # === 5. MATERIÁL (s koeficientem + scrap) ===
-    # ADR-024: Use new MaterialInput-based calculation
-    material_calc = await calculate_part_material_cost(part, quantity, db)
-    result.material_cost_raw = material_calc.cost  # Za 1 kus
-    result.material_cost = result.material_cost_raw * result.stock_coefficient * quantity * scrap_factor
-    result.material_weight_kg = material_calc.weight_kg        # za 1 kus
-    result.material_price_per_kg = material_calc.price_per_kg  # primární materiál
-
-    # === 6. CELKEM ===
-    result.total_cost = result.work_with_margin + result.coop_cost + result.material_cost
-    result.cost_per_piece = result.total_cost / quantity if quantity > 0 else 0
+    return context
 
-    return result
+
+async def calculate_part_price(
+    part,
+    quantity: int = 1,
+    db: AsyncSession = None
+) -> PriceBreakdown:
+    """
+    Výpočet ceny dílu s rozpadem nákladů (ADR-016).
+
+    Vzorec viz PricingContext.price(). Pro více množství téhož dílu použij
+    calculate_series_pricing() / build_pricing_context() — vstupy se načtou jednou.
+
+    Args:
+        part: Part instance (s eager-loaded operations + material_item)
+        quantity: Množství kusů (setup distribuce + material tier)
+        db: AsyncSession (required pro config a material cost)
+
+    Returns:
+        PriceBreakdown: Detailní rozpad nákladů
+    """
+    if db is None:
+        raise ValueError("DB session required for price calculation")
+
+    context = await build_pricing_context(part, db)
+    return context.price(quantity)
 
 
 async def calculate_series_pricing(
@@ -722,6 +843,9 @@ async def calculate_series_pricing(
     """
     Porovnání cen pro různé série (setup distribuce).
 
+    Koeficienty, pracoviště a price tiers se načtou jednou, ceny pro všechna
+    množství se pak počítají v paměti.
+
     Args:
         part: Part instance
         quantities: Seznam množství [1, 10, 50, 100, 500]
@@ -730,11 +854,10 @@ async def calculate_series_pricing(
     Returns:
         List[PriceBreakdown]: Kalkulace pro každé množství
     """
-    results = []
-    for qty in quantities:
-        breakdown = await calculate_part_price(part, qty, db)
-        results.append(breakdown)
-    return results
+    if not quantities:
+        return []
+    context = await build_pricing_context(part, db)
+    return context.price_series(quantities)
 
 
 # ============================================================================
@@ -760,27 +883,140 @@ async def calculate_stock_cost_from_material_input(
     Returns:
         MaterialCost: volume, weight, price_per_kg (pro snapshot), cost, density
     """
-    result = MaterialCost()
-
     if db is None:
         logger.error("DB session required for dynamic price tier selection")
+        return MaterialCost()
+
+    costs = await calculate_material_input_costs([material_input], quantity, db)
+    return costs[0]
+
+
+async def calculate_material_input_costs(
+    material_inputs: Sequence[Any],
+    quantity: int,
+    db: AsyncSession
+) -> List[MaterialCost]:
+    """
+    Ceny více MaterialInputs pro jedno množství (ADR-014/024).
+
+    Váhy se spočítají v paměti, tiers pro všechny vstupy vybere jedno
+    volání find_price_tiers (jedno čtení cache cenových kategorií).
+
+    Returns:
+        List[MaterialCost]: ve stejném pořadí; vstup, který nelze ocenit → MaterialCost()
+    """
+    pricings = [
+        await _prepare_material_input_pricing(material_input, db, with_tiers=False)
+        for material_input in material_inputs
+    ]
+    priced = [p for p in pricings if p is not None]
+    tiers = iter(await find_price_tiers(
+        [p.price_category_id for p in priced],
+        [p.weight_kg_per_part * quantity for p in priced],
+        db,
+    ))
+
+    costs: List[MaterialCost] = []
+    for pricing in pricings:
+        if pricing is None:
+            costs.append(MaterialCost())
+            continue
+        tier = next(tiers)
+        price_per_kg = tier.price_per_kg if tier else 0
+        if tier and price_per_kg is None:
+            logger.error(f"Tier in category {pricing.category_code} has NULL price_per_kg! Returning 0.")
+            price_per_kg = 0.0
+        costs.append(pricing.cost_for_price(price_per_kg))
+    return costs
+
+
+@dataclass
+class _MaterialInputPricing:
+    """MaterialInput s předpočítanou váhou a seřazenými price tiers (ADR-014/024)."""
+    volume_mm3: float
+    weight_kg_per_part: float
+    weight_source: str
+    density: float
+    category_code: str
+    tier_min_weights: List[float]        # vzestupně
+    tier_prices: List[Optional[float]]
+    price_category_id: Optional[int] = None
+
+    def price_per_kg(self, total_weight_kg: float) -> float:
+        """Největší min_weight <= total_weight (nejbližší nižší tier) — bisect."""
+        if not self.tier_min_weights:
+            return 0
+        idx = bisect_right(self.tier_min_weights, total_weight_kg) - 1
+        if idx < 0:
+            logger.error(
+                f"No valid tier for weight {total_weight_kg}kg in category {self.category_code}. "
+                f"Check tier configuration (should have tier with min_weight=0)."
+            )
+            return 0
+        price = self.tier_prices[idx]
+        if price is None:
+            logger.error(f"Tier in category {self.category_code} has NULL price_per_kg! Returning 0.")
+            return 0.0
+        return price
+
+    def cost_for_quantity(self, quantity: int) -> MaterialCost:
+        # ADR-014: Dynamický výběr ceny podle quantity
+        total_weight = self.weight_kg_per_part * quantity
+        return self.cost_for_price(self.price_per_kg(total_weight))
+
+    def cost_for_price(self, price_per_kg: float) -> MaterialCost:
+        # Cena za 1 kus dílu (včetně quantity materiálů)
+        cost = self.weight_kg_per_part * price_per_kg
+
+        result = MaterialCost()
+        result.volume_mm3 = round(self.volume_mm3 if self.weight_source == "volume" else 0.0, 0)
+        result.weight_kg = round(self.weight_kg_per_part, 3)  # Celková váha za 1 díl
+        result.price_per_kg = price_per_kg  # Pro snapshot (ADR-012)
+        result.density = self.density
+        result.cost = round(cost, 2)
+        result.weight_source = self.weight_source  # ADR-050
         return result
 
+
+async def _load_price_tiers(price_category, db: AsyncSession) -> Optional[PriceCategoryTiers]:
+    """Seřazené tiers kategorie — z eager-loaded relace, jinak z cache (material_calculator)."""
+    from sqlalchemy.exc import MissingGreenlet
+
+    try:
+        tiers = price_category.tiers
+    except (MissingGreenlet, AttributeError):
+        categories = await get_price_categories([price_category.id], db)
+        return categories.get(price_category.id)
+    if tiers is None:
+        return None
+    return PriceCategoryTiers.from_tiers(price_category.id, price_category.code, tiers)
+
+
+async def _prepare_material_input_pricing(
+    material_input,
+    db: AsyncSession,
+    *,
+    with_tiers: bool = True,
+) -> Optional[_MaterialInputPricing]:
+    """Geometrie → váha za 1 díl + tiers. None = vstup nelze ocenit (cena 0).
+
+    with_tiers=False: jen váha (tier vybere volající přes find_price_tiers).
+    """
     # Načíst price_category a material_group
     price_category = material_input.price_category
     if not price_category:
         logger.error(f"MaterialInput {material_input.id} has no price_category")
-        return result
+        return None
 
     material_group = price_category.material_group if price_category else None
     if not material_group:
         logger.error(f"PriceCategory {price_category.id} has no material_group")
-        return result
+        return None
 
     stock_shape = material_input.stock_shape
     if not stock_shape:
         logger.error(f"MaterialInput {material_input.id} has no stock_shape")
-        return result
+        return None
 
     # Geometrie z MaterialInput
     stock_diameter = material_input.stock_diameter or 0
@@ -868,21 +1104,26 @@ async def calculate_stock_cost_from_material_input(
     # Zohlednit MaterialInput.quantity (kolik kusů polotovaru na 1 díl)
     weight_kg_per_part = weight_kg * material_input.quantity
 
-    # ADR-014: Dynamický výběr ceny podle quantity
-    total_weight = weight_kg_per_part * quantity
-    price_per_kg = await get_price_per_kg_for_weight(price_category, total_weight, db)
+    category_tiers = await _load_price_tiers(price_category, db) if with_tiers else None
+    if with_tiers and (not category_tiers or not category_tiers.tiers):
+        logger.error(f"No tiers found for price category {price_category.id}")
 
-    # Cena za 1 kus dílu (včetně quantity materiálů)
-    cost = weight_kg_per_part * price_per_kg
-
-    result.volume_mm3 = round(volume_mm3 if weight_source == "volume" else 0.0, 0)
-    result.weight_kg = round(weight_kg_per_part, 3)  # Celková váha za 1 díl
-    result.price_per_kg = price_per_kg  # Pro snapshot (ADR-012)
-    result.density = material_group.density
-    result.cost = round(cost, 2)
-    result.weight_source = weight_source  # ADR-050
+    # Seřazeno podle min_weight; při shodě vyhrává první tier (jako max() v get_price_per_kg_for_weight)
+    tier_min_weights: List[float] = list(category_tiers.min_weights) if category_tiers else []
+    tier_prices: List[Optional[float]] = (
+        [t.price_per_kg for t in category_tiers.tiers] if category_tiers else []
+    )
 
-    return result
+    return _MaterialInputPricing(
+        volume_mm3=volume_mm3,
+        weight_kg_per_part=weight_kg_per_part,
+        weight_source=weight_source,
+        density=material_group.density,
+        price_category_id=price_category.id,
+        category_code=price_category.code,
+        tier_min_weights=tier_min_weights,
+        tier_prices=tier_prices,
+    )
 
 
 async def calculate_part_material_cost(
@@ -919,16 +1160,12 @@ async def calculate_part_material_cost(
         loaded = await db.execute(stmt)
         part = loaded.scalar_one()
 
-    is_first = True
-    for material_input in part.material_inputs:
-        if material_input.deleted_at:  # Skip soft-deleted
-            continue
+    # Skip soft-deleted; tiers všech vstupů jedním čtením cache
+    active_inputs = [mi for mi in part.material_inputs if not mi.deleted_at]
+    mat_costs = await calculate_material_input_costs(active_inputs, quantity, db)
 
-        mat_cost = await calculate_stock_cost_from_material_input(
-            material_input,
-            quantity,
-            db
-        )
+    is_first = True
+    for mat_cost in mat_costs:
         result.cost += mat_cost.cost
         result.weight_kg += mat_cost.weight_kg
         if is_first:
@@ -11,22 +11,28 @@ a KDY hotovo (CO deadline). Planovani je 100% lokalni.
 
 from __future__ import annotations
 
+import copy
+import itertools
 import logging
+import os
 from datetime import date, datetime, timedelta
-from typing import Any, Dict, List, Literal, Optional, Sequence
+from typing import Any, Dict, List, Literal, Optional, Sequence, Set, Tuple
 
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.db_helpers import safe_commit, set_audit
 from app.models.production_priority import ProductionPriority
 from app.services import workshop_service
+from app.services.work_calendar import WorkCalendarSet, get_work_calendars
 
 logger = logging.getLogger(__name__)
 
 # ============================================================================
 # Scheduling constants
 # ============================================================================
+# Výchozí směna (Po–Pá) — pracovní kalendář viz work_calendar (svátky, směny per WC)
 HOURS_PER_DAY = 8
 SHIFT_START_HOUR = 7   # 07:00
 SHIFT_END_HOUR = 15    # 15:00
@@ -54,56 +60,13 @@ def _derive_tier(priority: int, is_hot: bool) -> str:
 
 
 def _clamp_to_work_start(dt: datetime) -> datetime:
-    """Posunout datetime na nejblizsi pracovni cas (07:00, preskocit vikend)."""
-    # Weekend: Saturday=5, Sunday=6
-    while dt.weekday() >= 5:
-        dt = dt.replace(hour=SHIFT_START_HOUR, minute=0, second=0, microsecond=0)
-        dt += timedelta(days=1)
-    # Before shift start -> move to shift start
-    if dt.hour < SHIFT_START_HOUR:
-        dt = dt.replace(hour=SHIFT_START_HOUR, minute=0, second=0, microsecond=0)
-    # After shift end -> next workday 07:00
-    if dt.hour >= SHIFT_END_HOUR:
-        dt += timedelta(days=1)
-        dt = dt.replace(hour=SHIFT_START_HOUR, minute=0, second=0, microsecond=0)
-        # Skip weekend again
-        while dt.weekday() >= 5:
-            dt += timedelta(days=1)
-    return dt
+    """Posunout datetime na nejblizsi pracovni cas (zacatek smeny, preskocit vikend/svatek)."""
+    return get_work_calendars().default.clamp(dt)
 
 
 def _add_work_hours(start: datetime, hours: float) -> datetime:
-    """Pricit pracovni hodiny (8h den 07:00-15:00, preskocit vikendy)."""
-    if hours <= 0:
-        return start
-    current = _clamp_to_work_start(start)
-    remaining = hours
-    while remaining > 0:
-        day_end = current.replace(
-            hour=SHIFT_END_HOUR, minute=0, second=0, microsecond=0,
-        )
-        available = (day_end - current).total_seconds() / 3600
-        if available <= 0:
-            # Move to next workday
-            current += timedelta(days=1)
-            current = current.replace(
-                hour=SHIFT_START_HOUR, minute=0, second=0, microsecond=0,
-            )
-            current = _clamp_to_work_start(current)
-            continue
-        if remaining <= available:
-            current += timedelta(hours=remaining)
-            remaining = 0
-        else:
-            remaining -= available
-            current = day_end
-            # Move to next workday
-            current += timedelta(days=1)
-            current = current.replace(
-                hour=SHIFT_START_HOUR, minute=0, second=0, microsecond=0,
-            )
-            current = _clamp_to_work_start(current)
-    return current
+    """Pricit pracovni hodiny dle vychoziho pracovniho kalendare."""
+    return get_work_calendars().default.add_work_hours(start, hours)
 
 
 def _compute_duration_hrs(
@@ -125,86 +88,155 @@ def _compute_duration_hrs(
     return total if total > 0 else DEFAULT_OP_HOURS
 
 
-def _schedule_operations(
-    vps: List[Dict[str, Any]],
-    now: Optional[datetime] = None,
-) -> List[Dict[str, Any]]:
-    """Forward-schedule: prirazeni sched_start/sched_end kazdé operaci.
+def _oper_sort_key(op: Dict[str, Any]) -> int:
+    oper_num = op["oper_num"] or "0"
+    return int(oper_num) if oper_num.isdigit() else 0
 
-    Vraci wc_lanes strukturu pro WC pohled.
-    """
-    if now is None:
-        now = datetime.now()
-    today_start = _clamp_to_work_start(now)
 
-    # Horizons
-    wc_available: Dict[str, datetime] = {}
-    vp_prev_end: Dict[str, datetime] = {}
+def _vp_sort_key(vp: Dict[str, Any]) -> tuple:
+    """Poradi VP: hotove na konec, is_hot DESC, priority ASC, co_due_date ASC."""
+    all_done = all(op["status"] == "done" for op in vp["operations"])
+    hot = vp.get("is_hot", False)
+    priority = vp.get("priority", 100)
+    co_due = vp.get("co_due_date") or "9999-12-31"
+    return (all_done, not hot, priority, co_due)
 
-    # --- Pass 1: done + in_progress ops → initialize horizons ---
-    for vp in vps:
-        key = _vp_key(vp["job"], vp["suffix"])
-        for op in vp["operations"]:
-            status = op["status"]
-            if status == "done":
-                # Keep Infor dates, update horizons
-                op_end_date = _parse_date(op.get("end_date"))
-                if op_end_date:
-                    op_end_dt = datetime.combine(
-                        op_end_date,
-                        datetime.min.time().replace(hour=SHIFT_END_HOUR),
-                    )
-                    op_start_date = _parse_date(op.get("start_date"))
-                    op_start_dt = datetime.combine(
-                        op_start_date or op_end_date,
-                        datetime.min.time().replace(hour=SHIFT_START_HOUR),
+
+# Verze plánu unikátní i po restartu procesu (klient se starou verzí → refetch)
+_schedule_versions = itertools.count((os.getpid() << 24) + 1)
+
+
+class PlannerSchedule:
+    """Forward-schedule s per-WC stavem horizontu (lanes) — umi inkrementalni preplanovani.
+
+    Pass 1 (done + in_progress) dava pevny zaklad horizontu WC a VP — nezavisi
+    na poradi VP. Pass 2 planuje idle operace v poradi VP; pro kazde VP si
+    pamatuje horizonty WC, ktere videlo na vstupu. Po zmene priority / tieru se
+    prepocitaji jen VP, kterym se vstupni horizont zmenil (dotcene lanes
+    a navazujici operace); ostatni jen posunou horizont svymi puvodnimi casy.
+
+    Predpoklad: klic VP (job|suffix) je v seznamu unikatni.
+    """
+
+    def __init__(
+        self,
+        vps: List[Dict[str, Any]],
+        now: Optional[datetime] = None,
+        calendars: Optional[WorkCalendarSet] = None,
+    ):
+        self.now = now or datetime.now()
+        self.calendars = calendars or get_work_calendars()
+        self.today_start = self.calendars.default.clamp(self.now)
+        self.version = next(_schedule_versions)
+
+        self._order: List[Dict[str, Any]] = list(vps)
+        self._seq: Dict[int, int] = {id(vp): i for i, vp in enumerate(self._order)}
+        self._by_key: Dict[str, Dict[str, Any]] = {
+            _vp_key(vp["job"], vp["suffix"]): vp for vp in self._order
+        }
+        self._lane_base: Dict[str, datetime] = {}
+        self._vp_base: Dict[str, datetime] = {}
+        # id(vp) → [(op, wc, sched_start, sched_end)] naplanovanych idle operaci
+        self._planned: Dict[int, List[Tuple[Dict[str, Any], str, datetime, datetime]]] = {}
+        # id(vp) → horizont WC na vstupu do VP
+        self._inputs: Dict[int, Dict[str, datetime]] = {}
+
+        self._init_horizons()
+        self._flow(0, force=set())
+
+    # ---------- pass 1: done + in_progress ----------
+
+    def _init_horizons(self) -> None:
+        today_start = self.today_start
+        for vp in self._order:
+            key = _vp_key(vp["job"], vp["suffix"])
+            for op in vp["operations"]:
+                status = op["status"]
+                if status == "done":
+                    # Keep Infor dates, update horizons
+                    op_end_date = _parse_date(op.get("end_date"))
+                    if op_end_date:
+                        op_end_dt = datetime.combine(
+                            op_end_date,
+                            datetime.min.time().replace(hour=SHIFT_END_HOUR),
+                        )
+                        op_start_date = _parse_date(op.get("start_date"))
+                        op_start_dt = datetime.combine(
+                            op_start_date or op_end_date,
+                            datetime.min.time().replace(hour=SHIFT_START_HOUR),
+                        )
+                        op["sched_start"] = op_start_dt.isoformat()
+                        op["sched_end"] = op_end_dt.isoformat()
+
+                        wc_code = op.get("wc") or "_NONE_"
+                        self._lane_base[wc_code] = max(
+                            self._lane_base.get(wc_code, today_start), op_end_dt,
+                        )
+                        self._vp_base[key] = max(
+                            self._vp_base.get(key, today_start), op_end_dt,
+                        )
+                    else:
+                        op["sched_start"] = None
+                        op["sched_end"] = None
+
+                    duration = _compute_duration_hrs(
+                        op.get("setup_hrs"), op.get("pcs_per_hour"), op.get("qty_released"),
                     )
-                    op["sched_start"] = op_start_dt.isoformat()
-                    op["sched_end"] = op_end_dt.isoformat()
+                    op["duration_hrs"] = round(duration, 2)
 
+                elif status == "in_progress":
+                    duration = _compute_duration_hrs(
+                        op.get("setup_hrs"), op.get("pcs_per_hour"), op.get("qty_released"),
+                    )
+                    op["duration_hrs"] = round(duration, 2)
                     wc_code = op.get("wc") or "_NONE_"
-                    wc_available[wc_code] = max(
-                        wc_available.get(wc_code, today_start), op_end_dt,
+                    calendar = self.calendars.for_wc(wc_code)
+                    sched_start = calendar.clamp(self.now)
+                    sched_end = calendar.add_work_hours(sched_start, duration)
+                    op["sched_start"] = sched_start.isoformat()
+                    op["sched_end"] = sched_end.isoformat()
+
+                    self._lane_base[wc_code] = max(
+                        self._lane_base.get(wc_code, today_start), sched_end,
                     )
-                    vp_prev_end[key] = max(
-                        vp_prev_end.get(key, today_start), op_end_dt,
+                    self._vp_base[key] = max(
+                        self._vp_base.get(key, today_start), sched_end,
                     )
-                else:
-                    op["sched_start"] = None
-                    op["sched_end"] = None
-
-                duration = _compute_duration_hrs(
-                    op.get("setup_hrs"), op.get("pcs_per_hour"), op.get("qty_released"),
-                )
-                op["duration_hrs"] = round(duration, 2)
-
-            elif status == "in_progress":
-                duration = _compute_duration_hrs(
-                    op.get("setup_hrs"), op.get("pcs_per_hour"), op.get("qty_released"),
-                )
-                op["duration_hrs"] = round(duration, 2)
-                sched_start = _clamp_to_work_start(now)
-                sched_end = _add_work_hours(sched_start, duration)
-                op["sched_start"] = sched_start.isoformat()
-                op["sched_end"] = sched_end.isoformat()
 
-                wc_code = op.get("wc") or "_NONE_"
-                wc_available[wc_code] = max(
-                    wc_available.get(wc_code, today_start), sched_end,
-                )
-                vp_prev_end[key] = max(
-                    vp_prev_end.get(key, today_start), sched_end,
-                )
-
-    # --- Pass 2: idle ops → forward-schedule ---
-    # VPs already sorted by is_hot DESC, priority ASC, co_due_date ASC
-    for vp in vps:
-        key = _vp_key(vp["job"], vp["suffix"])
+    # ---------- pass 2: idle ops ----------
+
+    def _flow(self, start_pos: int, force: Set[int]) -> Set[int]:
+        """Preplanovat VP od pozice start_pos. Vraci id(vp) se zmenenymi casy."""
+        lanes = dict(self._lane_base)
+        for vp in self._order[:start_pos]:
+            for _op, wc_code, _start, end in self._planned[id(vp)]:
+                lanes[wc_code] = end
+
+        changed: Set[int] = set()
+        for vp in self._order[start_pos:]:
+            vid = id(vp)
+            planned = self._planned.get(vid)
+            if vid not in force and planned is not None and all(
+                lanes.get(wc_code, self.today_start) == seen
+                for wc_code, seen in self._inputs[vid].items()
+            ):
+                # Stejny vstupni horizont → stejne casy, jen posunout lanes
+                for _op, wc_code, _start, end in planned:
+                    lanes[wc_code] = end
+                continue
+            if self._plan_vp(vp, lanes):
+                changed.add(vid)
+        return changed
+
+    def _plan_vp(self, vp: Dict[str, Any], lanes: Dict[str, datetime]) -> bool:
+        vid = id(vp)
+        prev_end = self._vp_base.get(_vp_key(vp["job"], vp["suffix"]), self.today_start)
+        inputs: Dict[str, datetime] = {}
+        planned = []
+
         ops_sorted = sorted(
             [o for o in vp["operations"] if o["status"] == "idle"],
-            key=lambda o: int(o["oper_num"] or "0")
-            if (o["oper_num"] or "0").isdigit()
-            else 0,
+            key=_oper_sort_key,
         )
         for op in ops_sorted:
             duration = _compute_duration_hrs(
@@ -213,52 +245,192 @@ def _schedule_operations(
             op["duration_hrs"] = round(duration, 2)
 
             wc_code = op.get("wc") or "_NONE_"
-            earliest = max(
-                wc_available.get(wc_code, today_start),
-                vp_prev_end.get(key, today_start),
-                today_start,
-            )
-            sched_start = _clamp_to_work_start(earliest)
-            sched_end = _add_work_hours(sched_start, duration)
+            lane_end = lanes.get(wc_code, self.today_start)
+            inputs.setdefault(wc_code, lane_end)
+            calendar = self.calendars.for_wc(wc_code)
+            sched_start = calendar.clamp(max(lane_end, prev_end, self.today_start))
+            sched_end = calendar.add_work_hours(sched_start, duration)
             op["sched_start"] = sched_start.isoformat()
             op["sched_end"] = sched_end.isoformat()
 
-            wc_available[wc_code] = sched_end
-            vp_prev_end[key] = sched_end
+            lanes[wc_code] = sched_end
+            prev_end = sched_end
+            planned.append((op, wc_code, sched_start, sched_end))
+
+        old = self._planned.get(vid)
+        self._planned[vid] = planned
+        self._inputs[vid] = inputs
+        return old is None or [p[2:] for p in old] != [p[2:] for p in planned]
+
+    # ---------- inkrementalni zmena ----------
+
+    def update_vp(
+        self,
+        job: str,
+        suffix: str,
+        priority: int,
+        is_hot: bool,
+    ) -> Optional[Dict[str, Any]]:
+        """Zmena priority / hot flagu jedne VP → preplanovat jen dotcene lanes.
+
+        Vraci delta pro Gantt (zmenene VP, nove poradi, zmenene WC lanes)
+        nebo None, pokud VP v planu neni.
+        """
+        vp = self._by_key.get(_vp_key(job, suffix))
+        if vp is None:
+            return None
+
+        vp["priority"] = priority
+        vp["is_hot"] = is_hot
+        vp["tier"] = _derive_tier(priority, is_hot)
+
+        old_order = self._order
+        self._order = sorted(
+            old_order, key=lambda v: (_vp_sort_key(v), self._seq[id(v)]),
+        )
+        # Pred prvni zmenou poradi zustava plan beze zmeny
+        start_pos = next(
+            (i for i, (a, b) in enumerate(zip(old_order, self._order)) if a is not b),
+            len(self._order),
+        )
+        start_pos = min(start_pos, next(i for i, v in enumerate(self._order) if v is vp))
+        changed = self._flow(start_pos, force={id(vp)})
+        changed.add(id(vp))
+
+        changed_vps = [v for v in self._order if id(v) in changed]
+        changed_wcs: Set[str] = {op.get("wc") or "_NONE_" for op in vp["operations"]}
+        for v in changed_vps:
+            _apply_delay(v)
+            changed_wcs.update(wc_code for _op, wc_code, _s, _e in self._planned[id(v)])
+
+        base_version = self.version
+        self.version = next(_schedule_versions)
+        return {
+            "version": self.version,
+            "base_version": base_version,
+            "vps": copy.deepcopy(changed_vps),  # plan se dal meni, SSE serializuje pozdeji
+            "vp_order": [[v["job"], v["suffix"]] for v in self._order],
+            "wc_lanes": self.wc_lanes(changed_wcs),
+            "time_range": _time_range(self._order),
+        }
+
+    # ---------- vystup ----------
+
+    def wc_lanes(self, only: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """WC pohled: operace per WC serazene dle sched_start (volitelne jen vybrana WC)."""
+        wc_ops_map: Dict[str, List[Dict[str, Any]]] = {}
+        for vp in self._order:
+            for op in vp["operations"]:
+                wc_code = op.get("wc") or "_NONE_"
+                if only is not None and wc_code not in only:
+                    continue
+                wc_op = {
+                    "job": vp["job"],
+                    "suffix": vp["suffix"],
+                    "oper_num": op.get("oper_num"),
+                    "item": vp.get("item"),
+                    "description": vp.get("description"),
+                    "status": op["status"],
+                    "sched_start": op.get("sched_start"),
+                    "sched_end": op.get("sched_end"),
+                    "duration_hrs": op.get("duration_hrs"),
+                    "setup_hrs": op.get("setup_hrs"),
+                    "pcs_per_hour": op.get("pcs_per_hour"),
+                    "priority": vp.get("priority", 100),
+                    "is_hot": vp.get("is_hot", False),
+                    "co_due_date": vp.get("co_due_date"),
+                }
+                if wc_code not in wc_ops_map:
+                    wc_ops_map[wc_code] = []
+                wc_ops_map[wc_code].append(wc_op)
+
+        # Sort ops within each WC by sched_start
+        wc_lanes = []
+        for wc_code in sorted(wc_ops_map.keys()):
+            ops = wc_ops_map[wc_code]
+            ops.sort(key=lambda o: o.get("sched_start") or "9999")
+            wc_lanes.append({"wc": wc_code, "ops": ops})
+        return wc_lanes
+
 
-    # --- Build wc_lanes ---
-    wc_ops_map: Dict[str, List[Dict[str, Any]]] = {}
+def _schedule_operations(
+    vps: List[Dict[str, Any]],
+    now: Optional[datetime] = None,
+    calendars: Optional[WorkCalendarSet] = None,
+) -> List[Dict[str, Any]]:
+    """Forward-schedule: prirazeni sched_start/sched_end kazdé operaci.
+
+    Kazda operace se planuje v pracovnim kalendari sveho WC (smeny, svatky).
+    VPs uz serazene (is_hot DESC, priority ASC, co_due_date ASC).
+    Vraci wc_lanes strukturu pro WC pohled.
+    """
+    return PlannerSchedule(vps, now, calendars).wc_lanes()
+
+
+def _apply_delay(vp: Dict[str, Any]) -> None:
+    """is_delayed/delay_days z posledniho sched_end vs co_due_date."""
+    sched_ends = []
+    for op in vp["operations"]:
+        se = op.get("sched_end")
+        if se:
+            try:
+                sched_ends.append(datetime.fromisoformat(se))
+            except (ValueError, TypeError):
+                pass
+    vp["is_delayed"] = False
+    vp["delay_days"] = None
+    if sched_ends:
+        last_sched_end = max(sched_ends)
+        co_due = _parse_date(vp.get("co_due_date"))
+        if co_due and last_sched_end.date() > co_due:
+            vp["is_delayed"] = True
+            vp["delay_days"] = (last_sched_end.date() - co_due).days
+
+
+def _time_range(vps: Sequence[Dict[str, Any]]) -> Dict[str, str]:
+    """Casovy rozsah Ganttu ze sched_start/sched_end (+ padding)."""
+    min_date = None
+    max_date = None
     for vp in vps:
         for op in vp["operations"]:
-            wc_code = op.get("wc") or "_NONE_"
-            wc_op = {
-                "job": vp["job"],
-                "suffix": vp["suffix"],
-                "oper_num": op.get("oper_num"),
-                "item": vp.get("item"),
-                "description": vp.get("description"),
-                "status": op["status"],
-                "sched_start": op.get("sched_start"),
-                "sched_end": op.get("sched_end"),
-                "duration_hrs": op.get("duration_hrs"),
-                "setup_hrs": op.get("setup_hrs"),
-                "pcs_per_hour": op.get("pcs_per_hour"),
-                "priority": vp.get("priority", 100),
-                "is_hot": vp.get("is_hot", False),
-                "co_due_date": vp.get("co_due_date"),
-            }
-            if wc_code not in wc_ops_map:
-                wc_ops_map[wc_code] = []
-            wc_ops_map[wc_code].append(wc_op)
+            for dk in ("sched_start", "sched_end"):
+                val = op.get(dk)
+                if val:
+                    try:
+                        d = datetime.fromisoformat(val).date()
+                        if min_date is None or d < min_date:
+                            min_date = d
+                        if max_date is None or d > max_date:
+                            max_date = d
+                    except (ValueError, TypeError):
+                        pass
 
-    # Sort ops within each WC by sched_start
-    wc_lanes = []
-    for wc_code in sorted(wc_ops_map.keys()):
-        ops = wc_ops_map[wc_code]
-        ops.sort(key=lambda o: o.get("sched_start") or "9999")
-        wc_lanes.append({"wc": wc_code, "ops": ops})
+    today = date.today()
+    if not min_date:
+        min_date = today - timedelta(days=7)
+    if not max_date:
+        max_date = today + timedelta(days=30)
+    max_date = max_date + timedelta(days=3)  # padding
+    return {
+        "min_date": min_date.isoformat(),
+        "max_date": max_date.isoformat(),
+    }
 
-    return wc_lanes
+
+# Posledni spocitany plan (per proces) — zaklad pro inkrementalni preplanovani
+# po zmene priority / tieru. Nahrazen pri kazdem fetch_planner_data.
+_schedule: Optional[PlannerSchedule] = None
+
+
+def _incremental_enabled() -> bool:
+    """Inkrementalni preplanovani jen s memory event busem (jeden worker).
+
+    Plan zije v pameti procesu. S vice workery (EVENT_BUS_BACKEND=sqlite) by
+    zmenu priority obslouzil worker s jinym (nebo zadnym) planem a delta by
+    vychazela ze zastaraleho stavu — tam se deltas neposilaji a Gantt se
+    nacita cely pres fetch_planner_data.
+    """
+    return settings.EVENT_BUS_BACKEND == "memory"
 
 
 # Property sets pro CO lookup přes IteRybPrehledZakazekView
@@ -495,8 +667,6 @@ async def fetch_planner_data(
     }
 
     # 6) Merge: VP data + CO deadline + priority + is_hot
-    today = date.today()
-
     for vp in vp_list:
         item_upper = (vp.get("item") or "").upper()
         co_info = co_map.get(item_upper, {})
@@ -519,69 +689,25 @@ async def fetch_planner_data(
         vp["delay_days"] = None
 
     # 8) Sort: is_hot DESC, priority ASC, co_due_date ASC
-    def _sort_key(vp: Dict[str, Any]):
-        # All done VPs go to the end
-        all_done = all(op["status"] == "done" for op in vp["operations"])
-        hot = vp.get("is_hot", False)
-        priority = vp.get("priority", 100)
-        co_due = vp.get("co_due_date") or "9999-12-31"
-        return (all_done, not hot, priority, co_due)
-
-    vp_list.sort(key=_sort_key)
+    vp_list.sort(key=_vp_sort_key)
 
     # 9) Forward-schedule operations
-    wc_lanes = _schedule_operations(vp_list)
+    global _schedule
+    schedule = PlannerSchedule(vp_list)
+    wc_lanes = schedule.wc_lanes()
+    incremental = _incremental_enabled()
+    _schedule = schedule if incremental else None
 
     # 10) Recompute is_delayed from last sched_end vs co_due_date
     for vp in vp_list:
-        sched_ends = []
-        for op in vp["operations"]:
-            se = op.get("sched_end")
-            if se:
-                try:
-                    sched_ends.append(datetime.fromisoformat(se))
-                except (ValueError, TypeError):
-                    pass
-        if sched_ends:
-            last_sched_end = max(sched_ends)
-            co_due = _parse_date(vp.get("co_due_date"))
-            if co_due and last_sched_end.date() > co_due:
-                vp["is_delayed"] = True
-                vp["delay_days"] = (last_sched_end.date() - co_due).days
-            else:
-                vp["is_delayed"] = False
-                vp["delay_days"] = None
+        _apply_delay(vp)
 
     # 11) Time range from sched_start/sched_end
-    min_date = None
-    max_date = None
-    for vp in vp_list:
-        for op in vp["operations"]:
-            for dk in ("sched_start", "sched_end"):
-                val = op.get(dk)
-                if val:
-                    try:
-                        d = datetime.fromisoformat(val).date()
-                        if min_date is None or d < min_date:
-                            min_date = d
-                        if max_date is None or d > max_date:
-                            max_date = d
-                    except (ValueError, TypeError):
-                        pass
-
-    if not min_date:
-        min_date = today - timedelta(days=7)
-    if not max_date:
-        max_date = today + timedelta(days=30)
-    max_date = max_date + timedelta(days=3)  # padding
-
     return {
         "vps": vp_list,
         "wc_lanes": wc_lanes,
-        "time_range": {
-            "min_date": min_date.isoformat(),
-            "max_date": max_date.isoformat(),
-        },
+        "time_range": _time_range(vp_list),
+        "version": schedule.version if incremental else None,
     }
 
 
@@ -610,6 +736,7 @@ async def set_priority(
         existing.priority = priority
         set_audit(existing, username, is_update=True)
         await safe_commit(db, existing, "set_priority")
+        _reschedule_vp(safe_job, safe_suffix, existing.priority, existing.is_hot)
         return existing
 
     entry = ProductionPriority(
@@ -620,6 +747,7 @@ async def set_priority(
     set_audit(entry, username)
     db.add(entry)
     await safe_commit(db, entry, "set_priority")
+    _reschedule_vp(safe_job, safe_suffix, entry.priority, entry.is_hot)
     return entry
 
 
@@ -655,6 +783,7 @@ async def set_hot(
         await safe_commit(db, existing, "set_hot")
         tier = _derive_tier(existing.priority, existing.is_hot)
         _broadcast_tier(safe_job, safe_suffix, tier)
+        _reschedule_vp(safe_job, safe_suffix, existing.priority, existing.is_hot)
         return existing
 
     entry = ProductionPriority(
@@ -667,6 +796,7 @@ async def set_hot(
     await safe_commit(db, entry, "set_hot")
     tier = _derive_tier(entry.priority, entry.is_hot)
     _broadcast_tier(safe_job, safe_suffix, tier)
+    _reschedule_vp(safe_job, safe_suffix, entry.priority, entry.is_hot)
     return entry
 
 
@@ -698,6 +828,7 @@ async def set_tier(
         set_audit(existing, username, is_update=True)
         await safe_commit(db, existing, "set_tier")
         _broadcast_tier(safe_job, safe_suffix, tier)
+        _reschedule_vp(safe_job, safe_suffix, priority, is_hot)
         return existing
 
     entry = ProductionPriority(
@@ -710,9 +841,28 @@ async def set_tier(
     db.add(entry)
     await safe_commit(db, entry, "set_tier")
     _broadcast_tier(safe_job, safe_suffix, tier)
+    _reschedule_vp(safe_job, safe_suffix, priority, is_hot)
     return entry
 
 
 def _broadcast_tier(job: str, suffix: str, tier: str) -> None:
     from app.services.event_bus import broadcast
     broadcast("tier_change", {"job": job, "suffix": suffix, "tier": tier})
+
+
+def _reschedule_vp(job: str, suffix: str, priority: int, is_hot: bool) -> None:
+    """Inkrementalne preplanovat posledni plan a poslat delta pres SSE."""
+    global _schedule
+    schedule = _schedule
+    if schedule is None or not _incremental_enabled():
+        return
+    try:
+        delta = schedule.update_vp(job, suffix, priority, is_hot)
+    except Exception:
+        logger.exception("Incremental reschedule failed for %s/%s", job, suffix)
+        _schedule = None  # nekonzistentni stav → dalsi fetch_planner_data spocita znovu
+        return
+    if delta is None:
+        return
+    from app.services.event_bus import broadcast
+    broadcast("planner_schedule_delta", delta)
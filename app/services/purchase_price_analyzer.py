@@ -5,20 +5,24 @@ maps to PriceCategories, and computes real weighted averages
 per weight tier — no hardcoded coefficients.
 
 Data flow:
-  Infor SLPoItems → fetch (paginated) → parse Item codes → resolve PriceCategory
-  → segment by QtyReceived into tier ranges → compute weighted avg per tier
+  Infor SLPoItems → sync into purchase_po_lines (backfill per year by PoOrderDate,
+  then delta by RecordDate watermark) → Item code resolved to PriceCategory at
+  write time → purchase_price_quarters aggregate refreshed for touched quarters
+  → analysis = local queries + numpy per-tier/percentile math
   → compare with current PriceTier values → return analysis
 """
 
 import logging
 import time
 from collections import defaultdict
-from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
-from sqlalchemy import select
+import numpy as np
+from sqlalchemy import and_, bindparam, delete, distinct, func, insert, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
+from app.config import settings
 from app.models.material import (
     MaterialGroup,
     MaterialPriceCategory,
@@ -26,6 +30,8 @@ from app.models.material import (
     StockShape,
 )
 from app.models.material_norm import MaterialNorm
+from app.models.purchase_po_line import PurchasePoLine, PurchasePoSyncYear, PurchasePriceQuarter
+from app.models.sync_state import SyncState
 from app.schemas.purchase_prices import (
     PriceCategoryAnalysis,
     PurchasePriceAnalysisResponse,
@@ -36,6 +42,8 @@ from app.schemas.purchase_prices import (
 )
 from app.services.infor_api_client import InforAPIClient
 from app.services.infor_material_importer import MaterialImporter
+from app.services.infor_sync_service import DEFAULT_STEPS, infor_sync_service
+from app.services.sync_bulk_upsert import BulkUpsertResult, bulk_upsert, content_hash
 
 logger = logging.getLogger(__name__)
 
@@ -48,14 +56,70 @@ SLPOITEMS_PROPERTIES = [
     "QtyOrdered", "QtyReceived", "ItemCost",
     "DerTotalRcvdCost", "UM", "PoOrderDate",
     "DueDate", "RcvdDate", "PoVendNum",
-    "VenadrName", "Stat",
+    "VenadrName", "Stat", "RecordDate",
 ]
 
+# Sync krok (SyncState) sdílený s InforSyncService — watermark RecordDate + step lock
+PO_SYNC_STEP = "purchase_po_items"
+PO_BASE_FILTER = "Item LIKE '1.%' AND DerTotalRcvdCost > 0"
+
+_LINE_KEY_COLUMNS = ("po_num", "po_line", "item")
+_LINE_CONTENT_COLUMNS = (
+    "description", "qty_received", "total_cost", "unit_price",
+    "order_date", "quarter", "vendor_num", "vendor_name", "record_date",
+    "w_nr", "shape", "material_group_id", "price_category_id", "unmatched_reason",
+)
+_RESOLVED_COLUMNS = ("w_nr", "shape", "material_group_id", "price_category_id", "unmatched_reason")
+# SQLite limit bind parametrů — lookup (po_num, po_line, item) po kusech
+_KEY_LOOKUP_CHUNK = 300
+
+
+def _clean(value: Any, max_len: Optional[int] = None) -> Optional[str]:
+    if value is None:
+        return None
+    s = str(value).strip()
+    if not s:
+        return None
+    return s[:max_len] if max_len else s
+
+
+def _order_date(value: Any) -> Optional[str]:
+    """Infor datum ("20260203 00:00:00.000" / "2026-02-03") → "YYYY-MM-DD"."""
+    if not value:
+        return None
+    clean = str(value).replace("-", "").replace(" ", "")[:8]
+    if len(clean) < 8 or not clean.isdigit():
+        return None
+    month = int(clean[4:6])
+    if not 1 <= month <= 12:
+        return None
+    return f"{clean[:4]}-{clean[4:6]}-{clean[6:8]}"
+
+
+def _quarter(order_date: Optional[str]) -> Optional[str]:
+    """"YYYY-MM-DD" → "YYYY-QN"."""
+    if not order_date:
+        return None
+    return f"{order_date[:4]}-Q{(int(order_date[5:7]) - 1) // 3 + 1}"
+
+
+def _year_filter(year_from: int, year_to: int) -> str:
+    return (
+        f"{PO_BASE_FILTER} "
+        f"AND PoOrderDate >= '{year_from}-01-01' "
+        f"AND PoOrderDate < '{year_to + 1}-01-01'"
+    )
+
+
+def _as_utc(value: datetime) -> datetime:
+    """SQLite vrací naive datetime — watermark v sync_states je UTC."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
 
 class PurchasePriceAnalyzer:
     """Analyzes purchase prices from Infor SLPoItems and maps to PriceCategories."""
 
-    def __init__(self, infor_client: InforAPIClient, db: AsyncSession):
+    def __init__(self, infor_client: Optional[InforAPIClient], db: AsyncSession):
         self.client = infor_client
         self.db = db
         self._importer = MaterialImporter()
@@ -67,9 +131,14 @@ class PurchasePriceAnalyzer:
         self._categories: Dict[int, MaterialPriceCategory] = {}  # cat_id -> category
         self._groups: Dict[int, MaterialGroup] = {}              # group_id -> group
         self._tiers_by_category: Dict[int, List[MaterialPriceTier]] = {}  # cat_id -> [tier, ...]
+        self._norms_loaded = False
+        self._lookups_loaded = False
 
     async def analyze(self, year_from: int = 2024, year_to: Optional[int] = None) -> PurchasePriceAnalysisResponse:
-        """Main analysis: fetch PO items, map to categories, aggregate per tier.
+        """Main analysis: sync PO items locally, then aggregate per category + tier.
+
+        Infor se volá jen pro roky bez backfillu a pro deltu starší než
+        PURCHASE_PRICE_SYNC_MAX_AGE_S — jinak je to čistě lokální dotaz.
 
         Args:
             year_from: Start year (inclusive)
@@ -79,71 +148,205 @@ class PurchasePriceAnalyzer:
             year_to = year_from
 
         start = time.time()
+        backfilled = await self.sync(year_from, year_to)
+        return await self._analyze_local(year_from, year_to, cached=not backfilled, start=start)
 
-        # Pre-load all lookup data into memory (avoid N+1 queries)
-        await self._preload_lookups()
+    # ── Local sync ───────────────────────────────────────────────
 
-        # Fetch all PO items from Infor
-        raw_items = await self._fetch_all_po_items(year_from, year_to)
-        fetch_time = time.time() - start
+    async def sync(self, year_from: int, year_to: int, force: bool = False) -> bool:
+        """Doplní purchase_po_lines: backfill chybějících roků + delta přes RecordDate.
 
-        date_label = f"{year_from}" if year_from == year_to else f"{year_from}-{year_to}"
+        Args:
+            force: Delta i když je watermark čerstvý
 
-        if not raw_items:
-            return PurchasePriceAnalysisResponse(
-                year_from=year_from,
-                date_range=f"{date_label} (0 rows)",
-                total_po_lines_fetched=0,
-                total_po_lines_matched=0,
-                total_po_lines_unmatched=0,
-                unique_materials=0,
-                categories=[],
-                unmatched=[],
-                cached=False,
-                fetch_time_seconds=round(fetch_time, 1),
+        Returns:
+            True, pokud proběhl backfill některého roku (crawl podle PoOrderDate)
+        """
+        async with infor_sync_service.step_lock(PO_SYNC_STEP):
+            now = datetime.now(timezone.utc)
+            state = await self._sync_state()
+
+            result = await self.db.execute(
+                select(PurchasePoSyncYear.year).where(
+                    PurchasePoSyncYear.year >= year_from, PurchasePoSyncYear.year <= year_to
+                )
             )
+            covered = set(result.scalars().all())
+            missing = [y for y in range(year_from, year_to + 1) if y not in covered]
 
-        # Parse and resolve each PO item
-        matched, unmatched_raw, w_nr_set = self._resolve_items(raw_items)
+            try:
+                if state.last_sync_at is not None:
+                    age = (now - _as_utc(state.last_sync_at)).total_seconds()
+                    if force or age >= settings.PURCHASE_PRICE_SYNC_MAX_AGE_S:
+                        since = state.last_sync_at.strftime("%Y-%m-%d %H:%M:%S")
+                        rows = await self._fetch_all_po_items(f"{PO_BASE_FILTER} AND RecordDate >= '{since}'")
+                        await self.store_po_items(rows)
+                        state.last_sync_at = now
+
+                if missing:
+                    rows = await self._fetch_all_po_items(_year_filter(min(missing), max(missing)))
+                    await self.store_po_items(rows)
+                    for year in missing:
+                        self.db.add(PurchasePoSyncYear(year=year, synced_at=now.replace(tzinfo=None)))
+                    if state.last_sync_at is None:
+                        state.last_sync_at = now
+
+                await self.db.commit()
+            except Exception:
+                await self.db.rollback()
+                raise
+
+        return bool(missing)
+
+    async def _sync_state(self) -> SyncState:
+        """SyncState kroku purchase_po_items (založí ho, pokud sync service ještě neběžela)."""
+        result = await self.db.execute(select(SyncState).where(SyncState.step_name == PO_SYNC_STEP))
+        state = result.scalar_one_or_none()
+        if state is None:
+            config = next(s for s in DEFAULT_STEPS if s["step_name"] == PO_SYNC_STEP)
+            state = SyncState(**config)
+            self.db.add(state)
+        return state
+
+    async def store_po_items(self, raw_items: List[Dict[str, Any]]) -> BulkUpsertResult:
+        """Upsert SLPoItems řádků (s mapováním na PriceCategory) + přepočet dotčených kvartálů.
+
+        Commit je na volajícím.
+        """
+        if not raw_items:
+            return BulkUpsertResult()
 
-        # Aggregate per PriceCategory + per tier
-        categories = self._aggregate(matched)
+        await self._preload_lookups()
+        lines: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        for row in raw_items:
+            line = self._map_row(row)
+            if line is not None:
+                lines[(line["po_num"], line["po_line"], line["item"])] = line
+
+        # Kvartály, ze kterých řádek případně odchází (změna PoOrderDate)
+        touched = await self._existing_quarters(list(lines))
+        touched.update(line["quarter"] for line in lines.values())
+
+        result = await bulk_upsert(
+            self.db,
+            PurchasePoLine,
+            list(lines.values()),
+            key_columns=_LINE_KEY_COLUMNS,
+            content_columns=_LINE_CONTENT_COLUMNS,
+            touch_values={"synced_at": datetime.utcnow()},
+        )
+        if result.created or result.updated:
+            await self._refresh_quarters(touched)
 
-        # Collect unmatched summary
-        unmatched = self._summarize_unmatched(unmatched_raw)
+        logger.info(
+            f"SLPoItems stored: +{result.created} ~{result.updated} ={result.unchanged}"
+        )
+        return result
 
-        # Date range from data
-        dates = [r.get("PoOrderDate", "") for r in raw_items if r.get("PoOrderDate")]
-        date_min = min(dates)[:10].replace(" ", "") if dates else f"{year_from}-01-01"
-        date_max = max(dates)[:10].replace(" ", "") if dates else "now"
+    async def reresolve(self) -> int:
+        """Přemapuje uložené řádky podle aktuálních norem/kategorií (po jejich úpravě).
 
-        return PurchasePriceAnalysisResponse(
-            year_from=year_from,
-            date_range=f"{date_min} to {date_max}",
-            total_po_lines_fetched=len(raw_items),
-            total_po_lines_matched=len(matched),
-            total_po_lines_unmatched=len(unmatched_raw),
-            unique_materials=len(w_nr_set),
-            categories=categories,
-            unmatched=unmatched,
-            cached=False,
-            fetch_time_seconds=round(time.time() - start, 1),
+        Returns:
+            Počet řádků se změněným mapováním. Commit je na volajícím.
+        """
+        await self._preload_lookups()
+        table = PurchasePoLine.__table__
+        result = await self.db.execute(
+            select(table.c.id, table.c.item, *[table.c[c] for c in _LINE_CONTENT_COLUMNS])
+        )
+
+        updates: List[Dict[str, Any]] = []
+        touched: Set[Optional[str]] = set()
+        for row in result.all():
+            line = dict(row._mapping)
+            resolved = self._resolve(
+                line["item"], line["description"] or "", line["qty_received"], line["total_cost"]
+            )
+            if all(line[c] == resolved[c] for c in _RESOLVED_COLUMNS):
+                continue
+            line.update(resolved)
+            updates.append({
+                "_id": line["id"],
+                **{f"_{c}": resolved[c] for c in _RESOLVED_COLUMNS},
+                "_sync_hash": content_hash(line, _LINE_CONTENT_COLUMNS),
+            })
+            touched.add(line["quarter"])
+
+        if updates:
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam("_id"))
+                .values(
+                    **{c: bindparam(f"_{c}") for c in _RESOLVED_COLUMNS},
+                    sync_hash=bindparam("_sync_hash"),
+                )
+            )
+            await self.db.execute(stmt, updates)
+            await self._refresh_quarters(touched)
+
+        logger.info(f"Purchase PO lines re-resolved: {len(updates)} changed")
+        return len(updates)
+
+    async def invalidate_year(self, year: int) -> None:
+        """Zahodí lokální řádky roku → příští analýza ho znovu načte z Inforu celý."""
+        date_from, date_to = f"{year}-01-01", f"{year}-12-31"
+        await self.db.execute(
+            delete(PurchasePoLine).where(
+                PurchasePoLine.order_date >= date_from, PurchasePoLine.order_date <= date_to
+            )
+        )
+        await self.db.execute(delete(PurchasePoSyncYear).where(PurchasePoSyncYear.year == year))
+        await self._refresh_quarters({f"{year}-Q{q}" for q in range(1, 5)})
+
+    async def _existing_quarters(self, keys: Sequence[Tuple[str, str, str]]) -> Set[Optional[str]]:
+        key_cols = tuple_(PurchasePoLine.po_num, PurchasePoLine.po_line, PurchasePoLine.item)
+        quarters: Set[Optional[str]] = set()
+        for start in range(0, len(keys), _KEY_LOOKUP_CHUNK):
+            chunk = keys[start:start + _KEY_LOOKUP_CHUNK]
+            result = await self.db.execute(
+                select(PurchasePoLine.quarter).where(key_cols.in_(chunk)).distinct()
+            )
+            quarters.update(result.scalars().all())
+        return quarters
+
+    async def _refresh_quarters(self, quarters: Set[Optional[str]]) -> None:
+        """Přepočet agregátu purchase_price_quarters pro dané kvartály (jeden GROUP BY)."""
+        quarters_list = sorted(q for q in quarters if q)
+        if not quarters_list:
+            return
+        line = PurchasePoLine
+        await self.db.execute(
+            delete(PurchasePriceQuarter).where(PurchasePriceQuarter.quarter.in_(quarters_list))
+        )
+        aggregate = (
+            select(
+                line.price_category_id,
+                line.quarter,
+                func.count(),
+                func.sum(line.qty_received),
+                func.sum(line.total_cost),
+                func.min(line.unit_price),
+                func.max(line.unit_price),
+            )
+            .where(line.quarter.in_(quarters_list), line.price_category_id.isnot(None))
+            .group_by(line.price_category_id, line.quarter)
+        )
+        await self.db.execute(
+            insert(PurchasePriceQuarter).from_select(
+                ["price_category_id", "quarter", "po_lines", "qty_received",
+                 "total_cost", "min_unit_price", "max_unit_price"],
+                aggregate,
+            )
         )
 
     # ── Infor fetch ──────────────────────────────────────────────
 
-    async def _fetch_all_po_items(self, year_from: int, year_to: int) -> List[Dict[str, Any]]:
+    async def _fetch_all_po_items(self, filter_expr: str) -> List[Dict[str, Any]]:
         """Paginated fetch of SLPoItems from Infor with deduplication.
 
         Uses (PoNum, PoLine, Item) as unique key to prevent counting
         the same PO line multiple times across pages.
         """
-        filter_expr = (
-            f"Item LIKE '1.%' AND DerTotalRcvdCost > 0 "
-            f"AND PoOrderDate >= '{year_from}-01-01' "
-            f"AND PoOrderDate < '{year_to + 1}-01-01'"
-        )
-
         all_items: List[Dict[str, Any]] = []
         seen_keys: set = set()  # (PoNum, PoLine, Item) dedup
         seen_bookmarks: set = set()
@@ -207,16 +410,25 @@ class PurchasePriceAnalyzer:
 
     # ── Pre-load lookups ─────────────────────────────────────────
 
-    async def _preload_lookups(self) -> None:
-        """Pre-load MaterialNorms, Groups, Categories, Tiers into dicts."""
-        # MaterialNorms → w_nr -> group_id
-        result = await self.db.execute(select(MaterialNorm))
-        for norm in result.scalars().all():
-            if norm.w_nr:
-                self._norm_by_wnr[norm.w_nr] = norm.material_group_id
-                prefix = norm.w_nr[:3]  # "1.0", "1.4", etc.
-                if prefix not in self._norm_by_prefix:
-                    self._norm_by_prefix[prefix] = norm.material_group_id
+    async def _preload_lookups(self, include_norms: bool = True) -> None:
+        """Pre-load MaterialNorms, Groups, Categories, Tiers into dicts.
+
+        Normy jsou potřeba jen pro mapování nových řádků — lokální analýza
+        načítá jen skupiny, kategorie a pásma.
+        """
+        if include_norms and not self._norms_loaded:
+            # MaterialNorms → w_nr -> group_id
+            result = await self.db.execute(select(MaterialNorm.w_nr, MaterialNorm.material_group_id))
+            for w_nr, group_id in result.all():
+                if w_nr:
+                    self._norm_by_wnr[w_nr] = group_id
+                    prefix = w_nr[:3]  # "1.0", "1.4", etc.
+                    if prefix not in self._norm_by_prefix:
+                        self._norm_by_prefix[prefix] = group_id
+            self._norms_loaded = True
+
+        if self._lookups_loaded:
+            return
 
         # MaterialGroups
         result = await self.db.execute(select(MaterialGroup))
@@ -239,6 +451,7 @@ class PurchasePriceAnalyzer:
         )
         for tier in result.scalars().all():
             self._tiers_by_category.setdefault(tier.price_category_id, []).append(tier)
+        self._lookups_loaded = True
 
         logger.info(
             f"Pre-loaded: {len(self._norm_by_wnr)} norms, "
@@ -248,93 +461,212 @@ class PurchasePriceAnalyzer:
 
     # ── Parse + Resolve ──────────────────────────────────────────
 
-    def _resolve_items(
-        self, raw_items: List[Dict[str, Any]]
-    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], set]:
-        """Parse Item codes and resolve to PriceCategory. Returns (matched, unmatched, w_nr_set)."""
-        matched: List[Dict[str, Any]] = []
-        unmatched: List[Dict[str, Any]] = []
-        w_nr_set: set = set()
-
-        for row in raw_items:
-            item_code = str(row.get("Item", ""))
-            qty_received = self._to_float(row.get("QtyReceived", 0))
-            total_cost = self._to_float(row.get("DerTotalRcvdCost", 0))
-
-            # Skip zero-qty rows
-            if qty_received <= 0 or total_cost <= 0:
-                continue
-
-            # Extract W.Nr
-            w_nr = self._importer.extract_w_nr_from_item_code(item_code)
-            if not w_nr:
-                unmatched.append({**row, "_reason": "W.Nr not extracted from Item code"})
-                continue
+    def _map_row(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """SLPoItems řádek → sloupce purchase_po_lines (None = bez klíče)."""
+        po_num = _clean(row.get("PoNum"), 20)
+        po_line = _clean(row.get("PoLine"), 10)
+        item_code = _clean(row.get("Item"), 60)
+        if not po_num or not po_line or not item_code:
+            return None
+
+        description = _clean(row.get("Description"), 200)
+        qty_received = self._to_float(row.get("QtyReceived", 0))
+        total_cost = self._to_float(row.get("DerTotalRcvdCost", 0))
+        order_date = _order_date(row.get("PoOrderDate"))
+
+        return {
+            "po_num": po_num,
+            "po_line": po_line,
+            "item": item_code,
+            "description": description,
+            "qty_received": qty_received,
+            "total_cost": total_cost,
+            "unit_price": total_cost / qty_received if qty_received > 0 else None,
+            "order_date": order_date,
+            "quarter": _quarter(order_date),
+            "vendor_num": _clean(row.get("PoVendNum"), 20),
+            "vendor_name": _clean(row.get("VenadrName"), 100),
+            "record_date": _clean(row.get("RecordDate"), 30),
+            **self._resolve(item_code, description or "", qty_received, total_cost),
+        }
+
+    def _resolve(self, item_code: str, description: str, qty_received: float, total_cost: float) -> Dict[str, Any]:
+        """Parse Item code and resolve to PriceCategory → mapovací sloupce řádku."""
+        resolved: Dict[str, Any] = {c: None for c in _RESOLVED_COLUMNS}
+
+        # Skip zero-qty rows (nepočítají se do matched ani unmatched)
+        if qty_received <= 0 or total_cost <= 0:
+            return resolved
+
+        # Extract W.Nr
+        w_nr = self._importer.extract_w_nr_from_item_code(item_code)
+        if not w_nr:
+            resolved["unmatched_reason"] = "W.Nr not extracted from Item code"
+            return resolved
+        resolved["w_nr"] = w_nr
+
+        # Resolve MaterialGroup (in-memory lookup)
+        group_id = self._norm_by_wnr.get(w_nr)
+        if not group_id:
+            prefix = w_nr[:3]
+            group_id = self._norm_by_prefix.get(prefix)
+        if not group_id:
+            resolved["unmatched_reason"] = f"No MaterialNorm for W.Nr '{w_nr}'"
+            return resolved
+        resolved["material_group_id"] = group_id
+
+        # Parse shape from Item code
+        dims = self._importer.parse_dimensions_from_item_code(item_code)
+        shape = self._importer.parse_shape_from_item_code(item_code, dims)
+        if not shape:
+            # Fallback: try from Description
+            shape = self._importer.parse_shape_from_text(description)
+        if not shape:
+            resolved["unmatched_reason"] = f"Shape not detected from '{item_code}'"
+            return resolved
+
+        shape_value = shape.value if isinstance(shape, StockShape) else shape
+        resolved["shape"] = shape_value
+
+        # Resolve PriceCategory (in-memory lookup)
+        cat_id = self._category_by_group_shape.get((group_id, shape_value))
+        if not cat_id:
+            resolved["unmatched_reason"] = f"No PriceCategory for group={group_id} + shape={shape_value}"
+            return resolved
+
+        resolved["price_category_id"] = cat_id
+        return resolved
+
+    # ── Local analysis ───────────────────────────────────────────
+
+    async def _analyze_local(
+        self, year_from: int, year_to: int, cached: bool, start: float
+    ) -> PurchasePriceAnalysisResponse:
+        """Analýza z purchase_po_lines + purchase_price_quarters (bez Inforu)."""
+        await self._preload_lookups(include_norms=False)
+
+        line = PurchasePoLine
+        in_range = and_(line.order_date >= f"{year_from}-01-01", line.order_date <= f"{year_to}-12-31")
+        matched_filter = and_(in_range, line.price_category_id.isnot(None))
+
+        totals = (await self.db.execute(
+            select(
+                func.count(),
+                func.count(line.price_category_id),
+                func.count(line.unmatched_reason),
+                func.count(distinct(line.w_nr)),
+                func.min(line.order_date),
+                func.max(line.order_date),
+            ).where(in_range)
+        )).one()
+        fetched, matched_count, unmatched_count, unique_materials, date_min, date_max = totals
 
-            w_nr_set.add(w_nr)
+        date_label = f"{year_from}" if year_from == year_to else f"{year_from}-{year_to}"
 
-            # Resolve MaterialGroup (in-memory lookup)
-            group_id = self._norm_by_wnr.get(w_nr)
-            if not group_id:
-                prefix = w_nr[:3]
-                group_id = self._norm_by_prefix.get(prefix)
-            if not group_id:
-                unmatched.append({**row, "_reason": f"No MaterialNorm for W.Nr '{w_nr}'"})
-                continue
+        if not fetched:
+            return PurchasePriceAnalysisResponse(
+                year_from=year_from,
+                date_range=f"{date_label} (0 rows)",
+                total_po_lines_fetched=0,
+                total_po_lines_matched=0,
+                total_po_lines_unmatched=0,
+                unique_materials=0,
+                categories=[],
+                unmatched=[],
+                cached=cached,
+                fetch_time_seconds=round(time.time() - start, 1),
+            )
 
-            # Parse shape from Item code
-            dims = self._importer.parse_dimensions_from_item_code(item_code)
-            shape = self._importer.parse_shape_from_item_code(item_code, dims)
-            if not shape:
-                # Fallback: try from Description
-                desc = str(row.get("Description", ""))
-                shape = self._importer.parse_shape_from_text(desc)
-            if not shape:
-                unmatched.append({**row, "_reason": f"Shape not detected from '{item_code}'"})
-                continue
+        quarter_rows = (await self.db.execute(
+            select(
+                PurchasePriceQuarter.price_category_id,
+                PurchasePriceQuarter.quarter,
+                PurchasePriceQuarter.po_lines,
+                PurchasePriceQuarter.qty_received,
+                PurchasePriceQuarter.total_cost,
+                PurchasePriceQuarter.min_unit_price,
+                PurchasePriceQuarter.max_unit_price,
+            )
+            .where(
+                PurchasePriceQuarter.quarter >= f"{year_from}-Q1",
+                PurchasePriceQuarter.quarter <= f"{year_to}-Q4",
+            )
+            .order_by(PurchasePriceQuarter.quarter)
+        )).all()
 
-            shape_value = shape.value if isinstance(shape, StockShape) else shape
+        vendor_rows = (await self.db.execute(
+            select(line.price_category_id, line.vendor_name, func.count())
+            .where(matched_filter, line.vendor_name.isnot(None))
+            .group_by(line.price_category_id, line.vendor_name)
+        )).all()
 
-            # Resolve PriceCategory (in-memory lookup)
-            cat_id = self._category_by_group_shape.get((group_id, shape_value))
-            if not cat_id:
-                unmatched.append({
-                    **row,
-                    "_reason": f"No PriceCategory for group={group_id} + shape={shape_value}",
-                })
-                continue
+        line_rows = (await self.db.execute(
+            select(line.price_category_id, line.qty_received, line.total_cost, line.unit_price)
+            .where(matched_filter)
+            .order_by(line.price_category_id)
+        )).all()
 
-            # Compute unit price from real data
-            unit_price = total_cost / qty_received
-
-            matched.append({
-                "cat_id": cat_id,
-                "group_id": group_id,
-                "w_nr": w_nr,
-                "shape": shape_value,
-                "qty_received": qty_received,
-                "total_cost": total_cost,
-                "unit_price": unit_price,
-                "order_date": str(row.get("PoOrderDate", "")),
-                "vendor_name": str(row.get("VenadrName", "")),
-                "vendor_num": str(row.get("PoVendNum", "")),
-            })
+        categories = self._aggregate(quarter_rows, vendor_rows, line_rows)
+        unmatched = await self._summarize_unmatched(in_range)
 
-        logger.info(f"Resolved: {len(matched)} matched, {len(unmatched)} unmatched")
-        return matched, unmatched, w_nr_set
+        return PurchasePriceAnalysisResponse(
+            year_from=year_from,
+            date_range=f"{date_min or f'{year_from}-01-01'} to {date_max or 'now'}",
+            total_po_lines_fetched=fetched,
+            total_po_lines_matched=matched_count,
+            total_po_lines_unmatched=unmatched_count,
+            unique_materials=unique_materials,
+            categories=categories,
+            unmatched=unmatched,
+            cached=cached,
+            fetch_time_seconds=round(time.time() - start, 1),
+        )
 
     # ── Aggregation ──────────────────────────────────────────────
 
-    def _aggregate(self, matched: List[Dict[str, Any]]) -> List[PriceCategoryAnalysis]:
-        """Aggregate matched PO items per PriceCategory with per-tier breakdown."""
-        # Group by cat_id
-        by_cat: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
-        for item in matched:
-            by_cat[item["cat_id"]].append(item)
+    def _aggregate(
+        self,
+        quarter_rows: Sequence[Any],
+        vendor_rows: Sequence[Any],
+        line_rows: Sequence[Any],
+    ) -> List[PriceCategoryAnalysis]:
+        """Aggregate per PriceCategory: totals z kvartálního agregátu, pásma/percentily z řádků."""
+        # Kvartální agregát → totals + quarterly prices per category
+        totals: Dict[int, Dict[str, Any]] = {}
+        for cat_id, quarter, po_lines, qty, cost, min_price, max_price in quarter_rows:
+            t = totals.setdefault(cat_id, {
+                "po_lines": 0, "qty": 0.0, "cost": 0.0,
+                "min_price": None, "max_price": None, "quarterly": {},
+            })
+            t["po_lines"] += po_lines
+            t["qty"] += qty
+            t["cost"] += cost
+            if min_price is not None:
+                t["min_price"] = min_price if t["min_price"] is None else min(t["min_price"], min_price)
+            if max_price is not None:
+                t["max_price"] = max_price if t["max_price"] is None else max(t["max_price"], max_price)
+            if qty > 0:
+                t["quarterly"][quarter] = round(cost / qty, 2)
+
+        vendors: Dict[int, List[Tuple[str, int]]] = defaultdict(list)
+        for cat_id, vendor_name, count in vendor_rows:
+            vendors[cat_id].append((vendor_name, count))
+
+        # Řádky (seřazené podle kategorie) → numpy pole, řez per kategorie
+        if line_rows:
+            cat_ids = np.fromiter((r[0] for r in line_rows), dtype=np.int64, count=len(line_rows))
+            qtys = np.fromiter((r[1] for r in line_rows), dtype=np.float64, count=len(line_rows))
+            costs = np.fromiter((r[2] for r in line_rows), dtype=np.float64, count=len(line_rows))
+            prices = np.fromiter((r[3] for r in line_rows), dtype=np.float64, count=len(line_rows))
+            unique_cats, starts = np.unique(cat_ids, return_index=True)
+            bounds = dict(zip(unique_cats.tolist(), zip(starts.tolist(), [*starts[1:].tolist(), len(line_rows)])))
+        else:
+            qtys = costs = prices = np.empty(0)
+            bounds = {}
 
         results: List[PriceCategoryAnalysis] = []
 
-        for cat_id, items in sorted(by_cat.items()):
+        for cat_id, t in sorted(totals.items()):
             cat = self._categories.get(cat_id)
             if not cat:
                 continue
@@ -342,31 +674,22 @@ class PurchasePriceAnalyzer:
             group = self._groups.get(cat.material_group_id) if cat.material_group_id else None
             tiers_db = self._tiers_by_category.get(cat_id, [])
 
-            # Overall stats
-            total_qty = sum(i["qty_received"] for i in items)
-            total_cost = sum(i["total_cost"] for i in items)
+            total_qty = t["qty"]
+            total_cost = t["cost"]
             weighted_avg = total_cost / total_qty if total_qty > 0 else 0.0
-            unit_prices = [i["unit_price"] for i in items]
 
             # Vendors
-            vendor_counts: Dict[str, int] = defaultdict(int)
-            for i in items:
-                vn = i["vendor_name"]
-                if vn:
-                    vendor_counts[vn] += 1
-            top_vendors = [
-                v for v, _ in sorted(vendor_counts.items(), key=lambda x: -x[1])[:3]
-            ]
+            cat_vendors = vendors.get(cat_id, [])
+            top_vendors = [v for v, _ in sorted(cat_vendors, key=lambda x: (-x[1], x[0]))[:3]]
+
+            lo, hi = bounds.get(cat_id, (0, 0))
+            qty_slice, cost_slice, price_slice = qtys[lo:hi], costs[lo:hi], prices[lo:hi]
 
             # Per-tier analysis (segment PO items by QtyReceived into existing tier ranges)
-            tier_analyses = self._analyze_tiers(items, tiers_db)
+            tier_analyses = self._analyze_tiers(qty_slice, cost_slice, price_slice, tiers_db)
 
             # Weight distribution + suggested boundaries
-            qtys = sorted(i["qty_received"] for i in items)
-            weight_dist = self._compute_distribution(qtys, tiers_db) if len(qtys) >= 3 else None
-
-            # Quarterly prices
-            quarterly = self._compute_quarterly(items)
+            weight_dist = self._compute_distribution(qty_slice, tiers_db) if qty_slice.size >= 3 else None
 
             results.append(PriceCategoryAnalysis(
                 price_category_id=cat_id,
@@ -375,49 +698,56 @@ class PurchasePriceAnalyzer:
                 material_group_id=cat.material_group_id,
                 material_group_name=group.name if group else None,
                 shape=cat.shape,
-                total_po_lines=len(items),
+                total_po_lines=t["po_lines"],
                 total_qty_received_kg=round(total_qty, 2),
                 total_cost_czk=round(total_cost, 2),
                 weighted_avg_price_per_kg=round(weighted_avg, 2),
-                min_unit_price=round(min(unit_prices), 2) if unit_prices else 0.0,
-                max_unit_price=round(max(unit_prices), 2) if unit_prices else 0.0,
-                unique_vendors=len(vendor_counts),
+                min_unit_price=round(t["min_price"], 2) if t["min_price"] is not None else 0.0,
+                max_unit_price=round(t["max_price"], 2) if t["max_price"] is not None else 0.0,
+                unique_vendors=len(cat_vendors),
                 top_vendors=top_vendors,
                 tiers=tier_analyses,
                 weight_distribution=weight_dist,
-                quarterly_prices=quarterly,
+                quarterly_prices=t["quarterly"],
             ))
 
         # Sort by total_cost descending (most significant categories first)
         results.sort(key=lambda r: -r.total_cost_czk)
         return results
 
+    @staticmethod
     def _analyze_tiers(
-        self,
-        items: List[Dict[str, Any]],
+        qtys: np.ndarray,
+        costs: np.ndarray,
+        prices: np.ndarray,
         tiers_db: List[MaterialPriceTier],
     ) -> List[TierAnalysis]:
-        """Segment PO items into tier weight ranges and compute REAL averages per tier."""
+        """Segment PO items into tier weight ranges and compute REAL averages per tier.
+
+        Maska pásmo × řádek: součty jako maticový součin, min/max přes np.where.
+        """
         if not tiers_db:
             return []
 
-        tier_results: List[TierAnalysis] = []
-
-        for tier in tiers_db:
-            min_w = tier.min_weight
-            max_w = tier.max_weight  # None = infinity
+        min_w = np.array([tier.min_weight for tier in tiers_db], dtype=np.float64)
+        max_w = np.array(
+            [np.inf if tier.max_weight is None else tier.max_weight for tier in tiers_db],
+            dtype=np.float64,
+        )
+        mask = (qtys >= min_w[:, None]) & (qtys < max_w[:, None])
 
-            # Filter items that fall into this tier's weight range
-            tier_items = [
-                i for i in items
-                if i["qty_received"] >= min_w
-                and (max_w is None or i["qty_received"] < max_w)
-            ]
+        counts = mask.sum(axis=1)
+        tier_qtys = mask @ qtys
+        tier_costs = mask @ costs
+        min_prices = np.where(mask, prices, np.inf).min(axis=1, initial=np.inf)
+        max_prices = np.where(mask, prices, -np.inf).max(axis=1, initial=-np.inf)
 
-            tier_qty = sum(i["qty_received"] for i in tier_items)
-            tier_cost = sum(i["total_cost"] for i in tier_items)
+        tier_results: List[TierAnalysis] = []
+        for i, tier in enumerate(tiers_db):
+            count = int(counts[i])
+            tier_qty = float(tier_qtys[i])
+            tier_cost = float(tier_costs[i])
             tier_avg = tier_cost / tier_qty if tier_qty > 0 else 0.0
-            tier_prices = [i["unit_price"] for i in tier_items]
 
             # Compare with current DB price
             current = tier.price_per_kg
@@ -425,22 +755,22 @@ class PurchasePriceAnalyzer:
             if current and current > 0 and tier_avg > 0:
                 diff_pct = round(((tier_avg - current) / current) * 100, 1)
 
-            label_max = f"{max_w:.0f}" if max_w is not None else "∞"
+            label_max = f"{tier.max_weight:.0f}" if tier.max_weight is not None else "∞"
             tier_results.append(TierAnalysis(
                 tier_id=tier.id,
-                tier_label=f"{min_w:.0f}-{label_max} kg",
-                min_weight=min_w,
-                max_weight=max_w,
+                tier_label=f"{tier.min_weight:.0f}-{label_max} kg",
+                min_weight=tier.min_weight,
+                max_weight=tier.max_weight,
                 avg_price_per_kg=round(tier_avg, 2),
                 total_qty_kg=round(tier_qty, 2),
                 total_cost_czk=round(tier_cost, 2),
-                po_line_count=len(tier_items),
-                min_price=round(min(tier_prices), 2) if tier_prices else 0.0,
-                max_price=round(max(tier_prices), 2) if tier_prices else 0.0,
+                po_line_count=count,
+                min_price=round(float(min_prices[i]), 2) if count else 0.0,
+                max_price=round(float(max_prices[i]), 2) if count else 0.0,
                 current_price=current,
                 current_tier_version=tier.version,
                 diff_pct=diff_pct,
-                sufficient_data=len(tier_items) >= 3,
+                sufficient_data=count >= 3,
             ))
 
         return tier_results
@@ -449,7 +779,7 @@ class PurchasePriceAnalyzer:
 
     @staticmethod
     def _compute_distribution(
-        sorted_qtys: List[float],
+        qtys: np.ndarray,
         tiers_db: List[MaterialPriceTier],
     ) -> WeightDistribution:
         """Compute percentile-based weight distribution with suggested tier boundaries.
@@ -459,26 +789,15 @@ class PurchasePriceAnalyzer:
         - Tier 2→3 boundary at P67 (top third = bulk purchases)
         - Rounds to nice numbers (5, 10, 25, 50, 100 kg steps)
         """
-        n = len(sorted_qtys)
-
-        def percentile(pct: float) -> float:
-            k = (n - 1) * pct / 100.0
-            f = int(k)
-            c = f + 1
-            if c >= n:
-                return sorted_qtys[-1]
-            return sorted_qtys[f] + (k - f) * (sorted_qtys[c] - sorted_qtys[f])
-
-        p25 = round(percentile(25), 2)
-        p50 = round(percentile(50), 2)
-        p75 = round(percentile(75), 2)
+        # Lineární interpolace mezi sousedními hodnotami (numpy default)
+        p25, p33, p50, p67, p75 = (float(p) for p in np.percentile(qtys, [25, 33, 50, 67, 75]))
 
         # Suggest tier boundaries from data distribution
         suggestions: List[SuggestedBoundary] = []
         if len(tiers_db) >= 2:
             # For 3 tiers: split at P33 and P67 (equal data in each tier)
-            raw_b1 = percentile(33) if len(tiers_db) >= 3 else percentile(50)
-            raw_b2 = percentile(67) if len(tiers_db) >= 3 else None
+            raw_b1 = p33 if len(tiers_db) >= 3 else p50
+            raw_b2 = p67 if len(tiers_db) >= 3 else None
 
             def round_boundary(val: float) -> float:
                 """Round to nice weight boundary."""
@@ -520,93 +839,46 @@ class PurchasePriceAnalyzer:
                     ))
 
         return WeightDistribution(
-            p25=p25,
-            p50=p50,
-            p75=p75,
-            min_qty=round(sorted_qtys[0], 2),
-            max_qty=round(sorted_qtys[-1], 2),
-            avg_qty=round(sum(sorted_qtys) / n, 2),
-            sample_count=n,
+            p25=round(p25, 2),
+            p50=round(p50, 2),
+            p75=round(p75, 2),
+            min_qty=round(float(qtys.min()), 2),
+            max_qty=round(float(qtys.max()), 2),
+            avg_qty=round(float(qtys.mean()), 2),
+            sample_count=int(qtys.size),
             suggested_boundaries=suggestions,
         )
 
-    # ── Quarterly breakdown ──────────────────────────────────────
-
-    @staticmethod
-    def _compute_quarterly(items: List[Dict[str, Any]]) -> Dict[str, float]:
-        """Compute weighted avg price per quarter (YYYY-QN)."""
-        q_qty: Dict[str, float] = defaultdict(float)
-        q_cost: Dict[str, float] = defaultdict(float)
-
-        for item in items:
-            date_str = item.get("order_date", "")
-            if not date_str or len(date_str) < 8:
-                continue
-            # Format: "20260203 00:00:00.000" or "2026-02-03"
-            clean = date_str.replace("-", "").replace(" ", "")[:8]
-            try:
-                year = int(clean[:4])
-                month = int(clean[4:6])
-            except (ValueError, IndexError):
-                continue
-
-            quarter = (month - 1) // 3 + 1
-            key = f"{year}-Q{quarter}"
-            q_qty[key] += item["qty_received"]
-            q_cost[key] += item["total_cost"]
-
-        result = {}
-        for key in sorted(q_qty.keys()):
-            if q_qty[key] > 0:
-                result[key] = round(q_cost[key] / q_qty[key], 2)
-
-        return result
-
     # ── Unmatched summary ────────────────────────────────────────
 
-    @staticmethod
-    def _summarize_unmatched(unmatched: List[Dict[str, Any]]) -> List[UnmatchedItem]:
+    async def _summarize_unmatched(self, in_range: Any) -> List[UnmatchedItem]:
         """Group unmatched items by (Item, reason) for compact display."""
-        groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
-
-        for row in unmatched:
-            item = str(row.get("Item", ""))
-            reason = row.get("_reason", "Unknown")
-            key = (item, reason)
-            if key not in groups:
-                groups[key] = {
-                    "item": item,
-                    "description": str(row.get("Description", "")),
-                    "w_nr": None,
-                    "reason": reason,
-                    "total_cost": 0.0,
-                    "count": 0,
-                }
-                # Try to extract W.Nr even for unmatched
-                w_nr_match = MaterialImporter().extract_w_nr_from_item_code(item)
-                if w_nr_match:
-                    groups[key]["w_nr"] = w_nr_match
-
-            total_cost = 0.0
-            try:
-                total_cost = float(row.get("DerTotalRcvdCost", 0))
-            except (ValueError, TypeError):
-                pass
-            groups[key]["total_cost"] += total_cost
-            groups[key]["count"] += 1
-
-        result = [
+        line = PurchasePoLine
+        total_cost = func.sum(line.total_cost)
+        result = await self.db.execute(
+            select(
+                line.item,
+                line.unmatched_reason,
+                func.max(line.description),
+                func.max(line.w_nr),
+                total_cost,
+                func.count(),
+            )
+            .where(in_range, line.unmatched_reason.isnot(None))
+            .group_by(line.item, line.unmatched_reason)
+            .order_by(total_cost.desc())
+        )
+        return [
             UnmatchedItem(
-                item=g["item"],
-                description=g["description"],
-                w_nr=g["w_nr"],
-                reason=g["reason"],
-                total_cost=round(g["total_cost"], 2),
-                count=g["count"],
+                item=item,
+                description=description or "",
+                w_nr=w_nr,
+                reason=reason,
+                total_cost=round(cost or 0.0, 2),
+                count=count,
             )
-            for g in sorted(groups.values(), key=lambda x: -x["total_cost"])
+            for item, reason, description, w_nr, cost, count in result.all()
         ]
-        return result
 
     # ── Utilities ────────────────────────────────────────────────
 
@@ -10,13 +10,11 @@ Returns QuoteRequestReviewV2 for user review.
 """
 
 import asyncio
-import base64
 import logging
 import re
-from typing import Optional
+from typing import Any, Optional
 
-import fitz  # PyMuPDF
-from openai import OpenAI
+from openai import AsyncOpenAI
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -40,87 +38,65 @@ from app.services.openai_vision_prompts import (
     OPENAI_VISION_SYSTEM,
     build_openai_vision_prompt,
 )
+from app.services.pdf_raster import rasterize_pdf
 from app.services.quote_service import QuoteService
 
 logger = logging.getLogger(__name__)
 
-MAX_IMAGE_DIM = 4096
-
-
-# =============================================================================
-# PDF bytes -> base64 image
-# =============================================================================
-
-def _bytes_to_base64_image(pdf_bytes: bytes, page_num: int = 0, dpi: int = 200) -> str:
-    """Render a PDF page from bytes to a base64 PNG string."""
-    try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    except Exception as exc:
-        raise RuntimeError(f"Failed to open PDF bytes: {exc}") from exc
-
-    try:
-        if page_num >= len(doc):
-            raise ValueError(f"Page {page_num} out of range ({len(doc)} pages)")
-
-        page = doc[page_num]
-        scale = dpi / 72.0
-        page_w = page.rect.width * scale
-        page_h = page.rect.height * scale
-
-        if max(page_w, page_h) > MAX_IMAGE_DIM:
-            scale = MAX_IMAGE_DIM / max(page.rect.width, page.rect.height)
-
-        mat = fitz.Matrix(scale, scale)
-        pix = page.get_pixmap(matrix=mat)
-        png_bytes = pix.tobytes("png")
-        return base64.b64encode(png_bytes).decode("utf-8")
-    finally:
-        doc.close()
+REQUEST_MAX_PAGES = 5  # safety cap
+REQUEST_DPI = 250
+DRAWING_DPI = 300
 
 
 # =============================================================================
 # AI call helper
 # =============================================================================
 
-def _call_vision(
-    client: OpenAI,
+async def _call_vision(
+    client: AsyncOpenAI,
+    limit: asyncio.Semaphore,
     model: str,
     system_prompt: str,
     user_prompt: str,
-    image_b64: str,
+    images_b64: list[str],
     detail: str = "high",
     max_tokens: int = 2000,
 ) -> dict:
-    """Single OpenAI Vision call -> parsed JSON dict."""
-    response = client.chat.completions.create(
-        model=model,
-        max_tokens=max_tokens,
-        temperature=0,
-        store=True,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{image_b64}",
-                            "detail": detail,
-                        },
-                    },
-                    {"type": "text", "text": user_prompt},
-                ],
+    """OpenAI Vision call (one or more page images) -> parsed JSON dict.
+
+    `limit` omezuje souběžná volání v rámci jednoho parsování
+    (QUOTE_PARSE_AI_CONCURRENCY) — rate limit OpenAI účtu.
+    """
+    content: list[dict] = [
+        {
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:image/png;base64,{img_b64}",
+                "detail": detail,
             },
-        ],
-    )
+        }
+        for img_b64 in images_b64
+    ]
+    content.append({"type": "text", "text": user_prompt})
+
+    async with limit:
+        response = await client.chat.completions.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=0,
+            store=True,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": content},
+            ],
+        )
     raw = response.choices[0].message.content
     usage = response.usage
     if usage:
         logger.info(
-            "OpenAI tokens: prompt=%d, completion=%d, total=%d (model=%s)",
+            "OpenAI tokens: prompt=%d, completion=%d, total=%d (model=%s, pages=%d)",
             usage.prompt_tokens, usage.completion_tokens, usage.total_tokens,
-            model[:30],
+            model[:30], len(images_b64),
         )
     return _parse_json_response(raw)
 
@@ -188,82 +164,17 @@ PRAVIDLA:
 - Zakaznik = ODESILATEL poptavky, NE prijemce/dodaci adresa"""
 
 
-def _get_pdf_page_count(pdf_bytes: bytes) -> int:
-    """Get number of pages in a PDF."""
-    try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        count = len(doc)
-        doc.close()
-        return count
-    except Exception:
-        return 1
-
-
-def _call_vision_multi_page(
-    client: OpenAI,
-    model: str,
-    system_prompt: str,
-    user_prompt: str,
-    images_b64: list[str],
-    detail: str = "high",
-    max_tokens: int = 4000,
+async def _parse_request_pdf(
+    client: AsyncOpenAI, limit: asyncio.Semaphore, pdf_bytes: bytes, filename: str,
 ) -> dict:
-    """OpenAI Vision call with multiple images -> parsed JSON dict."""
-    content: list[dict] = []
-    for img_b64 in images_b64:
-        content.append({
-            "type": "image_url",
-            "image_url": {
-                "url": f"data:image/png;base64,{img_b64}",
-                "detail": detail,
-            },
-        })
-    content.append({"type": "text", "text": user_prompt})
-
-    response = client.chat.completions.create(
-        model=model,
-        max_tokens=max_tokens,
-        temperature=0,
-        store=True,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": content},
-        ],
-    )
-    raw = response.choices[0].message.content
-    usage = response.usage
-    if usage:
-        logger.info(
-            "OpenAI tokens: prompt=%d, completion=%d, total=%d (model=%s, pages=%d)",
-            usage.prompt_tokens, usage.completion_tokens, usage.total_tokens,
-            model[:30], len(images_b64),
-        )
-    return _parse_json_response(raw)
-
-
-async def _parse_request_pdf(client: OpenAI, pdf_bytes: bytes, filename: str) -> dict:
-    """Parse request PDF with gpt-4.1. ONE call, all pages."""
-    page_count = _get_pdf_page_count(pdf_bytes)
-    # Skip last page if 3+ pages (usually terms/footer only)
-    pages_to_parse = min(page_count, 5)  # safety cap
-
-    images_b64 = []
-    for page_num in range(pages_to_parse):
-        img = _bytes_to_base64_image(pdf_bytes, page_num=page_num, dpi=250)
-        images_b64.append(img)
-
+    """Parse request PDF with gpt-4.1. ONE call, all pages (max 5)."""
+    images_b64 = await rasterize_pdf(pdf_bytes, max_pages=REQUEST_MAX_PAGES, dpi=REQUEST_DPI)
     logger.info("Parsing request %s: %d pages as images", filename, len(images_b64))
 
-    if len(images_b64) == 1:
-        result = _call_vision(
-            client, "gpt-4.1", PARSE_REQUEST_SYSTEM, PARSE_REQUEST_PROMPT,
-            images_b64[0], detail="high", max_tokens=4000,
-        )
-    else:
-        result = _call_vision_multi_page(
-            client, "gpt-4.1", PARSE_REQUEST_SYSTEM, PARSE_REQUEST_PROMPT,
-            images_b64, detail="high", max_tokens=4000,
-        )
+    result = await _call_vision(
+        client, limit, "gpt-4.1", PARSE_REQUEST_SYSTEM, PARSE_REQUEST_PROMPT,
+        images_b64, detail="high", max_tokens=4000,
+    )
 
     logger.info("Parsed request %s: %d items, customer=%s",
                  filename, len(result.get("items", [])),
@@ -276,11 +187,13 @@ async def _parse_request_pdf(client: OpenAI, pdf_bytes: bytes, filename: str) ->
 # =============================================================================
 
 async def _parse_drawing_pdf(
-    client: OpenAI, pdf_bytes: bytes, filename: str,
+    client: AsyncOpenAI, limit: asyncio.Semaphore, pdf_bytes: bytes, filename: str,
 ) -> DrawingAnalysis:
-    """Parse drawing PDF with ft_v1 (or base) model. ONE call."""
-    img_b64 = _bytes_to_base64_image(pdf_bytes, dpi=300)
+    """Parse drawing PDF with ft_v1 (or base) model. ONE call.
 
+    Chyba renderu i AI volání → DrawingAnalysis s confidence 0 (ostatní
+    výkresy a poptávka doběhnou).
+    """
     ft = is_fine_tuned_model()
     if ft:
         model = OPENAI_MODEL
@@ -292,9 +205,10 @@ async def _parse_drawing_pdf(
         user_prompt = build_openai_vision_prompt()
 
     try:
-        result = _call_vision(
-            client, model, sys_prompt, user_prompt,
-            img_b64, detail="high", max_tokens=2000,
+        images_b64 = await rasterize_pdf(pdf_bytes, max_pages=1, dpi=DRAWING_DPI)
+        result = await _call_vision(
+            client, limit, model, sys_prompt, user_prompt,
+            images_b64, detail="high", max_tokens=2000,
         )
         drawing_number = result.get("drawing_number")
         return DrawingAnalysis(
@@ -534,20 +448,43 @@ async def _match_partner(customer_data: dict, db: AsyncSession) -> CustomerMatch
 # Main entry point
 # =============================================================================
 
+def _broadcast_parse(
+    job_id: Optional[str],
+    user_id: Optional[int],
+    event_type: str,
+    data: dict[str, Any],
+) -> None:
+    if job_id is None:
+        return
+    from app.services.event_bus import broadcast
+    # Jen pro uživatele, který parsování spustil (výsledky AI z cizích poptávek ne)
+    broadcast(event_type, {"job_id": job_id, **data}, user_id=user_id)
+
+
 async def parse_quote_request_v2(
     request_bytes: dict[str, bytes],
     drawing_bytes: dict[str, bytes],
     db: AsyncSession,
+    job_id: Optional[str] = None,
+    user_id: Optional[int] = None,
 ) -> QuoteRequestReviewV2:
     """Parse uploaded PDF files. ONE AI call per file.
 
     User already classified files in the UI (auto-detected from filename).
     No heuristics, no double calls.
 
+    Render PDF běží v process poolu (pdf_raster), AI volání přes AsyncOpenAI
+    s limitem QUOTE_PARSE_AI_CONCURRENCY — event loop zůstává volný.
+    S `job_id` jde průběh přes SSE (/api/events/stream):
+    quote_parse_progress po každém dokončeném souboru (výkres nese hotovou
+    DrawingAnalysis → klient ji zobrazí hned), quote_parse_done na konci.
+
     Args:
         request_bytes: Dict of filename -> PDF bytes (request PDFs)
         drawing_bytes: Dict of filename -> PDF bytes (drawing PDFs)
         db: Database session
+        job_id: Client-generated ID for SSE progress events (None = no events)
+        user_id: Recipient of the progress events (only this user's SSE streams)
 
     Returns:
         QuoteRequestReviewV2 for user review
@@ -555,8 +492,6 @@ async def parse_quote_request_v2(
     if not settings.OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY is not configured. Set it in .env file.")
 
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
     if not request_bytes:
         raise ValueError("Nahrajte alespon jeden soubor poptavky.")
 
@@ -569,14 +504,65 @@ async def parse_quote_request_v2(
         request_filename, len(drawing_bytes),
     )
 
+    total_files = 1 + len(drawing_bytes)
+    completed = 0
+
+    def _file_done(filename: str, kind: str, status: str, **extra: Any) -> None:
+        nonlocal completed
+        completed += 1
+        _broadcast_parse(job_id, user_id, "quote_parse_progress", {
+            "filename": filename, "kind": kind, "status": status,
+            "completed": completed, "total": total_files, **extra,
+        })
+
+    client = AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL or None,
+    )
+    limit = asyncio.Semaphore(max(1, settings.QUOTE_PARSE_AI_CONCURRENCY))
+
+    async def _request_task() -> dict:
+        try:
+            data = await _parse_request_pdf(client, limit, request_bytes[request_filename], request_filename)
+        except Exception as exc:
+            _file_done(request_filename, "request", "error", error=str(exc))
+            raise
+        _file_done(
+            request_filename, "request", "done",
+            items_count=len(data.get("items", [])),
+            customer=(data.get("customer") or {}).get("company_name"),
+        )
+        return data
+
+    async def _drawing_task(fname: str, pdf_bytes: bytes) -> DrawingAnalysis:
+        analysis = await _parse_drawing_pdf(client, limit, pdf_bytes, fname)
+        _file_done(
+            fname, "drawing", "done" if analysis.confidence > 0 else "error",
+            analysis=analysis.model_dump(mode="json"),
+        )
+        return analysis
+
+    _broadcast_parse(job_id, user_id, "quote_parse_progress", {
+        "status": "started", "completed": 0, "total": total_files,
+    })
+
     # ALL calls in parallel — request + drawings, one call each
-    request_task = _parse_request_pdf(client, request_bytes[request_filename], request_filename)
-    drawing_tasks = [
-        _parse_drawing_pdf(client, pdf_bytes, fname)
+    tasks = [asyncio.ensure_future(_request_task())] + [
+        asyncio.ensure_future(_drawing_task(fname, pdf_bytes))
         for fname, pdf_bytes in drawing_bytes.items()
     ]
+    try:
+        all_results = await asyncio.gather(*tasks)
+    except BaseException as exc:
+        # Poptávka selhala → výkresy nemají k čemu se přiřadit, zbytečně neplatit
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        _broadcast_parse(job_id, user_id, "quote_parse_done", {"status": "error", "error": str(exc)})
+        raise
+    finally:
+        await client.close()
 
-    all_results = await asyncio.gather(request_task, *drawing_tasks)
     request_data = all_results[0]
     drawing_analyses: list[DrawingAnalysis] = list(all_results[1:])
 
@@ -584,6 +570,7 @@ async def parse_quote_request_v2(
     customer_raw = request_data.get("customer", {})
 
     if not items_raw:
+        _broadcast_parse(job_id, user_id, "quote_parse_done", {"status": "error", "error": "no items"})
         raise ValueError(
             f"Z poptavky {request_filename} nebyly extrahovany zadne polozky. "
             "Zkontrolujte, zda PDF obsahuje tabulku s dily."
@@ -626,6 +613,10 @@ async def parse_quote_request_v2(
         ),
     )
 
+    _broadcast_parse(job_id, user_id, "quote_parse_done", {
+        "status": "ok", "total_items": summary.total_items, "drawings": len(drawing_analyses),
+    })
+
     return QuoteRequestReviewV2(
         customer=customer_match,
         items=part_matches,
@@ -0,0 +1,286 @@
+"""GESTIMA — Bulk upsert engine pro Infor sync dispatchery
+
+Společná vrstva pro zápis synchronizovaných řádků do lokální DB:
+  - bulk_upsert: SQLite INSERT ... ON CONFLICT DO UPDATE přes executemany dávky.
+    Vyžaduje unique klíč; změny pozná podle sloupce `sync_hash` (hash obsahových
+    sloupců), u tabulek bez něj porovnáním obsahových sloupců.
+  - bulk_sync_by_key: tabulky bez unique klíče / hash sloupce (např. ProductionRecord)
+    — porovnává přímo obsahové sloupce, INSERT + UPDATE podle id přes executemany.
+
+Oba režimy načítají jen existující řádky s klíči z aktuální dávky (ne celou
+tabulku), nezměněné řádky přeskočí a vrací počty created/updated/unchanged.
+Sync tick tak škáluje s deltou, ne s celou historií.
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+SYNC_HASH_COLUMN = "sync_hash"
+_DEFAULT_BATCH_SIZE = 500
+# SQLite limit na počet bind parametrů (starší buildy 999) — lookup klíčů po menších kusech
+_LOOKUP_CHUNK_PARAMS = 900
+
+
+@dataclass
+class BulkUpsertResult:
+    """Výsledek bulk upsertu — počty pro SyncLog a dispatch result."""
+
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    missing: int = 0  # jen update-only režim: klíč v DB neexistuje
+    errors: List[str] = field(default_factory=list)
+
+    def as_dispatch_result(self, skipped: int = 0) -> Dict[str, Any]:
+        return {
+            "created_count": self.created,
+            "updated_count": self.updated,
+            "unchanged_count": self.unchanged,
+            "skipped_count": skipped + self.missing,
+            "errors": list(self.errors),
+        }
+
+
+def content_hash(values: Dict[str, Any], columns: Sequence[str]) -> str:
+    """Stabilní hash obsahových sloupců řádku (pořadí dle `columns`)."""
+    payload = json.dumps([values.get(c) for c in columns], default=str, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _dedup_by_key(
+    rows: Iterable[Dict[str, Any]], key_columns: Sequence[str]
+) -> Dict[Tuple[Any, ...], Dict[str, Any]]:
+    """Poslední výskyt klíče vyhrává (stejně jako dřívější sekvenční upsert)."""
+    by_key: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for row in rows:
+        by_key[tuple(row[c] for c in key_columns)] = row
+    return by_key
+
+
+def _key_condition(key_cols: Sequence[Any], chunk: Sequence[Tuple[Any, ...]]):
+    if len(key_cols) == 1:
+        return key_cols[0].in_([k[0] for k in chunk])
+    return tuple_(*key_cols).in_(list(chunk))
+
+
+def _chunks(items: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def _load_existing(
+    db: AsyncSession,
+    table,
+    key_columns: Sequence[str],
+    value_columns: Sequence[str],
+    keys: Sequence[Tuple[Any, ...]],
+    where: Optional[Any] = None,
+) -> Dict[Tuple[Any, ...], Any]:
+    """Načte existující řádky jen pro dané klíče → {key: Row}."""
+    key_cols = [table.c[c] for c in key_columns]
+    select_cols = key_cols + [table.c[c] for c in value_columns if c not in key_columns]
+    chunk_size = max(1, _LOOKUP_CHUNK_PARAMS // len(key_columns))
+
+    existing: Dict[Tuple[Any, ...], Any] = {}
+    for chunk in _chunks(list(keys), chunk_size):
+        query = select(*select_cols).where(_key_condition(key_cols, chunk))
+        if where is not None:
+            query = query.where(where)
+        result = await db.execute(query)
+        for row in result.all():
+            mapping = row._mapping
+            existing[tuple(mapping[c] for c in key_columns)] = mapping
+    return existing
+
+
+async def bulk_upsert(
+    db: AsyncSession,
+    model,
+    rows: Sequence[Dict[str, Any]],
+    *,
+    key_columns: Sequence[str],
+    content_columns: Sequence[str],
+    insert_values: Optional[Dict[str, Any]] = None,
+    touch_values: Optional[Dict[str, Any]] = None,
+    conflict_set: Optional[Callable[[Any, Any], Dict[str, Any]]] = None,
+    touch_unchanged: bool = False,
+    batch_size: int = _DEFAULT_BATCH_SIZE,
+) -> BulkUpsertResult:
+    """INSERT ... ON CONFLICT(key) DO UPDATE jen pro nové a změněné řádky.
+
+    Změna se pozná podle sloupce `sync_hash` (pokud ho model má), jinak
+    porovnáním obsahových sloupců s DB.
+
+    Args:
+        model: ORM model s unique constraintem na `key_columns`.
+        rows: Namapované řádky (klíč + obsahové sloupce + případné insert-only hodnoty).
+        content_columns: Sloupce, ze kterých se počítá hash a které se přepisují.
+        insert_values: Konstanty jen pro INSERT (created_at, created_by...).
+        touch_values: Konstanty pro INSERT i UPDATE (updated_at, synced_at...).
+        conflict_set: callable(table, excluded) → extra SET výrazy pro UPDATE větev
+            (např. podmíněný soft-delete).
+        touch_unchanged: I nezměněným řádkům zapíše `touch_values` (jeden
+            UPDATE ... WHERE key IN (...) na dávku, obsahové sloupce beze změny)
+            — pro TTL cache, kde `synced_at` znamená „naposledy ověřeno v Inforu".
+
+    Commit je na volajícím.
+    """
+    result = BulkUpsertResult()
+    if not rows:
+        return result
+
+    table = model.__table__
+    use_hash = SYNC_HASH_COLUMN in table.c
+    compare_columns = [SYNC_HASH_COLUMN] if use_hash else list(content_columns)
+    by_key = _dedup_by_key(rows, key_columns)
+    existing = await _load_existing(db, table, key_columns, compare_columns, list(by_key.keys()))
+
+    pending: List[Dict[str, Any]] = []
+    unchanged_keys: List[Tuple[Any, ...]] = []
+    for key, row in by_key.items():
+        current = existing.get(key)
+        if use_hash:
+            row_hash = content_hash(row, content_columns)
+            unchanged = current is not None and current[SYNC_HASH_COLUMN] == row_hash
+        else:
+            unchanged = current is not None and all(current[c] == row.get(c) for c in content_columns)
+        if unchanged:
+            result.unchanged += 1
+            unchanged_keys.append(key)
+            continue
+        if current is None:
+            result.created += 1
+        else:
+            result.updated += 1
+        params = dict(insert_values or {})
+        params.update(row)
+        params.update(touch_values or {})
+        if use_hash:
+            params[SYNC_HASH_COLUMN] = row_hash
+        pending.append(params)
+
+    if touch_unchanged and touch_values and unchanged_keys:
+        key_cols = [table.c[c] for c in key_columns]
+        chunk_size = max(1, _LOOKUP_CHUNK_PARAMS // len(key_columns))
+        for chunk in _chunks(unchanged_keys, chunk_size):
+            await db.execute(
+                update(table).where(_key_condition(key_cols, chunk)).values(**touch_values)
+            )
+
+    if not pending:
+        return result
+
+    # executemany vyžaduje shodnou sadu klíčů ve všech parametrech
+    param_keys = set().union(*(p.keys() for p in pending))
+    for params in pending:
+        for k in param_keys:
+            params.setdefault(k, None)
+
+    stmt = sqlite_insert(table)
+    update_columns = [*content_columns, *(touch_values or {}).keys()]
+    if use_hash:
+        update_columns.append(SYNC_HASH_COLUMN)
+    set_: Dict[str, Any] = {c: stmt.excluded[c] for c in update_columns}
+    if "version" in table.c:
+        set_["version"] = table.c.version + 1
+    if conflict_set is not None:
+        set_.update(conflict_set(table, stmt.excluded))
+    stmt = stmt.on_conflict_do_update(index_elements=list(key_columns), set_=set_)
+
+    for chunk in _chunks(pending, batch_size):
+        await db.execute(stmt, list(chunk))
+
+    logger.debug(
+        "bulk_upsert %s: +%d ~%d =%d",
+        table.name, result.created, result.updated, result.unchanged,
+    )
+    return result
+
+
+async def bulk_sync_by_key(
+    db: AsyncSession,
+    model,
+    rows: Sequence[Dict[str, Any]],
+    *,
+    key_columns: Sequence[str],
+    content_columns: Sequence[str],
+    where: Optional[Any] = None,
+    insert_values: Optional[Dict[str, Any]] = None,
+    touch_values: Optional[Dict[str, Any]] = None,
+    create_missing: bool = True,
+    batch_size: int = _DEFAULT_BATCH_SIZE,
+) -> BulkUpsertResult:
+    """Diff sync pro tabulky bez unique klíče — porovnání obsahových sloupců.
+
+    Existující řádky (dle `key_columns` + volitelného `where`, např. ne-smazané)
+    se porovnají hodnotou, změněné se updatují podle id přes executemany,
+    chybějící se vloží (nebo započítají jako `missing` při `create_missing=False`).
+
+    Commit je na volajícím.
+    """
+    result = BulkUpsertResult()
+    if not rows:
+        return result
+
+    table = model.__table__
+    by_key = _dedup_by_key(rows, key_columns)
+    existing = await _load_existing(
+        db, table, key_columns, ["id", *content_columns], list(by_key.keys()), where=where,
+    )
+
+    inserts: List[Dict[str, Any]] = []
+    updates: List[Dict[str, Any]] = []
+    for key, row in by_key.items():
+        current = existing.get(key)
+        if current is None:
+            if not create_missing:
+                result.missing += 1
+                continue
+            params = dict(insert_values or {})
+            params.update(row)
+            params.update(touch_values or {})
+            inserts.append(params)
+            result.created += 1
+            continue
+        if all(current[c] == row.get(c) for c in content_columns):
+            result.unchanged += 1
+            continue
+        params = {f"_{c}": row.get(c) for c in content_columns}
+        params.update({f"_{c}": v for c, v in (touch_values or {}).items()})
+        params["_id"] = current["id"]
+        updates.append(params)
+        result.updated += 1
+
+    if inserts:
+        param_keys = set().union(*(p.keys() for p in inserts))
+        for params in inserts:
+            for k in param_keys:
+                params.setdefault(k, None)
+        insert_stmt = table.insert()
+        for chunk in _chunks(inserts, batch_size):
+            await db.execute(insert_stmt, list(chunk))
+
+    if updates:
+        values: Dict[str, Any] = {
+            c: bindparam(f"_{c}") for c in [*content_columns, *(touch_values or {}).keys()]
+        }
+        if "version" in table.c:
+            values["version"] = table.c.version + 1
+        update_stmt = update(table).where(table.c.id == bindparam("_id")).values(**values)
+        for chunk in _chunks(updates, batch_size):
+            await db.execute(update_stmt, list(chunk))
+
+    logger.debug(
+        "bulk_sync_by_key %s: +%d ~%d =%d missing=%d",
+        table.name, result.created, result.updated, result.unchanged, result.missing,
+    )
+    return result
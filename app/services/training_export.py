@@ -0,0 +1,291 @@
+"""GESTIMA - Streamovaný export trénovacích dat (OpenAI vision fine-tuning JSONL)
+
+Export stovek výkresů nesmí držet celý JSONL (stovky MB base64) v paměti ani
+renderovat PDF na event loopu. Volající (FT debug, TimeVision) nejdřív z DB
+sestaví lehké TrainingExample (cesta k PDF + texty, bez obrázku); render pak
+běží přes pdf_raster.rasterize_pdf (process pool + raster cache) s omezeným
+předstihem — v paměti je nejvýš TRAINING_EXPORT_RENDER_AHEAD obrázků.
+
+- stream_jsonl()            — async generátor řádků JSONL (StreamingResponse)
+- stream_jsonl_resumable()  — totéž + zápis do souboru na disku; přerušený
+                              export (odpojený klient, restart) pokračuje tam,
+                              kde skončil, hotové řádky se jen přečtou ze souboru;
+                              exporty nepoužité déle než TRAINING_EXPORT_TTL_HOURS
+                              se přitom z adresáře smažou
+- export_file_path()        — deterministický soubor podle druhu a sady záznamů
+
+DB dotazy musí proběhnout před vrácením StreamingResponse — session z
+get_db se uzavře dřív, než se začne streamovat.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Iterator, Optional, Tuple
+
+from app.config import settings
+from app.services.pdf_raster import MAX_IMAGE_DIM, rasterize_pdf
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DPI = 300  # stejně jako inference (openai_vision_service, ft_debug_service)
+
+
+@dataclass(frozen=True)
+class TrainingExample:
+    """Jeden trénovací příklad bez obrázku — render až při streamování."""
+
+    key: str  # stabilní identifikátor záznamu (pokračování exportu)
+    pdf_path: Path
+    system_prompt: str
+    user_text: str
+    answer: str  # obsah assistant zprávy (JSON string)
+    detail: str = "high"
+
+    def to_line(self, img_b64: str) -> bytes:
+        entry = {
+            "messages": [
+                {"role": "system", "content": self.system_prompt},
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/png;base64,{img_b64}",
+                                "detail": self.detail,
+                            },
+                        },
+                        {"type": "text", "text": self.user_text},
+                    ],
+                },
+                {"role": "assistant", "content": self.answer},
+            ]
+        }
+        return json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+async def _render(example: TrainingExample) -> str:
+    return (await rasterize_pdf(example.pdf_path, max_pages=1, dpi=EXPORT_DPI, max_dim=MAX_IMAGE_DIM))[0]
+
+
+async def _iter_rendered(
+    examples: Iterable[TrainingExample],
+    label: str,
+) -> AsyncIterator[Tuple[TrainingExample, bytes]]:
+    """(příklad, řádek) v pořadí vstupu; render s předstihem max N příkladů."""
+    ahead = max(1, settings.TRAINING_EXPORT_RENDER_AHEAD)
+    source = iter(examples)
+    pending: "deque[Tuple[TrainingExample, asyncio.Task]]" = deque()
+    exported = skipped = 0
+
+    def _fill() -> None:
+        while len(pending) < ahead:
+            example = next(source, None)
+            if example is None:
+                return
+            pending.append((example, asyncio.ensure_future(_render(example))))
+
+    try:
+        _fill()
+        while pending:
+            example, task = pending.popleft()
+            try:
+                img_b64 = await task
+            except Exception as exc:
+                logger.warning("%s: PDF render failed for %s (%s): %s", label, example.key, example.pdf_path, exc)
+                skipped += 1
+                _fill()
+                continue
+            _fill()
+            exported += 1
+            yield example, example.to_line(img_b64)
+    finally:
+        for _, task in pending:
+            task.cancel()
+        logger.info("%s: exported %d training examples (%d skipped)", label, exported, skipped)
+
+
+async def stream_jsonl(examples: Iterable[TrainingExample], label: str = "export") -> AsyncIterator[bytes]:
+    """Async generátor JSONL řádků (každý končí \\n). Nevyrenderovatelné PDF se přeskočí."""
+    async for _, line in _iter_rendered(examples, label):
+        yield line
+
+
+# =============================================================================
+# Resumable export do souboru
+# =============================================================================
+
+_READ_CHUNK = 1024 * 1024
+_LOCK_POLL_S = 0.1
+
+
+def export_file_path(kind: str, examples: Iterable[TrainingExample]) -> Path:
+    """Soubor exportu: stejný druh + stejná sada klíčů → stejný soubor (pokračování)."""
+    digest = hashlib.sha256("\n".join(e.key for e in examples).encode("utf-8")).hexdigest()
+    return Path(settings.TRAINING_EXPORT_DIR) / f"{kind}_{digest[:16]}.jsonl"
+
+
+def _keys_path(path: Path) -> Path:
+    return path.with_name(path.name + ".keys")
+
+
+def _try_lock(keys_path: Path) -> Optional[int]:
+    """Neblokující zámek na .keys souboru → fd (uvolní _unlock), None = drží jiný.
+
+    Zámek je na úrovni OS — platí mezi workery i mezi požadavky v jednom procesu.
+    POSIX: flock; Windows: msvcrt.locking na prvním bajtu.
+    """
+    keys_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(keys_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if os.name == "posix":
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            import msvcrt
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        # Mezitím smazáno úklidem (_prune_expired) → zámek na starém inode nic nechrání
+        if os.fstat(fd).st_ino != os.stat(keys_path).st_ino:
+            raise BlockingIOError
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _unlock(fd: int) -> None:
+    if os.name != "posix":
+        import msvcrt
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+    os.close(fd)
+
+
+@asynccontextmanager
+async def _export_lock(path: Path) -> AsyncIterator[None]:
+    """Jeden zapisovatel na soubor exportu — druhý požadavek počká a pak jen čte."""
+    keys_path = _keys_path(path)
+    while (fd := _try_lock(keys_path)) is None:
+        await asyncio.sleep(_LOCK_POLL_S)
+    try:
+        yield
+    finally:
+        _unlock(fd)
+
+
+def _prune_expired(directory: Path, keep: Path) -> None:
+    """Smaže exporty nepoužité déle než TRAINING_EXPORT_TTL_HOURS (kromě `keep`).
+
+    Stáří podle .keys — přepisuje se při každém použití exportu. Rozpracované
+    exporty (zamčené) se přeskočí.
+    """
+    ttl_s = settings.TRAINING_EXPORT_TTL_HOURS * 3600
+    if ttl_s <= 0 or not directory.is_dir():
+        return
+    cutoff = time.time() - ttl_s
+    for keys_path in directory.glob("*.jsonl.keys"):
+        path = keys_path.with_suffix("")
+        if path == keep:
+            continue
+        try:
+            if keys_path.stat().st_mtime > cutoff:
+                continue
+        except OSError:
+            continue
+        fd = _try_lock(keys_path)
+        if fd is None:
+            continue
+        try:
+            path.unlink(missing_ok=True)
+            if os.name != "posix":
+                # Windows nesmaže otevřený soubor — zámek pustit až po smazání dat
+                _unlock(fd)
+                fd = None
+            keys_path.unlink(missing_ok=True)
+            logger.info("Training export %s expired, deleted", path.name)
+        except OSError as exc:
+            logger.warning("Training export %s: cleanup failed: %s", path.name, exc)
+        finally:
+            if fd is not None:
+                _unlock(fd)
+
+
+def _recover(path: Path) -> list[str]:
+    """Srovná soubor a seznam hotových klíčů na společný počet úplných řádků.
+
+    Řádek se zapisuje před klíčem — po pádu mezi nimi (nebo uprostřed řádku)
+    se přebytek usekne.
+    """
+    keys_path = _keys_path(path)
+    keys = keys_path.read_text(encoding="utf-8").splitlines() if keys_path.exists() else []
+    if not path.exists():
+        keys = []
+    else:
+        offset = lines = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n") or lines == len(keys):
+                    break
+                offset += len(line)
+                lines += 1
+        keys = keys[:lines]
+        with open(path, "r+b") as f:
+            f.truncate(offset)
+    keys_path.parent.mkdir(parents=True, exist_ok=True)
+    keys_path.write_text("".join(f"{k}\n" for k in keys), encoding="utf-8")
+    return keys
+
+
+def _read_chunks(path: Path) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        yield from iter(lambda: f.read(_READ_CHUNK), b"")
+
+
+async def stream_jsonl_resumable(
+    examples: list[TrainingExample],
+    path: Path,
+    label: str = "export",
+) -> AsyncIterator[bytes]:
+    """Streamuje export a zároveň ho zapisuje do `path`.
+
+    Už hotová část se odešle ze souboru, renderují se jen zbývající příklady.
+    Přeskočené (nevyrenderovatelné) příklady se při dalším běhu zkusí znovu.
+    """
+    await asyncio.to_thread(_prune_expired, path.parent, path)
+    async with _export_lock(path):
+        done = set(await asyncio.to_thread(_recover, path))
+        if done:
+            logger.info("%s: resuming %s (%d examples already exported)", label, path.name, len(done))
+            chunks = _read_chunks(path)
+            try:
+                while True:
+                    chunk = await asyncio.to_thread(next, chunks, None)
+                    if chunk is None:
+                        break
+                    yield chunk
+            finally:
+                chunks.close()  # odpojený klient → zavřít soubor hned, ne až v GC
+
+        remaining = [e for e in examples if e.key not in done]
+        with open(path, "ab") as out, open(_keys_path(path), "a", encoding="utf-8") as keys_out:
+            async for example, line in _iter_rendered(remaining, label):
+                await asyncio.to_thread(_append, out, keys_out, example.key, line)
+                yield line
+
+
+def _append(out, keys_out, key: str, line: bytes) -> None:
+    out.write(line)
+    out.flush()
+    keys_out.write(f"{key}\n")
+    keys_out.flush()
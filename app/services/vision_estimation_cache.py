@@ -0,0 +1,139 @@
+"""GESTIMA - Response cache + single-flight pro OpenAI vision odhady (TimeVision)
+
+Odhad času (time_v1) i extrakce features (features_v2) jsou pro stejný obsah
+PDF, model, prompt a detail mode deterministické (temperature=0) — opakované
+volání jen stojí peníze a čas. Cache je přímo TimeVisionEstimation:
+záznam nese klíč (source_hash, ai_model, prompt_hash, ai_detail,
+estimation_type) a surovou odpověď ve vision_extraction_json.
+
+- vision_cache_key()  — klíč z PDF (SHA-256 obsahu v threadu) + promptu
+- estimate_cached()   — hit z DB, jinak jedno volání pro všechny souběžné
+                        stejné požadavky (single-flight), force=True → vždy znovu
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.time_vision import TimeVisionEstimation
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class VisionCacheKey:
+    estimation_type: str
+    source_hash: str
+    model: str
+    prompt_hash: str
+    detail: str
+
+    def columns(self) -> dict:
+        """Hodnoty sloupců TimeVisionEstimation pro uložení klíče."""
+        return {
+            "source_hash": self.source_hash,
+            "prompt_hash": self.prompt_hash,
+            "ai_detail": self.detail,
+        }
+
+
+def prompt_hash(system_prompt: str, user_prompt: str) -> str:
+    return hashlib.sha256(f"{system_prompt}\x00{user_prompt}".encode("utf-8")).hexdigest()
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def vision_cache_key(
+    pdf_path: Path,
+    estimation_type: str,
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    detail: str,
+) -> VisionCacheKey:
+    source_hash = await asyncio.to_thread(_file_sha256, Path(pdf_path))
+    return VisionCacheKey(
+        estimation_type=estimation_type,
+        source_hash=source_hash,
+        model=model,
+        prompt_hash=prompt_hash(system_prompt, user_prompt),
+        detail=detail,
+    )
+
+
+async def find_cached(db: AsyncSession, key: VisionCacheKey) -> Optional[dict]:
+    """Poslední nesmazaný odhad se stejným klíčem → surová odpověď modelu."""
+    result = await db.execute(
+        select(TimeVisionEstimation.vision_extraction_json)
+        .where(
+            TimeVisionEstimation.source_hash == key.source_hash,
+            TimeVisionEstimation.estimation_type == key.estimation_type,
+            TimeVisionEstimation.ai_model == key.model,
+            TimeVisionEstimation.prompt_hash == key.prompt_hash,
+            TimeVisionEstimation.ai_detail == key.detail,
+            TimeVisionEstimation.vision_extraction_json.isnot(None),
+            TimeVisionEstimation.deleted_at.is_(None),
+        )
+        .order_by(TimeVisionEstimation.updated_at.desc(), TimeVisionEstimation.id.desc())
+        .limit(1)
+    )
+    raw = result.scalar_one_or_none()
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+
+# Běžící volání per klíč — souběžné stejné požadavky čekají na jeden výsledek
+_inflight: Dict[VisionCacheKey, "asyncio.Future[dict]"] = {}
+
+
+async def estimate_cached(
+    db: AsyncSession,
+    key: VisionCacheKey,
+    compute: Callable[[], Awaitable[dict]],
+    force: bool = False,
+) -> Tuple[dict, bool]:
+    """Vrátí (odpověď modelu, cached).
+
+    force=True přeskočí DB lookup; k už běžícímu volání se ale připojí —
+    jeho výsledek je stejně čerstvý.
+    """
+    if not force:
+        hit = await find_cached(db, key)
+        if hit is not None:
+            logger.info("Vision cache hit: %s %s (%s)", key.estimation_type, key.source_hash[:12], key.model[:30])
+            return hit, True
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(compute())
+        _inflight[key] = task
+
+        def _done(t: "asyncio.Future[dict]") -> None:
+            if _inflight.get(key) is t:
+                del _inflight[key]
+            if not t.cancelled():
+                t.exception()  # označit jako převzatou (žádné "never retrieved")
+
+        task.add_done_callback(_done)
+    else:
+        logger.info("Vision call coalesced: %s %s", key.estimation_type, key.source_hash[:12])
+
+    # shield: odpojení jednoho klienta (SSE) nezruší volání ostatním
+    return await asyncio.shield(task), False
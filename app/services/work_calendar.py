@@ -0,0 +1,297 @@
+"""GESTIMA - Pracovní kalendář pro plánování výroby
+
+Převod mezi časem (wall-clock) a "offsetem pracovních hodin" v konstantním čase:
+  - pro každý den horizontu předpočítané směny (intervaly v sekundách od půlnoci)
+    a kumulativní součet pracovních sekund od počátku horizontu
+  - tabulka "celá pracovní hodina → den" → lookup dne bez procházení dnů
+
+Podporuje svátky, směny podle dne v týdnu (i více směn za den) a samostatný
+kalendář pro konkrétní pracoviště (WC). Horizont se rozšiřuje podle potřeby.
+
+Časy jsou naivní lokální datetime (stejně jako v plánovači).
+
+Usage:
+    calendar = get_work_calendars().for_wc("FV3")
+    start = calendar.clamp(datetime.now())
+    end = calendar.add_work_hours(start, 5.5)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Směna = (začátek, konec) v sekundách od půlnoci, konec <= 24h
+Shift = Tuple[int, int]
+WeekPattern = Dict[int, Tuple[Shift, ...]]  # weekday (0=Po) → směny
+
+_SECONDS_PER_DAY = 24 * 3600
+_INITIAL_HORIZON_DAYS = 400
+_BACKFILL_DAYS = 31
+
+# Výchozí: Po–Pá 07:00–15:00 (8h)
+DEFAULT_WEEK_PATTERN: WeekPattern = {
+    weekday: ((7 * 3600, 15 * 3600),) for weekday in range(5)
+}
+
+
+def parse_shift(value: str) -> Shift:
+    """"06:00-14:00" → (21600, 50400). Konec "24:00" je povolen."""
+    start_str, end_str = (part.strip() for part in value.split("-", 1))
+
+    def _seconds(hhmm: str) -> int:
+        hours, _, minutes = hhmm.partition(":")
+        return int(hours) * 3600 + int(minutes or 0) * 60
+
+    start, end = _seconds(start_str), _seconds(end_str)
+    if not 0 <= start < end <= _SECONDS_PER_DAY:
+        raise ValueError(f"Neplatná směna: {value!r}")
+    return (start, end)
+
+
+def _normalize_shifts(shifts: Iterable[Shift]) -> Tuple[Shift, ...]:
+    """Seřadit a sloučit navazující / překrývající se směny."""
+    merged: List[List[int]] = []
+    for start, end in sorted(shifts):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return tuple((s, e) for s, e in merged)
+
+
+def czech_holidays(year: int) -> List[date]:
+    """Státní svátky ČR (včetně Velkého pátku a Velikonočního pondělí)."""
+    # Velikonoční neděle — anonymní gregoriánský algoritmus
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    easter = date(year, month, day)
+
+    fixed = [(1, 1), (5, 1), (5, 8), (7, 5), (7, 6), (9, 28), (10, 28), (11, 17), (12, 24), (12, 25), (12, 26)]
+    return sorted(
+        [date(year, mo, dy) for mo, dy in fixed]
+        + [easter - timedelta(days=2), easter + timedelta(days=1)]
+    )
+
+
+class WorkCalendar:
+    """Pracovní kalendář s předpočítanými kumulativními pracovními sekundami."""
+
+    def __init__(
+        self,
+        week_pattern: Optional[Mapping[int, Sequence[Shift]]] = None,
+        holidays: Iterable[date] = (),
+        origin: Optional[date] = None,
+        holiday_rule: Optional[Callable[[int], Iterable[date]]] = None,
+    ):
+        pattern = DEFAULT_WEEK_PATTERN if week_pattern is None else week_pattern
+        self._week: Dict[int, Tuple[Shift, ...]] = {
+            wd: _normalize_shifts(pattern.get(wd, ())) for wd in range(7)
+        }
+        if not any(self._week.values()):
+            raise ValueError("Pracovní kalendář nemá žádnou směnu")
+        self._holidays = set(holidays)
+        self._holiday_rule = holiday_rule  # svátky podle roku (např. czech_holidays), lazy
+        self._holiday_years: set = set()
+        self._build(origin or date.today() - timedelta(days=_BACKFILL_DAYS))
+
+    # ---------- předpočet ----------
+
+    def _build(self, origin: date) -> None:
+        self._origin = origin
+        self._day_shifts: List[Tuple[Shift, ...]] = []
+        self._cum: List[int] = [0]            # pracovní sekundy na začátku dne i
+        self._hour_to_day: List[int] = []     # celá pracovní hodina → index dne
+        self._extend(_INITIAL_HORIZON_DAYS)
+
+    def _is_holiday(self, day: date) -> bool:
+        if self._holiday_rule is not None and day.year not in self._holiday_years:
+            self._holiday_years.add(day.year)
+            self._holidays.update(self._holiday_rule(day.year))
+        return day in self._holidays
+
+    def _extend(self, days: int) -> None:
+        for _ in range(days):
+            day = self._origin + timedelta(days=len(self._day_shifts))
+            shifts = () if self._is_holiday(day) else self._week[day.weekday()]
+            self._day_shifts.append(shifts)
+            day_index = len(self._day_shifts) - 1
+            total = self._cum[-1] + sum(e - s for s, e in shifts)
+            self._cum.append(total)
+            while len(self._hour_to_day) * 3600 < total:
+                self._hour_to_day.append(day_index)
+
+    def _day_index(self, day: date) -> int:
+        index = (day - self._origin).days
+        if index < 0:
+            # Datum před počátkem → přestavět horizont s dřívějším počátkem (vzácné)
+            self._build(day - timedelta(days=_BACKFILL_DAYS))
+            index = (day - self._origin).days
+        if index >= len(self._day_shifts):
+            self._extend(max(index - len(self._day_shifts) + 1, len(self._day_shifts)))
+        return index
+
+    # ---------- převody ----------
+
+    def to_offset(self, dt: datetime) -> float:
+        """Pracovní sekundy od počátku horizontu do `dt` (mimo směnu = konec předchozí práce).
+
+        Offset je platný jen do přestavění horizontu (datum před počátkem) —
+        nepersistovat, používat v rámci jednoho výpočtu.
+        """
+        index = self._day_index(dt.date())
+        second = dt.hour * 3600 + dt.minute * 60 + dt.second + dt.microsecond / 1_000_000
+        offset: float = self._cum[index]
+        for start, end in self._day_shifts[index]:
+            if second >= end:
+                offset += end - start
+            else:
+                if second > start:
+                    offset += second - start
+                break
+        return offset
+
+    def from_offset(self, offset: float, *, end: bool = False) -> datetime:
+        """Čas odpovídající pracovnímu offsetu.
+
+        Na hranici směn: end=False → začátek následující směny (začátek operace),
+        end=True → konec předchozí směny (konec operace).
+        """
+        offset = max(offset, 0.0)
+        while self._cum[-1] <= offset:
+            self._extend(len(self._day_shifts))
+
+        index = self._hour_to_day[int(offset // 3600)]
+        while self._cum[index + 1] <= offset:
+            index += 1
+
+        remaining = offset - self._cum[index]
+        if end and remaining == 0 and offset > 0:
+            # Přesně na začátku pracovního dne → konec posledního pracovního dne
+            index -= 1
+            while self._cum[index + 1] == self._cum[index]:
+                index -= 1
+            return self._at(index, self._day_shifts[index][-1][1])
+
+        for start, stop in self._day_shifts[index]:
+            length = stop - start
+            if remaining < length or (end and remaining == length):
+                return self._at(index, start + remaining)
+            remaining -= length
+        # Nedosažitelné (remaining < denní kapacita)
+        return self._at(index, self._day_shifts[index][-1][1])
+
+    def _at(self, index: int, second: float) -> datetime:
+        return datetime.combine(self._origin + timedelta(days=index), time()) + timedelta(seconds=second)
+
+    # ---------- API pro plánovače ----------
+
+    def clamp(self, dt: datetime) -> datetime:
+        """Nejbližší pracovní okamžik >= dt (mimo směnu → začátek další směny)."""
+        return self.from_offset(self.to_offset(dt))
+
+    def add_work_hours(self, start: datetime, hours: float) -> datetime:
+        """Přičíst pracovní hodiny (přeskočí noci, víkendy, svátky)."""
+        if hours <= 0:
+            return start
+        return self.from_offset(self.to_offset(start) + hours * 3600, end=True)
+
+    def work_hours_between(self, start: datetime, end: datetime) -> float:
+        """Počet pracovních hodin mezi dvěma časy (záporný, pokud end < start)."""
+        self._day_index(min(start, end).date())  # případné přestavění horizontu předem
+        return (self.to_offset(end) - self.to_offset(start)) / 3600
+
+    def is_working_day(self, day: date) -> bool:
+        return bool(self._day_shifts[self._day_index(day)])
+
+
+# ---------------------------------------------------------------------------
+# Kalendáře podle pracoviště (z konfigurace)
+# ---------------------------------------------------------------------------
+
+def _parse_week_pattern(value) -> WeekPattern:
+    """["06:00-14:00", ...] → Po–Pá; {"0": [...], "5": [...]} → podle dne v týdnu."""
+    if isinstance(value, list):
+        shifts = tuple(parse_shift(s) for s in value)
+        return {weekday: shifts for weekday in range(5)}
+    return {int(weekday): tuple(parse_shift(s) for s in shifts) for weekday, shifts in value.items()}
+
+
+class WorkCalendarSet:
+    """Výchozí kalendář + kalendáře pro jednotlivá WC (sdílené svátky)."""
+
+    def __init__(
+        self,
+        default: WorkCalendar,
+        per_wc: Optional[Dict[str, WorkCalendar]] = None,
+    ):
+        self.default = default
+        self._per_wc = {k.upper(): v for k, v in (per_wc or {}).items()}
+
+    def for_wc(self, wc: Optional[str]) -> WorkCalendar:
+        if not wc:
+            return self.default
+        return self._per_wc.get(wc.strip().upper(), self.default)
+
+
+_calendars: Optional[WorkCalendarSet] = None
+
+
+def build_work_calendars(shifts_json: str, holidays_json: str) -> WorkCalendarSet:
+    """Sestaví kalendáře z JSON konfigurace (PLANNER_WC_SHIFTS, PLANNER_HOLIDAYS)."""
+    try:
+        holidays = [date.fromisoformat(d) for d in json.loads(holidays_json or "[]")]
+    except (ValueError, TypeError) as e:
+        logger.error(f"Invalid PLANNER_HOLIDAYS: {e}")
+        holidays = []
+
+    try:
+        shifts_config: Dict[str, object] = json.loads(shifts_json or "{}")
+    except json.JSONDecodeError as e:
+        logger.error(f"Invalid PLANNER_WC_SHIFTS JSON: {e}")
+        shifts_config = {}
+
+    def _calendar(pattern: Optional[WeekPattern]) -> WorkCalendar:
+        return WorkCalendar(
+            pattern,
+            holidays=holidays,
+            holiday_rule=czech_holidays if settings.PLANNER_CZ_HOLIDAYS else None,
+        )
+
+    patterns: Dict[str, WeekPattern] = {}
+    for wc, value in shifts_config.items():
+        try:
+            patterns[wc] = _parse_week_pattern(value)
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.error(f"Invalid PLANNER_WC_SHIFTS entry for {wc}: {e}")
+
+    default = _calendar(patterns.pop("_default", None))
+    return WorkCalendarSet(default, {wc: _calendar(p) for wc, p in patterns.items()})
+
+
+def get_work_calendars() -> WorkCalendarSet:
+    """Process-level kalendáře z konfigurace (sestaví se při prvním použití)."""
+    global _calendars
+    if _calendars is None:
+        _calendars = build_work_calendars(settings.PLANNER_WC_SHIFTS, settings.PLANNER_HOLIDAYS)
+    return _calendars
+
+
+def reset_work_calendars() -> None:
+    """Zahodí kalendáře (po změně konfigurace / v testech)."""
+    global _calendars
+    _calendars = None
@@ -14,15 +14,17 @@ SP parametry ověřeny z InduStream IL (industream_verified_sp_calls.json).
 from __future__ import annotations
 
 import asyncio
+import base64
+import json
 import logging
 import os
 from datetime import date, datetime, timezone
 import re
-from typing import Any, Dict, Iterable, List, Optional, Sequence
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence
 from zoneinfo import ZoneInfo
 
 from fastapi import HTTPException
-from sqlalchemy import Integer, cast, func, select
+from sqlalchemy import Integer, cast, func, select, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db_helpers import safe_commit, set_audit
@@ -834,6 +836,47 @@ def _is_operation_completed_row(row: Dict[str, Any]) -> bool:
     )
 
 
+# ---------------------------------------------------------------------------
+# Odvozené sloupce workshop_job_routes (udržují sync dispatchery)
+# ---------------------------------------------------------------------------
+
+# Chybějící datum → na konec (jako (1, "") v _sort_key_for_date); řadí se za ISO i text
+_SORT_KEY_MISSING = "\uffff"
+# Nenumerické OperNum → za numerické (jako skupina 1 v _oper_sort_key), pak podle textu
+_OPER_KEY_NON_NUMERIC = 2 ** 62
+# SQLite upper() bez ICU mění jen ASCII — kurzor musí počítat stejně
+_ASCII_UPPER = str.maketrans("abcdefghijklmnopqrstuvwxyz", "ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+
+def route_date_sort_key(value: Any) -> str:
+    """Normalizovaný klíč pro op_datum_st_key / op_datum_sp_key."""
+    missing, key = _sort_key_for_date(_as_clean_str(value))
+    return _SORT_KEY_MISSING if missing else key
+
+
+def route_oper_sort_key(oper_num: Any) -> int:
+    """Normalizovaný klíč pro oper_num_key (numerické OperNum jako číslo)."""
+    group, number, _text = _oper_sort_key(_as_clean_str(oper_num))
+    return number if group == 0 else _OPER_KEY_NON_NUMERIC
+
+
+def route_is_completed(
+    state: Any,
+    state_asd: Any,
+    qty_released: Any,
+    qty_complete: Any,
+    qty_scrapped: Any,
+) -> bool:
+    """Odvozený is_completed (stav z JBR nebo odvedené množství) — jako _is_operation_completed_row."""
+    return _is_operation_completed_row({
+        "State": state,
+        "StateAsd": state_asd,
+        "JobQtyReleased": qty_released,
+        "QtyComplete": qty_complete,
+        "QtyScrapped": qty_scrapped,
+    })
+
+
 def _normalize_queue_row(row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     job = _as_clean_str(_first_value(row, ("Job", "JobNum", "colJob")))
     oper_num = _as_clean_str(_first_value(row, ("OperNum", "Oper", "colOper", "colOperNum")))
@@ -1068,7 +1111,18 @@ async def _invoke_best_effort_candidates(
         logger.warning("%s best-effort skipped: %s", method_name, " | ".join(errors))
 
 
-async def _load_collection_first(
+_INFOR_OK_CODES = (None, 0, 200, 210)
+
+
+def _collection_row_key(row: Dict[str, Any], properties: Sequence[str]) -> Any:
+    """Klíč pro deduplikaci řádku — RowPointer, jinak všechny hodnoty řádku."""
+    rp = row.get("RowPointer")
+    if rp:
+        return rp
+    return tuple(str(row.get(p, "")) for p in properties)
+
+
+async def _iter_collection_pages(
     infor_client,
     ido_name: str,
     property_sets: Sequence[Sequence[str]],
@@ -1076,120 +1130,176 @@ async def _load_collection_first(
     filter_expr: Optional[str] = None,
     order_by: Optional[str] = None,
     record_cap: int = 200,
-) -> List[Dict[str, Any]]:
-    """Načte data z IDO s automatickou paginací přes bookmark.
-
-    Infor API typicky vrací max ~200 řádků na stránku. Tato funkce
-    automaticky následuje bookmark dokud nejsou načteny všechny záznamy
-    (nebo dosažen record_cap). Řádky se deduplikují podle RowPointer
-    (pokud existuje), jinak podle všech hodnot řádku.
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Streamovaná paginace přes bookmark — yielduje stránky (už deduplikované).
+
+    Požadavek na stránku N+1 se odešle hned, jak je znám bookmark stránky N,
+    takže HTTP round-trip běží souběžně se zpracováním stránky N u volajícího.
+    Property set se volí podle první stránky. Chyba první stránky u všech
+    property setů vyhodí RuntimeError; chyba další stránky (HTTP nebo
+    MessageCode) se zaloguje a paginace skončí s už vydanými stránkami.
     """
     errors: List[str] = []
 
-    for properties in property_sets:
+    def _page_kwargs(properties: Sequence[str], bookmark: Optional[str]) -> Dict[str, Any]:
         kwargs: Dict[str, Any] = {
             "ido_name": ido_name,
             "properties": list(properties),
             "record_cap": record_cap,
         }
+        if bookmark:
+            kwargs["load_type"] = "NEXT"
+            kwargs["bookmark"] = bookmark
         if filter_expr:
             kwargs["filter"] = filter_expr
         if order_by:
             kwargs["order_by"] = order_by
+        return kwargs
 
+    for properties in property_sets:
         try:
-            result = await infor_client.load_collection(**kwargs)
-            message_code = result.get("message_code")
+            result = await infor_client.load_collection(**_page_kwargs(properties, None))
+        except Exception as exc:
+            errors.append(f"{list(properties)} -> {exc}")
+            continue
+        message_code = result.get("message_code")
+        if message_code not in _INFOR_OK_CODES:
             message = (result.get("message") or "").strip()
-            if message_code not in (None, 0, 200, 210):
-                errors.append(f"{list(properties)} -> {message or f'MessageCode {message_code}'}")
-                continue
+            errors.append(f"{list(properties)} -> {message or f'MessageCode {message_code}'}")
+            continue
 
-            all_data = list(result.get("data", []))
-            page_sizes = [len(all_data)]
-
-            # Automatická paginace přes bookmark.
-            # Infor API typicky vrací max ~200 řádků na stránku nezávisle na record_cap.
-            # Paginace pokračuje dokud:
-            #   - has_more je True a bookmark existuje
-            #   - nedosáhli jsme record_cap
-            bookmark = result.get("bookmark")
-            has_more = result.get("has_more", False)
-            page = 1
-            while has_more and bookmark and (record_cap <= 0 or len(all_data) < record_cap):
+        seen: set = set()
+        fetched = 0
+        unique = 0
+        page = 0
+        page_sizes: List[int] = []
+        pending: Optional[asyncio.Task] = None
+        try:
+            while True:
                 page += 1
-                page_kwargs: Dict[str, Any] = {
-                    "ido_name": ido_name,
-                    "properties": list(properties),
-                    "record_cap": record_cap,
-                    "load_type": "NEXT",
-                    "bookmark": bookmark,
-                }
-                if filter_expr:
-                    page_kwargs["filter"] = filter_expr
-                if order_by:
-                    page_kwargs["order_by"] = order_by
-                next_result = await infor_client.load_collection(**page_kwargs)
-                next_code = next_result.get("message_code")
-                if next_code not in (None, 0, 200, 210):
-                    logger.warning("LoadCollection %s page %d: error code %s", ido_name, page, next_code)
+                page_data = list(result.get("data", []))
+                page_sizes.append(len(page_data))
+                fetched += len(page_data)
+
+                # Prefetch další stránky ještě před zpracováním aktuální.
+                # Paginace pokračuje dokud:
+                #   - has_more je True a bookmark existuje
+                #   - nedosáhli jsme record_cap
+                bookmark = result.get("bookmark")
+                if (
+                    page_data
+                    and result.get("has_more", False)
+                    and bookmark
+                    and (record_cap <= 0 or fetched < record_cap)
+                ):
+                    pending = asyncio.create_task(
+                        infor_client.load_collection(**_page_kwargs(properties, bookmark))
+                    )
+                    # Pustit task ke slovu — požadavek odejde dřív, než volající
+                    # začne zpracovávat stránku (jinak by čekal na jeho první await).
+                    await asyncio.sleep(0)
+
+                rows: List[Dict[str, Any]] = []
+                for row in page_data:
+                    key = _collection_row_key(row, properties)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    rows.append(row)
+                unique += len(rows)
+                if rows:
+                    yield rows
+
+                if pending is None:
                     break
-                page_data = list(next_result.get("data", []))
-                if not page_data:
+                try:
+                    next_result = await pending
+                except Exception as exc:
+                    logger.warning("LoadCollection %s page %d failed: %s", ido_name, page + 1, exc)
                     break
-                page_sizes.append(len(page_data))
-                all_data.extend(page_data)
-                new_bookmark = next_result.get("bookmark")
-                if new_bookmark == bookmark:
+                finally:
+                    pending = None
+                next_code = next_result.get("message_code")
+                if next_code not in _INFOR_OK_CODES:
+                    message = (next_result.get("message") or "").strip() or f"MessageCode {next_code}"
+                    logger.warning(
+                        "LoadCollection %s page %d: %s — returning %d rows loaded so far",
+                        ido_name, page + 1, message, unique,
+                    )
                     break
-                bookmark = new_bookmark
-                has_more = next_result.get("has_more", False)
-
-            if page > 1:
-                before = len(all_data)
-                all_data = _dedup_rows(all_data, list(properties))
-                after = len(all_data)
-                logger.info(
-                    "LoadCollection %s: %d pages %s, %d rows (dedup removed %d)",
-                    ido_name, page, page_sizes, after, before - after,
-                )
-            else:
-                logger.info(
-                    "LoadCollection %s: 1 page, %d rows",
-                    ido_name, len(all_data),
-                )
-
-            return all_data
-        except Exception as exc:
-            errors.append(f"{list(properties)} -> {exc}")
+                if not next_result.get("data"):
+                    break
+                if next_result.get("bookmark") == bookmark:
+                    # Stejný bookmark = Infor vrací stále stejnou stránku; poslední data ještě zpracujeme.
+                    next_result = {**next_result, "has_more": False}
+                result = next_result
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+        if page > 1:
+            logger.info(
+                "LoadCollection %s: %d pages %s, %d rows (dedup removed %d)",
+                ido_name, page, page_sizes, unique, fetched - unique,
+            )
+        else:
+            logger.info("LoadCollection %s: 1 page, %d rows", ido_name, unique)
+        return
 
     raise RuntimeError(
         f"LoadCollection {ido_name} failed for all property sets: {' || '.join(errors)}"
     )
 
 
-def _dedup_rows(
-    rows: List[Dict[str, Any]],
-    properties: List[str],
+async def _iter_collection_rows(
+    infor_client,
+    ido_name: str,
+    property_sets: Sequence[Sequence[str]],
+    *,
+    filter_expr: Optional[str] = None,
+    order_by: Optional[str] = None,
+    record_cap: int = 200,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Řádková varianta `_iter_collection_pages` — async iterátor přes řádky."""
+    async for rows in _iter_collection_pages(
+        infor_client,
+        ido_name,
+        property_sets,
+        filter_expr=filter_expr,
+        order_by=order_by,
+        record_cap=record_cap,
+    ):
+        for row in rows:
+            yield row
+
+
+async def _load_collection_first(
+    infor_client,
+    ido_name: str,
+    property_sets: Sequence[Sequence[str]],
+    *,
+    filter_expr: Optional[str] = None,
+    order_by: Optional[str] = None,
+    record_cap: int = 200,
 ) -> List[Dict[str, Any]]:
-    """Deduplikuje řádky z Infor API (paginace může vracet overlapping data).
+    """Načte data z IDO s automatickou paginací přes bookmark.
 
-    Používá RowPointer (pokud existuje) jako unikátní klíč, jinak
-    kombinaci všech hodnot řádku.
+    Infor API typicky vrací max ~200 řádků na stránku. Tato funkce
+    automaticky následuje bookmark dokud nejsou načteny všechny záznamy
+    (nebo dosažen record_cap). Řádky se deduplikují podle RowPointer
+    (pokud existuje), jinak podle všech hodnot řádku.
     """
-    seen: set = set()
-    result: List[Dict[str, Any]] = []
-    for row in rows:
-        rp = row.get("RowPointer")
-        if rp:
-            key: Any = rp
-        else:
-            key = tuple(str(row.get(p, "")) for p in properties)
-        if key in seen:
-            continue
-        seen.add(key)
-        result.append(row)
-    return result
+    all_data: List[Dict[str, Any]] = []
+    async for rows in _iter_collection_pages(
+        infor_client,
+        ido_name,
+        property_sets,
+        filter_expr=filter_expr,
+        order_by=order_by,
+        record_cap=record_cap,
+    ):
+        all_data.extend(rows)
+    return all_data
 
 
 def _eq_filter(field: str, value: str) -> str:
@@ -1236,16 +1346,33 @@ async def _fetch_queue_from_jbr(
     wc_upper = (wc or "").strip().upper()
     fetch_cap = min(max(record_cap * 10, record_cap), 5000)
 
+    queue: List[Dict[str, Any]] = []
+
+    def _collect(row: Dict[str, Any]) -> None:
+        normalized = _normalize_queue_row(row)
+        if not normalized:
+            return
+        if wc_upper and ((normalized.get("Wc") or "").strip().upper() != wc_upper):
+            return
+        if _is_operation_completed_row(normalized):
+            return
+        queue.append(normalized)
+
     try:
-        rows = await _load_collection_first(
+        # Stránky se normalizují průběžně, zatímco se stahuje další stránka.
+        # Chyba načítání přichází jen před prvním řádkem (viz _iter_collection_pages);
+        # fallback přesto začíná s prázdnou frontou (chyba normalizace řádku).
+        async for row in _iter_collection_rows(
             infor_client,
             ido_name="IteCzTsdJbrDetails",
             property_sets=_QUEUE_PROP_SETS,
             record_cap=fetch_cap,
-        )
+        ):
+            _collect(row)
     except Exception as exc:
         # Some Infor installations expose only default view columns for this IDO.
         logger.warning("JbrDetails property-set load failed, trying default properties: %s", exc)
+        queue.clear()
         result = await infor_client.load_collection(
             ido_name="IteCzTsdJbrDetails",
             record_cap=fetch_cap,
@@ -1257,17 +1384,8 @@ async def _fetch_queue_from_jbr(
         rows = list(result.get("data", []))
         if not rows and _is_jbr_detail_only_bookmark(result.get("bookmark")):
             raise RuntimeError("JBR detail-only schema (SessionId/OperNum) cannot provide queue rows.")
-
-    queue: List[Dict[str, Any]] = []
-    for row in rows:
-        normalized = _normalize_queue_row(row)
-        if not normalized:
-            continue
-        if wc_upper and ((normalized.get("Wc") or "").strip().upper() != wc_upper):
-            continue
-        if _is_operation_completed_row(normalized):
-            continue
-        queue.append(normalized)
+        for row in rows:
+            _collect(row)
 
     queue.sort(key=lambda item: (_sort_key_for_date(item.get("OpDatumSt")), item["Job"], item["OperNum"]))
     if truncate:
@@ -1288,17 +1406,15 @@ async def _fetch_queue_from_sljobroutes(
     filter_expr = " AND ".join(filters)
 
     fetch_cap = min(max(record_cap * 10, record_cap), 5000)
-    rows = await _load_collection_first(
+    queue: List[Dict[str, Any]] = []
+    async for row in _iter_collection_rows(
         infor_client,
         ido_name="SLJobRoutes",
         property_sets=_JOB_ROUTE_PROP_SETS,
         filter_expr=filter_expr,
         order_by="DerStartDate ASC, Job ASC, OperNum ASC",
         record_cap=fetch_cap,
-    )
-
-    queue: List[Dict[str, Any]] = []
-    for row in rows:
+    ):
         normalized = _normalize_queue_row(row)
         if not normalized:
             continue
@@ -1421,16 +1537,14 @@ async def fetch_machine_plan(
         filter_expr = " AND ".join(filters)
 
         fetch_cap = min(max(record_cap * 2, 200), 5000)
-        rows = await _load_collection_first(
+        async for row in _iter_collection_rows(
             infor_client,
             ido_name="SLJobRoutes",
             property_sets=_JOB_ROUTE_PROP_SETS,
             filter_expr=filter_expr,
             order_by="DerStartDate ASC, Job ASC, OperNum ASC",
             record_cap=fetch_cap,
-        )
-
-        for row in rows:
+        ):
             normalized = _normalize_queue_row(row)
             if not normalized:
                 continue
@@ -1448,6 +1562,7 @@ async def fetch_machine_plan(
         backlog = backlog[:record_cap]
     except Exception as exc:
         logger.warning("Backlog (F/S/W) load failed, showing released only: %s", exc)
+        backlog = []
 
     return released + backlog
 
@@ -2119,6 +2234,14 @@ def _build_view_materials(row: Dict[str, Any]) -> List[Dict[str, Any]]:
     return mats
 
 
+def order_overview_read_model(raw: Dict[str, Any], job: Optional[str]) -> tuple[Optional[str], str]:
+    """Předpočítaný read model řádku přehledu zakázek (sync) → (selected_vp_job, view_json)."""
+    operations = _build_view_operations(raw)
+    view = {"operations": operations, "materials": _build_view_materials(raw)}
+    selected_vp_job = job if (job and operations) else None
+    return selected_vp_job, json.dumps(view, ensure_ascii=False, separators=(",", ":"))
+
+
 def _build_view_filter(
     *,
     customer: Optional[str],
@@ -2197,27 +2320,25 @@ async def fetch_orders_overview(
         customer=customer, due_from=due_from, due_to=due_to, search=search,
     )
 
-    rows = await _load_collection_first(
-        infor_client,
-        ido_name="IteRybPrehledZakazekView",
-        property_sets=_VIEW_PROP_SETS,
-        filter_expr=view_filter,
-        order_by="DueDate ASC",
-        record_cap=safe_limit,
-    )
-    logger.info("orders_overview: loaded %d rows from IteRybPrehledZakazekView (limit=%d)", len(rows), safe_limit)
-    if not rows:
-        return []
-
     # ── Pass 1: Sběr VP jobů podle Item ──
     # View vrací 1 Job per CO řádek, ale JobCount říká kolik VP existuje.
     # Pro single-VP items bereme data přímo z view.
     # Pro multi-VP items (JobCount > 1) děláme separátní SLJobRoutes lookup.
+    # Pass 1 běží průběžně nad stránkami, zatímco se stahuje další stránka.
+    rows: List[Dict[str, Any]] = []
     item_vp_map: Dict[str, List[Dict[str, Any]]] = {}
     multi_vp_items: set[str] = set()
     seen_vp_jobs: set[str] = set()
 
-    for row in rows:
+    async for row in _iter_collection_rows(
+        infor_client,
+        ido_name="IteRybPrehledZakazekView",
+        property_sets=_VIEW_PROP_SETS,
+        filter_expr=view_filter,
+        order_by="DueDate ASC",
+        record_cap=safe_limit,
+    ):
+        rows.append(row)
         item = _as_clean_str(row.get("Item"))
         job = _as_clean_str(row.get("Job"))
         suffix = _as_clean_str(row.get("Suffix")) or "0"
@@ -2251,6 +2372,10 @@ async def fetch_orders_overview(
         }
         item_vp_map.setdefault(item, []).append(entry)
 
+    logger.info("orders_overview: loaded %d rows from IteRybPrehledZakazekView (limit=%d)", len(rows), safe_limit)
+    if not rows:
+        return []
+
     # ── Multi-VP lookup přes SLJobRoutes ──
     if multi_vp_items:
         logger.info("orders_overview: %d items with multiple VPs, querying SLJobRoutes", len(multi_vp_items))
@@ -3158,6 +3283,94 @@ async def is_table_synced(db: AsyncSession, table_name: str) -> bool:
         _sync_check_cache[table_name] = True
     return synced
 
+
+# Řazení fronty v SQL — (sloupec, normalizace, klíč v dictu) se stejnou sémantikou jako sort_queue
+_ROUTE_SORT_FIELDS: Dict[str, tuple[str, str, str]] = {
+    "Job": ("job", "text", "Job"),
+    "OperNum": ("oper_num", "oper", "OperNum"),
+    "Wc": ("wc", "text", "Wc"),
+    "DerJobItem": ("der_job_item", "text", "DerJobItem"),
+    "JobDescription": ("job_description", "text", "JobDescription"),
+    "QtyComplete": ("qty_complete", "number", "QtyComplete"),
+    "JobQtyReleased": ("job_qty_released", "number", "JobQtyReleased"),
+    "OpDatumSp": ("op_datum_sp_key", "date", "OpDatumSp"),
+    "OpDatumSt": ("op_datum_st_key", "date", "OpDatumSt"),
+}
+
+
+def _route_sort_field(sort_by: str) -> tuple[str, str, str]:
+    return _ROUTE_SORT_FIELDS.get((sort_by or "").strip(), _ROUTE_SORT_FIELDS["OpDatumSt"])
+
+
+def _route_sort_exprs(model, sort_by: str) -> List[Any]:
+    """ORDER BY výrazy: primární řazení + tie-break (Job, OperNum) + unikátní klíč."""
+    from sqlalchemy import case
+
+    column, kind, _row_key = _route_sort_field(sort_by)
+    col = getattr(model, column)
+    if kind == "text":
+        text_value = func.upper(func.coalesce(func.trim(col), ""))
+        primary = [case((text_value == "", 1), else_=0), text_value]
+    elif kind == "number":
+        primary = [case((col.is_(None), 1), else_=0), func.coalesce(col, 0.0)]
+    elif kind == "oper":
+        primary = [model.oper_num_key, model.oper_num]
+    else:
+        primary = [col]
+    return primary + [func.upper(model.job), model.oper_num_key, model.job, model.suffix, model.oper_num]
+
+
+def _route_sort_values(row: Dict[str, Any], sort_by: str) -> List[Any]:
+    """Hodnoty _route_sort_exprs pro řádek z _wjr_to_queue_dict (pro kurzor)."""
+    _column, kind, row_key = _route_sort_field(sort_by)
+    value = row.get(row_key)
+    if kind == "text":
+        text = (value or "").strip(" ").translate(_ASCII_UPPER)
+        primary: List[Any] = [0 if text else 1, text]
+    elif kind == "number":
+        primary = [1, 0.0] if value is None else [0, float(value)]
+    elif kind == "oper":
+        primary = [route_oper_sort_key(value), value]
+    else:
+        primary = [route_date_sort_key(value)]
+    job = row["Job"]
+    oper_num = row["OperNum"]
+    return primary + [job.translate(_ASCII_UPPER), route_oper_sort_key(oper_num), job, row["Suffix"], oper_num]
+
+
+def _decode_queue_cursor(cursor: str, expected_len: int) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != expected_len:
+        raise HTTPException(status_code=400, detail="Neplatný kurzor stránkování")
+    return values
+
+
+def queue_next_cursor(rows: Sequence[Dict[str, Any]], sort_by: str, limit: int) -> Optional[str]:
+    """Kurzor na další stránku (keyset) — None, pokud je stránka poslední."""
+    if not rows or len(rows) < limit:
+        return None
+    payload = json.dumps(_route_sort_values(rows[-1], sort_by), separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _route_page(query, model, sort_by: str, sort_dir: str, limit: int, after: Optional[str]):
+    """ORDER BY + keyset (after) + LIMIT v SQL."""
+    from sqlalchemy import tuple_
+
+    exprs = _route_sort_exprs(model, sort_by)
+    descending = _sort_direction(sort_dir)
+    if after:
+        values = _decode_queue_cursor(after, len(exprs))
+        key = tuple_(*exprs)
+        query = query.where(key < tuple_(*values) if descending else key > tuple_(*values))
+    query = query.order_by(*[e.desc() if descending else e.asc() for e in exprs])
+    return query.limit(limit)
+
+
 async def read_wc_queue_from_db(
     db: AsyncSession,
     wc: Optional[str] = None,
@@ -3165,44 +3378,30 @@ async def read_wc_queue_from_db(
     sort_by: str = "OpDatumSt",
     sort_dir: str = "asc",
     limit: int = 200,
+    after: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
-    """Načte frontu z lokální tabulky workshop_job_routes (job_stat='R')."""
+    """Načte frontu z lokální tabulky workshop_job_routes (job_stat='R').
+
+    Filtr dokončených (is_completed), řazení a stránkování (keyset kurzor
+    `after` z queue_next_cursor) běží v SQL nad indexem ix_wjr_queue.
+    """
     from app.models.workshop_job_route import WorkshopJobRoute
-    from sqlalchemy import or_, not_, and_
 
     query = select(WorkshopJobRoute).where(
         WorkshopJobRoute.deleted_at.is_(None),
         WorkshopJobRoute.job_stat == "R",
+        WorkshopJobRoute.is_completed == False,  # noqa: E712 — index ix_wjr_queue
     )
     if wc:
         query = query.where(WorkshopJobRoute.wc == wc.strip())
 
-    # SQL-side completed filter (COALESCE for NULL-safe ILIKE)
-    state_conditions = []
-    for marker in _DONE_STATE_MARKERS:
-        state_conditions.append(func.coalesce(WorkshopJobRoute.jbr_state, '').ilike(f"%{marker}%"))
-        state_conditions.append(func.coalesce(WorkshopJobRoute.jbr_state_asd, '').ilike(f"%{marker}%"))
-    qty_done = and_(
-        WorkshopJobRoute.job_qty_released > 0,
-        (func.coalesce(WorkshopJobRoute.qty_complete, 0)
-         + func.coalesce(WorkshopJobRoute.qty_scrapped, 0))
-        >= WorkshopJobRoute.job_qty_released,
-    )
-    query = query.where(not_(or_(*state_conditions, qty_done)))
-
     # SQL-side job filter
     if job_filter:
         query = query.where(WorkshopJobRoute.job.ilike(f"%{job_filter.strip()}%"))
 
+    query = _route_page(query, WorkshopJobRoute, sort_by, sort_dir, limit, after)
     result = await db.execute(query)
-    entries = result.scalars().all()
-
-    rows = [_wjr_to_queue_dict(e) for e in entries]
-    # Python safety net
-    rows = [r for r in rows if not _is_operation_completed_row(r)]
-
-    rows = sort_queue(rows, sort_by=sort_by, sort_dir=sort_dir)
-    return rows[:limit]
+    return [_wjr_to_queue_dict(e) for e in result.scalars().all()]
 
 
 async def read_machine_plan_from_db(
@@ -3213,36 +3412,26 @@ async def read_machine_plan_from_db(
     sort_by: str = "OpDatumSt",
     sort_dir: str = "asc",
     record_cap: int = 500,
+    after: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """Načte plán stroje z DB: released (R) + backlog (F/S/W).
 
     Args:
         search: Fulltextové hledání v Job + DerJobItem + JobDescription (case-insensitive).
                 Má přednost před job_filter.
+        after: Keyset kurzor další stránky (queue_next_cursor).
     """
     from app.models.workshop_job_route import WorkshopJobRoute
-    from sqlalchemy import or_, not_, and_
+    from sqlalchemy import or_
 
     query = select(WorkshopJobRoute).where(
         WorkshopJobRoute.deleted_at.is_(None),
         WorkshopJobRoute.job_stat.in_(["R", "F", "S", "W"]),
+        WorkshopJobRoute.is_completed == False,  # noqa: E712 — index ix_wjr_queue
     )
     if wc:
         query = query.where(WorkshopJobRoute.wc == wc.strip())
 
-    # SQL-side completed filter (COALESCE for NULL-safe ILIKE)
-    state_conditions = []
-    for marker in _DONE_STATE_MARKERS:
-        state_conditions.append(func.coalesce(WorkshopJobRoute.jbr_state, '').ilike(f"%{marker}%"))
-        state_conditions.append(func.coalesce(WorkshopJobRoute.jbr_state_asd, '').ilike(f"%{marker}%"))
-    qty_done = and_(
-        WorkshopJobRoute.job_qty_released > 0,
-        (func.coalesce(WorkshopJobRoute.qty_complete, 0)
-         + func.coalesce(WorkshopJobRoute.qty_scrapped, 0))
-        >= WorkshopJobRoute.job_qty_released,
-    )
-    query = query.where(not_(or_(*state_conditions, qty_done)))
-
     # SQL-side search / job_filter
     if search:
         s = f"%{search.strip()}%"
@@ -3254,20 +3443,15 @@ async def read_machine_plan_from_db(
     elif job_filter:
         query = query.where(WorkshopJobRoute.job.ilike(f"%{job_filter.strip()}%"))
 
+    query = _route_page(query, WorkshopJobRoute, sort_by, sort_dir, record_cap, after)
     result = await db.execute(query)
-    entries = result.scalars().all()
 
     rows: List[Dict[str, Any]] = []
-    for e in entries:
+    for e in result.scalars().all():
         d = _wjr_to_queue_dict(e)
         d["JobStat"] = e.job_stat or "R"
-        # Python safety net — catches edge cases SQL filter might miss
-        if _is_operation_completed_row(d):
-            continue
         rows.append(d)
-
-    rows = sort_queue(rows, sort_by=sort_by, sort_dir=sort_dir)
-    return rows[:record_cap]
+    return rows
 
 
 async def enrich_orders_with_tier(
@@ -3308,21 +3492,23 @@ async def enrich_orders_with_tier(
             order["tier"] = tier_map.get(svj.strip().upper(), "normal")
 
 
-async def read_orders_overview_from_db(
-    db: AsyncSession,
-    customer: Optional[str] = None,
-    due_from: Optional[str] = None,
-    due_to: Optional[str] = None,
-    search: Optional[str] = None,
-    limit: int = 2000,
-) -> List[Dict[str, Any]]:
-    """Načte přehled zakázek z lokální tabulky workshop_order_overviews."""
-    import json as _json
-    from app.models.workshop_order_overview import WorkshopOrderOverview
+def _fts_phrase(text: str) -> str:
+    """Hledaný text jako FTS5 fráze (bez operátorů)."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _orders_overview_query(
+    customer: Optional[str],
+    due_from: Optional[str],
+    due_to: Optional[str],
+    search: Optional[str],
+):
+    from sqlalchemy import or_, text
+    from app.models.workshop_order_overview import ORDER_OVERVIEW_FTS_TABLE, WorkshopOrderOverview
 
     query = select(WorkshopOrderOverview).where(
         WorkshopOrderOverview.deleted_at.is_(None),
-    ).order_by(WorkshopOrderOverview.due_date.asc())
+    )
 
     if customer:
         query = query.where(WorkshopOrderOverview.customer_code == customer.strip())
@@ -3339,22 +3525,93 @@ async def read_orders_overview_from_db(
     if due_to:
         query = query.where(date_col <= due_to.replace("-", ""))
 
+    s = (search or "").strip()
+    if len(s) >= 3:
+        # FTS5 trigram — substring hledání přes index (case-insensitive)
+        query = query.where(WorkshopOrderOverview.id.in_(
+            text(
+                f"SELECT rowid FROM {ORDER_OVERVIEW_FTS_TABLE} WHERE {ORDER_OVERVIEW_FTS_TABLE} MATCH :fts_query"
+            ).bindparams(fts_query=_fts_phrase(s))
+        ))
+    elif s:
+        # Kratší než trigram → LIKE
+        like = f"%{s}%"
+        query = query.where(or_(
+            WorkshopOrderOverview.co_num.ilike(like),
+            WorkshopOrderOverview.item.ilike(like),
+            WorkshopOrderOverview.description.ilike(like),
+            WorkshopOrderOverview.selected_vp_job.ilike(like),
+        ))
+    return query
+
+
+async def orders_overview_etag(
+    db: AsyncSession,
+    customer: Optional[str] = None,
+    due_from: Optional[str] = None,
+    due_to: Optional[str] = None,
+    search: Optional[str] = None,
+    limit: int = 2000,
+    offset: int = 0,
+) -> str:
+    """ETag přehledu zakázek — parametry + watermark dat (bez sestavení odpovědi).
+
+    Odpověď závisí na workshop_order_overviews, workshop_job_routes (VP kandidáti)
+    a production_priorities (tier). Watermark = nejnovější updated_at ze všech tří
+    (bulk upsert mění updated_at jen u změněných řádků, mazání je soft delete).
+    MAX přes index ix_*_updated_at → jeden dotaz bez skenování tabulek.
+    """
+    import hashlib
+
+    from app.models.production_priority import ProductionPriority
+    from app.models.workshop_job_route import WorkshopJobRoute
+    from app.models.workshop_order_overview import WorkshopOrderOverview
+
+    watermarks = union_all(*(
+        select(func.max(model.updated_at).label("updated_at"))
+        for model in (WorkshopOrderOverview, WorkshopJobRoute, ProductionPriority)
+    )).subquery()
+    watermark = (await db.execute(select(func.max(watermarks.c.updated_at)))).scalar()
+
+    parts: List[Any] = ["orders-overview:v2", customer, due_from, due_to, search, limit, offset, watermark]
+    payload = json.dumps(parts, default=str, separators=(",", ":"))
+    return 'W/"' + hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+
+async def read_orders_overview_from_db(
+    db: AsyncSession,
+    customer: Optional[str] = None,
+    due_from: Optional[str] = None,
+    due_to: Optional[str] = None,
+    search: Optional[str] = None,
+    limit: int = 2000,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """Načte přehled zakázek z read modelu workshop_order_overviews.
+
+    Filtry, hledání (FTS5), řazení a stránkování běží v SQL; operace a materiály
+    jsou předpočítané při syncu (view_json). VP kandidáti + tier jen pro stránku.
+    """
+    from app.models.workshop_order_overview import WorkshopOrderOverview
+
+    query = _orders_overview_query(customer, due_from, due_to, search).order_by(
+        WorkshopOrderOverview.due_date.asc(), WorkshopOrderOverview.id.asc(),
+    ).offset(offset).limit(limit)
+
     result = await db.execute(query)
     entries = result.scalars().all()
 
     out: List[Dict[str, Any]] = []
     for e in entries:
-        # Parse raw_data JSON blob
-        raw = {}
-        if e.raw_data:
-            try:
-                raw = _json.loads(e.raw_data)
-            except (ValueError, TypeError):
-                pass
-
-        # Build operations/materials z raw_data (Wc01-10, Comp01-10, Wip01-10, Mat01-03, MatComp01-03)
-        operations = _build_view_operations(raw)
-        materials = _build_view_materials(raw)
+        view: Dict[str, Any] = {}
+        try:
+            if e.view_json:
+                view = json.loads(e.view_json)
+            elif e.raw_data:
+                # Řádek ze syncu před zavedením read modelu → dopočítat z raw_data
+                view = json.loads(order_overview_read_model(json.loads(e.raw_data), e.job)[1])
+        except (ValueError, TypeError):
+            pass
 
         row_id = f"{e.co_num}|{e.co_line}|{e.co_release}"
         row = {
@@ -3378,28 +3635,17 @@ async def read_orders_overview_from_db(
             "promise_date": e.promise_date,
             "confirm_date": e.confirm_date,
             "vp_candidates": [],  # VP candidates se naplní z workshop_job_routes
-            "selected_vp_job": e.job if (e.job and operations) else None,
-            "operations": operations,
-            "materials": materials,
+            "selected_vp_job": e.selected_vp_job,
+            "operations": view.get("operations", []),
+            "materials": view.get("materials", []),
             "record_date": e.record_date,
         }
         out.append(row)
 
-    # In-memory search filtr (po DB query)
-    if search:
-        s = search.strip().upper()
-        out = [
-            r for r in out
-            if s in (r.get("co_num") or "").upper()
-            or s in (r.get("item") or "").upper()
-            or s in (r.get("description") or "").upper()
-            or s in (r.get("selected_vp_job") or "").upper()
-        ]
-
-    # VP candidates enrichment z workshop_job_routes
+    # VP candidates enrichment z workshop_job_routes (jen položky stránky)
     await _enrich_orders_with_vp_candidates(db, out)
 
-    return out[:limit]
+    return out
 
 
 async def _enrich_orders_with_vp_candidates(
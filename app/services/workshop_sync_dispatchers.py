@@ -16,12 +16,19 @@ import logging
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, case, func, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.infor_job_transaction import InforJobTransaction
 from app.models.workshop_job_route import WorkshopJobRoute
 from app.models.workshop_order_overview import WorkshopOrderOverview
+from app.services.sync_bulk_upsert import bulk_sync_by_key, bulk_upsert
+from app.services.workshop_service import (
+    order_overview_read_model,
+    route_date_sort_key,
+    route_is_completed,
+    route_oper_sort_key,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +56,69 @@ def _parse_float(value) -> float | None:
 
 # ─── Workshop Routes (SLJobRoutes Type='J') ──────────────────────────────
 
+_ROUTE_KEY_COLUMNS = ("job", "suffix", "oper_num")
+_ROUTE_CONTENT_COLUMNS = (
+    "wc", "job_stat", "der_job_item", "job_description",
+    "job_qty_released", "qty_complete", "qty_scrapped",
+    "jsh_setup_hrs", "der_run_mch_hrs", "der_run_lbr_hrs",
+    "op_datum_st", "op_datum_sp", "record_date",
+    "op_datum_st_key", "op_datum_sp_key", "oper_num_key",
+)
+# Sloupce, ze kterých se odvozuje is_completed (route sync: množství, JBR sync: stav)
+_ROUTE_COMPLETION_COLUMNS = (
+    "jbr_state", "jbr_state_asd", "job_qty_released", "qty_complete", "qty_scrapped",
+)
+_LOOKUP_CHUNK = 300  # klíče (job, suffix, oper_num) na jeden SELECT — limit bind parametrů
+
+
+def _route_conflict_set(table, excluded) -> Dict[str, Any]:
+    """Soft-delete completed (zachová původní deleted_at), restore non-completed."""
+    is_completed = excluded.job_stat == "C"
+    return {
+        "deleted_at": case(
+            (is_completed, func.coalesce(table.c.deleted_at, excluded.deleted_at)),
+            else_=None,
+        ),
+        "deleted_by": case(
+            (is_completed, func.coalesce(table.c.deleted_by, excluded.deleted_by)),
+            else_=None,
+        ),
+    }
+
+
+async def _refresh_completion_flags(db: AsyncSession, rows: List[Dict[str, Any]]) -> int:
+    """Přepočítá odvozený is_completed pro klíče z dávky (po route i JBR syncu).
+
+    Flag závisí na množství (route sync) i na stavu z JBR (JBR sync) — po zápisu
+    kteréhokoli z nich se přečtou aktuální hodnoty a zapíšou jen změněné flagy
+    (bez version bump, jde o odvozený sloupec). Vrací počet změněných řádků.
+    """
+    keys = list({tuple(r[c] for c in _ROUTE_KEY_COLUMNS) for r in rows})
+    key_cols = tuple_(*(getattr(WorkshopJobRoute, c) for c in _ROUTE_KEY_COLUMNS))
+    changes: List[Dict[str, Any]] = []
+    for start in range(0, len(keys), _LOOKUP_CHUNK):
+        result = await db.execute(
+            select(
+                WorkshopJobRoute.id,
+                WorkshopJobRoute.is_completed,
+                *(getattr(WorkshopJobRoute, c) for c in _ROUTE_COMPLETION_COLUMNS),
+            ).where(key_cols.in_(keys[start:start + _LOOKUP_CHUNK]))
+        )
+        for row in result.all():
+            completed = route_is_completed(*row[2:])
+            if bool(row.is_completed) != completed:
+                changes.append({"_id": row.id, "_is_completed": completed})
+
+    if changes:
+        await db.execute(
+            update(WorkshopJobRoute.__table__)
+            .where(WorkshopJobRoute.__table__.c.id == bindparam("_id"))
+            .values(is_completed=bindparam("_is_completed")),
+            changes,
+        )
+    return len(changes)
+
+
 async def dispatch_workshop_routes(
     rows: List[Dict[str, Any]], db: AsyncSession
 ) -> Dict[str, Any]:
@@ -56,33 +126,14 @@ async def dispatch_workshop_routes(
 
     Klíč: (job, suffix, oper_num).
     Completed operace (job_stat='C') dostanou soft-delete.
+    Bulk upsert — nezměněné řádky (dle sync_hash) se nezapisují.
     """
     if not rows:
         return _empty_result()
 
-    total_created = 0
-    total_updated = 0
     all_errors: List[str] = []
-
-    # Batch: sbíráme klíče pro jednorázový lookup
-    keys = []
-    for row in rows:
-        job = _as_clean_str(row.get("Job"))
-        oper_num = _as_clean_str(row.get("OperNum"))
-        suffix = _as_clean_str(row.get("Suffix")) or "0"
-        if job and oper_num:
-            keys.append((job, suffix, oper_num))
-
-    if not keys:
-        return _empty_result()
-
-    # Batch lookup existujících záznamů
-    existing_map: Dict[tuple, WorkshopJobRoute] = {}
-    result = await db.execute(select(WorkshopJobRoute))
-    for entry in result.scalars().all():
-        existing_map[(entry.job, entry.suffix, entry.oper_num)] = entry
-
     now = datetime.utcnow()
+    mapped_rows: List[Dict[str, Any]] = []
 
     for row in rows:
         try:
@@ -93,10 +144,11 @@ async def dispatch_workshop_routes(
                 continue
 
             job_stat = (_as_clean_str(row.get("JobStat")) or "R").upper()
-            key = (job, suffix, oper_num)
-            existing = existing_map.get(key)
-
-            mapped = {
+            is_completed = job_stat == "C"
+            mapped_rows.append({
+                "job": job,
+                "suffix": suffix,
+                "oper_num": oper_num,
                 "wc": _as_clean_str(row.get("Wc")),
                 "job_stat": job_stat,
                 "der_job_item": _as_clean_str(row.get("DerJobItem")),
@@ -110,77 +162,61 @@ async def dispatch_workshop_routes(
                 "op_datum_st": _as_clean_str(row.get("DerStartDate")),
                 "op_datum_sp": _as_clean_str(row.get("DerEndDate")),
                 "record_date": _as_clean_str(row.get("RecordDate")),
-            }
-
-            if existing:
-                for attr, val in mapped.items():
-                    setattr(existing, attr, val)
-                existing.updated_at = now
-                existing.updated_by = "sync"
-                # Soft-delete completed, restore non-completed
-                if job_stat == "C":
-                    if existing.deleted_at is None:
-                        existing.deleted_at = now
-                        existing.deleted_by = "sync:completed"
-                else:
-                    if existing.deleted_at is not None:
-                        existing.deleted_at = None
-                        existing.deleted_by = None
-                total_updated += 1
-            else:
-                entry = WorkshopJobRoute(
-                    job=job,
-                    suffix=suffix,
-                    oper_num=oper_num,
-                    **mapped,
-                )
-                entry.created_at = now
-                entry.created_by = "sync"
-                entry.updated_at = now
-                entry.updated_by = "sync"
-                if job_stat == "C":
-                    entry.deleted_at = now
-                    entry.deleted_by = "sync:completed"
-                db.add(entry)
-                existing_map[key] = entry
-                total_created += 1
-
+                "op_datum_st_key": route_date_sort_key(row.get("DerStartDate")),
+                "op_datum_sp_key": route_date_sort_key(row.get("DerEndDate")),
+                "oper_num_key": route_oper_sort_key(oper_num),
+                "deleted_at": now if is_completed else None,
+                "deleted_by": "sync:completed" if is_completed else None,
+            })
         except Exception as e:
             all_errors.append(f"Route sync error: {e}")
             logger.error("Workshop route sync error: %s", e, exc_info=True)
 
+    if not mapped_rows:
+        return _empty_result()
+
     try:
+        result = await bulk_upsert(
+            db,
+            WorkshopJobRoute,
+            mapped_rows,
+            key_columns=_ROUTE_KEY_COLUMNS,
+            content_columns=_ROUTE_CONTENT_COLUMNS,
+            insert_values={"created_at": now, "created_by": "sync", "version": 0},
+            touch_values={"updated_at": now, "updated_by": "sync"},
+            conflict_set=_route_conflict_set,
+        )
+        await _refresh_completion_flags(db, mapped_rows)
         await db.commit()
     except Exception:
         await db.rollback()
         raise
 
-    return _build_result(total_created, total_updated, 0, all_errors)
+    result.errors.extend(all_errors)
+    return result.as_dispatch_result()
 
 
 # ─── Job Transactions (SLJobTrans) ────────────────────────────────────────
 
+_TRANS_CONTENT_COLUMNS = (
+    "trans_type", "trans_date", "emp_num", "job", "suffix", "oper_num", "wc",
+    "run_hrs_t", "setup_hrs_t", "qty_complete", "qty_scrapped", "record_date",
+)
+
+
 async def dispatch_job_transactions(
     rows: List[Dict[str, Any]], db: AsyncSession
 ) -> Dict[str, Any]:
     """Upsert SLJobTrans do infor_job_transactions.
 
-    Klíč: trans_num (unique).
+    Klíč: trans_num (unique). Bulk upsert, nezměněné transakce se přeskočí.
     """
     if not rows:
         return _empty_result()
 
-    total_created = 0
-    total_updated = 0
     all_errors: List[str] = []
-
-    # Batch lookup existujících záznamů
-    existing_map: Dict[str, InforJobTransaction] = {}
-    result = await db.execute(select(InforJobTransaction))
-    for entry in result.scalars().all():
-        existing_map[entry.trans_num] = entry
-
     now = datetime.utcnow()
+    mapped_rows: List[Dict[str, Any]] = []
 
     for row in rows:
         try:
@@ -195,7 +231,8 @@ async def dispatch_job_transactions(
             trans_type = _as_clean_str(row.get("TransType"))
             ahrs = _parse_float(row.get("AHrs")) or 0.0
 
-            mapped = {
+            mapped_rows.append({
+                "trans_num": trans_num,
                 "trans_type": trans_type,
                 "trans_date": _as_clean_str(row.get("TransDate")),
                 "emp_num": _as_clean_str(row.get("EmpNum")),
@@ -208,36 +245,31 @@ async def dispatch_job_transactions(
                 "qty_complete": _parse_float(row.get("QtyComplete")),
                 "qty_scrapped": _parse_float(row.get("QtyScrapped")),
                 "record_date": _as_clean_str(row.get("RecordDate")),
-            }
-
-            existing = existing_map.get(trans_num)
-
-            if existing:
-                for attr, val in mapped.items():
-                    setattr(existing, attr, val)
-                existing.synced_at = now
-                total_updated += 1
-            else:
-                entry = InforJobTransaction(
-                    trans_num=trans_num,
-                    **mapped,
-                    synced_at=now,
-                )
-                db.add(entry)
-                existing_map[trans_num] = entry
-                total_created += 1
+            })
 
         except Exception as e:
             all_errors.append(f"Job transaction sync error: {e}")
             logger.error("Job transaction sync error: %s", e, exc_info=True)
 
+    if not mapped_rows:
+        return _empty_result()
+
     try:
+        result = await bulk_upsert(
+            db,
+            InforJobTransaction,
+            mapped_rows,
+            key_columns=("trans_num",),
+            content_columns=_TRANS_CONTENT_COLUMNS,
+            touch_values={"synced_at": now},
+        )
         await db.commit()
     except Exception:
         await db.rollback()
         raise
 
-    return _build_result(total_created, total_updated, 0, all_errors)
+    result.errors.extend(all_errors)
+    return result.as_dispatch_result()
 
 
 # ─── Workshop Orders (IteRybPrehledZakazekView) ─────────────────────────
@@ -255,30 +287,32 @@ _RAW_DATA_KEYS = [
 ]
 
 
+_ORDER_KEY_COLUMNS = ("co_num", "co_line", "co_release")
+_ORDER_CONTENT_COLUMNS = (
+    "customer_code", "customer_name", "delivery_name", "item", "description", "stat",
+    "due_date", "promise_date", "confirm_date",
+    "qty_ordered", "qty_shipped", "qty_on_hand", "qty_available", "qty_wip",
+    "job", "suffix", "job_count", "material_ready", "raw_data", "record_date",
+    "selected_vp_job", "view_json",
+)
+
+
 async def dispatch_workshop_orders(
     rows: List[Dict[str, Any]], db: AsyncSession
 ) -> Dict[str, Any]:
     """Upsert IteRybPrehledZakazekView do workshop_order_overviews.
 
     Klíč: (co_num, co_line, co_release).
-    raw_data = JSON blob pro view-specific sloupce.
+    raw_data = JSON blob pro view-specific sloupce; z něj se předpočítá read model
+    (selected_vp_job, view_json) — čtení přehledu už raw_data neparsuje.
+    View se načítá celé každý cyklus — bulk upsert zapisuje jen změněné řádky.
     """
     if not rows:
         return _empty_result()
 
-    total_created = 0
-    total_updated = 0
     all_errors: List[str] = []
-
-    # Batch lookup existujících záznamů
-    existing_map: Dict[tuple, WorkshopOrderOverview] = {}
-    result = await db.execute(
-        select(WorkshopOrderOverview).where(WorkshopOrderOverview.deleted_at.is_(None))
-    )
-    for entry in result.scalars().all():
-        existing_map[(entry.co_num, entry.co_line, entry.co_release)] = entry
-
     now = datetime.utcnow()
+    mapped_rows: List[Dict[str, Any]] = []
 
     for row in rows:
         try:
@@ -304,7 +338,13 @@ async def dispatch_workshop_orders(
                 or _as_clean_str(row.get("ConfirmedDate"))
             )
 
-            mapped = {
+            job = _as_clean_str(row.get("Job"))
+            selected_vp_job, view_json = order_overview_read_model(raw, job)
+
+            mapped_rows.append({
+                "co_num": co_num,
+                "co_line": co_line,
+                "co_release": co_release,
                 "customer_code": _as_clean_str(row.get("CustNum")),
                 "customer_name": _as_clean_str(row.get("CustName")),
                 "delivery_name": _as_clean_str(row.get("CustShipName")) or _as_clean_str(row.get("CustName")),
@@ -319,49 +359,40 @@ async def dispatch_workshop_orders(
                 "qty_on_hand": _parse_float(row.get("QtyOnHand")),
                 "qty_available": _parse_float(row.get("QtyAvailable")),
                 "qty_wip": _parse_float(row.get("QtyWIP")),
-                "job": _as_clean_str(row.get("Job")),
+                "job": job,
                 "suffix": _as_clean_str(row.get("Suffix")),
                 "job_count": int(row.get("JobCount", 0) or 0) if row.get("JobCount") is not None else None,
                 "material_ready": str(row.get("Ready", "0")).strip() == "1",
                 "raw_data": raw_json,
                 "record_date": _as_clean_str(row.get("RecordDate")),
-            }
-
-            key = (co_num, co_line, co_release)
-            existing = existing_map.get(key)
-
-            if existing:
-                for attr, val in mapped.items():
-                    setattr(existing, attr, val)
-                existing.updated_at = now
-                existing.updated_by = "sync"
-                total_updated += 1
-            else:
-                entry = WorkshopOrderOverview(
-                    co_num=co_num,
-                    co_line=co_line,
-                    co_release=co_release,
-                    **mapped,
-                )
-                entry.created_at = now
-                entry.created_by = "sync"
-                entry.updated_at = now
-                entry.updated_by = "sync"
-                db.add(entry)
-                existing_map[key] = entry
-                total_created += 1
+                "selected_vp_job": selected_vp_job,
+                "view_json": view_json,
+            })
 
         except Exception as e:
             all_errors.append(f"Order sync error: {e}")
             logger.error("Workshop order sync error: %s", e, exc_info=True)
 
+    if not mapped_rows:
+        return _empty_result()
+
     try:
+        result = await bulk_upsert(
+            db,
+            WorkshopOrderOverview,
+            mapped_rows,
+            key_columns=_ORDER_KEY_COLUMNS,
+            content_columns=_ORDER_CONTENT_COLUMNS,
+            insert_values={"created_at": now, "created_by": "sync", "version": 0},
+            touch_values={"updated_at": now, "updated_by": "sync"},
+        )
         await db.commit()
     except Exception:
         await db.rollback()
         raise
 
-    return _build_result(total_created, total_updated, 0, all_errors)
+    result.errors.extend(all_errors)
+    return result.as_dispatch_result()
 
 
 # ─── Workshop JBR (IteCzTsdJbrDetails) ────────────────────────────────
@@ -385,6 +416,7 @@ _JBR_STATE_ASD_KEYS = ("StateAsd", "StatusAsd", "colStateAsd")
 _JBR_LZE_DOKONCIT_KEYS = ("LzeDokoncit", "colLzeDokoncit")
 _JBR_PLAN_FLAG_KEYS = ("PlanFlag", "colPlanFlag")
 _JBR_JOB_SUFFIX_OPER_KEYS = ("JobSuffixOperNum", "vJobSuffixOperNum", "colJobSuffixOperNum")
+_JBR_CONTENT_COLUMNS = ("jbr_state", "jbr_state_asd", "jbr_lze_dokoncit", "jbr_plan_flag")
 
 
 def _parse_jso(value) -> tuple | None:
@@ -412,23 +444,14 @@ async def dispatch_workshop_jbr(
     if not rows:
         return _empty_result()
 
-    total_updated = 0
-    total_skipped = 0
     all_errors: List[str] = []
 
     # Log first row keys for debugging column names
     if rows:
         logger.info("JBR dispatch: %d rows, first row keys: %s", len(rows), list(rows[0].keys()))
 
-    # Batch lookup all active workshop_job_routes
-    result = await db.execute(
-        select(WorkshopJobRoute).where(WorkshopJobRoute.deleted_at.is_(None))
-    )
-    existing_map: Dict[tuple, WorkshopJobRoute] = {}
-    for entry in result.scalars().all():
-        existing_map[(entry.job, entry.suffix, entry.oper_num)] = entry
-
     now_str = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
+    mapped_rows: List[Dict[str, Any]] = []
 
     for row in rows:
         try:
@@ -450,40 +473,43 @@ async def dispatch_workshop_jbr(
             if not job or not oper_num:
                 continue
 
-            key = (job, suffix, oper_num)
-            existing = existing_map.get(key)
-            if not existing:
-                total_skipped += 1
-                continue
-
-            # Diff-update: only write if value actually changed
-            changed = False
-            for attr, keys in [
-                ("jbr_state", _JBR_STATE_KEYS),
-                ("jbr_state_asd", _JBR_STATE_ASD_KEYS),
-                ("jbr_lze_dokoncit", _JBR_LZE_DOKONCIT_KEYS),
-                ("jbr_plan_flag", _JBR_PLAN_FLAG_KEYS),
-            ]:
-                new_val = _as_clean_str(_jbr_first(row, keys))
-                if getattr(existing, attr) != new_val:
-                    setattr(existing, attr, new_val)
-                    changed = True
-
-            if changed:
-                existing.jbr_synced_at = now_str
-                total_updated += 1
+            mapped_rows.append({
+                "job": job,
+                "suffix": suffix,
+                "oper_num": oper_num,
+                "jbr_state": _as_clean_str(_jbr_first(row, _JBR_STATE_KEYS)),
+                "jbr_state_asd": _as_clean_str(_jbr_first(row, _JBR_STATE_ASD_KEYS)),
+                "jbr_lze_dokoncit": _as_clean_str(_jbr_first(row, _JBR_LZE_DOKONCIT_KEYS)),
+                "jbr_plan_flag": _as_clean_str(_jbr_first(row, _JBR_PLAN_FLAG_KEYS)),
+            })
 
         except Exception as e:
             all_errors.append(f"JBR sync error: {e}")
             logger.error("Workshop JBR sync error: %s", e, exc_info=True)
 
+    if not mapped_rows:
+        return _empty_result()
+
+    # Diff-update: zapisují se jen řádky, kde se JBR hodnota skutečně změnila
     try:
+        result = await bulk_sync_by_key(
+            db,
+            WorkshopJobRoute,
+            mapped_rows,
+            key_columns=_ROUTE_KEY_COLUMNS,
+            content_columns=_JBR_CONTENT_COLUMNS,
+            where=WorkshopJobRoute.deleted_at.is_(None),
+            touch_values={"jbr_synced_at": now_str},
+            create_missing=False,
+        )
+        await _refresh_completion_flags(db, mapped_rows)
         await db.commit()
     except Exception:
         await db.rollback()
         raise
 
-    return _build_result(0, total_updated, total_skipped, all_errors)
+    result.errors.extend(all_errors)
+    return result.as_dispatch_result()
 
 
 # ─── Workshop Materials Prefetch ─────────────────────────────────────────
@@ -576,34 +602,27 @@ async def dispatch_workshop_materials(
         elif isinstance(r, Exception):
             errors.append(str(r))
 
-    # 5. Batch save do DB (jeden commit)
+    # 5. Batch save do DB (bulk upsert, jeden commit)
     if fetched:
-        import json as _json
-        from app.models.workshop_job_material_cache import WorkshopJobMaterialCache
-
-        # Lookup existujících cache entries
-        cache_result = await db.execute(select(WorkshopJobMaterialCache))
-        cache_map = {
-            (e.job, e.suffix, e.oper_num): e
-            for e in cache_result.scalars().all()
-        }
-
-        for job, suffix, oper_num, materials in fetched:
-            key = (job.strip(), suffix.strip() or "0", oper_num.strip() or "0")
-            data = _json.dumps(materials, ensure_ascii=False)
-            existing = cache_map.get(key)
-            if existing:
-                existing.data_json = data
-                existing.synced_at = now
-            else:
-                entry = WorkshopJobMaterialCache(
-                    job=key[0], suffix=key[1], oper_num=key[2],
-                    data_json=data, synced_at=now,
-                )
-                db.add(entry)
-                cache_map[key] = entry
-
+        cache_rows = [
+            {
+                "job": job.strip(),
+                "suffix": suffix.strip() or "0",
+                "oper_num": oper_num.strip() or "0",
+                "data_json": json.dumps(materials, ensure_ascii=False),
+            }
+            for job, suffix, oper_num, materials in fetched
+        ]
         try:
+            await bulk_upsert(
+                db,
+                WorkshopJobMaterialCache,
+                cache_rows,
+                key_columns=_ROUTE_KEY_COLUMNS,
+                content_columns=("data_json",),
+                touch_values={"synced_at": now},
+                touch_unchanged=True,
+            )
             await db.commit()
         except Exception:
             await db.rollback()
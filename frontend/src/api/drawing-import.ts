@@ -19,8 +19,12 @@ export async function getDrawingShareStatus(): Promise<ShareStatusResponse> {
   return data
 }
 
-export async function previewDrawingImport(): Promise<DrawingImportPreviewResponse> {
-  const { data } = await apiClient.post<DrawingImportPreviewResponse>(`${BASE}/preview`)
+export async function previewDrawingImport(
+  options: { changedOnly?: boolean; fullScan?: boolean } = {},
+): Promise<DrawingImportPreviewResponse> {
+  const { data } = await apiClient.post<DrawingImportPreviewResponse>(`${BASE}/preview`, null, {
+    params: { changed_only: options.changedOnly ?? false, full_scan: options.fullScan ?? false },
+  })
   return data
 }
 
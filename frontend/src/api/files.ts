@@ -20,8 +20,13 @@ export async function list(limit = 200): Promise<FileWithLinks[]> {
   return data.files
 }
 
-export function previewUrl(fileId: number): string {
-  return `/api/files/${fileId}/preview`
+/**
+ * Náhled souboru. S fileHash je URL content-addressed (?v=hash) →
+ * backend vrací immutable cache, opakované otevření jde z cache prohlížeče.
+ */
+export function previewUrl(fileId: number, fileHash?: string): string {
+  const base = `/api/files/${fileId}/preview`
+  return fileHash ? `${base}?v=${fileHash}` : base
 }
 
 export async function upload(
@@ -13,6 +13,7 @@ export interface ProcessingStep {
   step: number
   total: number
   label: string
+  cached?: boolean
 }
 
 export async function fetchDrawings(): Promise<DrawingFileInfo[]> {
@@ -81,6 +82,7 @@ export function processDrawingOpenAISSE(
   onError: (error: string) => void,
   fileId?: number | null,
   partId?: number | null,
+  forceRefresh = false,
 ): () => void {
   const url = `/api/time-vision/process-openai`
   const token = localStorage.getItem('gestima_token')
@@ -93,7 +95,12 @@ export function processDrawingOpenAISSE(
       'Content-Type': 'application/json',
       ...(token ? { Authorization: `Bearer ${token}` } : {}),
     },
-    body: JSON.stringify({ filename, file_id: fileId ?? undefined, part_id: partId ?? undefined }),
+    body: JSON.stringify({
+      filename,
+      file_id: fileId ?? undefined,
+      part_id: partId ?? undefined,
+      force_refresh: forceRefresh || undefined,
+    }),
     signal: controller.signal,
   })
     .then(async (response) => {
@@ -160,6 +167,7 @@ export function processDrawingFeaturesSSE(
   onError: (error: string) => void,
   fileId?: number | null,
   partId?: number | null,
+  forceRefresh = false,
 ): () => void {
   const url = `/api/time-vision/process-features`
   const token = localStorage.getItem('gestima_token')
@@ -172,7 +180,12 @@ export function processDrawingFeaturesSSE(
       'Content-Type': 'application/json',
       ...(token ? { Authorization: `Bearer ${token}` } : {}),
     },
-    body: JSON.stringify({ filename, file_id: fileId ?? undefined, part_id: partId ?? undefined }),
+    body: JSON.stringify({
+      filename,
+      file_id: fileId ?? undefined,
+      part_id: partId ?? undefined,
+      force_refresh: forceRefresh || undefined,
+    }),
     signal: controller.signal,
   })
     .then(async (response) => {
@@ -1,9 +1,10 @@
 /**
  * Global SSE (Server-Sent Events) composable.
  *
- * Singleton EventSource na /api/events/stream.
+ * Singleton EventSource na /api/events/stream?topics=<přihlášené typy>.
  * Komponenty se přihlásí přes `onSseEvent(type, callback)`.
- * Auto-reconnect s backoff při výpadku.
+ * Auto-reconnect s backoff při výpadku — resume přes last_event_id
+ * (zmeškané eventy doručí server; při mezeře pošle `resync`).
  * Auth check po opakovaném selhání — redirect na login při 401.
  */
 
@@ -13,6 +14,8 @@ type SseCallback = (data: unknown) => void
 
 const listeners = new Map<string, Set<SseCallback>>()
 let source: EventSource | null = null
+let sourceTopics = ''
+let lastEventId: string | null = null
 let reconnectTimer: ReturnType<typeof setTimeout> | null = null
 let consecutiveFailures = 0
 const MAX_FAILURES_BEFORE_AUTH_CHECK = 3
@@ -43,22 +46,37 @@ async function checkAuthAndRedirect(): Promise<boolean> {
   }
 }
 
+function currentTopics(): string {
+  return [...listeners.keys()].filter((t) => t !== 'resync').sort().join(',')
+}
+
 function ensureConnection() {
-  if (source && source.readyState !== EventSource.CLOSED) return
+  const topics = currentTopics()
+  if (source && source.readyState !== EventSource.CLOSED) {
+    if (topics === sourceTopics) return
+    source.close() // změna témat → nové připojení (resume přes lastEventId)
+  }
 
-  source = new EventSource('/api/events/stream')
+  const params = new URLSearchParams({ topics })
+  if (lastEventId) params.set('last_event_id', lastEventId)
+  source = new EventSource(`/api/events/stream?${params}`)
+  sourceTopics = topics
 
   source.onopen = () => {
     consecutiveFailures = 0
   }
 
   source.onmessage = (e) => {
+    if (e.lastEventId) lastEventId = e.lastEventId
     try {
-      const msg = JSON.parse(e.data)
-      const type = msg.type as string
-      const cbs = listeners.get(type)
-      if (cbs) {
-        for (const cb of cbs) cb(msg)
+      // Server posílá dávky jako JSON pole (sloučené eventy), jednotlivé jako objekt
+      const parsed = JSON.parse(e.data)
+      const msgs = Array.isArray(parsed) ? parsed : [parsed]
+      for (const msg of msgs) {
+        const cbs = listeners.get(msg.type as string)
+        if (cbs) {
+          for (const cb of cbs) cb(msg)
+        }
       }
     } catch { /* ignore parse errors */ }
   }
@@ -101,6 +119,7 @@ function scheduleReconnect() {
  * onSseEvent('tier_change', (data) => {
  *   // data = { type: 'tier_change', job: '...', suffix: '0', tier: 'hot' }
  * })
+ * onSseEvent('resync', () => reload())  // zmeškané eventy už nejdou doručit
  */
 export function onSseEvent(type: string, callback: SseCallback) {
   if (!listeners.has(type)) listeners.set(type, new Set())
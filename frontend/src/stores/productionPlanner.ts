@@ -4,7 +4,7 @@ import { ref } from 'vue'
 import { defineStore } from 'pinia'
 import * as api from '@/api/productionPlanner'
 import { useUiStore } from './ui'
-import type { PlannerVpRow, PriorityTier, WcLane } from '@/types/production-planner'
+import type { PlannerScheduleDelta, PlannerVpRow, PriorityTier, WcLane } from '@/types/production-planner'
 
 const TIER_CYCLE: PriorityTier[] = ['normal', 'urgent', 'hot']
 const TIER_PRIORITY: Record<PriorityTier, number> = { hot: 5, urgent: 20, normal: 100 }
@@ -19,6 +19,8 @@ export const useProductionPlannerStore = defineStore('productionPlanner', () =>
     max_date: '',
   })
   const loading = ref(false)
+  // Verze plánu na serveru — delta navazuje jen na stejnou verzi
+  const version = ref<number | null>(null)
 
   async function fetchData(limit = 500) {
     loading.value = true
@@ -27,6 +29,7 @@ export const useProductionPlannerStore = defineStore('productionPlanner', () =>
       vps.value = data.vps
       wcLanes.value = data.wc_lanes ?? []
       timeRange.value = data.time_range
+      version.value = data.version ?? null
     } catch {
       ui.showError('Nepodařilo se načíst data plánovače výroby')
     } finally {
@@ -85,6 +88,30 @@ export const useProductionPlannerStore = defineStore('productionPlanner', () =>
     }
   }
 
+  /** Sloučit delta ze SSE (změněné VP + WC lanes) bez načtení celého plánu */
+  function applyScheduleDelta(delta: PlannerScheduleDelta) {
+    if (!vps.value.length) return
+    if (version.value === null || delta.base_version !== version.value) {
+      // Zmeškaná delta (jiný plán / výpadek SSE) → načíst celý plán
+      fetchData()
+      return
+    }
+
+    const vpKey = (job: string, suffix: string) => `${job}|${suffix}`
+    const byKey = new Map(vps.value.map((v) => [vpKey(v.job, v.suffix), v]))
+    for (const vp of delta.vps) byKey.set(vpKey(vp.job, vp.suffix), vp)
+    vps.value = delta.vp_order
+      .map(([job, suffix]) => byKey.get(vpKey(job, suffix)))
+      .filter((v): v is PlannerVpRow => v !== undefined)
+
+    const lanes = new Map(wcLanes.value.map((l) => [l.wc, l]))
+    for (const lane of delta.wc_lanes) lanes.set(lane.wc, lane)
+    wcLanes.value = [...lanes.values()].sort((a, b) => a.wc.localeCompare(b.wc))
+
+    timeRange.value = delta.time_range
+    version.value = delta.version
+  }
+
   function cycleTier(job: string, suffix: string) {
     const vp = vps.value.find((v) => v.job === job && v.suffix === suffix)
     if (!vp) return
@@ -103,5 +130,6 @@ export const useProductionPlannerStore = defineStore('productionPlanner', () =>
     setFire,
     setTier,
     cycleTier,
+    applyScheduleDelta,
   }
 })
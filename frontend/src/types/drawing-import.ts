@@ -23,6 +23,8 @@ export interface ShareFolderPreview {
 export interface DrawingImportPreviewResponse {
   share_path: string
   total_folders: number
+  changed: number
+  removed: number
   matched: number
   unmatched: number
   already_imported: number
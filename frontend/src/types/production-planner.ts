@@ -68,4 +68,15 @@ export interface PlannerData {
   vps: PlannerVpRow[]
   wc_lanes: WcLane[]
   time_range: { min_date: string; max_date: string }
+  version?: number | null  // null = bez inkrementálních delt (více workerů)
+}
+
+/** SSE `planner_schedule_delta` — inkrementální přeplánování po změně priority / tieru */
+export interface PlannerScheduleDelta {
+  version: number
+  base_version: number
+  vps: PlannerVpRow[]
+  vp_order: [string, string][]
+  wc_lanes: WcLane[]
+  time_range: { min_date: string; max_date: string }
 }
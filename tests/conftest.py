@@ -14,6 +14,8 @@ from app.models.enums import StockShape, UserRole
 # Disable rate limiting for tests BEFORE importing app
 from app.config import settings
 settings.RATE_LIMIT_ENABLED = False
+# Raster cache nepsat do repa — testy cache si ho zapnou nad tmp_path
+settings.RASTER_CACHE_MAX_MB = 0
 
 from app.gestima_app import app
 from passlib.context import CryptContext
@@ -29,6 +29,9 @@ from app.services.material_calculator import (
     calculate_volume_tube,
     calculate_volume,
     find_price_tier,
+    find_price_tiers,
+    invalidate_price_category_cache,
+    PriceCategoryTiers,
     calculate_material_weight_and_price,
     MaterialCalculation,
 )
@@ -369,6 +372,73 @@ async def test_find_price_tier_no_match(db_session, price_category):
     assert result is None
 
 
+@pytest.mark.asyncio
+async def test_find_price_tiers_bulk(db_session, price_category, price_tiers):
+    """Bulk lookup: tier pro každý pár (kategorie, váha), neznámá kategorie → None"""
+    tiers = await find_price_tiers(
+        [price_category.id, price_category.id, price_category.id, 999999],
+        [5.0, 25.0, 150.0, 5.0],
+        db_session
+    )
+
+    assert [t.price_per_kg for t in tiers[:3]] == [49.4, 34.5, 26.3]
+    assert tiers[3] is None
+    assert await find_price_tiers([], [], db_session) == []
+
+    with pytest.raises(ValueError):
+        await find_price_tiers([price_category.id], [5.0, 10.0], db_session)
+
+
+@pytest.mark.asyncio
+async def test_price_category_cache_invalidation(db_session, price_category, price_tiers):
+    """Změna tieru přes ORM invaliduje cache po commitu (ne po pouhém flush)"""
+    category_id = price_category.id
+    assert (await find_price_tier(category_id, 5.0, db_session)).price_per_kg == 49.4
+
+    price_tiers[0].price_per_kg = 55.0
+    await db_session.flush()
+    assert (await find_price_tier(category_id, 5.0, db_session)).price_per_kg == 49.4
+
+    await db_session.commit()
+    assert (await find_price_tier(category_id, 5.0, db_session)).price_per_kg == 55.0
+
+    # Rollback neuložené změny cache nezahodí
+    tier = await db_session.get(MaterialPriceTier, price_tiers[0].id)
+    tier.price_per_kg = 60.0
+    await db_session.flush()
+    await db_session.rollback()
+    assert (await find_price_tier(category_id, 5.0, db_session)).price_per_kg == 55.0
+
+    invalidate_price_category_cache()
+    assert (await find_price_tier(category_id, 5.0, db_session)).price_per_kg == 55.0
+
+
+def test_price_category_tiers_bisect():
+    """Seřazení, duplicitní min_weight (první vyhrává) a soft-deleted tiers"""
+    from types import SimpleNamespace
+
+    def tier(id, min_weight, price, deleted_at=None):
+        return SimpleNamespace(
+            id=id, min_weight=min_weight, max_weight=None,
+            price_per_kg=price, deleted_at=deleted_at
+        )
+
+    category = PriceCategoryTiers.from_tiers(1, "TEST", [
+        tier(1, 100, 26.3),
+        tier(2, 0, 49.4),
+        tier(3, 15, 34.5),
+        tier(4, 15, 99.0),
+        tier(5, 50, 10.0, deleted_at="2026-01-01"),
+    ])
+
+    assert category.min_weights == (0, 15, 100)
+    assert category.tier_for_weight(14.99).id == 2
+    assert category.tier_for_weight(15).id == 3
+    assert category.tier_for_weight(60).price_per_kg == 34.5
+    assert category.tier_for_weight(1000).id == 1
+    assert category.tier_for_weight(-1) is None
+
+
 # ============================================================================
 # END-TO-END CALCULATION
 # ============================================================================
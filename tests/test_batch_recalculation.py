@@ -474,3 +474,112 @@ async def test_recalculate_batch_with_coop(db_session):
 
     # Unit cost: 0 + 0 + 0 + 55.0 = 55.0 Kč
     assert batch.unit_cost == pytest.approx(55.0, abs=1.0)
+
+
+@pytest.mark.asyncio
+async def test_reprice_parts_bulk_skips_frozen(db_session):
+    """Hromadný přepočet: unfrozen batche všech dílů, frozen beze změny, progress přes SSE."""
+    from app.services import event_bus
+    from app.services.batch_service import reprice_parts
+
+    parts = []
+    for i, number in enumerate(("1000061", "1000062")):
+        part = Part(part_number=number, name=f"Reprice {i}", created_by="test")
+        db_session.add(part)
+        await db_session.flush()
+        db_session.add(Operation(
+            part_id=part.id, seq=10, name="OP10 - Kalení", type="cooperation",
+            is_coop=True, coop_price=50.0, coop_min_price=0.0, created_by="test",
+        ))
+        parts.append(part)
+    await db_session.flush()
+
+    batches = [
+        Batch(batch_number="3000061", part_id=parts[0].id, quantity=1, created_by="test"),
+        Batch(batch_number="3000062", part_id=parts[0].id, quantity=10, created_by="test"),
+        Batch(batch_number="3000063", part_id=parts[1].id, quantity=5, created_by="test"),
+        Batch(batch_number="3000064", part_id=parts[1].id, quantity=5, is_frozen=True,
+              unit_cost=1.0, created_by="test"),
+    ]
+    db_session.add_all(batches)
+    await db_session.flush()
+
+    sub = event_bus.subscribe()
+    try:
+        result = await reprice_parts(db_session, [p.id for p in parts], job_id="test-job")
+    finally:
+        event_bus.unsubscribe(sub)
+
+    assert result["total_parts"] == 2
+    assert result["repriced_batches"] == 3
+    assert result["failed_parts"] == 0
+    for batch in batches[:3]:
+        assert batch.coop_cost == pytest.approx(55.0, abs=1.0)
+    assert batches[3].unit_cost == 1.0
+
+    events = []
+    while not sub.queue.empty():
+        events.append(sub.queue.get_nowait().msg)
+    assert events[0]["type"] == "batch_reprice_progress"
+    assert events[-1]["type"] == "batch_reprice_done"
+    assert events[-1]["repriced_batches"] == 3
+
+
+@pytest.mark.asyncio
+async def test_reprice_parts_rolls_back_partially_failed_part(db_session, monkeypatch):
+    """Chyba uprostřed dílu → žádný batch tohoto dílu se nezmění, ostatní díly ano."""
+    from sqlalchemy import select
+    from app.services import batch_service
+
+    parts = []
+    for i, number in enumerate(("1000071", "1000072")):
+        part = Part(part_number=number, name=f"Reprice fail {i}", created_by="test")
+        db_session.add(part)
+        await db_session.flush()
+        db_session.add(Operation(
+            part_id=part.id, seq=10, name="OP10 - Kalení", type="cooperation",
+            is_coop=True, coop_price=50.0, coop_min_price=0.0, created_by="test",
+        ))
+        parts.append(part)
+    batches = [
+        Batch(batch_number="3000071", part_id=parts[0].id, quantity=1, unit_cost=1.0, created_by="test"),
+        Batch(batch_number="3000072", part_id=parts[0].id, quantity=10, unit_cost=1.0, created_by="test"),
+        Batch(batch_number="3000073", part_id=parts[1].id, quantity=5, unit_cost=1.0, created_by="test"),
+    ]
+    db_session.add_all(batches)
+    await db_session.commit()
+
+    original = batch_service._apply_breakdown
+
+    def failing_apply(batch, breakdown, operations):
+        original(batch, breakdown, operations)
+        if batch.batch_number == "3000072":
+            raise RuntimeError("breakdown failed")
+
+    monkeypatch.setattr(batch_service, "_apply_breakdown", failing_apply)
+    result = await batch_service.reprice_parts(db_session, [p.id for p in parts])
+
+    assert result["failed_parts"] == 1
+    assert result["repriced_batches"] == 1
+    rows = await db_session.execute(select(Batch.batch_number, Batch.unit_cost).order_by(Batch.batch_number))
+    unit_costs = dict(rows.all())
+    assert unit_costs["3000071"] == 1.0
+    assert unit_costs["3000072"] == 1.0
+    assert unit_costs["3000073"] == pytest.approx(55.0, abs=1.0)
+
+
+def test_finished_reprice_jobs_expire(monkeypatch):
+    from app.services import batch_service
+
+    monkeypatch.setattr(batch_service, "_reprice_jobs", {})
+    monkeypatch.setattr(batch_service, "_reprice_finished", {})
+    monkeypatch.setattr(batch_service, "_REPRICE_JOBS_MAX", 2)
+    now = batch_service.time.monotonic()
+    for job_id, finished in (("old", now - 7200), ("a", now - 20), ("b", now - 10), ("c", now - 5)):
+        batch_service._reprice_jobs[job_id] = {"job_id": job_id, "status": "done"}
+        batch_service._reprice_finished[job_id] = finished
+    batch_service._reprice_jobs["running"] = {"job_id": "running", "status": "running"}
+
+    # TTL vyhodí "old", limit pak nejstarší dokončené; běžící job zůstává
+    assert batch_service.get_reprice_job("old") is None
+    assert set(batch_service._reprice_jobs) == {"c", "running"}
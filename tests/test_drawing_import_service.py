@@ -0,0 +1,242 @@
+"""GESTIMA - Tests for DrawingImportService incremental scan (ScanManifest) and import pipeline"""
+
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.models.file_record import FileLink, FileRecord
+from app.models.part import Part
+from app.schemas.drawing_import import ImportFolderRequest
+from app.services import drawing_import_service
+from app.services.file_service import file_service
+from app.services.drawing_import_service import (
+    DrawingImportService,
+    ScanManifest,
+    _scan_local_share_sync,
+)
+
+
+def _touch_later(path):
+    """Posunout mtime složky (FS s hrubým rozlišením mtime)."""
+    st = path.stat()
+    os.utime(path, (st.st_atime, st.st_mtime + 5))
+
+
+def test_local_scan_descends_only_changed_folders(tmp_path, monkeypatch):
+    share = tmp_path / "share"
+    for name in ("100200.1", "300400", "4600"):
+        (share / name).mkdir(parents=True)
+    (share / "100200.1" / "a.pdf").write_bytes(b"%PDF-1.4")
+    (share / "100200.1" / "a.stp").write_bytes(b"ISO-10303")
+    (share / "300400" / "notes.txt").write_bytes(b"x")
+
+    manifest_path = tmp_path / "manifest.json"
+    manifest = ScanManifest.load(manifest_path, str(share))
+    first = _scan_local_share_sync(share, manifest)
+    assert [f["folder_name"] for f in first] == ["100200.1", "300400"]
+    assert first[0]["step_files"][0]["filename"] == "a.stp"
+    assert manifest.changed == {"100200.1", "300400"} and manifest.skipped == 1
+    manifest.set_hash("100200.1", "a.pdf", "a" * 64)
+    manifest.save()
+
+    descended = []
+    original = drawing_import_service._stat_local_folder_sync
+    monkeypatch.setattr(
+        drawing_import_service,
+        "_stat_local_folder_sync",
+        lambda path, previous: descended.append(path.name) or original(path, previous),
+    )
+
+    reloaded = ScanManifest.load(manifest_path, str(share))
+    assert _scan_local_share_sync(share, reloaded) == first
+    assert descended == [] and reloaded.changed == set()
+
+    (share / "300400" / "b.pdf").write_bytes(b"%PDF-1.7")
+    _touch_later(share / "300400")
+    _scan_local_share_sync(share, reloaded)
+    assert descended == ["300400"] and reloaded.changed == {"300400"}
+    assert reloaded.folders["100200.1"]["files"]["a.pdf"]["hash"] == "a" * 64
+
+    # full=True → všechny složky; hash nezměněného souboru zůstává
+    descended.clear()
+    _scan_local_share_sync(share, reloaded, full=True)
+    assert sorted(descended) == ["100200.1", "300400"] and reloaded.changed == set()
+    assert reloaded.folders["100200.1"]["files"]["a.pdf"]["hash"] == "a" * 64
+
+    # Manifest jiného zdroje se nepoužije
+    assert ScanManifest.load(manifest_path, "ssh://other/path").folders == {}
+
+
+def test_ssh_scan_parses_single_combined_listing():
+    service = DrawingImportService("ssh://user@nas/vykresy")
+    listing = [
+        "D\t100200.1\t1700000000.5",
+        "D\t100200.1/archiv\t1700000000.0",
+        "D\t4700\t1700000000.0",
+        "F\t100200.1/a.pdf\t1234\t1700000001.0",
+        "F\t100200.1/a.STEP\t99\t1700000002.0",
+        "F\t4700/skip.pdf\t1\t1.0",
+        "D\t500600\t1700000003.0",
+    ]
+    service._stream_ssh_lines_sync = lambda remote_cmd, timeout=600, partial_returncodes=(): iter(listing)
+
+    manifest = ScanManifest(None, service.share_path_raw)
+    result = service._scan_share_ssh_sync(manifest)
+
+    assert [f["folder_name"] for f in result] == ["100200.1", "500600"]
+    assert result[0]["pdf_files"] == [{"filename": "a.pdf", "file_size": 1234, "file_type": "pdf"}]
+    assert result[0]["step_files"][0]["filename"] == "a.STEP"
+    assert manifest.skipped == 1 and manifest.changed == {"100200.1", "500600"}
+
+
+class _FakeFindProcess:
+    """Popen stub: vypíše řádky, zapíše stderr a skončí daným rc."""
+
+    def __init__(self, lines, returncode, stderr_text):
+        self._lines = lines
+        self._returncode = returncode
+        self._stderr_text = stderr_text
+
+    def __call__(self, cmd, stdout=None, stderr=None, **kwargs):
+        stderr.write(self._stderr_text)
+        stderr.flush()
+        self.stdout = (line + "\n" for line in self._lines)
+        return self
+
+    def wait(self):
+        return self._returncode
+
+    def poll(self):
+        return self._returncode
+
+    def kill(self):
+        pass
+
+
+@pytest.mark.parametrize("returncode, expected", [(1, ["100200"]), (255, [])])
+def test_ssh_scan_keeps_listing_when_find_hits_permission_denied(monkeypatch, returncode, expected):
+    service = DrawingImportService("ssh://user@nas/vykresy")
+    fake = _FakeFindProcess(
+        ["D\t100200\t1700000000.0", "F\t100200/a.pdf\t10\t1700000001.0"],
+        returncode,
+        "find: '/vykresy/tajne': Permission denied\n",
+    )
+    monkeypatch.setattr(drawing_import_service.subprocess, "Popen", fake)
+
+    manifest = ScanManifest(None, service.share_path_raw)
+    result = service._scan_share_ssh_sync(manifest)
+
+    assert [f["folder_name"] for f in result] == expected
+    assert sorted(manifest.folders) == expected
+
+
+def test_import_checkpoint_survives_reload_until_folder_changes(tmp_path):
+    share = tmp_path / "share"
+    (share / "100200").mkdir(parents=True)
+    (share / "100200" / "a.pdf").write_bytes(b"%PDF-1.4")
+    manifest_path = tmp_path / "manifest.json"
+
+    manifest = ScanManifest.load(manifest_path, str(share))
+    _scan_local_share_sync(share, manifest)
+    manifest.mark_imported("100200", part_id=7)
+    manifest.save()
+
+    # Přerušený import → nový běh přeskočí složku potvrzenou commitem
+    reloaded = ScanManifest.load(manifest_path, str(share))
+    assert reloaded.is_imported("100200", 7)
+    assert not reloaded.is_imported("100200", 8)
+
+    (share / "100200" / "b.pdf").write_bytes(b"%PDF-1.7")
+    _touch_later(share / "100200")
+    _scan_local_share_sync(share, reloaded)
+    assert not reloaded.is_imported("100200", 7)
+
+
+@pytest.fixture
+def import_env(tmp_path, monkeypatch):
+    """Sdílená složka se 4 výkresy + uploads v tmp; commit po 2 složkách."""
+    monkeypatch.setattr(file_service, "UPLOADS_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(settings, "DRAWING_IMPORT_WORKERS", 2)
+    monkeypatch.setattr(settings, "DRAWING_IMPORT_COMMIT_EVERY", 2)
+    share = tmp_path / "share"
+    for i in range(4):
+        folder = share / f"10{i}"
+        folder.mkdir(parents=True)
+        (folder / "vykres.pdf").write_bytes(b"%PDF-1.4 vykres " + bytes([48 + i]))
+        (folder / "model.stp").write_bytes(b"ISO-10303-21; model " + bytes([48 + i]))
+    return tmp_path
+
+
+async def _import_parts(db_session):
+    parts = [Part(part_number=f"1090000{i}", name=f"Díl {i}", created_by="test") for i in range(4)]
+    db_session.add_all(parts)
+    await db_session.commit()
+    return [
+        ImportFolderRequest(folder_name=f"10{i}", part_id=part.id, primary_pdf="vykres.pdf")
+        for i, part in enumerate(parts)
+    ]
+
+
+async def _active_records(db_session) -> int:
+    return (await db_session.execute(
+        select(func.count(FileRecord.id)).where(FileRecord.deleted_at.is_(None))
+    )).scalar()
+
+
+def _logical_files(uploads) -> list[str]:
+    return sorted(p.name for p in (uploads / "parts").rglob("*") if p.is_file())
+
+
+@pytest.mark.asyncio
+async def test_execute_import_abort_keeps_committed_folders_and_discards_rest(db_session, import_env):
+    folders = await _import_parts(db_session)
+    service = DrawingImportService(str(import_env / "share"), import_env / "manifest.json")
+    await service.scan_share()
+
+    written = []
+    original_write = service._write_folder
+
+    async def _write_then_abort(folder_req, *args, **kwargs):
+        if len(written) == 3:
+            raise asyncio.CancelledError()  # klient zrušil request uprostřed importu
+        written.append(folder_req.folder_name)
+        return await original_write(folder_req, *args, **kwargs)
+
+    service._write_folder = _write_then_abort
+    with pytest.raises(asyncio.CancelledError):
+        await service.execute_import(folders, db_session)
+
+    # Commit po 2 složkách: první dvě zůstanou, třetí (zapsaná, necommitnutá) a čtvrtá ne
+    db_session.expire_all()
+    assert await _active_records(db_session) == 4
+    committed = {part_id for (part_id,) in (await db_session.execute(
+        select(FileLink.entity_id).where(FileLink.deleted_at.is_(None))
+    )).all()}
+    part_ids = {f.folder_name: f.part_id for f in folders}
+    assert committed == {part_ids[name] for name in written[:2]}
+    assert _logical_files(import_env / "uploads") == ["model.stp", "model.stp", "vykres.pdf", "vykres.pdf"]
+    assert set(service._manifest.imported) == set(written[:2])
+
+    # Nový běh doimportuje zbytek, hotové složky přeskočí podle checkpointu
+    service._write_folder = original_write
+    result = await service.execute_import(folders, db_session)
+    assert result.success and result.skipped == 2 and result.parts_updated == 2
+    assert await _active_records(db_session) == 8
+
+
+@pytest.mark.asyncio
+async def test_execute_import_rerun_without_scan_does_not_duplicate(db_session, import_env):
+    folders = await _import_parts(db_session)
+    first = await DrawingImportService(str(import_env / "share")).execute_import(folders, db_session)
+    assert first.success and first.files_created == 8
+
+    # Nová instance bez scan_share: žádný checkpoint ani známé hashe v manifestu
+    rerun = await DrawingImportService(str(import_env / "share")).execute_import(folders, db_session)
+    assert rerun.success and rerun.files_created == 0
+    assert await _active_records(db_session) == 8
+    assert len(_logical_files(import_env / "uploads")) == 8
+    parts = (await db_session.execute(select(Part).where(Part.part_number.like("1090000%")))).scalars().all()
+    assert all(part.file_id is not None for part in parts)
@@ -0,0 +1,183 @@
+"""GESTIMA - Tests for SSE event bus (ID, replay, témata, back-pressure, sqlite backend)"""
+
+import pytest
+
+from app.services.event_bus import (
+    RESYNC,
+    EventBus,
+    MemoryBackend,
+    SQLiteBackend,
+    _SUBSCRIBER_QUEUE_SIZE,
+    encode_frame,
+)
+
+
+def _memory_bus(replay_size: int = 100, coalesce_window: float = 0.0) -> EventBus:
+    return EventBus(MemoryBackend(), replay_size, coalesce_window)
+
+
+@pytest.mark.asyncio
+async def test_topics_and_monotonic_ids():
+    bus = _memory_bus()
+    tiers = bus.subscribe(topics={"tier_change"})
+    everything = bus.subscribe()
+
+    bus.publish({"type": "tier_change", "job": "VP1", "tier": "hot"})
+    bus.publish({"type": "batch_reprice_progress", "job_id": "x"})
+    bus.publish({"type": "tier_change", "job": "VP2", "tier": "normal"})
+
+    got = await bus.next_events(tiers, timeout=0.1)
+    assert [e.msg["job"] for e in got] == ["VP1", "VP2"]
+    all_events = await bus.next_events(everything, timeout=0.1)
+    ids = [event.id for event in all_events]
+    assert ids == sorted(ids) and len(set(ids)) == 3
+    assert await bus.next_events(tiers, timeout=0.01) == []
+
+
+@pytest.mark.asyncio
+async def test_resume_from_last_event_id():
+    bus = _memory_bus()
+    for i in range(5):
+        bus.publish({"type": "tier_change", "job": f"VP{i}"})
+    last_seen = bus._ring[1].id  # klient viděl VP0, VP1
+
+    sub = bus.subscribe(topics={"tier_change"}, last_event_id=last_seen)
+    bus.publish({"type": "tier_change", "job": "VP5"})  # mezi připojením a prvním čtením
+    resumed = await bus.next_events(sub, timeout=0.1)
+    assert [e.msg["job"] for e in resumed] == ["VP2", "VP3", "VP4", "VP5"]
+    bus.publish({"type": "tier_change", "job": "VP6"})
+    live = await bus.next_events(sub, timeout=0.1)
+    assert [e.msg["job"] for e in live] == ["VP6"]
+
+    # ID mimo buffer (cizí instance / příliš starý výpadek) → resync
+    stale = bus.subscribe(last_event_id=1)
+    assert await bus.next_events(stale, timeout=0.1) == [RESYNC]
+
+
+@pytest.mark.asyncio
+async def test_user_addressed_events_reach_only_that_user():
+    bus = _memory_bus()
+    owner = bus.subscribe(user_id=1)
+    other = bus.subscribe(user_id=2)
+    bus.publish({"type": "tier_change", "job": "VP0"})
+    seen = bus._ring[0].id
+
+    bus.publish({"type": "quote_parse_progress", "job_id": "j", "user_id": 1})
+    bus.publish({"type": "tier_change", "job": "VP1"})
+
+    assert [e.msg["type"] for e in await bus.next_events(owner, timeout=0.1)] == [
+        "tier_change", "quote_parse_progress", "tier_change",
+    ]
+    assert [e.msg.get("job") for e in await bus.next_events(other, timeout=0.1)] == ["VP0", "VP1"]
+
+    # Ani replay po reconnectu cizí event nevydá
+    resumed = bus.subscribe(last_event_id=seen, user_id=2)
+    assert [e.msg["type"] for e in await bus.next_events(resumed, timeout=0.1)] == ["tier_change"]
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_recovers_from_replay():
+    bus = _memory_bus(replay_size=_SUBSCRIBER_QUEUE_SIZE * 4)
+    sub = bus.subscribe()
+    total = _SUBSCRIBER_QUEUE_SIZE * 2
+    for i in range(total):
+        bus.publish({"type": "tier_change", "n": i})
+    assert sub.lagged
+
+    received = []
+    while len(received) < total:
+        batch = await bus.next_events(sub, timeout=0.1)
+        assert batch and batch != [RESYNC]
+        received.extend(e.msg["n"] for e in batch)
+    assert received == list(range(total))
+
+    # Přetečení i replay bufferu → resync
+    small = _memory_bus(replay_size=_SUBSCRIBER_QUEUE_SIZE)
+    slow = small.subscribe()
+    for i in range(_SUBSCRIBER_QUEUE_SIZE * 3):
+        small.publish({"type": "tier_change", "n": i})
+    batch = await small.next_events(slow, timeout=0.1)
+    assert [e.msg["n"] for e in batch[:-1]] == list(range(_SUBSCRIBER_QUEUE_SIZE))
+    assert batch[-1] == RESYNC
+    small.publish({"type": "tier_change", "n": -1})
+    assert [e.msg["n"] for e in await small.next_events(slow, timeout=0.1)] == [-1]
+
+
+@pytest.mark.asyncio
+async def test_coalescing_keeps_latest_per_key_in_one_frame():
+    bus = _memory_bus(coalesce_window=0.05)
+    sub = bus.subscribe(topics={"tier_change", "planner_schedule_delta"})
+
+    bus.publish({"type": "tier_change", "job": "VP1", "suffix": "0", "tier": "hot"})
+    bus.publish({"type": "tier_change", "job": "VP2", "suffix": "0", "tier": "hot"})
+    bus.publish({"type": "planner_schedule_delta", "version": 2, "base_version": 1})
+    bus.publish({"type": "tier_change", "job": "VP1", "suffix": "0", "tier": "normal"})
+
+    batch = await bus.next_events(sub, timeout=0.1)
+    assert [(e.msg["type"], e.msg.get("job"), e.msg.get("tier")) for e in batch] == [
+        ("tier_change", "VP2", "hot"),
+        ("planner_schedule_delta", None, None),
+        ("tier_change", "VP1", "normal"),
+    ]
+    # Jeden rámec, ID posledního eventu, JSON sdílený (nepřekódovaný)
+    frame = encode_frame(batch)
+    assert frame.startswith(f"id: {bus.last_id}\ndata: [")
+    assert batch[0].data in frame and frame.count("data:") == 1
+    assert sub.coalesced == 1 and sub.delivered == 3
+    # Event objekt (a jeho JSON) je sdílený mezi odběrateli i replay bufferem
+    assert bus._ring[-1] is batch[-1]
+
+
+@pytest.mark.asyncio
+async def test_stats_report_lagging_subscriber():
+    bus = _memory_bus()
+    fast = bus.subscribe(label="admin@pc")
+    slow = bus.subscribe(label="tablet@ipad")
+    for i in range(_SUBSCRIBER_QUEUE_SIZE + 5):
+        bus.publish({"type": "tier_change", "n": i})
+        if i % 8 == 0:
+            await bus.next_events(fast, timeout=0.01)
+
+    stats = bus.stats()
+    assert [s["label"] for s in stats["subscribers"]][0] == "tablet@ipad"
+    slow_stats = stats["subscribers"][0]
+    assert slow_stats["lagged"] and slow_stats["lag_count"] == 1 and slow_stats["dropped"] == 5
+    assert slow_stats["pending"] == _SUBSCRIBER_QUEUE_SIZE
+    assert stats["subscribers"][1]["dropped"] == 0
+    assert slow.lagged and not fast.lagged
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_fans_out_between_workers(tmp_path):
+    path = tmp_path / "events.db"
+    worker_a = EventBus(SQLiteBackend(path, retention=100, poll_interval=0.05), 50)
+    worker_b = EventBus(SQLiteBackend(path, retention=100, poll_interval=0.05), 50)
+    await worker_a.start()
+    await worker_b.start()
+    try:
+        sub_b = worker_b.subscribe(topics={"tier_change"})
+        worker_a.publish({"type": "tier_change", "job": "VP1"})
+        worker_a.publish({"type": "tier_change", "job": "VP2"})
+
+        got = []
+        for _ in range(20):
+            got.extend(await worker_b.next_events(sub_b, timeout=0.2))
+            if len(got) == 2:
+                break
+        assert [e.msg["job"] for e in got] == ["VP1", "VP2"]
+        last_id = got[-1].id
+    finally:
+        await worker_a.stop()
+        await worker_b.stop()
+
+    # Restart workeru: replay buffer se načte ze souboru, ID navazují
+    restarted = EventBus(SQLiteBackend(path, retention=100, poll_interval=0.05), 50)
+    await restarted.start()
+    try:
+        resumed = restarted.subscribe(last_event_id=got[0].id)
+        assert [e.msg["job"] for e in await restarted.next_events(resumed, timeout=0.1)] == ["VP2"]
+        restarted.publish({"type": "tier_change", "job": "VP3"})
+        live = await restarted.next_events(resumed, timeout=1.0)
+        assert live[0].id > last_id
+    finally:
+        await restarted.stop()
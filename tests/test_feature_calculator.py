@@ -20,6 +20,12 @@ from app.services.feature_calculator import (
     calc_milling_time,
     calc_threading_time,
     calculate_features_time,
+    calculate_features_time_batch,
+    calc_turning_time_array,
+    calc_drilling_time_array,
+    calc_milling_time_array,
+    calc_threading_time_array,
+    parse_detail,
 )
 
 
@@ -376,3 +382,63 @@ class TestFeatureCalculation:
         # High mode should be faster
         assert result_low["cutting_mode"] == "low"
         assert result_high["cutting_mode"] == "high"
+
+
+# ============================================================================
+# BATCH CALCULATION TESTS
+# ============================================================================
+
+class TestBatchCalculation:
+    """Batch API: jeden tokenizer, memoizované podmínky, vektorové vzorce."""
+
+    def test_parse_detail_single_pass(self):
+        assert parse_detail("80×22×3.4mm") == (80.0, 80.0, 22.0, 3.4, 22.0)
+        assert parse_detail("M10×1.5") == (10.0, 10.0, None, None, 1.5)
+        assert parse_detail("ø60 h9") == (60.0, None, None, 9.0, None)
+        assert parse_detail("M8") == (8.0, None, None, None, 1.25)
+        assert parse_detail("") == (None, None, None, None, None)
+
+    def test_array_formulas_match_scalar(self):
+        assert calc_turning_time_array([60, 0], [100, 100], [220, 220], [0.25, 0.25]).tolist() == [
+            calc_turning_time(60, 100, 220, 0.25, 2.5), 0.01,
+        ]
+        assert calc_turning_time_array([60], [100], [220], [0.25], [2.5], [7.0]).tolist() == [
+            calc_turning_time(60, 100, 220, 0.25, 2.5, material_removal_mm=7.0),
+        ]
+        assert calc_drilling_time_array([5, 5], [10, 0], [90, 90], [0.2, 0.2]).tolist() == [
+            calc_drilling_time(5, 10, 90, 0.2), 0.01,
+        ]
+        assert calc_milling_time_array([80], [3.4], [160], [0.1], [2.0]).tolist() == [
+            calc_milling_time(80, 22, 3.4, 160, 0.1, 2.0),
+        ]
+        assert calc_threading_time_array([10], [15], [1.5], [80]).tolist() == [
+            calc_threading_time(10, 15, 1.5, 80),
+        ]
+
+    def test_batch_matches_single_calls(self):
+        jobs = [
+            {
+                "features_json": [
+                    {"type": "outer_diameter", "count": 1, "detail": "ø60 L80", "location": ""},
+                    {"type": "through_hole", "count": 2, "detail": "2× ø5.3 mm", "location": ""},
+                    {"type": "pocket", "count": 1, "detail": "80×22×3.4mm", "location": ""},
+                    {"type": "thread_internal", "count": 4, "detail": "M8", "location": ""},
+                    {"type": "chamfer", "count": 3, "detail": "1×45°", "location": ""},
+                    {"type": "nonexistent_feature_type", "count": 1, "detail": "", "location": ""},
+                ],
+                "material_group": "20910004",
+                "cutting_mode": "mid",
+            },
+            {
+                "features_json": [
+                    {"type": "outer_diameter", "count": 1, "detail": "ø30", "location": ""},
+                    {"type": "through_hole", "count": 1, "detail": "bez rozměru", "location": ""},
+                ],
+                "material_group": "UNKNOWN_CODE",
+                "cutting_mode": "high",
+            },
+            {"features_json": [], "material_group": "20910000"},
+        ]
+
+        assert calculate_features_time_batch(jobs) == [calculate_features_time(**job) for job in jobs]
+        assert calculate_features_time_batch([]) == []
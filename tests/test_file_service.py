@@ -14,6 +14,7 @@ Tests:
 - get_primary() - primary file lookup
 - cleanup_temp() - expire temp files
 - find_orphans() - files without links
+- content-addressed blob store (dedup, refcount GC, orphan purge)
 """
 
 
@@ -197,6 +198,87 @@ async def test_store_duplicate_filename(db, temp_uploads_dir):
     assert "duplicate_" in record2.file_path  # UUID suffix added
 
 
+@pytest.mark.asyncio
+async def test_store_deduplicates_content_across_sources(db, temp_uploads_dir):
+    """Stejný obsah z uploadu, sdíleného disku i bytes → jeden blob, tři záznamy."""
+    content = b"%PDF-1.4\n%Test PDF content"
+    source = temp_uploads_dir / "share" / "vykres.pdf"
+    source.parent.mkdir()
+    source.write_bytes(content)
+
+    uploaded = await file_service.store(file=create_pdf_upload("vykres.pdf"), directory="parts/1", db=db)
+    from_share = await file_service.store_from_path(source, "parts/2", db)
+    from_infor = await file_service.store_from_bytes(content, "vykres.pdf", "parts/3", db)
+
+    assert len({uploaded.id, from_share.id, from_infor.id}) == 3
+    assert uploaded.file_hash == from_share.file_hash == from_infor.file_hash
+    blobs = [p for p in (temp_uploads_dir / ".blobs").rglob("*") if p.is_file()]
+    assert [b.name for b in blobs] == [uploaded.file_hash]
+    # Každý FileRecord.file_path je jméno (hardlink) téhož blobu
+    for record in (uploaded, from_share, from_infor):
+        path = temp_uploads_dir / record.file_path
+        assert path.read_bytes() == content
+        assert path.stat().st_ino == blobs[0].stat().st_ino
+    assert await file_service.blob_refcounts(db, {uploaded.file_hash}) == {uploaded.file_hash: 3}
+
+
+@pytest.mark.asyncio
+async def test_cleanup_temp_releases_unreferenced_blobs(db, temp_uploads_dir):
+    """Blob se smaže až když ho nereferencuje žádný aktivní záznam."""
+    shared_temp = await file_service.store(file=create_pdf_upload("a.pdf"), directory="temp", db=db)
+    kept = await file_service.store(file=create_pdf_upload("b.pdf"), directory="parts/1", db=db)
+    only_temp = await file_service.store_from_bytes(b"%PDF-1.7 jiny obsah", "c.pdf", "temp", db)
+    for record in (shared_temp, only_temp):
+        record.status = "temp"
+        record.created_at = datetime.utcnow() - timedelta(hours=25)
+    await db.commit()
+
+    assert await file_service.cleanup_temp(db, max_age_hours=24) == 2
+    await db.commit()
+
+    assert file_service._blob_path(kept.file_hash).exists()
+    assert (temp_uploads_dir / kept.file_path).exists()
+    assert not file_service._blob_path(only_temp.file_hash).exists()
+    assert await file_service.collect_garbage(db) == {"blobs_deleted": 0, "bytes_freed": 0}
+
+
+@pytest.mark.asyncio
+async def test_find_orphans_reclaimable_only(db, temp_uploads_dir):
+    """Orphan sdílející blob s navázaným souborem neuvolní místo."""
+    shared_orphan = await file_service.store(file=create_pdf_upload("a.pdf"), directory="test", db=db)
+    linked = await file_service.store(file=create_pdf_upload("b.pdf"), directory="test", db=db)
+    own_orphan = await file_service.store_from_bytes(b"%PDF-1.7 jiny obsah", "c.pdf", "test", db)
+    await file_service.link(linked.id, "part", 1, db)
+
+    orphans = await file_service.find_orphans(db)
+    assert {r.id for r in orphans} == {shared_orphan.id, own_orphan.id}
+    reclaimable = await file_service.find_orphans(db, reclaimable_only=True)
+    assert [r.id for r in reclaimable] == [own_orphan.id]
+
+
+@pytest.mark.asyncio
+async def test_purge_deleted_orphans_frees_blob_bytes(db, temp_uploads_dir):
+    """Smazaný orphan uvolní blob; blob sdílený s navázaným souborem zůstane."""
+    content = b"%PDF-1.7 jiny obsah"
+    shared_orphan = await file_service.store(file=create_pdf_upload("a.pdf"), directory="test", db=db)
+    linked = await file_service.store(file=create_pdf_upload("b.pdf"), directory="test", db=db)
+    own_orphan = await file_service.store_from_bytes(content, "c.pdf", "test", db)
+    await file_service.link(linked.id, "part", 1, db)
+    await db.commit()
+
+    orphans = await file_service.find_orphans(db)
+    for record in orphans:
+        await file_service.delete(record.id, db, deleted_by="test")
+    await db.commit()
+
+    assert await file_service.purge_deleted(db, orphans) == len(content)
+    assert not file_service._blob_path(own_orphan.file_hash).exists()
+    assert not (temp_uploads_dir / own_orphan.file_path).exists()
+    assert not (temp_uploads_dir / shared_orphan.file_path).exists()
+    assert (temp_uploads_dir / linked.file_path).exists()
+    assert file_service._blob_path(linked.file_hash).exists()
+
+
 # ==================== LINK TESTS ====================
 
 @pytest.mark.asyncio
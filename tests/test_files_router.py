@@ -6,10 +6,12 @@ Coverage:
 - POST /api/files/upload (file upload + optional link)
 - GET /api/files/{file_id} (metadata + links)
 - GET /api/files/{file_id}/download (file download)
+- GET /api/files/{file_id}/preview (ETag / 304 / Range)
 - DELETE /api/files/{file_id} (soft delete)
 - POST /api/files/{file_id}/link (link to entity)
 - PUT /api/files/{file_id}/primary/{entity_type}/{entity_id} (set primary)
 - GET /api/files (list with filters)
+- POST /api/files/gc (temp cleanup + blob GC, admin only)
 
 Transaction handling (L-008): All tests verify rollback on errors.
 Validation (L-009): Pydantic Field() constraints tested.
@@ -440,3 +442,111 @@ class TestFileList:
 
         assert data["total"] == 1
         assert data["files"][0]["links"][0]["entity_id"] == test_part.id
+
+
+class TestFileServing:
+    """Test GET /api/files/{file_id}/preview — ETag, 304, Range"""
+
+    async def _upload(self, client: AsyncClient, admin_headers, sample_pdf) -> dict:
+        pdf_content, filename, _ = sample_pdf
+        response = await client.post(
+            "/api/files/upload",
+            data={"directory": "loose"},
+            files={"file": (filename, pdf_content, "application/pdf")},
+            headers=admin_headers
+        )
+        assert response.status_code == 201
+        return response.json()
+
+    async def test_preview_etag_and_not_modified(self, client: AsyncClient, admin_headers, sample_pdf):
+        """Strong ETag from file_hash, If-None-Match → 304, ?v=hash → immutable"""
+        uploaded = await self._upload(client, admin_headers, sample_pdf)
+        url = f"/api/files/{uploaded['id']}/preview"
+
+        response = await client.get(url)
+        assert response.status_code == 200
+        assert response.headers["etag"] == f'"{uploaded["file_hash"]}"'
+        assert response.headers["accept-ranges"] == "bytes"
+        assert "no-cache" in response.headers["cache-control"]
+
+        response = await client.get(url, headers={"If-None-Match": response.headers["etag"]})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = await client.get(f"{url}?v={uploaded['file_hash']}")
+        assert "immutable" in response.headers["cache-control"]
+
+    async def test_preview_range_requests(self, client: AsyncClient, admin_headers, sample_pdf):
+        """Range → 206 with Content-Range, out of bounds → 416, If-Range mismatch → 200"""
+        _, _, file_size = sample_pdf
+        uploaded = await self._upload(client, admin_headers, sample_pdf)
+        url = f"/api/files/{uploaded['id']}/preview"
+
+        response = await client.get(url, headers={"Range": "bytes=0-7"})
+        assert response.status_code == 206
+        assert response.content == b"%PDF-1.4"
+        assert response.headers["content-range"] == f"bytes 0-7/{file_size}"
+        assert response.headers["content-length"] == "8"
+
+        response = await client.get(url, headers={"Range": "bytes=-5"})
+        assert response.status_code == 206
+        assert len(response.content) == 5
+
+        response = await client.get(url, headers={"Range": f"bytes={file_size}-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{file_size}"
+
+        response = await client.get(url, headers={"Range": "bytes=0-7", "If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert len(response.content) == file_size
+
+
+class TestFileGarbageCollection:
+    """Test POST /api/files/gc endpoint"""
+
+    async def test_gc_removes_expired_temp_and_its_blob(
+        self, client: AsyncClient, admin_headers, operator_headers, test_db_session
+    ):
+        """Expirovaný temp soubor → smazán z disku i s blobem; jen admin"""
+        from datetime import datetime, timedelta
+
+        from app.services.file_service import file_service
+
+        content = b"%PDF-1.4\n%GC test " + str(datetime.utcnow().timestamp()).encode()
+        response = await client.post(
+            "/api/files/upload",
+            data={"directory": "loose"},
+            files={"file": ("gc.pdf", BytesIO(content), "application/pdf")},
+            headers=admin_headers
+        )
+        uploaded = response.json()
+        record = await test_db_session.get(FileRecord, uploaded["id"])
+        record.status = "temp"
+        record.created_at = datetime.utcnow() - timedelta(hours=25)
+        await test_db_session.commit()
+        blob = file_service._blob_path(uploaded["file_hash"])
+        assert blob.exists()
+
+        response = await client.post("/api/files/gc", headers=operator_headers)
+        assert response.status_code == 403
+
+        response = await client.post("/api/files/gc", headers=admin_headers)
+        assert response.status_code == 200
+        assert response.json()["temp_deleted"] == 1
+        assert not blob.exists()
+        assert not (file_service.UPLOADS_DIR / uploaded["file_path"]).exists()
+
+
+def test_parse_range():
+    from app.services.file_response import parse_range
+
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=990-2000", 1000) == (990, 999)
+    # Ignorováno → celý soubor
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    assert parse_range("items=0-5", 1000) is None
+    assert parse_range("bytes=5-1", 1000) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=1000-", 1000)
@@ -0,0 +1,91 @@
+"""GESTIMA - Tests for shared InforAPIClient (token single-flight, 401 retry, metrics)"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.infor_api_client import (
+    InforAPIClient,
+    InforRequestMetrics,
+    close_shared_infor_clients,
+    get_shared_infor_client,
+)
+
+
+def _client_with_transport(handler) -> InforAPIClient:
+    client = InforAPIClient(base_url="https://infor.test", config="TEST", username="u", password="p")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+@pytest.mark.asyncio
+async def test_token_single_flight():
+    """Souběžné požadavky bez tokenu vyvolají jen jeden /json/token."""
+    token_calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal token_calls
+        if request.url.path.startswith("/json/token/"):
+            token_calls += 1
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"Token": "tok-1"})
+        return httpx.Response(200, json={"Items": [], "Bookmark": None})
+
+    client = _client_with_transport(handler)
+    tokens = await asyncio.gather(*(client.get_token() for _ in range(10)))
+
+    assert set(tokens) == {"tok-1"}
+    assert token_calls == 1
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_refreshed_on_401():
+    """401 s cached tokenem → nový token a jeden retry."""
+    issued = iter(["tok-old", "tok-new"])
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.startswith("/json/token/"):
+            return httpx.Response(200, json={"Token": next(issued)})
+        if request.headers.get("Authorization") != "tok-new":
+            return httpx.Response(401, json={"Message": "expired"})
+        return httpx.Response(200, json={"Items": [{"Item": "A"}], "Bookmark": None})
+
+    client = _client_with_transport(handler)
+    result = await client.load_collection("SLItems", properties=["Item"])
+
+    assert result["data"] == [{"Item": "A"}]
+    stats = client.metrics.snapshot()["SLItems"]
+    assert stats["requests"] == 2
+    assert stats["errors"] == 1
+    assert stats["pages"] == 1
+    assert stats["rows"] == 1
+    await client.close()
+
+
+def test_request_metrics_histogram():
+    metrics = InforRequestMetrics()
+    metrics.record_request("SLJobRoutes", 40, 1000)
+    metrics.record_request("SLJobRoutes", 300, 2000)
+    metrics.record_request("SLJobRoutes", 20000, 0, error=True)
+
+    stats = metrics.snapshot()["SLJobRoutes"]
+    assert stats["requests"] == 3
+    assert stats["errors"] == 1
+    assert stats["bytes"] == 3000
+    assert stats["latency_histogram"]["<=50ms"] == 1
+    assert stats["latency_histogram"]["<=500ms"] == 1
+    assert stats["latency_histogram"][">10000ms"] == 1
+
+
+@pytest.mark.asyncio
+async def test_shared_client_registry():
+    """Stejná konfigurace → stejná instance; shutdown registry vyprázdní."""
+    first = get_shared_infor_client("TEST")
+    assert get_shared_infor_client("TEST") is first
+    assert get_shared_infor_client("OTHER") is not first
+
+    await close_shared_infor_clients()
+    assert get_shared_infor_client("TEST") is not first
+    await close_shared_infor_clients()
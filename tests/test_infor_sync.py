@@ -6,7 +6,7 @@ and state management.
 
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -174,6 +174,46 @@ async def test_dispatch_production_no_matching_parts(db_session: AsyncSession):
     assert result["created_count"] == 0
 
 
+@pytest.mark.asyncio
+async def test_dispatch_production_skips_bad_row_and_syncs_rest(db_session: AsyncSession):
+    """Test one unmappable production row is reported without failing the others."""
+    from sqlalchemy import select
+    from app.models.production_record import ProductionRecord
+    from app.services.infor_production_importer import ProductionImporter
+    from app.services.infor_sync_dispatchers import dispatch_production
+
+    db_session.add(Part(
+        part_number="10000002", article_number="TEST-PROD-001",
+        name="Test Part", created_by="test",
+    ))
+    await db_session.commit()
+
+    rows = [
+        {"Job": "ORDER001", "JobItem": "TEST-PROD-001", "OperNum": "10", "JobQtyReleased": "50"},
+        {"Job": "ORDER001", "JobItem": "TEST-PROD-001", "OperNum": "20", "JobQtyReleased": "50"},
+        {"Job": "ORDER001", "JobItem": "TEST-PROD-001", "OperNum": "30", "JobQtyReleased": "50"},
+    ]
+    original_map_row = ProductionImporter.map_row
+
+    async def flaky_map_row(self, row, db):
+        if row["OperNum"] == "20":
+            raise ValueError("bad WC payload")
+        return await original_map_row(self, row, db)
+
+    with patch.object(ProductionImporter, "map_row", flaky_map_row):
+        result = await dispatch_production(rows, db_session)
+
+    assert result["created_count"] == 2
+    assert result["skipped_count"] == 1
+    assert len(result["errors"]) == 1
+    assert "bad WC payload" in result["errors"][0]
+
+    seqs = (await db_session.execute(
+        select(ProductionRecord.operation_seq).order_by(ProductionRecord.operation_seq)
+    )).scalars().all()
+    assert seqs == [10, 30]
+
+
 @pytest.mark.asyncio
 async def test_dispatch_material_inputs_no_matching_parts(db_session: AsyncSession):
     """Test material inputs dispatch skips rows for unknown article numbers."""
@@ -205,6 +245,170 @@ async def test_dispatch_documents_empty():
     assert result["created_count"] == 0
 
 
+def _route_row(**overrides):
+    row = {
+        "Job": "VP26-001",
+        "Suffix": "0",
+        "OperNum": "10",
+        "Wc": "SH2",
+        "JobStat": "R",
+        "JobQtyReleased": "50",
+        "QtyComplete": "0",
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.mark.asyncio
+async def test_dispatch_workshop_routes_skips_unchanged_rows(db_session: AsyncSession):
+    """Bulk upsert: second identical sync writes nothing, changed row is updated."""
+    from app.services.workshop_sync_dispatchers import dispatch_workshop_routes
+
+    rows = [_route_row(), _route_row(OperNum="20")]
+    first = await dispatch_workshop_routes(rows, db_session)
+    assert first["created_count"] == 2
+    assert first["updated_count"] == 0
+
+    second = await dispatch_workshop_routes(rows, db_session)
+    assert second["created_count"] == 0
+    assert second["updated_count"] == 0
+    assert second["unchanged_count"] == 2
+
+    third = await dispatch_workshop_routes([_route_row(QtyComplete="10"), _route_row(OperNum="20")], db_session)
+    assert third["updated_count"] == 1
+    assert third["unchanged_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dispatch_workshop_routes_soft_deletes_completed(db_session: AsyncSession):
+    """Completed job (JobStat='C') is soft-deleted, re-released job is restored."""
+    from sqlalchemy import select
+    from app.models.workshop_job_route import WorkshopJobRoute
+    from app.services.workshop_sync_dispatchers import dispatch_workshop_routes
+
+    await dispatch_workshop_routes([_route_row()], db_session)
+    await dispatch_workshop_routes([_route_row(JobStat="C")], db_session)
+
+    result = await db_session.execute(
+        select(WorkshopJobRoute.deleted_at, WorkshopJobRoute.deleted_by, WorkshopJobRoute.version)
+    )
+    deleted_at, deleted_by, version = result.one()
+    assert deleted_at is not None
+    assert deleted_by == "sync:completed"
+    assert version == 1
+
+    await dispatch_workshop_routes([_route_row(JobStat="R")], db_session)
+    result = await db_session.execute(select(WorkshopJobRoute.deleted_at))
+    assert result.scalar_one() is None
+
+
+@pytest.mark.asyncio
+async def test_dispatch_workshop_jbr_updates_only_changed_state(db_session: AsyncSession):
+    """JBR dispatch is update-only and writes only rows whose JBR state changed."""
+    from app.services.workshop_sync_dispatchers import dispatch_workshop_jbr, dispatch_workshop_routes
+
+    await dispatch_workshop_routes([_route_row(), _route_row(OperNum="20")], db_session)
+
+    jbr_rows = [
+        {"Job": "VP26-001", "Suffix": "0", "OperNum": "10", "State": "B"},
+        {"Job": "VP26-001", "Suffix": "0", "OperNum": "20", "State": None},
+        {"Job": "VP26-999", "Suffix": "0", "OperNum": "10", "State": "B"},
+    ]
+    result = await dispatch_workshop_jbr(jbr_rows, db_session)
+    assert result["created_count"] == 0
+    assert result["updated_count"] == 1
+    assert result["unchanged_count"] == 1
+    assert result["skipped_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dispatch_workshop_routes_maintains_completion_flag(db_session: AsyncSession):
+    """Route + JBR sync udržují odvozený is_completed a klíče řazení."""
+    from sqlalchemy import select
+    from app.models.workshop_job_route import WorkshopJobRoute
+    from app.services.workshop_sync_dispatchers import dispatch_workshop_jbr, dispatch_workshop_routes
+
+    await dispatch_workshop_routes([
+        _route_row(DerStartDate="2026-03-02 00:00:00.000"),
+        _route_row(OperNum="20"),
+        _route_row(OperNum="30", QtyComplete="50"),
+    ], db_session)
+
+    async def _state():
+        result = await db_session.execute(
+            select(
+                WorkshopJobRoute.oper_num, WorkshopJobRoute.is_completed,
+                WorkshopJobRoute.op_datum_st_key, WorkshopJobRoute.oper_num_key,
+            ).order_by(WorkshopJobRoute.oper_num)
+        )
+        return {row.oper_num: row for row in result.all()}
+
+    state = await _state()
+    assert [state[o].is_completed for o in ("10", "20", "30")] == [False, False, True]
+    assert state["10"].op_datum_st_key == "2026-03-02T00:00:00"
+    assert state["20"].op_datum_st_key == "\uffff"  # chybí datum → na konec
+    assert state["20"].oper_num_key == 20
+
+    # Stav z JBR dokončí operaci 20 bez změny množství
+    await dispatch_workshop_jbr([{"Job": "VP26-001", "Suffix": "0", "OperNum": "20", "State": "Dokonceno"}], db_session)
+    assert (await _state())["20"].is_completed is True
+
+    # Vrácené množství → znovu otevřená
+    await dispatch_workshop_routes([_route_row(OperNum="30", QtyComplete="10")], db_session)
+    assert (await _state())["30"].is_completed is False
+
+
+@pytest.mark.asyncio
+async def test_dispatch_job_transactions_bulk_upsert(db_session: AsyncSession):
+    """SLJobTrans upsert by trans_num, unchanged transactions are skipped."""
+    from app.services.workshop_sync_dispatchers import dispatch_job_transactions
+
+    rows = [
+        {"TransNum": "1001", "TransType": "R", "Job": "VP26-001", "OperNum": "10", "AHrs": "1.5"},
+        {"TransNum": "1002", "TransType": "S", "Job": "VP26-001", "OperNum": "10", "AHrs": "0.5"},
+    ]
+    first = await dispatch_job_transactions(rows, db_session)
+    assert first["created_count"] == 2
+
+    rows[1]["AHrs"] = "0.75"
+    second = await dispatch_job_transactions(rows, db_session)
+    assert second["created_count"] == 0
+    assert second["updated_count"] == 1
+    assert second["unchanged_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dispatch_workshop_materials_refreshes_unchanged_cache(db_session: AsyncSession):
+    """Nezměněné materiály z Inforu posunou synced_at, další prefetch je přeskočí."""
+    from sqlalchemy import select, update
+    from app.models.workshop_job_material_cache import WorkshopJobMaterialCache
+    from app.services.workshop_sync_dispatchers import dispatch_workshop_materials, dispatch_workshop_routes
+
+    await dispatch_workshop_routes([_route_row()], db_session)
+    materials = [{"Item": "MAT-1", "Qty": 2}]
+
+    with patch(
+        "app.services.workshop_service.fetch_job_materials",
+        new=AsyncMock(return_value=materials),
+    ) as fetch:
+        first = await dispatch_workshop_materials(db_session, client=object())
+        assert first["created_count"] == 1
+
+        stale = datetime.utcnow() - timedelta(hours=1)
+        await db_session.execute(update(WorkshopJobMaterialCache).values(synced_at=stale))
+        await db_session.commit()
+
+        second = await dispatch_workshop_materials(db_session, client=object())
+        assert second["created_count"] == 1
+        synced_at = (await db_session.execute(select(WorkshopJobMaterialCache.synced_at))).scalar_one()
+        assert synced_at > stale
+
+        third = await dispatch_workshop_materials(db_session, client=object())
+        assert third["created_count"] == 0
+        assert third["skipped_count"] == 1
+        assert fetch.await_count == 2
+
+
 @pytest.mark.asyncio
 async def test_service_start_stop():
     """Test sync service start/stop lifecycle."""
@@ -237,6 +441,110 @@ async def test_service_double_start():
     await service.stop()
 
 
+def test_backoff_seconds_grows_and_is_capped():
+    """Backoff: interval * 2^(n-1) s jitterem 50–100 %, strop 15 min."""
+    from app.services.infor_sync_service import _backoff_seconds
+
+    assert _backoff_seconds(60, 0) == 60
+    for failures, upper in ((1, 60), (2, 120), (3, 240), (10, 900)):
+        for _ in range(20):
+            delay = _backoff_seconds(60, failures)
+            assert upper / 2 <= delay <= upper
+
+
+def test_record_run_metrics_and_next_run():
+    """Úspěch resetuje chyby, chyba zvyšuje počítadlo, overrun se počítá."""
+    from types import SimpleNamespace
+
+    service = InforSyncService()
+    start = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    snapshot = {"step_name": "parts", "interval_seconds": 30, "consecutive_failures": 2, "overrun_count": 0}
+
+    step = SimpleNamespace()
+    service._record_run(step, snapshot, start, duration_ms=45_000, success=True)
+    assert step.consecutive_failures == 0
+    assert step.overrun_count == 1
+    assert step.last_duration_ms == 45_000
+    assert step.next_run_at == start + timedelta(seconds=30)
+
+    step = SimpleNamespace()
+    before = datetime.now(timezone.utc)
+    service._record_run(step, snapshot, start, duration_ms=100, success=False)
+    assert step.consecutive_failures == 3
+    assert not hasattr(step, "overrun_count")
+    # 3. chyba → backoff 60–120 s
+    assert before + timedelta(seconds=59) <= step.next_run_at <= datetime.now(timezone.utc) + timedelta(seconds=120)
+
+
+@pytest.mark.asyncio
+async def test_dispatch_due_runs_steps_concurrently_by_priority():
+    """Splatné kroky se spustí každý ve vlastním tasku, budoucí zůstanou ve frontě."""
+    import asyncio
+    import time
+
+    service = InforSyncService()
+    service._running = True
+    started = []
+    release = asyncio.Event()
+
+    async def fake_run_step(step_name):
+        started.append(step_name)
+        await release.wait()
+        service._running_steps.discard(step_name)
+
+    service._run_step = fake_run_step
+    now = time.monotonic()
+    service._schedule("parts", now - 1)
+    service._schedule("materials", now - 2)
+    service._schedule("documents", now + 3600)
+    service._schedule("parts", now - 0.5)  # přeplánováno → starý záznam se zahodí
+
+    service._dispatch_due()
+    await asyncio.sleep(0)
+    assert started == ["materials", "parts"]
+    assert set(service.running_steps) == {"materials", "parts"}
+    assert list(service._due) == ["documents"]
+
+    release.set()
+    await asyncio.gather(*service._step_tasks)
+    assert service.running_steps == []
+
+
+@pytest.mark.asyncio
+async def test_update_step_reschedules_queued_step(db_session: AsyncSession, monkeypatch):
+    """Změna intervalu přeplánuje krok ve frontě hned, vypnutí ho z fronty vyřadí."""
+    import time
+    from types import SimpleNamespace
+    from app.models.sync_state import SyncState, SyncStateUpdate
+    from app.routers import infor_sync_router
+
+    service = InforSyncService()
+    service._running = True
+    monkeypatch.setattr(infor_sync_router, "infor_sync_service", service)
+
+    last_sync = datetime.now(timezone.utc) - timedelta(seconds=30)
+    db_session.add(SyncState(
+        step_name="parts", ido_name="SLItems", properties="Item",
+        interval_seconds=3600, enabled=True, last_sync_at=last_sync,
+        next_run_at=last_sync + timedelta(seconds=3600),
+    ))
+    await db_session.commit()
+    service._schedule("parts", time.monotonic() + 3570)
+    admin = SimpleNamespace(username="admin")
+
+    await infor_sync_router.update_sync_step(
+        "parts", SyncStateUpdate(interval_seconds=60), db=db_session, current_user=admin,
+    )
+    assert service._due["parts"] - time.monotonic() == pytest.approx(30, abs=2)
+    service._dispatch_due()
+    assert service.running_steps == []  # stará položka (za hodinu) se nespustí, nová ještě není splatná
+
+    await infor_sync_router.update_sync_step(
+        "parts", SyncStateUpdate(enabled=False), db=db_session, current_user=admin,
+    )
+    assert "parts" not in service._due
+
+
 @pytest.mark.asyncio
 async def test_default_steps_config():
     """Test that DEFAULT_STEPS has all required steps."""
@@ -252,7 +560,8 @@ async def test_default_steps_config():
     assert "workshop_orders" in step_names
     assert "workshop_jbr" in step_names
     assert "job_transactions" in step_names
-    assert len(DEFAULT_STEPS) == 9
+    assert "purchase_po_items" in step_names
+    assert len(DEFAULT_STEPS) == 10
 
     # jobroutes_j replaces old production + workshop_routes
     assert "production" not in step_names
@@ -0,0 +1,101 @@
+"""GESTIMA - Tests for in-memory material norm index + MaterialParserService.parse_many"""
+
+import pytest
+
+from app.models.enums import StockShape
+from app.models.material_norm import MaterialNorm
+from app.services.material_norm_index import (
+    GroupEntry,
+    MaterialNormIndex,
+    NormEntry,
+    PriceCategoryEntry,
+    get_material_norm_index,
+)
+from app.services.material_parser import MaterialParserService
+
+
+def _index() -> MaterialNormIndex:
+    norms = [
+        NormEntry(id=3, w_nr="3.3547", en_iso="AW 5083", csn=None, aisi=None, material_group_id=20),
+        NormEntry(id=1, w_nr="1.0503", en_iso="C45", csn="12050", aisi="1045", material_group_id=10),
+        NormEntry(id=2, w_nr="1.0038", en_iso="S235JR", csn="11375", aisi=None, material_group_id=10),
+        NormEntry(id=4, w_nr="3.2315", en_iso="AW 6082", csn=None, aisi=None, material_group_id=20),
+    ]
+    groups = {
+        10: GroupEntry(id=10, code="OCEL", name="Ocel", density=7.85),
+        20: GroupEntry(id=20, code="AL", name="Hliník", density=2.7),
+    }
+    categories = {
+        5: PriceCategoryEntry(5, "OLD", "Stará", "ROUND_BAR", 10, 55.0),
+        6: PriceCategoryEntry(6, "OCEL-KR", "Ocel kruhová", "ROUND_BAR", 10, 49.4),
+        7: PriceCategoryEntry(7, "OCEL-KR2", "Ocel kruhová 2", "ROUND_BAR", 10, 40.0),
+    }
+    return MaterialNormIndex(norms, groups, categories, active_category_ids={6, 7})
+
+
+def test_exact_prefix_contains_lookup():
+    index = _index()
+
+    assert index.find_exact("C45").id == 1
+    assert index.find_exact("c45") is None  # exact je case-sensitive (jako SQL ==)
+    assert index.find_prefix("S235").id == 2
+    assert index.find_prefix("s235").id == 2  # prefix/contains jako LIKE (case-insensitive)
+    assert index.find_contains("5083").id == 3
+    assert index.find_contains("6082").id == 4
+    assert index.find_contains("99999") is None
+
+
+def test_lookup_respects_group_and_lowest_id():
+    index = _index()
+
+    # "AW " je v normách 3 i 4 → vyhrává nejnižší id
+    assert index.find_contains("AW ").id == 3
+    assert index.find_contains("5083", group_id=10) is None
+    assert index.find_exact("C45", group_id=10).id == 1
+    # krátký kód (< trigram) → lineární průchod
+    assert index.find_contains("45").id == 1
+
+
+def test_price_category_lookup():
+    index = _index()
+
+    # Smazaná kategorie (5) se nepoužije pro group+shape, ale je dostupná podle id
+    category = index.price_category_for(10, "ROUND_BAR")
+    assert category.id == 6
+    assert category.base_price_per_kg == 49.4
+    assert index.price_category(5).code == "OLD"
+    assert index.price_category_for(10, "PLATE") is None
+    assert index.group(20).density == 2.7
+
+
+@pytest.mark.asyncio
+async def test_parse_many_matches_parse(db_session):
+    """parse_many vrací stejné výsledky jako parse, ve stejném pořadí."""
+    parser = MaterialParserService(db_session)
+    descriptions = ["D20 C45 100", "20x30 S235 500", "D20 C45 100", "D50"]
+
+    batch = await parser.parse_many(descriptions)
+    single = [await MaterialParserService(db_session).parse(d) for d in descriptions]
+
+    assert [r.model_dump() for r in batch] == [r.model_dump() for r in single]
+    # Duplicitní vstupy jsou nezávislé kopie
+    assert batch[0] is not batch[2]
+
+
+@pytest.mark.asyncio
+async def test_index_sees_committed_norm(db_session):
+    """Commit nové normy zahodí cachovaný index."""
+    group = db_session.test_material_group
+    before = await get_material_norm_index(db_session)
+    assert before.find_exact("11SMN30") is None
+
+    db_session.add(MaterialNorm(w_nr="1.0715", en_iso="11SMN30", material_group_id=group.id, created_by="test"))
+    await db_session.commit()
+
+    after = await get_material_norm_index(db_session)
+    assert after is not before
+    assert after.find_exact("11SMN30").material_group_id == group.id
+
+    result = await MaterialParserService(db_session).parse("D50 11SMn30")
+    assert result.suggested_material_group_id == group.id
+    assert result.shape == StockShape.ROUND_BAR
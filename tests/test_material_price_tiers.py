@@ -221,6 +221,67 @@ async def test_batch_pricing_with_tiers(db_session):
     assert cost_500.price_per_kg == 26.3
 
 
+@pytest.mark.asyncio
+async def test_part_material_cost_selects_tiers_in_one_bulk_lookup(db_session, monkeypatch):
+    """Více MaterialInputs dílu → tiers jedním voláním find_price_tiers (bez eager tiers)."""
+    from app.services import price_calculator
+
+    group = MaterialGroup(code="TEST-BULK", name="Test ocel", density=7.85, created_by="test")
+    db_session.add(group)
+    await db_session.flush()
+    category = MaterialPriceCategory(
+        code="TEST-BULK", name="Test bulk", material_group_id=group.id, created_by="test"
+    )
+    db_session.add(category)
+    await db_session.flush()
+    for min_weight, max_weight, price in ((0, 15, 49.4), (15, None, 34.5)):
+        db_session.add(MaterialPriceTier(
+            price_category_id=category.id, min_weight=min_weight, max_weight=max_weight,
+            price_per_kg=price, created_by="test",
+        ))
+    part = Part(part_number="TEST-BULK", name="Test díl", created_by="test")
+    db_session.add(part)
+    await db_session.flush()
+    # D20×100 ≈ 0.25 kg, D40×100 ≈ 0.99 kg za kus
+    for seq, diameter in ((1, 20.0), (2, 40.0)):
+        db_session.add(MaterialInput(
+            part_id=part.id, seq=seq, price_category_id=category.id,
+            stock_shape=StockShape.ROUND_BAR, stock_diameter=diameter, stock_length=100.0,
+            quantity=1, created_by="test",
+        ))
+    await db_session.flush()
+
+    result = await db_session.execute(
+        select(Part)
+        .options(
+            selectinload(Part.material_inputs).selectinload(MaterialInput.material_item),
+            selectinload(Part.material_inputs)
+            .selectinload(MaterialInput.price_category)
+            .selectinload(MaterialPriceCategory.material_group),
+        )
+        .where(Part.id == part.id)
+    )
+    part = result.scalar_one()
+
+    calls = []
+    original = price_calculator.find_price_tiers
+
+    async def spy(category_ids, weights, db):
+        calls.append(list(category_ids))
+        return await original(category_ids, weights, db)
+
+    monkeypatch.setattr(price_calculator, "find_price_tiers", spy)
+
+    # 10 ks: 2.5 kg a 9.9 kg → malý tier pro oba vstupy
+    cost_10 = await price_calculator.calculate_part_material_cost(part, quantity=10, db=db_session)
+    # 20 ks: 4.9 kg → malý tier, 19.7 kg → velký tier
+    costs_20 = await price_calculator.calculate_material_input_costs(part.material_inputs, 20, db_session)
+
+    assert calls == [[category.id, category.id], [category.id, category.id]]
+    assert cost_10.price_per_kg == 49.4
+    assert [c.price_per_kg for c in costs_20] == [49.4, 34.5]
+
+
 @pytest.mark.asyncio
 async def test_tier_with_single_flat_price(db_session):
     """Kategorie s jedním tier (flat price) - např. OCEL-DESKY"""
@@ -280,3 +341,64 @@ async def test_no_valid_tier_returns_zero(db_session):
     # Test: 5 kg has no valid tier (min_weight=10)
     price = await get_price_per_kg_for_weight(category, 5.0, db_session)
     assert price == 0  # Error case
+
+
+def _context_with_tiers():
+    """PricingContext bez DB: 1 strojní operace + 1 materiál s tiers 0/15/100 kg."""
+    from app.services.price_calculator import (
+        PricingContext,
+        _MachineOperationRates,
+        _MaterialInputPricing,
+    )
+
+    return PricingContext(
+        coefficients={
+            "overhead_coefficient": 1.2,
+            "margin_coefficient": 1.25,
+            "stock_coefficient": 1.15,
+            "coop_coefficient": 1.1,
+        },
+        machine_operations=[
+            _MachineOperationRates(
+                setup_time_min=30, operation_time_min=6, ko=1.0,
+                eff_setup_hours=0.5, eff_op_hours=0.1,
+                amortization=400, labor=500, tools=100, overhead=100,
+            )
+        ],
+        material_inputs=[
+            _MaterialInputPricing(
+                volume_mm3=0, weight_kg_per_part=1.0, weight_source="catalog", density=7.85,
+                category_code="OCEL-KRUH",
+                tier_min_weights=[0, 15, 100], tier_prices=[49.4, 34.5, 26.3],
+            )
+        ],
+    )
+
+
+def test_pricing_context_series_uses_tier_per_quantity():
+    """price_series = price() per množství; tier se vybírá podle váhy série."""
+    context = _context_with_tiers()
+    series = context.price_series([1, 20, 200])
+
+    assert [b.material_price_per_kg for b in series] == [49.4, 34.5, 26.3]
+    assert [b.quantity for b in series] == [1, 20, 200]
+    # Setup se rozkládá → cena/ks klesá
+    assert series[0].cost_per_piece > series[1].cost_per_piece > series[2].cost_per_piece
+    # Setup: 0.5 h × (400 + 500 + 100); operace: 0.1 h × 1100 × qty
+    assert series[1].machine_setup_cost == pytest.approx(500.0)
+    assert series[1].machine_operation_cost == pytest.approx(20 * 110.0)
+    for breakdown in series:
+        single = context.price(breakdown.quantity)
+        assert single.total_cost == breakdown.total_cost
+
+
+def test_material_input_pricing_tier_below_minimum():
+    """Bez tieru s min_weight <= váha → cena 0 (jako get_price_per_kg_for_weight)."""
+    from app.services.price_calculator import _MaterialInputPricing
+
+    pricing = _MaterialInputPricing(
+        volume_mm3=0, weight_kg_per_part=1.0, weight_source="catalog", density=7.85,
+        category_code="X", tier_min_weights=[10], tier_prices=[30.0],
+    )
+    assert pricing.cost_for_quantity(5).price_per_kg == 0
+    assert pricing.cost_for_quantity(10).price_per_kg == 30.0
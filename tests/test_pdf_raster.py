@@ -0,0 +1,112 @@
+"""GESTIMA - Tests for shared PDF raster cache (pdf_raster)"""
+
+import fitz
+import pytest
+
+from app.config import settings
+from app.services import pdf_raster
+from app.services.ft_debug_service import _pdf_to_base64
+from app.services.openai_vision_service import _pdf_to_base64_image
+from app.services.pdf_raster import RasterCache
+
+
+def _pdf(pages: int = 1) -> bytes:
+    doc = fitz.open()
+    for _ in range(pages):
+        doc.new_page(width=200, height=100)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def raster_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RASTER_CACHE_DIR", tmp_path / "raster")
+    monkeypatch.setattr(settings, "RASTER_CACHE_MAX_MB", 16)
+    monkeypatch.setattr(settings, "PDF_RASTER_WORKERS", 0)
+    return pdf_raster.get_raster_cache()
+
+
+def _forbid_render(monkeypatch):
+    def _fail(*args, **kwargs):
+        raise AssertionError("page rendered again")
+    monkeypatch.setattr(pdf_raster, "render_pdf_pages", _fail)
+
+
+@pytest.mark.asyncio
+async def test_vision_paths_share_rendered_page(raster_cache, tmp_path, monkeypatch):
+    pdf_path = tmp_path / "vykres.pdf"
+    pdf_path.write_bytes(_pdf())
+
+    estimate_image = _pdf_to_base64_image(str(pdf_path))
+
+    # Export trénovacích dat i parsování poptávky (kopie souboru = stejný obsah) → cache hit
+    _forbid_render(monkeypatch)
+    copy_path = tmp_path / "kopie.pdf"
+    copy_path.write_bytes(pdf_path.read_bytes())
+    assert _pdf_to_base64(copy_path) == estimate_image
+    assert await pdf_raster.rasterize_pdf(pdf_path.read_bytes()) == [estimate_image]
+
+    # Jiné DPI = jiný klíč
+    with pytest.raises(RuntimeError, match="rendered again"):
+        _pdf_to_base64_image(str(pdf_path), dpi=150)
+
+
+@pytest.mark.asyncio
+async def test_page_count_is_cached_for_multi_page_requests(raster_cache, monkeypatch):
+    pdf_bytes = _pdf(pages=2)
+    first = await pdf_raster.rasterize_pdf(pdf_bytes, max_pages=5, dpi=72)
+    assert len(first) == 2
+
+    _forbid_render(monkeypatch)
+    assert await pdf_raster.rasterize_pdf(pdf_bytes, max_pages=5, dpi=72) == first
+    assert pdf_raster.rasterize_pdf_sync(pdf_bytes, max_pages=1, dpi=72) == first[:1]
+
+
+def test_lru_eviction_by_size(tmp_path):
+    cache = RasterCache(tmp_path, max_bytes=250)
+    cache.put("aa01", b"a" * 100)
+    cache.put("bb02", b"b" * 100)
+    assert cache.get("aa01") == b"a" * 100  # aa01 je teď nejčerstvější
+
+    cache.put("cc03", b"c" * 100)
+    assert cache.get("bb02") is None
+    assert not (tmp_path / "bb" / "bb02.bin").exists()
+    assert cache.size_bytes == 200
+
+    # Nová instance (restart) načte index z disku
+    reloaded = RasterCache(tmp_path, max_bytes=250)
+    assert reloaded.size_bytes == 200
+    assert reloaded.get("cc03") == b"c" * 100
+
+
+def test_workers_sharing_cache_dir_see_each_others_entries(tmp_path, monkeypatch):
+    worker_a = RasterCache(tmp_path, max_bytes=250)
+    worker_b = RasterCache(tmp_path, max_bytes=250)
+    assert worker_a.size_bytes == worker_b.size_bytes == 0  # oba indexy načtené (prázdné)
+
+    worker_a.put("aa01", b"a" * 100)
+    worker_a.put("bb02", b"b" * 100)
+    # Index B o souboru neví → najde ho na disku a převezme
+    assert worker_b.get("aa01") == b"a" * 100
+    assert worker_b.size_bytes == 100
+
+    # Na disku je B přes limit jen díky souborům A → přenačtení disku, smaže nejstarší (bb02)
+    monkeypatch.setattr(pdf_raster, "_CACHE_RESCAN_INTERVAL_S", 0.0)
+    worker_b.put("cc03", b"c" * 100)
+    assert not (tmp_path / "bb" / "bb02.bin").exists()
+    assert worker_b.size_bytes == 200
+    assert worker_a.get("bb02") is None and worker_a.get("cc03") == b"c" * 100
+
+
+def test_get_returns_data_evicted_between_read_and_touch(tmp_path, monkeypatch):
+    cache = RasterCache(tmp_path, max_bytes=250)
+    cache.put("aa01", b"a" * 100)
+
+    def _evicted(path):
+        path.unlink()
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(RasterCache, "_touch", staticmethod(_evicted))
+    assert cache.get("aa01") == b"a" * 100
+    assert cache.hits == 1 and cache.misses == 0
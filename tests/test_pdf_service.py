@@ -0,0 +1,94 @@
+"""GESTIMA - Tests for quote PDF service (cache vyrenderovaných PDF)"""
+
+import asyncio
+
+import pytest
+
+from app.services import pdf_service
+
+
+@pytest.fixture
+def fake_renderer(monkeypatch):
+    """Render bez Chrome: HTML → bajty, počítá volání."""
+    calls = []
+
+    async def _render(html: str) -> bytes:
+        calls.append(html)
+        await asyncio.sleep(0.01)
+        return b"%PDF-" + html.encode()
+
+    monkeypatch.setattr(pdf_service, "_render_pdf", _render)
+    monkeypatch.setattr(pdf_service, "_render_html", lambda quote, partner, items: f"<h1>{quote}</h1>")
+    monkeypatch.setattr(pdf_service.settings, "PDF_CACHE_SIZE", 2)
+    pdf_service.clear_pdf_cache()
+    yield calls
+    pdf_service.clear_pdf_cache()
+
+
+@pytest.mark.asyncio
+async def test_unchanged_quote_is_served_from_cache(fake_renderer):
+    first, second = await asyncio.gather(
+        pdf_service.generate_quote_pdf("N-1", None, []),
+        pdf_service.generate_quote_pdf("N-1", None, []),
+    )
+    assert first == second == b"%PDF-<h1>N-1</h1>"
+    assert len(fake_renderer) == 1  # souběžná stažení → jeden render
+
+    await pdf_service.generate_quote_pdf("N-1", None, [])
+    assert len(fake_renderer) == 1
+
+    # Změněný obsah → nový render; LRU drží PDF_CACHE_SIZE položek
+    await pdf_service.generate_quote_pdf("N-2", None, [])
+    await pdf_service.generate_quote_pdf("N-3", None, [])
+    assert len(fake_renderer) == 3
+    await pdf_service.generate_quote_pdf("N-1", None, [])
+    assert len(fake_renderer) == 4
+
+
+def test_cache_key_depends_on_html_and_render_revision(monkeypatch):
+    key = pdf_service._pdf_cache_key("<p>a</p>")
+    assert key == pdf_service._pdf_cache_key("<p>a</p>")
+    assert key != pdf_service._pdf_cache_key("<p>b</p>")
+    monkeypatch.setattr(pdf_service, "_RENDER_REV", "test")
+    assert key != pdf_service._pdf_cache_key("<p>a</p>")
+
+
+_FAKE_CHROME = '''
+import json, os
+inp, out = os.fdopen(3, "rb", 0), os.fdopen(4, "wb", 0)
+buf = b""
+while True:
+    chunk = inp.read(4096)
+    if not chunk:
+        break
+    buf += chunk
+    while b"\\0" in buf:
+        raw, buf = buf.split(b"\\0", 1)
+        msg = json.loads(raw)
+        result = {"product": f"FakeChrome sid={os.getsid(0)} pid={os.getpid()}"}
+        out.write(json.dumps({"id": msg["id"], "result": result}).encode() + b"\\0")
+        if msg["method"] == "Browser.close":
+            raise SystemExit(0)
+'''
+
+
+@pytest.mark.asyncio
+async def test_chrome_renderer_pipes_on_fd_3_and_4_in_own_session(tmp_path):
+    """DevTools pipe na fd 3/4 bez preexec_fn; Chrome ve vlastní session."""
+    import os
+    import sys
+
+    fake = tmp_path / "chrome"
+    fake.write_text(f"#!{sys.executable}\n{_FAKE_CHROME}")
+    fake.chmod(0o755)
+
+    renderer = pdf_service.ChromeRenderer(str(fake))
+    await renderer.start()
+    try:
+        product = (await renderer.send("Browser.getVersion", timeout=5))["product"]
+        sid, pid = (int(part.split("=")[1]) for part in product.split()[1:])
+        assert pid == renderer._proc.pid
+        assert sid == pid != os.getsid(0)
+    finally:
+        await renderer.close()
+    assert renderer._proc.returncode == 0
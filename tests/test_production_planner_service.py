@@ -683,6 +683,92 @@ def test_schedule_correct_duration_from_pcs_per_hour():
     assert ops[0]["sched_end"] == datetime(2026, 3, 2, 12, 30).isoformat()
 
 
+# ============================================================================
+# PlannerSchedule — inkrementalni preplanovani
+# ============================================================================
+
+
+def _random_vps(rng, count=40):
+    wcs = ["SH2A", "FR1B", "BRU", "PS", "FV3"]
+    vps = []
+    for i in range(count):
+        ops = []
+        for n in range(rng.randint(1, 4)):
+            status = "in_progress" if n == 0 and rng.random() < 0.15 else "idle"
+            ops.append(_make_op(
+                (n + 1) * 10, rng.choice(wcs), status=status,
+                setup_hrs=rng.choice([0, 0.5, 1.0]),
+                pcs_per_hour=rng.choice([10.0, 20.0, 50.0]),
+                qty_released=rng.choice([20, 100, 250]),
+            ))
+        vps.append(_make_vp(
+            f"22VP{i:03d}", "0", ops,
+            priority=rng.choice([20, 50, 100]),
+            co_due_date=f"2026-03-{rng.randint(2, 28):02d}",
+        ))
+    vps.sort(key=production_planner_service._vp_sort_key)
+    return vps
+
+
+def _op_times(vps):
+    return {
+        (vp["job"], op["oper_num"]): (op.get("sched_start"), op.get("sched_end"))
+        for vp in vps
+        for op in vp["operations"]
+    }
+
+
+def test_incremental_reschedule_matches_full():
+    """update_vp dava stejny plan jako kompletni prepocet."""
+    import copy
+    import random
+
+    rng = random.Random(7)
+    now = datetime(2026, 3, 2, 7, 0)
+    vps = _random_vps(rng)
+    schedule = production_planner_service.PlannerSchedule(vps, now=now)
+
+    for _ in range(25):
+        vp = rng.choice(vps)
+        tier = rng.choice(["hot", "urgent", "normal"])
+        priority, is_hot = production_planner_service.TIER_PRIORITY_MAP[tier]
+        delta = schedule.update_vp(vp["job"], vp["suffix"], priority, is_hot)
+        assert delta["base_version"] < delta["version"]
+
+        expected = copy.deepcopy(vps)
+        order = {v["job"]: i for i, v in enumerate(vps)}
+        expected.sort(key=lambda v: (production_planner_service._vp_sort_key(v), order[v["job"]]))
+        production_planner_service.PlannerSchedule(expected, now=now)
+
+        assert [j for j, _ in delta["vp_order"]] == [v["job"] for v in expected]
+        assert _op_times(vps) == _op_times(expected)
+
+
+def test_incremental_reschedule_delta_only_affected_lanes():
+    """Zmena tieru VP na jednom WC nemeni lanes ostatnich WC."""
+    now = datetime(2026, 3, 2, 7, 0)
+    vps = [
+        _make_vp("22VP10", "0", [_make_op(10, "SH2A"), _make_op(20, "FR1B")], priority=50),
+        _make_vp("22VP20", "0", [_make_op(10, "SH2A")], priority=100),
+        _make_vp("22VP30", "0", [_make_op(10, "BRU")], priority=100),
+    ]
+    schedule = production_planner_service.PlannerSchedule(vps, now=now)
+    bru_before = vps[2]["operations"][0]["sched_start"]
+
+    delta = schedule.update_vp("22vp20", "0", 5, True)
+
+    assert {lane["wc"] for lane in delta["wc_lanes"]} == {"SH2A", "FR1B"}
+    assert {vp["job"] for vp in delta["vps"]} == {"22VP10", "22VP20"}
+    assert delta["vp_order"][0] == ["22VP20", "0"]
+    assert delta["vps"][0]["tier"] == "hot"
+    # VP20 (hot) ted jde na SH2A prvni
+    sh2a = next(lane for lane in delta["wc_lanes"] if lane["wc"] == "SH2A")
+    assert sh2a["ops"][0]["job"] == "22VP20"
+    assert vps[2]["operations"][0]["sched_start"] == bru_before
+
+    assert schedule.update_vp("UNKNOWN", "0", 5, True) is None
+
+
 @pytest.mark.asyncio
 async def test_fetch_includes_wc_lanes(db):
     """fetch_planner_data returns wc_lanes key."""
@@ -827,3 +913,31 @@ async def test_fetch_planner_data_tier_hot(db):
         result = await production_planner_service.fetch_planner_data(db, AsyncMock())
 
     assert result["vps"][0]["tier"] == "hot"
+
+
+@pytest.mark.asyncio
+async def test_incremental_reschedule_only_with_memory_event_bus(db, monkeypatch):
+    """S vice workery (sqlite event bus) se plan nedrzi v pameti a delta se neposila."""
+    from app.config import settings
+
+    rows = [_infor_row(job="22VP10", oper="10", wc="SH2A"), _infor_row(job="22VP20", oper="10", wc="SH2A")]
+    monkeypatch.setattr(settings, "EVENT_BUS_BACKEND", "sqlite")
+    with patch.object(production_planner_service.workshop_service, "fetch_machine_plan", new_callable=AsyncMock) as mock_fetch, \
+            patch("app.services.event_bus.broadcast") as mock_broadcast:
+        mock_fetch.return_value = rows
+        result = await production_planner_service.fetch_planner_data(db, AsyncMock())
+        assert result["version"] is None
+        assert production_planner_service._schedule is None
+
+        await production_planner_service.set_tier(db, "22VP20", "250", "hot", "tester")
+        assert [c.args[0] for c in mock_broadcast.call_args_list] == ["tier_change"]
+
+    monkeypatch.setattr(settings, "EVENT_BUS_BACKEND", "memory")
+    with patch.object(production_planner_service.workshop_service, "fetch_machine_plan", new_callable=AsyncMock) as mock_fetch, \
+            patch("app.services.event_bus.broadcast") as mock_broadcast:
+        mock_fetch.return_value = rows
+        result = await production_planner_service.fetch_planner_data(db, AsyncMock())
+        assert result["version"] is not None
+
+        await production_planner_service.set_tier(db, "22VP10", "250", "hot", "tester")
+        assert [c.args[0] for c in mock_broadcast.call_args_list] == ["tier_change", "planner_schedule_delta"]
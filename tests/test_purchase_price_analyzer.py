@@ -0,0 +1,127 @@
+"""GESTIMA - Tests for PurchasePriceAnalyzer (lokální PO řádky, kvartální agregát, numpy pásma)"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app.models.material import MaterialGroup, MaterialPriceCategory
+from app.models.material_norm import MaterialNorm
+from app.models.purchase_po_line import PurchasePriceQuarter
+from app.services.purchase_price_analyzer import PurchasePriceAnalyzer
+
+
+class FakeInforClient:
+    """SLPoItems podle filtru: backfill (PoOrderDate) vs delta (RecordDate)."""
+
+    def __init__(self, year_rows, delta_rows=None):
+        self.year_rows = year_rows
+        self.delta_rows = delta_rows or []
+        self.filters = []
+
+    async def load_collection(self, ido_name, properties, filter, **kwargs):
+        self.filters.append(filter)
+        rows = self.delta_rows if "RecordDate" in filter else self.year_rows
+        return {"data": rows, "bookmark": None, "has_more": False}
+
+
+def _po(po_num, qty, cost, date="20250210 00:00:00.000", item="1.0715-KR020-T", vendor="Ferona"):
+    return {
+        "PoNum": po_num, "PoLine": "1", "Item": item, "Description": "tyč kruhová",
+        "QtyReceived": qty, "DerTotalRcvdCost": cost, "PoOrderDate": date,
+        "VenadrName": vendor, "PoVendNum": "V1", "RecordDate": date,
+    }
+
+
+async def _setup_category(db_session):
+    group = (await db_session.execute(select(MaterialGroup))).scalars().first()
+    category = (await db_session.execute(
+        select(MaterialPriceCategory).where(MaterialPriceCategory.code == "TEST-OCEL")
+    )).scalar_one()
+    category.material_group_id = group.id
+    category.shape = "round_bar"
+    db_session.add(MaterialNorm(w_nr="1.0715", material_group_id=group.id, created_by="test"))
+    await db_session.commit()
+    return category
+
+
+@pytest.mark.asyncio
+async def test_analysis_is_local_after_backfill(db_session):
+    category = await _setup_category(db_session)
+    client = FakeInforClient([
+        _po("P1", 10, 500),                              # pásmo 0-15
+        _po("P2", 20, 800, date="20250520 00:00:00.000"),  # pásmo 15-100, Q2
+        _po("P3", 200, 5200),                            # pásmo 100-∞
+        _po("P4", 5, 300, item="9.9999-XX"),             # bez W.Nr
+        _po("P5", 0, 100),                               # nulové množství
+    ])
+
+    first = await PurchasePriceAnalyzer(client, db_session).analyze(2025)
+    assert not first.cached and len(client.filters) == 1
+    assert first.total_po_lines_fetched == 5
+    assert first.total_po_lines_matched == 3 and first.total_po_lines_unmatched == 1
+    assert first.unmatched[0].item == "9.9999-XX"
+
+    cat = first.categories[0]
+    assert cat.price_category_id == category.id and cat.total_po_lines == 3
+    assert cat.weighted_avg_price_per_kg == pytest.approx(6500 / 230, abs=0.01)
+    assert cat.quarterly_prices == {"2025-Q1": round(5700 / 210, 2), "2025-Q2": 40.0}
+    assert [t.po_line_count for t in cat.tiers] == [1, 1, 1]
+    assert cat.top_vendors == ["Ferona"]
+
+    # Znovuotevření = lokální dotaz (watermark čerstvý)
+    second = await PurchasePriceAnalyzer(client, db_session).analyze(2025)
+    assert second.cached and len(client.filters) == 1
+    assert second.categories[0].total_cost_czk == cat.total_cost_czk
+
+
+@pytest.mark.asyncio
+async def test_delta_sync_updates_quarter_aggregate(db_session):
+    category = await _setup_category(db_session)
+    client = FakeInforClient([_po("P1", 10, 500)])
+    analyzer = PurchasePriceAnalyzer(client, db_session)
+    await analyzer.sync(2025, 2025)
+
+    # Řádek P1 dostal další příjem, P2 je nový — delta přes RecordDate
+    client.delta_rows = [_po("P1", 20, 1000), _po("P2", 10, 700, date="20250701 00:00:00.000")]
+    assert await analyzer.sync(2025, 2025, force=True) is False
+    assert "RecordDate >=" in client.filters[-1]
+
+    quarters = {
+        q.quarter: q for q in (await db_session.execute(
+            select(PurchasePriceQuarter).where(PurchasePriceQuarter.price_category_id == category.id)
+        )).scalars()
+    }
+    assert quarters["2025-Q1"].po_lines == 1 and quarters["2025-Q1"].qty_received == 20
+    assert quarters["2025-Q3"].total_cost == 700 and quarters["2025-Q3"].max_unit_price == 70
+
+
+def test_vectorized_tiers_and_percentiles_match_reference():
+    rng = np.random.default_rng(7)
+    qtys = rng.uniform(0.5, 400, 57).round(2)
+    costs = (qtys * rng.uniform(20, 60, 57)).round(2)
+    prices = costs / qtys
+    tiers = [
+        SimpleNamespace(id=i + 1, min_weight=lo, max_weight=hi, price_per_kg=30.0, version=0)
+        for i, (lo, hi) in enumerate([(0, 15), (15, 100), (100, None)])
+    ]
+
+    result = PurchasePriceAnalyzer._analyze_tiers(qtys, costs, prices, tiers)
+    for tier, analysis in zip(tiers, result):
+        inside = [i for i, q in enumerate(qtys) if q >= tier.min_weight and (tier.max_weight is None or q < tier.max_weight)]
+        assert analysis.po_line_count == len(inside)
+        assert analysis.total_cost_czk == round(sum(costs[i] for i in inside), 2)
+        assert analysis.max_price == round(max(prices[i] for i in inside), 2)
+
+    # Percentil = lineární interpolace nad seřazenými hodnotami (původní výpočet)
+    ordered = sorted(qtys.tolist())
+
+    def reference(pct):
+        k = (len(ordered) - 1) * pct / 100.0
+        f = int(k)
+        return ordered[f] + (k - f) * (ordered[f + 1] - ordered[f])
+
+    dist = PurchasePriceAnalyzer._compute_distribution(qtys, tiers)
+    assert (dist.p25, dist.p50, dist.p75) == tuple(round(reference(p), 2) for p in (25, 50, 75))
+    assert dist.sample_count == 57 and len(dist.suggested_boundaries) <= 2
@@ -0,0 +1,147 @@
+"""GESTIMA - Tests for AI quote request parsing pipeline (lokální fake OpenAI HTTP server)"""
+
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import fitz
+import pytest
+
+from app.config import settings
+from app.services import event_bus, pdf_raster
+from app.services.quote_request_parser import parse_quote_request_v2
+
+
+class FakeOpenAIServer:
+    """Minimální /v1/chat/completions — odpověď podle system promptu, měří souběh."""
+
+    def __init__(self, delay: float = 0.3):
+        self.delay = delay
+        self.inflight = 0
+        self.max_inflight = 0
+        self.requests = []
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with fake._lock:
+                    fake.requests.append(body)
+                    fake.inflight += 1
+                    fake.max_inflight = max(fake.max_inflight, fake.inflight)
+                time.sleep(fake.delay)
+                with fake._lock:
+                    fake.inflight -= 1
+
+                if "poptavkovych" in body["messages"][0]["content"]:
+                    content = {
+                        "customer": {"company_name": "Acme s.r.o.", "ico": None},
+                        "items": [{"article_number": "0561716", "name": "Hridel", "quantity": 10}],
+                        "customer_request_number": "RFQ-1",
+                    }
+                else:
+                    content = {"drawing_number": "0561716", "estimated_time_min": 12.5, "confidence": "high"}
+                payload = json.dumps({
+                    "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": body["model"],
+                    "choices": [{
+                        "index": 0, "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": json.dumps(content)},
+                    }],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _pdf(pages: int = 1) -> bytes:
+    doc = fitz.open()
+    for _ in range(pages):
+        doc.new_page(width=200, height=100)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    with FakeOpenAIServer() as server:
+        monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+        monkeypatch.setattr(settings, "OPENAI_BASE_URL", server.url)
+        monkeypatch.setattr(settings, "QUOTE_PARSE_AI_CONCURRENCY", 2)
+        monkeypatch.setattr(settings, "PDF_RASTER_WORKERS", 0)
+        yield server
+
+
+@pytest.mark.asyncio
+async def test_parse_runs_ai_calls_concurrently_and_streams_progress(db_session, fake_openai):
+    drawings = {f"0561716_{i}.pdf": _pdf() for i in range(3)}
+    drawings["broken.pdf"] = b"not a pdf"
+
+    sub = event_bus.subscribe({"quote_parse_progress", "quote_parse_done"}, user_id=7)
+    foreign = event_bus.subscribe({"quote_parse_progress", "quote_parse_done"}, user_id=8)
+    try:
+        review = await parse_quote_request_v2(
+            {"rfq.pdf": _pdf(pages=2)}, drawings, db_session, job_id="job-1", user_id=7,
+        )
+    finally:
+        event_bus.unsubscribe(sub)
+        event_bus.unsubscribe(foreign)
+
+    # 1 poptávka + 3 výkresy → 4 volání, nikdy víc než limit najednou
+    assert len(fake_openai.requests) == 4
+    assert fake_openai.max_inflight == 2
+    request_call = next(r for r in fake_openai.requests if r["model"] == "gpt-4.1" and len(r["messages"][1]["content"]) == 3)
+    assert request_call["max_tokens"] == 4000  # 2 stránky + text v jednom volání
+
+    assert review.customer.company_name == "Acme s.r.o."
+    assert [a.filename for a in review.drawing_analyses] == list(drawings)
+    assert [a.confidence for a in review.drawing_analyses] == [0.9, 0.9, 0.9, 0.0]
+    assert review.drawing_matches[0].item_index == 0
+
+    events = []
+    while not sub.queue.empty():
+        events.append(sub.queue.get_nowait().msg)
+    assert all(e["job_id"] == "job-1" and e["user_id"] == 7 for e in events)
+    assert foreign.queue.empty()  # analýzy výkresů nevidí jiný uživatel
+    assert events[0]["status"] == "started" and events[0]["total"] == 5
+    per_file = [e for e in events if e["type"] == "quote_parse_progress" and "filename" in e]
+    assert [e["completed"] for e in per_file] == [1, 2, 3, 4, 5]
+    assert per_file[0]["filename"] == "broken.pdf" and per_file[0]["status"] == "error"
+    done_drawing = next(e for e in per_file if e["kind"] == "drawing" and e["status"] == "done")
+    assert done_drawing["analysis"]["drawing_number"] == "0561716"
+    assert events[-1]["type"] == "quote_parse_done" and events[-1]["status"] == "ok"
+
+
+@pytest.mark.asyncio
+async def test_rasterize_in_process_pool(monkeypatch):
+    monkeypatch.setattr(settings, "PDF_RASTER_WORKERS", 1)
+    try:
+        images = await pdf_raster.rasterize_pdf(_pdf(pages=3), max_pages=2, dpi=72)
+        page_count, pngs = pdf_raster.render_pdf_pages(_pdf(pages=3), [0, 1], dpi=72)
+        assert page_count == 3
+        assert images == [base64.b64encode(png).decode() for png in pngs]
+
+        with pytest.raises(RuntimeError, match="Failed to open PDF"):
+            await pdf_raster.rasterize_pdf(b"not a pdf")
+    finally:
+        await pdf_raster.close_raster_pool()
@@ -1,7 +1,7 @@
 """Tests for TimeVision backend implementation"""
 
 import pytest
-from unittest.mock import Mock, patch, AsyncMock
+from unittest.mock import Mock, MagicMock, patch, AsyncMock
 from app.models.time_vision import (
     TimeVisionEstimation,
     VisionExtractionResult,
@@ -348,8 +348,9 @@ class TestOpenAIVisionService:
             mock_render.return_value = "fake_base64_image"
 
             # Mock OpenAI API
-            with patch('app.services.openai_vision_service.OpenAI') as mock_openai_class:
-                mock_client = Mock()
+            with patch('app.services.openai_vision_service.AsyncOpenAI') as mock_openai_class:
+                mock_client = MagicMock()
+                mock_client.__aenter__.return_value = mock_client
                 mock_response = Mock()
                 mock_choice = Mock()
                 mock_message = Mock()
@@ -382,7 +383,7 @@ class TestOpenAIVisionService:
                 mock_usage.total_tokens = 800
                 mock_response.usage = mock_usage
 
-                mock_client.chat.completions.create.return_value = mock_response
+                mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
                 mock_openai_class.return_value = mock_client
 
                 # Create fake PDF
@@ -437,8 +438,9 @@ class TestOpenAIVisionService:
             mock_render.return_value = "fake_base64_image"
 
             # Mock OpenAI API returning invalid JSON
-            with patch('app.services.openai_vision_service.OpenAI') as mock_openai_class:
-                mock_client = Mock()
+            with patch('app.services.openai_vision_service.AsyncOpenAI') as mock_openai_class:
+                mock_client = MagicMock()
+                mock_client.__aenter__.return_value = mock_client
                 mock_response = Mock()
                 mock_choice = Mock()
                 mock_message = Mock()
@@ -449,7 +451,7 @@ class TestOpenAIVisionService:
                 mock_response.choices = [mock_choice]
                 mock_response.usage = None
 
-                mock_client.chat.completions.create.return_value = mock_response
+                mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
                 mock_openai_class.return_value = mock_client
 
                 import tempfile
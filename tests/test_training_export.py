@@ -0,0 +1,226 @@
+"""GESTIMA - Tests for streamed / resumable training-data JSONL export"""
+
+import asyncio
+import json
+import os
+import sys
+import types
+
+import fitz
+import pytest
+from httpx import AsyncClient
+
+from app.config import settings
+from app.models.time_vision import TimeVisionEstimation
+from app.services import training_export
+from app.services.training_export import (
+    TrainingExample,
+    export_file_path,
+    stream_jsonl,
+    stream_jsonl_resumable,
+)
+
+
+def _pdf() -> bytes:
+    doc = fitz.open()
+    doc.new_page(width=200, height=100)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def export_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PDF_RASTER_WORKERS", 0)
+    monkeypatch.setattr(settings, "TRAINING_EXPORT_DIR", tmp_path / "exports")
+    monkeypatch.setattr(settings, "TRAINING_EXPORT_RENDER_AHEAD", 2)
+    return tmp_path
+
+
+@pytest.fixture
+def render_counter(monkeypatch):
+    """Počítá rendery a max. počet obrázků rozpracovaných najednou."""
+    real_render = training_export._render
+    stats = {"calls": 0, "inflight": 0, "max_inflight": 0}
+
+    async def _counting(example):
+        stats["calls"] += 1
+        stats["inflight"] += 1
+        stats["max_inflight"] = max(stats["max_inflight"], stats["inflight"])
+        try:
+            return await real_render(example)
+        finally:
+            stats["inflight"] -= 1
+
+    monkeypatch.setattr(training_export, "_render", _counting)
+    return stats
+
+
+def _examples(tmp_path, count, broken=()):
+    examples = []
+    for i in range(count):
+        path = tmp_path / f"vykres_{i}.pdf"
+        path.write_bytes(b"not a pdf" if i in broken else _pdf())
+        examples.append(TrainingExample(
+            key=f"part:{i}", pdf_path=path, system_prompt="system",
+            user_text="text", answer=json.dumps({"i": i}),
+        ))
+    return examples
+
+
+async def _collect(gen, limit=None):
+    out = []
+    async for chunk in gen:
+        out.append(chunk)
+        if limit is not None and len(out) == limit:
+            await gen.aclose()
+            break
+    return b"".join(out)
+
+
+@pytest.mark.asyncio
+async def test_stream_keeps_order_skips_broken_and_bounds_renders(export_env, render_counter):
+    examples = _examples(export_env, 5, broken={1})
+    data = await _collect(stream_jsonl(examples))
+
+    rows = [json.loads(line) for line in data.splitlines()]
+    assert [json.loads(r["messages"][2]["content"])["i"] for r in rows] == [0, 2, 3, 4]
+    image = rows[0]["messages"][1]["content"][0]["image_url"]
+    assert image["url"].startswith("data:image/png;base64,") and image["detail"] == "high"
+    assert render_counter["calls"] == 5
+    assert render_counter["max_inflight"] <= 2
+
+
+@pytest.mark.asyncio
+async def test_resumable_export_continues_after_disconnect(export_env, render_counter):
+    examples = _examples(export_env, 4)
+    path = export_file_path("training", examples)
+
+    # Klient se odpojí po dvou řádcích
+    first = await _collect(stream_jsonl_resumable(examples, path), limit=2)
+    assert len(first.splitlines()) == 2
+
+    # Rozepsaný řádek po pádu procesu se usekne
+    with open(path, "ab") as f:
+        f.write(b'{"messages": [')
+
+    calls_before = render_counter["calls"]
+    full = await _collect(stream_jsonl_resumable(examples, path))
+    assert full.startswith(first)
+    assert [json.loads(json.loads(line)["messages"][2]["content"])["i"] for line in full.splitlines()] == [0, 1, 2, 3]
+    assert path.read_bytes() == full
+    # Hotové řádky se nerenderují znovu (max. předstih rozpracovaný při odpojení)
+    assert render_counter["calls"] - calls_before == 2
+
+    # Hotový export se jen přečte ze souboru
+    calls_before = render_counter["calls"]
+    assert await _collect(stream_jsonl_resumable(examples, path)) == full
+    assert render_counter["calls"] == calls_before
+
+
+@pytest.mark.asyncio
+async def test_resumable_export_closes_file_when_client_disconnects_during_resume(export_env, monkeypatch):
+    examples = _examples(export_env, 2)
+    path = export_file_path("training", examples)
+    full = await _collect(stream_jsonl_resumable(examples, path))
+
+    monkeypatch.setattr(training_export, "_READ_CHUNK", 16)
+    closed = []
+    real_read_chunks = training_export._read_chunks
+
+    def _tracking(p):
+        try:
+            yield from real_read_chunks(p)
+        finally:
+            closed.append(p)
+
+    monkeypatch.setattr(training_export, "_read_chunks", _tracking)
+    first = await _collect(stream_jsonl_resumable(examples, path), limit=1)
+    assert full.startswith(first) and len(first) == 16
+    assert closed == [path]
+
+
+def test_export_lock_falls_back_to_msvcrt_off_posix(tmp_path, monkeypatch):
+    """Mimo POSIX (Windows) se zamyká přes msvcrt.locking — import fcntl se nevyžaduje."""
+    fcntl = pytest.importorskip("fcntl")  # fake msvcrt simuluje zámek přes flock
+
+    def _locking(fd, mode, nbytes):
+        flag = fcntl.LOCK_UN if mode == fake_msvcrt.LK_UNLCK else fcntl.LOCK_EX | fcntl.LOCK_NB
+        fcntl.flock(fd, flag)
+
+    fake_msvcrt = types.SimpleNamespace(LK_NBLCK=2, LK_UNLCK=0, locking=_locking)
+    monkeypatch.setitem(sys.modules, "msvcrt", fake_msvcrt)
+    monkeypatch.setattr(training_export.os, "name", "nt")
+    keys_path = tmp_path / "training_x.jsonl.keys"
+
+    fd = training_export._try_lock(keys_path)
+    assert fd is not None
+    assert training_export._try_lock(keys_path) is None
+    training_export._unlock(fd)
+    fd = training_export._try_lock(keys_path)
+    assert fd is not None
+    training_export._unlock(fd)
+
+
+@pytest.mark.asyncio
+async def test_resumable_export_waits_for_os_lock_held_elsewhere(export_env, render_counter, monkeypatch):
+    monkeypatch.setattr(training_export, "_LOCK_POLL_S", 0.01)
+    examples = _examples(export_env, 2)
+    path = export_file_path("training", examples)
+
+    # Jiný worker (jiný popisovač souboru) drží zámek exportu
+    fd = training_export._try_lock(training_export._keys_path(path))
+    assert fd is not None
+    task = asyncio.ensure_future(_collect(stream_jsonl_resumable(examples, path)))
+    await asyncio.sleep(0.1)
+    assert not task.done() and render_counter["calls"] == 0
+    os.close(fd)
+
+    data = await asyncio.wait_for(task, timeout=10)
+    assert len(data.splitlines()) == 2 and path.read_bytes() == data
+
+
+@pytest.mark.asyncio
+async def test_resumable_export_prunes_expired_exports(export_env, monkeypatch):
+    monkeypatch.setattr(settings, "TRAINING_EXPORT_TTL_HOURS", 1)
+    exports = export_env / "exports"
+    exports.mkdir()
+    old = 1_000_000_000
+    for name in ("training_old", "training_locked", "training_fresh"):
+        (exports / f"{name}.jsonl").write_bytes(b"{}\n")
+        (exports / f"{name}.jsonl.keys").write_text("k\n")
+    for name in ("training_old", "training_locked"):
+        os.utime(exports / f"{name}.jsonl.keys", (old, old))
+
+    fd = training_export._try_lock(exports / "training_locked.jsonl.keys")  # právě se zapisuje
+    try:
+        examples = _examples(export_env, 1)
+        await _collect(stream_jsonl_resumable(examples, export_file_path("training", examples)))
+    finally:
+        os.close(fd)
+
+    remaining = {p.name for p in exports.iterdir()}
+    assert "training_old.jsonl" not in remaining and "training_old.jsonl.keys" not in remaining
+    assert {"training_locked.jsonl", "training_fresh.jsonl"} <= remaining
+    assert len(remaining) == 6  # locked + fresh + nový export, každý s .keys
+
+
+@pytest.mark.asyncio
+async def test_export_training_endpoint_streams_jsonl(client: AsyncClient, admin_headers, test_db_session, export_env):
+    for i, content in enumerate([_pdf(), b"not a pdf", None]):
+        pdf_path = export_env / f"tv_{i}.pdf"
+        if content is not None:
+            pdf_path.write_bytes(content)
+        test_db_session.add(TimeVisionEstimation(
+            pdf_filename=pdf_path.name, pdf_path=str(pdf_path), status="calibrated",
+            ai_provider="openai", actual_time_min=10.0 + i, part_type="ROT", complexity="simple",
+        ))
+    await test_db_session.commit()
+
+    response = await client.get("/api/time-vision/export-training?resumable=true", headers=admin_headers)
+    assert response.status_code == 200
+    assert "gestima_ft_2_samples.jsonl" in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.content.splitlines()]
+    assert len(rows) == 1
+    assert json.loads(rows[0]["messages"][2]["content"])["estimated_time_min"] == 10.0
+    assert len(list((export_env / "exports").glob("training_*.jsonl"))) == 1
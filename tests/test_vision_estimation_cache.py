@@ -0,0 +1,69 @@
+"""GESTIMA - Tests for OpenAI vision response cache (TimeVisionEstimation jako cache)"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.models.time_vision import TimeVisionEstimation
+from app.services.vision_estimation_cache import estimate_cached, vision_cache_key
+
+
+class CountingCompute:
+    def __init__(self, result, delay=0.0):
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return dict(self.result)
+
+
+async def _key(pdf_path, user_prompt="prompt v1"):
+    return await vision_cache_key(pdf_path, "time_v1", "ft:model", "system", user_prompt, "high")
+
+
+@pytest.mark.asyncio
+async def test_estimation_record_is_cache_hit(db_session, tmp_path):
+    pdf_path = tmp_path / "vykres.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 vykres")
+    key = await _key(pdf_path)
+    compute = CountingCompute({"estimated_time_min": 12.5})
+
+    result, cached = await estimate_cached(db_session, key, compute)
+    assert (result, cached, compute.calls) == ({"estimated_time_min": 12.5}, False, 1)
+
+    db_session.add(TimeVisionEstimation(
+        pdf_filename="vykres.pdf", pdf_path=str(pdf_path), estimation_type="time_v1",
+        ai_model="ft:model", vision_extraction_json=json.dumps(result), **key.columns(),
+    ))
+    await db_session.commit()
+
+    # Stejný obsah pod jiným jménem → hit bez volání modelu
+    copy_path = tmp_path / "kopie.pdf"
+    copy_path.write_bytes(pdf_path.read_bytes())
+    result, cached = await estimate_cached(db_session, await _key(copy_path), compute)
+    assert cached and result["estimated_time_min"] == 12.5 and compute.calls == 1
+
+    # Jiný prompt nebo force_refresh → nové volání
+    assert (await estimate_cached(db_session, await _key(pdf_path, "prompt v2"), compute))[1] is False
+    assert (await estimate_cached(db_session, key, compute, force=True))[1] is False
+    assert compute.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call(db_session, tmp_path):
+    pdf_path = tmp_path / "vykres.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 vykres")
+    key = await _key(pdf_path)
+    compute = CountingCompute({"estimated_time_min": 7.0}, delay=0.05)
+
+    results = await asyncio.gather(*(estimate_cached(db_session, key, compute) for _ in range(3)))
+    assert compute.calls == 1
+    assert [r for r, _ in results] == [{"estimated_time_min": 7.0}] * 3
+
+    # Po dokončení se klíč uvolní — další volání (bez uloženého záznamu) jde znovu na model
+    await estimate_cached(db_session, key, compute)
+    assert compute.calls == 2
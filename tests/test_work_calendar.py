@@ -0,0 +1,94 @@
+"""GESTIMA - Tests for WorkCalendar (pracovní kalendář plánovače)"""
+
+import random
+from datetime import date, datetime, timedelta
+
+from app.services.work_calendar import (
+    WorkCalendar,
+    build_work_calendars,
+    czech_holidays,
+    parse_shift,
+)
+
+
+def _reference_add_work_hours(start: datetime, hours: float) -> datetime:
+    """Původní den-po-dni algoritmus (Po–Pá 07:00–15:00) pro porovnání."""
+    def clamp(dt):
+        while dt.weekday() >= 5:
+            dt = dt.replace(hour=7, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        if dt.hour < 7:
+            dt = dt.replace(hour=7, minute=0, second=0, microsecond=0)
+        if dt.hour >= 15:
+            dt = (dt + timedelta(days=1)).replace(hour=7, minute=0, second=0, microsecond=0)
+            while dt.weekday() >= 5:
+                dt += timedelta(days=1)
+        return dt
+
+    if hours <= 0:
+        return start
+    current = clamp(start)
+    remaining = hours
+    while remaining > 0:
+        day_end = current.replace(hour=15, minute=0, second=0, microsecond=0)
+        available = (day_end - current).total_seconds() / 3600
+        if remaining <= available:
+            return current + timedelta(hours=remaining)
+        remaining -= available
+        current = clamp((day_end + timedelta(days=1)).replace(hour=7))
+    return current
+
+
+def test_matches_previous_day_walk():
+    calendar = WorkCalendar(origin=date(2026, 1, 1))
+    rng = random.Random(42)
+    for _ in range(500):
+        start = datetime(2026, 3, 2) + timedelta(minutes=rng.randrange(0, 60 * 24 * 60, 15))
+        hours = rng.choice([0.25, 0.5, 1.0, 2.0, 5.5, 8.0, 12.0, 24.0, 40.0, 100.0])
+        assert calendar.add_work_hours(start, hours) == _reference_add_work_hours(start, hours), (start, hours)
+
+
+def test_holidays_are_skipped():
+    calendar = WorkCalendar(holiday_rule=czech_holidays, origin=date(2026, 1, 1))
+
+    # Velký pátek 3.4.2026 + Velikonoční pondělí 6.4.2026
+    assert not calendar.is_working_day(date(2026, 4, 3))
+    assert calendar.clamp(datetime(2026, 4, 2, 16, 0)) == datetime(2026, 4, 7, 7, 0)
+    # Čt 11:00 + 8h → 4h čtvrtek, pak až úterý 11:00
+    assert calendar.add_work_hours(datetime(2026, 4, 2, 11, 0), 8.0) == datetime(2026, 4, 7, 11, 0)
+
+
+def test_multi_shift_day_and_shift_boundaries():
+    two_shifts = (parse_shift("06:00-14:00"), parse_shift("14:00-22:00"))
+    calendar = WorkCalendar({wd: two_shifts for wd in range(5)}, origin=date(2026, 3, 1))
+
+    monday = datetime(2026, 3, 2, 6, 0)
+    assert calendar.add_work_hours(monday, 16.0) == datetime(2026, 3, 2, 22, 0)
+    assert calendar.add_work_hours(monday, 17.0) == datetime(2026, 3, 3, 7, 0)
+    assert calendar.work_hours_between(monday, datetime(2026, 3, 3, 7, 0)) == 17.0
+
+    # Přestávka mezi směnami: konec operace na konci směny, start na začátku další
+    split = WorkCalendar({0: (parse_shift("06:00-10:00"), parse_shift("12:00-16:00"))}, origin=date(2026, 3, 1))
+    assert split.add_work_hours(monday, 4.0) == datetime(2026, 3, 2, 10, 0)
+    assert split.clamp(datetime(2026, 3, 2, 10, 0)) == datetime(2026, 3, 2, 12, 0)
+
+
+def test_dates_before_origin_and_far_future():
+    calendar = WorkCalendar(origin=date(2026, 6, 1))
+
+    assert calendar.clamp(datetime(2020, 1, 4, 9, 0)) == datetime(2020, 1, 6, 7, 0)
+    far = datetime(2030, 1, 7, 7, 0)  # pondělí
+    assert calendar.add_work_hours(far, 8.0) == datetime(2030, 1, 7, 15, 0)
+
+
+def test_build_work_calendars_from_config():
+    calendars = build_work_calendars(
+        '{"FV3": ["06:00-14:00", "14:00-22:00"], "PS": {"5": ["06:00-12:00"]}}',
+        '["2026-03-04"]',
+    )
+
+    saturday = datetime(2026, 3, 7, 6, 0)
+    assert calendars.for_wc("ps").add_work_hours(saturday, 6.0) == datetime(2026, 3, 7, 12, 0)
+    assert calendars.for_wc("FV3").clamp(datetime(2026, 3, 3, 21, 0)) == datetime(2026, 3, 3, 21, 0)
+    # Dodatečný svátek (St 4.3.) platí pro všechna WC
+    assert calendars.for_wc("UNKNOWN").clamp(datetime(2026, 3, 4, 8, 0)) == datetime(2026, 3, 5, 7, 0)
+    assert calendars.for_wc("FV3").clamp(datetime(2026, 3, 4, 8, 0)) == datetime(2026, 3, 5, 6, 0)
@@ -1 +1,227 @@
 """Tests for workshop service."""
+
+import asyncio
+
+import pytest
+
+from app.services import workshop_service
+
+
+class _PagedInforClient:
+    """Fake Infor client vracející předem dané stránky přes bookmark."""
+
+    def __init__(self, pages):
+        self._pages = pages
+        self.calls = []
+
+    async def load_collection(self, **kwargs):
+        self.calls.append(kwargs)
+        index = int(kwargs.get("bookmark") or 0)
+        await asyncio.sleep(0)
+        data = self._pages[index]
+        next_index = index + 1
+        has_next = next_index < len(self._pages)
+        return {
+            "data": data,
+            "bookmark": str(next_index) if has_next else None,
+            "has_more": has_next,
+            "message_code": 0,
+        }
+
+
+@pytest.mark.asyncio
+async def test_iter_collection_pages_follows_bookmarks_and_dedups():
+    client = _PagedInforClient([
+        [{"RowPointer": "a"}, {"RowPointer": "b"}],
+        [{"RowPointer": "b"}, {"RowPointer": "c"}],
+        [{"RowPointer": "d"}],
+    ])
+
+    pages = [
+        page
+        async for page in workshop_service._iter_collection_pages(
+            client, "SLJobRoutes", [["RowPointer"]], record_cap=0,
+        )
+    ]
+
+    assert [[r["RowPointer"] for r in page] for page in pages] == [["a", "b"], ["c"], ["d"]]
+    assert [c.get("load_type") for c in client.calls] == [None, "NEXT", "NEXT"]
+
+
+@pytest.mark.asyncio
+async def test_iter_collection_pages_prefetches_next_page():
+    client = _PagedInforClient([[{"RowPointer": "a"}], [{"RowPointer": "b"}]])
+
+    iterator = workshop_service._iter_collection_pages(
+        client, "SLJobRoutes", [["RowPointer"]], record_cap=0,
+    )
+    first = await iterator.__anext__()
+
+    # Stránka 2 je už vyžádaná, zatímco volající zpracovává stránku 1
+    assert first == [{"RowPointer": "a"}]
+    assert len(client.calls) == 2
+    await iterator.aclose()
+
+
+@pytest.mark.asyncio
+async def test_iter_collection_pages_stops_at_record_cap():
+    client = _PagedInforClient([
+        [{"RowPointer": "a"}, {"RowPointer": "b"}],
+        [{"RowPointer": "c"}],
+    ])
+
+    rows = await workshop_service._load_collection_first(
+        client, "SLJobRoutes", [["RowPointer"]], record_cap=2,
+    )
+
+    assert [r["RowPointer"] for r in rows] == ["a", "b"]
+    assert len(client.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_iter_collection_pages_keeps_loaded_pages_on_failed_later_page(caplog):
+    class _Client(_PagedInforClient):
+        async def load_collection(self, **kwargs):
+            if kwargs.get("bookmark") == "2":
+                return {"data": [], "message_code": 500, "message": "Session expired"}
+            return await super().load_collection(**kwargs)
+
+    client = _Client([[{"RowPointer": "a"}], [{"RowPointer": "b"}], [{"RowPointer": "c"}]])
+
+    rows = await workshop_service._load_collection_first(
+        client, "SLJobRoutes", [["RowPointer"]], record_cap=0,
+    )
+
+    assert [r["RowPointer"] for r in rows] == ["a", "b"]
+    assert "page 3: Session expired" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_iter_collection_pages_raises_when_first_page_fails():
+    class _Client(_PagedInforClient):
+        async def load_collection(self, **kwargs):
+            return {"data": [], "message_code": 500, "message": "Session expired"}
+
+    with pytest.raises(RuntimeError, match="failed for all property sets"):
+        await workshop_service._load_collection_first(
+            _Client([]), "SLJobRoutes", [["RowPointer"]], record_cap=0,
+        )
+
+
+@pytest.mark.asyncio
+async def test_load_collection_first_falls_back_to_next_property_set():
+    class _Client(_PagedInforClient):
+        async def load_collection(self, **kwargs):
+            if "Bad" in kwargs["properties"]:
+                return {"data": [], "message_code": 500, "message": "Invalid property"}
+            return await super().load_collection(**kwargs)
+
+    client = _Client([[{"Job": "VP1"}]])
+
+    rows = await workshop_service._load_collection_first(
+        client, "SLJobRoutes", [["Bad"], ["Job"]], record_cap=0,
+    )
+
+    assert rows == [{"Job": "VP1"}]
+
+
+@pytest.mark.asyncio
+async def test_read_wc_queue_from_db_keyset_pages_match_sort_queue(db_session):
+    """SQL řazení + keyset kurzor dává stejné pořadí jako sort_queue nad celou frontou."""
+    from app.services.workshop_sync_dispatchers import dispatch_workshop_routes
+
+    rows = []
+    for i, (start, job) in enumerate([
+        ("2026-03-04", "VP26-002"), ("2026-03-02", "VP26-001"), (None, "VP26-003"),
+        ("2026-03-02", "vp26-000"), ("2026-03-03", "VP26-004"), ("2026-03-02", "VP26-001"),
+    ]):
+        rows.append({
+            "Job": job, "Suffix": "0", "OperNum": str(10 * (i + 1)), "Wc": "SH2", "JobStat": "R",
+            "JobQtyReleased": "10", "QtyComplete": "0", "DerStartDate": start,
+            "JobDescription": f"Díl {i % 3}",
+        })
+    rows.append({**rows[0], "OperNum": "99", "QtyComplete": "10"})  # dokončená → vynechat
+    await dispatch_workshop_routes(rows, db_session)
+
+    for sort_by, sort_dir in (("OpDatumSt", "asc"), ("JobDescription", "desc"), ("OperNum", "asc")):
+        everything = await workshop_service.read_wc_queue_from_db(
+            db_session, wc="SH2", sort_by=sort_by, sort_dir=sort_dir, limit=100,
+        )
+        assert [r["OperNum"] for r in everything] == [
+            r["OperNum"] for r in workshop_service.sort_queue(everything, sort_by, sort_dir)
+        ]
+        assert "99" not in {r["OperNum"] for r in everything}
+
+        paged, cursor = [], None
+        while True:
+            page = await workshop_service.read_wc_queue_from_db(
+                db_session, wc="SH2", sort_by=sort_by, sort_dir=sort_dir, limit=2, after=cursor,
+            )
+            paged.extend(page)
+            cursor = workshop_service.queue_next_cursor(page, sort_by, 2)
+            if cursor is None:
+                break
+        assert [r["OperNum"] for r in paged] == [r["OperNum"] for r in everything]
+
+
+@pytest.mark.asyncio
+async def test_read_orders_overview_fts_search_paging_and_etag(db_session):
+    """Přehled zakázek: read model ze syncu, FTS hledání, SQL stránkování, ETag."""
+    from app.services.workshop_sync_dispatchers import dispatch_workshop_orders
+
+    rows = [
+        {
+            "CoNum": f"CO{i:03d}", "CoLine": "1", "Item": f"HRIDEL-{i}", "ItemDescription": desc,
+            "DueDate": f"202603{10 + i:02d} 00:00:00.000", "Job": f"VP26-{i:03d}",
+            "Wc01": "FV3", "Comp01": "1", "Wc02": "SH2", "Wip02": "1", "Mat01": "C45",
+        }
+        for i, desc in enumerate(["Příruba velká", "Čep", "Pouzdro příruby", "Víko"])
+    ]
+    rows.append({"CoNum": "CO900", "CoLine": "1", "Item": "BEZ-OPERACI", "Job": "VP26-900",
+                 "DueDate": "20260401 00:00:00.000"})
+    await dispatch_workshop_orders(rows, db_session)
+    await db_session.commit()
+
+    everything = await workshop_service.read_orders_overview_from_db(db_session)
+    assert [r["co_num"] for r in everything] == ["CO000", "CO001", "CO002", "CO003", "CO900"]
+    assert everything[0]["selected_vp_job"] == "VP26-000"
+    assert [o["status"] for o in everything[0]["operations"]] == ["done", "in_progress"]
+    assert everything[0]["materials"] == [{"material": "C45", "status": "idle"}]
+    assert everything[-1]["selected_vp_job"] is None
+
+    # FTS trigram: substring, case-insensitive, přes popis i VP
+    hits = await workshop_service.read_orders_overview_from_db(db_session, search="ŘÍRUB")
+    assert [r["co_num"] for r in hits] == ["CO000", "CO002"]
+    hits = await workshop_service.read_orders_overview_from_db(db_session, search="čep")
+    assert [r["co_num"] for r in hits] == ["CO001"]
+    hits = await workshop_service.read_orders_overview_from_db(db_session, search="26-003")
+    assert [r["co_num"] for r in hits] == ["CO003"]
+    # Krátký dotaz (< trigram) → LIKE
+    hits = await workshop_service.read_orders_overview_from_db(db_session, search="9")
+    assert [r["co_num"] for r in hits] == ["CO900"]
+
+    page = await workshop_service.read_orders_overview_from_db(db_session, limit=2, offset=2)
+    assert [r["co_num"] for r in page] == ["CO002", "CO003"]
+
+    etag = await workshop_service.orders_overview_etag(db_session, limit=2, offset=2)
+    assert etag == await workshop_service.orders_overview_etag(db_session, limit=2, offset=2)
+    assert etag != await workshop_service.orders_overview_etag(db_session, limit=2, offset=0)
+
+    rows[1] = {**rows[1], "ItemDescription": "Čep kalený"}
+    await dispatch_workshop_orders(rows, db_session)
+    await db_session.commit()
+    assert etag != await workshop_service.orders_overview_etag(db_session, limit=2, offset=2)
+    hits = await workshop_service.read_orders_overview_from_db(db_session, search="kalen")
+    assert [r["co_num"] for r in hits] == ["CO001"]
+
+    # Beze změny dat stejný ETag, změna tieru (production_priorities) ho posune
+    etag = await workshop_service.orders_overview_etag(db_session, limit=2, offset=2)
+    await dispatch_workshop_orders(rows, db_session)
+    await db_session.commit()
+    assert etag == await workshop_service.orders_overview_etag(db_session, limit=2, offset=2)
+
+    from app.models.production_priority import ProductionPriority
+
+    db_session.add(ProductionPriority(infor_job="VP26-001", infor_suffix="0", priority=5, is_hot=True))
+    await db_session.commit()
+    assert etag != await workshop_service.orders_overview_etag(db_session, limit=2, offset=2)